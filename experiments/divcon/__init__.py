@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon: Division & Consensus Analysis
+大量の意見から対立軸を自動抽出・可視化するライブラリ
+
+import 時には何もしない（.env の読み込み、OpenAI クライアントの生成、
+pandas などの重いライブラリの読み込みは、実際に使うときまで遅延する）。
+
+使用例:
+    import divcon
+
+    divcon.configure(max_workers=4)
+    topics = divcon.stage1_topic_discovery(opinions)
+    divcon.run(data_path='data/opinions.csv', results_dir='results')
+"""
+
+import importlib
+
+__version__ = '0.1.0'
+
+# 属性名 → 定義モジュール（初回アクセス時に import する）
+_LAZY_ATTRS = {
+    'configure': 'config',
+    'get_settings': 'config',
+    'get_client': 'llm',
+    'set_client': 'llm',
+    'stage1_topic_discovery': 'stages',
+    'stage2_classification': 'stages',
+    'stage3a_axis_discovery': 'stages',
+    'stage3b_anchor_generation': 'stages',
+    'stage4_scoring': 'stages',
+    'stage5_consensus_analysis': 'stages',
+    'run': 'pipeline',
+    'run_batch': 'batch',
+    'coordinate': 'cluster',
+    'run_worker': 'cluster',
+    'compute_stats': 'stats',
+    'compute_axis_metrics': 'metrics',
+    'load_matrix': 'matrix',
+    'generate_views': ('views', 'generate_all'),
+    'build_database': 'server',
+}
+
+__all__ = sorted(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    target = _LAZY_ATTRS.get(name)
+    if target is None:
+        raise AttributeError(f"module 'divcon' has no attribute {name!r}")
+    module_name, attr = target if isinstance(target, tuple) else (target, name)
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
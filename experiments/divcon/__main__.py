@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""python -m divcon"""
+
+from .cli import main
+
+main()
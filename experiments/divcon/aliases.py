@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 意見IDの短い別名
+プロンプトには意見を「[ID] 本文」の形で載せ、Stage 2・4 では出力でも意見IDを返させ、Stage 3a・5 では
+理由説明の中で ID:XXX の形で参照させる。UUID や受付番号のような長いIDは、プロンプトと出力の両方で
+毎回トークンを使うため、プロンプトごとに 1, 2, 3, ... の別名に置き換え、パース後に元のIDに戻す。
+
+    - 別名はプロンプト内の順番。出力に未知の別名が返った場合、ID の列（Stage 2・4）では捨てる
+    - 出力は位置の配列にはせず、別名を返させる（欠けた行や順序の入れ替わりを検出できるように）
+    - 削減したトークン数の推定値を llm の集計（get_usage）に加える:
+        - alias_saved_input_tokens: プロンプトで ID を別名にした分
+        - alias_saved_output_tokens: 出力で ID を返す分（Stage 2・4。1件につき1回返すものとする）
+"""
+
+import re
+
+from . import llm
+from .normalize import estimate_tokens
+
+# 理由説明などの自由記述の中の参照（ID:12、ID: 12、[ID:12] など）
+_REFERENCE = re.compile(r'(ID\s*[:：]\s*)(\d+)')
+# 別名だけの値（"12"、"[12]"、"ID:12" など）
+_ALIAS_ONLY = re.compile(r'^\s*\[?\s*(?:ID\s*[:：]?\s*)?(\d+)\s*\]?\s*$')
+
+
+class IdAliases:
+    """1つのプロンプト内の意見ID ↔ 別名の対応"""
+
+    def __init__(self, opinion_ids, echoed=False):
+        """
+        Args:
+            opinion_ids: プロンプトに載せる順の意見ID
+            echoed: True の場合、出力でも各IDを1回返すものとして削減量を数える
+        """
+        self._ids = [str(opinion_id) for opinion_id in opinion_ids]
+        self._alias_of = {}
+        for n, opinion_id in enumerate(self._ids, 1):
+            self._alias_of.setdefault(opinion_id, str(n))
+
+        saved = sum(max(estimate_tokens(opinion_id) - estimate_tokens(self._alias_of[opinion_id]), 0)
+                    for opinion_id in self._ids)
+        if saved:
+            llm.add_usage('alias_saved_input_tokens', saved)
+            if echoed:
+                llm.add_usage('alias_saved_output_tokens', saved)
+
+    def alias(self, opinion_id):
+        return self._alias_of[str(opinion_id)]
+
+    def resolve(self, value):
+        """出力の別名を元の意見IDに戻す（別名でない・未知の別名の場合は None）"""
+        match = _ALIAS_ONLY.match(str(value))
+        if match is None:
+            return None
+        n = int(match.group(1))
+        return self._ids[n - 1] if 1 <= n <= len(self._ids) else None
+
+    def restore_reference(self, value):
+        """ID のリストの要素（"ID:12" など）の別名を元のIDに置き換える（未知の値はそのまま）"""
+        opinion_id = self.resolve(value)
+        if opinion_id is None:
+            return value
+        match = _REFERENCE.search(value)
+        return f"{match.group(1)}{opinion_id}" if match else opinion_id
+
+    def restore_text(self, text):
+        """自由記述の中の ID:12 の形の参照を元のIDに置き換える"""
+        def replace(match):
+            n = int(match.group(2))
+            if 1 <= n <= len(self._ids):
+                return f"{match.group(1)}{self._ids[n - 1]}"
+            return match.group(0)
+        return _REFERENCE.sub(replace, text)
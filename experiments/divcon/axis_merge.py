@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon トピック横断の対立軸の統合
+Stage 3a はトピックごとに独立して実行されるため、ほぼ同じ対立軸が複数のトピックに現れる。
+軸IDの標準化後に重複する軸を1つの共有軸にまとめ、Stage 3b・4 はまとめたトピックの意見の
+和集合に対して一度だけ実行する（同じ軸のアンカー生成とスコアリングを繰り返さない）。
+
+重複の判定:
+    - 軸名・左極・右極の文字 bigram のコサイン類似度（NFKC 正規化・空白除去後。左右の向きは問わない）
+    - 異なるトピックの軸どうしだけを比較し、1つの共有軸に同じトピックの軸は2つ入れない
+    - グループ内のすべての組が条件を満たす場合だけ統合する（連鎖的に別の軸へ広がらないように）
+    - confirm=True の場合は類似度 MERGE_CANDIDATE_SIMILARITY 以上の組を LLM に確認し、
+      False の場合は MERGE_SIMILARITY 以上の組をそのまま統合する
+
+共有軸は代表軸（強度が最も高い軸。同じなら軸IDの順で先）の ID と定義を引き継ぎ、次のキーを追加する:
+    - topic_ids: 共有するトピックIDのリスト（先頭は代表軸のトピック）
+    - merged_from: 統合された軸のID
+axes.json では代表軸のトピックの下にだけ置く。scores.csv の topic_id は各意見のトピックになる。
+
+出力:
+    - results/axis_merge.json: 統合した軸と類似度（統合有効時のみ）
+"""
+
+import unicodedata
+from collections import Counter
+
+import numpy as np
+from pydantic import BaseModel
+
+from . import llm
+from .config import get_settings
+from .stages import print_lock
+
+# この類似度以上の組を同じ軸として統合する（LLM 確認なしの場合）
+MERGE_SIMILARITY = 0.7
+# LLM 確認ありの場合に確認へ回す類似度の下限
+MERGE_CANDIDATE_SIMILARITY = 0.4
+
+_AXIS_FIELDS = ('name', 'left_pole', 'right_pole')
+
+
+# ============================================================================
+# 類似度
+# ============================================================================
+
+def _normalize(text):
+    text = unicodedata.normalize('NFKC', str(text or '')).lower()
+    return ''.join(text.split())
+
+
+def axis_bigrams(axis):
+    """軸名・両極の文字 bigram の出現数（フィールドをまたぐ bigram は作らない）"""
+    counts = Counter()
+    for field in _AXIS_FIELDS:
+        text = _normalize(axis.get(field))
+        counts.update(text[j:j + 2] for j in range(len(text) - 1))
+    return counts
+
+
+def similarity_matrix(axes):
+    """軸どうしの bigram コサイン類似度（n × n）"""
+    vectors = [axis_bigrams(axis) for axis in axes]
+    vocabulary = {gram: k for k, gram in enumerate(sorted(set().union(*vectors)))}
+    X = np.zeros((len(axes), len(vocabulary)), dtype=np.float64)
+    for i, vector in enumerate(vectors):
+        for gram, count in vector.items():
+            X[i, vocabulary[gram]] = count
+    norms = np.linalg.norm(X, axis=1)
+    X /= np.where(norms > 0, norms, 1.0)[:, None]
+    return X @ X.T
+
+
+# ============================================================================
+# LLM による確認
+# ============================================================================
+
+class AxisMergeDecision(BaseModel):
+    same_axis: bool
+    reasoning: str
+
+
+def confirm_same_axis(axis_a, topic_a, axis_b, topic_b):
+    """2つの軸が同じ対立を測っているかを LLM に確認する"""
+    def describe(axis, topic):
+        return (f"トピック: {topic['name']}\n"
+                f"軸名: {axis['name']}\n"
+                f"左極: {axis['left_pole']}\n"
+                f"右極: {axis['right_pole']}")
+
+    prompt = f"""次の2つの対立軸は、別々のトピックの意見から抽出されたものです。
+
+【軸A】
+{describe(axis_a, topic_a)}
+
+【軸B】
+{describe(axis_b, topic_b)}
+
+【タスク】
+2つの軸が同じ対立（同じ価値観・論点の対立）を表しており、1つの軸の同じ 1-6 のスケールで
+両方のトピックの意見をスコアリングしてよいかを判定してください。
+- 左右の向きが逆なだけの場合は同じ軸とみなしてください
+- 言葉が似ていても、対立している論点が異なる場合は別の軸としてください
+"""
+
+    result = llm.parse(
+        messages=[
+            {"role": "system", "content": "あなたは対立構造を分析する専門家です。"},
+            {"role": "user", "content": prompt}
+        ],
+        response_format=AxisMergeDecision
+    )
+    return result.same_axis
+
+
+# ============================================================================
+# 統合
+# ============================================================================
+
+def merge_duplicate_axes(all_axes, topic_map, confirm=False):
+    """トピックをまたいで重複する対立軸を共有軸にまとめる
+
+    Args:
+        all_axes: {topic_id: [axis, ...]}（軸IDは標準化済み）
+        topic_map: {topic_id: topic}（LLM 確認のプロンプトに使用）
+        confirm: True の場合、候補の組を LLM に確認してから統合する
+
+    Returns:
+        tuple: (統合後の {topic_id: [axis, ...]}, 統合レポートのリスト)
+    """
+    entries = [(topic_id, axis) for topic_id, axes in sorted(all_axes.items()) for axis in axes]
+    if len(entries) < 2:
+        return all_axes, []
+
+    sim = similarity_matrix([axis for _, axis in entries])
+    threshold = MERGE_CANDIDATE_SIMILARITY if confirm else MERGE_SIMILARITY
+    candidates = [
+        (float(sim[i, j]), i, j)
+        for i in range(len(entries)) for j in range(i + 1, len(entries))
+        if entries[i][0] != entries[j][0] and sim[i, j] >= threshold
+    ]
+
+    accepted = {(i, j) for _, i, j in candidates}
+    if confirm and candidates:
+        with print_lock:
+            print(f"  [軸の統合] {len(candidates)} 組の候補を LLM で確認中...")
+        with llm.ContextThreadPoolExecutor(max_workers=get_settings().max_workers) as executor:
+            decisions = list(executor.map(
+                lambda c: confirm_same_axis(entries[c[1]][1], topic_map[entries[c[1]][0]],
+                                            entries[c[2]][1], topic_map[entries[c[2]][0]]),
+                candidates
+            ))
+        accepted = {(i, j) for (_, i, j), same in zip(candidates, decisions) if same}
+
+    # 類似度の高い組から、グループ内の全組が accepted の場合だけグループを結合する
+    groups = {i: [i] for i in range(len(entries))}
+    group_of = list(range(len(entries)))
+    for _, i, j in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+        gi, gj = group_of[i], group_of[j]
+        if gi == gj:
+            continue
+        if {entries[k][0] for k in groups[gi]} & {entries[k][0] for k in groups[gj]}:
+            continue
+        if not all((min(a, b), max(a, b)) in accepted for a in groups[gi] for b in groups[gj]):
+            continue
+        for k in groups[gj]:
+            group_of[k] = gi
+        groups[gi].extend(groups.pop(gj))
+
+    merged_axes = {topic_id: [] for topic_id in all_axes}
+    report = []
+    for members in sorted(groups.values(), key=min):
+        if len(members) == 1:
+            topic_id, axis = entries[members[0]]
+            merged_axes[topic_id].append(axis)
+            continue
+
+        members = sorted(members, key=lambda k: (-entries[k][1]['strength'], entries[k][1]['id']))
+        canonical = members[0]
+        topic_id, axis = entries[canonical]
+        others = sorted(members[1:], key=lambda k: entries[k][1]['id'])
+        shared = dict(axis)
+        shared['topic_ids'] = [topic_id] + [entries[k][0] for k in others]
+        shared['merged_from'] = [entries[k][1]['id'] for k in others]
+        merged_axes[topic_id].append(shared)
+        report.append({
+            'axis_id': shared['id'],
+            'name': shared['name'],
+            'topic_ids': shared['topic_ids'],
+            'merged': [
+                {
+                    'axis_id': entries[k][1]['id'],
+                    'topic_id': entries[k][0],
+                    'name': entries[k][1]['name'],
+                    'similarity': round(float(sim[canonical, k]), 4),
+                }
+                for k in others
+            ],
+            'confirmed_by_llm': confirm,
+        })
+
+    # 元の並び（軸番号順）を保つ
+    for topic_id, axes in merged_axes.items():
+        order = {axis['id']: n for n, axis in enumerate(all_axes[topic_id])}
+        axes.sort(key=lambda axis: order[axis['id']])
+    return merged_axes, report
+
+
+def write_summary_merge(f, report):
+    """summary.txt に統合した軸を書き出す"""
+    n_merged = sum(len(r['merged']) for r in report)
+    f.write(f"対立軸の統合（トピック横断の重複 {n_merged} 軸を {len(report)} 軸に統合）:\n")
+    for r in report:
+        f.write(f"  - [{r['axis_id']}] {r['name']} (トピック: {', '.join(r['topic_ids'])})\n")
+        for m in r['merged']:
+            f.write(f"      ← [{m['axis_id']}] {m['name']} (類似度: {m['similarity']:.2f})\n")
+    f.write("\n")
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon バッチ実行
+マニフェストに列挙した複数のデータセットを1プロセスで並行して分析する
+
+マニフェスト（JSON）:
+    {
+      "output_dir": "runs",
+      "runs": [
+        {"name": "energy", "data": "data/opinions.csv"},
+        {"name": "city", "data": "data/city.csv", "results": "runs/city", "docs": "../docs/city"}
+      ]
+    }
+
+    - 相対パスはマニフェストファイルのあるディレクトリを基準に解決する
+    - results を省略した場合は output_dir/<name>/ に出力する（データセットごとに別ディレクトリ）
+    - docs を省略した場合は docs へのコピーを行わない
+
+全データセットで同時API呼び出し数の上限・毎分リクエスト数の上限・レスポンスキャッシュを共有し、
+同時実行枠はデータセット間で公平に割り当てる（llm.FairScheduler）。
+
+出力:
+    - <output_dir>/<name>/: 各データセットの結果（divcon run と同じ構成）
+    - <output_dir>/batch_summary.json: データセットごとの状態・処理時間・リクエスト数
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from . import llm, pipeline
+from .config import configure, get_settings
+from .stages import print_lock
+
+DEFAULT_OUTPUT_DIR = 'runs'
+CACHE_SUBDIR = 'cache'
+
+_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+def load_manifest(manifest_path, output_dir=None):
+    """マニフェストを読み込み、各データセットの入出力パスを解決する
+
+    Args:
+        manifest_path: マニフェストファイル（JSON）
+        output_dir: 出力ディレクトリ（マニフェストの output_dir を上書き）
+
+    Returns:
+        (output_dir, runs) のタプル。runs は {'name', 'data', 'results', 'docs'} のリスト
+    """
+    manifest_path = Path(manifest_path)
+    base_dir = manifest_path.parent
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    # 配列だけのマニフェストも受け付ける
+    if isinstance(manifest, list):
+        manifest = {'runs': manifest}
+
+    if output_dir is None:
+        output_dir = base_dir / manifest.get('output_dir', DEFAULT_OUTPUT_DIR)
+    output_dir = Path(output_dir)
+
+    runs = []
+    seen_names = set()
+    seen_results = set()
+    for entry in manifest.get('runs', []):
+        name = entry.get('name')
+        if not name or not _NAME_PATTERN.match(name):
+            raise ValueError(f"データセット名が不正です: {name!r}（英数字と _ . - のみ使用可能）")
+        if name in seen_names:
+            raise ValueError(f"データセット名が重複しています: {name}")
+        if 'data' not in entry:
+            raise ValueError(f"データセット [{name}] に data がありません")
+
+        data_path = base_dir / entry['data']
+        results_dir = base_dir / entry['results'] if 'results' in entry else output_dir / name
+        docs_dir = base_dir / entry['docs'] if entry.get('docs') else None
+
+        resolved = results_dir.resolve()
+        if resolved in seen_results:
+            raise ValueError(f"データセット [{name}] の出力先が他のデータセットと重複しています: {results_dir}")
+
+        seen_names.add(name)
+        seen_results.add(resolved)
+        runs.append({'name': name, 'data': data_path, 'results': results_dir, 'docs': docs_dir})
+
+    if not runs:
+        raise ValueError(f"マニフェストにデータセットがありません: {manifest_path}")
+
+    missing = [str(run['data']) for run in runs if not run['data'].exists()]
+    if missing:
+        raise FileNotFoundError(f"入力データが見つかりません: {', '.join(missing)}")
+
+    return output_dir, runs
+
+
+def run_batch(manifest_path, output_dir=None, views=True, max_parallel_runs=None):
+    """マニフェストの全データセットを並行して分析する
+
+    Args:
+        manifest_path: マニフェストファイル（JSON）
+        output_dir: 出力ディレクトリ（マニフェストの output_dir を上書き）
+        views: True の場合、各データセットのHTMLビューを生成する
+        max_parallel_runs: 同時に実行するデータセット数（None の場合は全データセット）
+
+    Returns:
+        データセットごとの実行結果のリスト（batch_summary.json と同じ内容）
+    """
+    output_dir, runs = load_manifest(manifest_path, output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 共有リミッタとキャッシュを有効にする（明示的な設定があればそちらを優先）
+    settings = get_settings()
+    overrides = {}
+    if settings.max_concurrency <= 0:
+        overrides['max_concurrency'] = settings.max_workers
+    if not settings.cache_dir:
+        overrides['cache_dir'] = str(output_dir / CACHE_SUBDIR)
+    if overrides:
+        settings = configure(**overrides)
+
+    print(f"DivCon Batch")
+    print(f"=" * 60)
+    print(f"データセット数: {len(runs)}")
+    print(f"同時API呼び出し数: {settings.max_concurrency}（データセット間で公平に割り当て）")
+    if settings.requests_per_minute > 0:
+        print(f"毎分リクエスト数上限: {settings.requests_per_minute}")
+    print(f"レスポンスキャッシュ: {settings.cache_dir}")
+    print(f"=" * 60)
+    print()
+
+    def run_one(run):
+        start_time = datetime.now()
+        with print_lock:
+            print(f"[バッチ] データセット [{run['name']}] を開始 ({run['data']} → {run['results']})")
+        try:
+            with llm.run_scope(run['name']):
+                pipeline.run(
+                    data_path=run['data'],
+                    results_dir=str(run['results']),
+                    docs_dir=str(run['docs']) if run['docs'] else None,
+                    views=views,
+                )
+            status, error = 'ok', None
+        except Exception as e:
+            status, error = 'error', f"{type(e).__name__}: {e}"
+            with print_lock:
+                print(f"[WARNING] データセット [{run['name']}] でエラー: {error}")
+        elapsed = (datetime.now() - start_time).total_seconds()
+        return {
+            'name': run['name'],
+            'data': str(run['data']),
+            'results': str(run['results']),
+            'status': status,
+            'error': error,
+            'elapsed_seconds': round(elapsed, 1),
+        }
+
+    with ThreadPoolExecutor(max_workers=max_parallel_runs or len(runs)) as executor:
+        results = list(executor.map(run_one, runs))
+
+    usage = llm.get_usage()
+    for result in results:
+        run_usage = usage.get(result['name'], {})
+        result['requests'] = run_usage.get('requests', 0)
+        result['cache_hits'] = run_usage.get('cache_hits', 0)
+        result['hedged'] = run_usage.get('hedged', 0)
+        result['hedge_wins'] = run_usage.get('hedge_wins', 0)
+        result['hedge_saved_seconds'] = round(run_usage.get('hedge_saved_seconds', 0), 1)
+
+    with open(output_dir / 'batch_summary.json', 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'=' * 60}")
+    print(f"[OK] バッチ処理完了")
+    for result in results:
+        mark = 'OK' if result['status'] == 'ok' else 'ERROR'
+        print(f"  [{mark}] {result['name']}: {result['elapsed_seconds']} 秒, "
+              f"リクエスト {result['requests']} 件, キャッシュヒット {result['cache_hits']} 件")
+        if result['error']:
+            print(f"      {result['error']}")
+    print(f"  サマリー: {output_dir / 'batch_summary.json'}")
+    print(f"{'=' * 60}")
+
+    return results
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon コマンドラインインターフェース
+
+使用方法:
+    divcon run [--data data/opinions.csv] [--results results] [--docs ../docs] [--dry-run]
+    divcon views [--results results] [--docs ../docs]
+    divcon stats [--results results]
+    divcon batch manifest.json [--output runs]
+    divcon sweep gold.json [--batch-sizes 10,20,50] [--efforts low,medium] [--min-quality 0.8]
+    divcon coordinate --queue /shared/divcon.db [--data data/opinions.csv] [--results results]
+    divcon worker --queue /shared/divcon.db [--kinds stage4,stage5] [--idle-timeout 600]
+"""
+
+import argparse
+import sys
+
+
+def _apply_settings(args):
+    """コマンドライン引数で設定を上書きする"""
+    from .config import configure
+
+    overrides = {}
+    if args.model:
+        overrides['model'] = args.model
+    if args.reasoning_effort:
+        overrides['reasoning_effort'] = args.reasoning_effort
+    if args.workers:
+        overrides['max_workers'] = args.workers
+    if args.max_concurrency is not None:
+        overrides['max_concurrency'] = args.max_concurrency
+    if args.rpm is not None:
+        overrides['requests_per_minute'] = args.rpm
+    if args.cache_dir:
+        overrides['cache_dir'] = args.cache_dir
+    if args.distill:
+        overrides['distill'] = True
+    if args.slim_scoring:
+        overrides['slim_scoring'] = True
+    if args.rescore is not None:
+        overrides['rescore_repeats'] = args.rescore
+    if args.profiles is not None:
+        overrides['profile_clusters'] = args.profiles
+    if args.merge_axes or args.merge_confirm:
+        overrides['merge_axes'] = True
+    if args.merge_confirm:
+        overrides['merge_confirm'] = True
+    if args.no_normalize:
+        overrides['normalize_comments'] = False
+    if args.compress_tokens is not None:
+        overrides['compress_tokens'] = args.compress_tokens
+    if args.hedge is not None:
+        overrides['hedge_percentile'] = args.hedge
+    if args.hedge_budget is not None:
+        overrides['hedge_budget'] = args.hedge_budget
+    if args.token_budget is not None:
+        overrides['token_budget'] = args.token_budget
+    if args.cost_budget is not None:
+        overrides['cost_budget'] = args.cost_budget
+    if overrides:
+        configure(**overrides)
+
+
+def _start_dashboard(args):
+    """--dashboard 指定時に進捗ダッシュボードを起動する"""
+    if args.dashboard is None:
+        return None
+    from . import progress
+
+    return progress.start_dashboard(args.dashboard)
+
+
+def _cmd_run(args):
+    from . import pipeline
+
+    _apply_settings(args)
+    if args.dry_run:
+        pipeline.plan(data_path=args.data)
+        return
+    dashboard = _start_dashboard(args)
+    try:
+        pipeline.run(
+            data_path=args.data,
+            results_dir=args.results,
+            docs_dir=None if args.no_docs else args.docs,
+            views=not args.no_views,
+        )
+    finally:
+        if dashboard is not None:
+            dashboard.stop()
+
+
+def _cmd_views(args):
+    from . import views
+
+    views.generate_all(args.results, None if args.no_docs else args.docs, force=args.force)
+
+
+def _cmd_stats(args):
+    from . import metrics, stats
+
+    score_stats = stats.compute_stats_from_results(args.results)
+    stats.write_stats(score_stats, f'{args.results}/stats.json')
+    print(f"[OK] 統計生成完了: {args.results}/stats.json")
+    print(f"   スコア数: {score_stats['overall']['total']} 件")
+    print(f"   トピック数: {len(score_stats['topics'])} 個")
+    print(f"   対立軸数: {len(score_stats['axes'])} 個")
+
+    axis_metrics = metrics.compute_axis_metrics_from_results(args.results)
+    metrics.write_axis_metrics(axis_metrics, f'{args.results}/axis_metrics.json')
+    print(f"[OK] 分極度メトリクス生成完了: {args.results}/axis_metrics.json")
+    for axis_id, m in sorted(axis_metrics.items(), key=lambda item: item[1]['rank'])[:5]:
+        print(f"   {m['rank']}. [{axis_id}] ER={m['esteban_ray']} BC={m['bimodality']} 極端={m['extremity_share']}")
+
+
+def _cmd_batch(args):
+    from . import batch
+
+    _apply_settings(args)
+    dashboard = _start_dashboard(args)
+    try:
+        results = batch.run_batch(
+            args.manifest,
+            output_dir=args.output,
+            views=not args.no_views,
+            max_parallel_runs=args.parallel,
+        )
+    finally:
+        if dashboard is not None:
+            dashboard.stop()
+    if any(result['status'] != 'ok' for result in results):
+        sys.exit(1)
+
+
+def _cmd_sweep(args):
+    import json
+
+    from . import sweep
+
+    _apply_settings(args)
+
+    def _list(value, cast=str):
+        return [cast(v) for v in value.split(',') if v] if value else None
+
+    print(f"品質とスループットのスイープ: {args.gold}")
+    records = sweep.run_sweep(
+        args.gold,
+        stages=_list(args.stages) or sweep.SWEEP_STAGES,
+        batch_sizes=_list(args.batch_sizes, int) or sweep.DEFAULT_BATCH_SIZES,
+        models=_list(args.models),
+        efforts=_list(args.efforts),
+        verbose=args.verbose,
+    )
+    sweep.print_table(records, args.min_quality)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            # NaN（件数が足りず kappa を計算できない場合）は null にする
+            json.dump([{k: None if v != v else v for k, v in r.items()} for r in records],
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n[OK] 結果を保存: {args.output}")
+
+
+def _cmd_coordinate(args):
+    from . import cluster
+
+    _apply_settings(args)
+    dashboard = _start_dashboard(args)
+    try:
+        cluster.coordinate(
+            data_path=args.data,
+            queue_path=args.queue,
+            results_dir=args.results,
+            docs_dir=None if args.no_docs else args.docs,
+            views=not args.no_views,
+            poll_interval=args.poll,
+        )
+    finally:
+        if dashboard is not None:
+            dashboard.stop()
+
+
+def _cmd_worker(args):
+    from . import cluster
+
+    _apply_settings(args)
+    dashboard = _start_dashboard(args)
+    try:
+        cluster.run_worker(
+            queue_path=args.queue,
+            kinds=[k for k in args.kinds.split(',') if k] if args.kinds else None,
+            worker_id=args.worker_id,
+            idle_timeout=args.idle_timeout,
+            poll_interval=args.poll,
+        )
+    finally:
+        if dashboard is not None:
+            dashboard.stop()
+
+
+def _cmd_serve(args):
+    from . import server
+
+    server.serve(args.results, host=args.host, port=args.port, rebuild=args.rebuild)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='divcon', description='DivCon: 意見の対立軸の発見と可視化')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_output_args(p):
+        p.add_argument('--results', default='results', help='結果ディレクトリ (default: results)')
+        p.add_argument('--docs', default='../docs', help='HTMLビューのコピー先 (default: ../docs)')
+        p.add_argument('--no-docs', action='store_true', help='docs へのコピーを行わない')
+
+    def add_llm_args(p):
+        p.add_argument('--no-views', action='store_true', help='HTMLビューを生成しない')
+        p.add_argument('--model', help='モデル名（OPENAI_MODEL を上書き）')
+        p.add_argument('--reasoning-effort', help='推論の強度（REASONING_EFFORT を上書き）')
+        p.add_argument('--workers', type=int, help='並列実行数')
+        p.add_argument('--max-concurrency', type=int, help='同時API呼び出し数の上限（0 = 無制限）')
+        p.add_argument('--rpm', type=int, help='毎分リクエスト数の上限（0 = 無制限）')
+        p.add_argument('--cache-dir', help='レスポンスキャッシュの保存先')
+        p.add_argument('--distill', action='store_true',
+                       help='Stage 4 でLLMスコアから学習したローカルスコアラーを併用する')
+        p.add_argument('--slim-scoring', action='store_true',
+                       help='Stage 4 で excerpt を書き写させずに文番号で返させ、reasoning を一部の意見だけに書かせる')
+        p.add_argument('--rescore', type=int, nargs='?', const=2, metavar='N',
+                       help='不確かなスコアだけを N 回スコアリングし直す (default N: 2)')
+        p.add_argument('--profiles', type=int, nargs='?', const=5, metavar='K',
+                       help='トピックごとに、対立軸をまたいだ立場の組み合わせを最大 K 個のプロファイルにまとめる (default K: 5)')
+        p.add_argument('--merge-axes', action='store_true',
+                       help='トピックをまたいで重複する対立軸を統合し、一度だけスコアリングする')
+        p.add_argument('--merge-confirm', action='store_true',
+                       help='軸の統合候補を LLM で確認してから統合する（--merge-axes を含む）')
+        p.add_argument('--no-normalize', action='store_true',
+                       help='プロンプト用の意見テキストの正規化（NFKC・定型文の削除など）を行わない')
+        p.add_argument('--compress-tokens', type=int, nargs='?', const=300, metavar='N',
+                       help='プロンプト用の意見テキストを1件あたり N トークン以内に抽出圧縮する (default N: 300)')
+        p.add_argument('--hedge', type=float, nargs='?', const=0.95, metavar='P',
+                       help='レイテンシの P パーセンタイルを超えた呼び出しを複製し、先に返った結果を使う (default P: 0.95)')
+        p.add_argument('--hedge-budget', type=float, metavar='F',
+                       help='ヘッジによる追加リクエストの上限（呼び出し数に対する割合、default: 0.05）')
+        p.add_argument('--token-budget', type=int, metavar='N',
+                       help='実行あたりの入出力トークン数の上限（0.8 倍で推論の強度を下げ、超えたら停止する）')
+        p.add_argument('--cost-budget', type=float, metavar='USD',
+                       help='実行あたりのコスト（USD）の上限（0.8 倍で推論の強度を下げ、超えたら停止する）')
+        p.add_argument('--dashboard', type=int, nargs='?', const=8765, metavar='PORT',
+                       help='実行状況をブラウザで確認できるダッシュボードを起動する (default PORT: 8765)')
+
+    p_run = subparsers.add_parser('run', help='全Stageを実行する')
+    p_run.add_argument('--data', default='data/opinions.csv', help='入力CSV (default: data/opinions.csv)')
+    p_run.add_argument('--dry-run', action='store_true',
+                       help='API を呼び出さずに Stage ごとの呼び出し数・トークン数・コスト・時間を見積もる')
+    add_output_args(p_run)
+    add_llm_args(p_run)
+    p_run.set_defaults(func=_cmd_run)
+
+    p_batch = subparsers.add_parser('batch', help='マニフェストの複数データセットを並行して分析する')
+    p_batch.add_argument('manifest', help='マニフェストファイル（JSON）')
+    p_batch.add_argument('--output', help='出力ディレクトリ（マニフェストの output_dir を上書き）')
+    p_batch.add_argument('--parallel', type=int, help='同時に実行するデータセット数 (default: 全データセット)')
+    add_llm_args(p_batch)
+    p_batch.set_defaults(func=_cmd_batch)
+
+    p_sweep = subparsers.add_parser('sweep', help='正解ラベル付きデータでバッチサイズ・モデル・推論の強度を比較する')
+    p_sweep.add_argument('gold', help='正解ラベルのファイル（JSON。形式は divcon.sweep を参照）')
+    p_sweep.add_argument('--stages', help='比較する Stage（カンマ区切り、default: 2,4）')
+    p_sweep.add_argument('--batch-sizes', help='バッチサイズの候補（カンマ区切り、default: 10,20,50）')
+    p_sweep.add_argument('--models', help='モデルの候補（カンマ区切り、default: 現在の設定）')
+    p_sweep.add_argument('--efforts', help='推論の強度の候補（カンマ区切り、default: 現在の設定）')
+    p_sweep.add_argument('--min-quality', type=float, help='この品質以上で最も速い組み合わせを推奨として表示する')
+    p_sweep.add_argument('--output', help='結果を保存する JSON ファイル')
+    p_sweep.add_argument('--verbose', action='store_true', help='各 Stage の出力を表示する')
+    add_llm_args(p_sweep)
+    p_sweep.set_defaults(func=_cmd_sweep)
+
+    p_coordinate = subparsers.add_parser('coordinate', help='Stage 2〜5 をキューに投入し、ワーカーで分散実行する')
+    p_coordinate.add_argument('--data', default='data/opinions.csv', help='入力CSV (default: data/opinions.csv)')
+    p_coordinate.add_argument('--queue', required=True, help='タスクキューの SQLite ファイル（全ワーカーと共有する）')
+    p_coordinate.add_argument('--poll', type=float, default=2.0, help='キューを確認する間隔（秒、default: 2）')
+    add_output_args(p_coordinate)
+    add_llm_args(p_coordinate)
+    p_coordinate.set_defaults(func=_cmd_coordinate)
+
+    p_worker = subparsers.add_parser('worker', help='タスクキューのタスクを処理する（複数ホスト・複数プロセスで起動可）')
+    p_worker.add_argument('--queue', required=True, help='タスクキューの SQLite ファイル')
+    p_worker.add_argument('--kinds', help='処理するタスクの種類（カンマ区切り、例: stage4,stage5。default: すべて）')
+    p_worker.add_argument('--worker-id', help='ワーカー名 (default: ホスト名:PID)')
+    p_worker.add_argument('--idle-timeout', type=float, default=0,
+                          help='タスクがないままこの秒数が過ぎたら終了する（default: 0 = コーディネーターの完了まで待つ）')
+    p_worker.add_argument('--poll', type=float, default=2.0, help='キューを確認する間隔（秒、default: 2）')
+    add_llm_args(p_worker)
+    p_worker.set_defaults(func=_cmd_worker)
+
+    p_views = subparsers.add_parser('views', help='結果からHTMLビューを生成する')
+    add_output_args(p_views)
+    p_views.add_argument('--force', action='store_true', help='入力が変わっていなくても生成し直す')
+    p_views.set_defaults(func=_cmd_views)
+
+    p_stats = subparsers.add_parser('stats', help='scores.csv から stats.json と axis_metrics.json を生成する')
+    p_stats.add_argument('--results', default='results', help='結果ディレクトリ (default: results)')
+    p_stats.set_defaults(func=_cmd_stats)
+
+    p_serve = subparsers.add_parser('serve', help='結果を SQLite に読み込み、検索・ページング付きで配信する')
+    p_serve.add_argument('--results', default='results', help='結果ディレクトリ (default: results)')
+    p_serve.add_argument('--host', default='127.0.0.1', help='待ち受けるアドレス (default: 127.0.0.1)')
+    p_serve.add_argument('--port', type=int, default=8000, help='ポート番号 (default: 8000)')
+    p_serve.add_argument('--rebuild', action='store_true', help='データベースを作り直す')
+    p_serve.set_defaults(func=_cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # UTF-8出力設定（Windows対応）
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    try:
+        args.func(args)
+    except KeyboardInterrupt:
+        print("\n\n処理を中断しました。")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n\nエラーが発生しました: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
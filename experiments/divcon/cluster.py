@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 分散実行
+Stage 2・3b・4・5 のタスクを永続タスクキュー（divcon.workqueue）に投入し、任意の数のホスト・プロセスで動く
+ワーカーに処理させる。1プロセスのスレッド数と1つの API キーの上限を超えて、大規模な意見募集を
+複数のマシンで分析するためのもの。
+
+使用方法（キューのファイルは全ホストから見える共有ファイルシステムに置く）:
+    divcon coordinate --data data/opinions.csv --queue /shared/divcon.db --results results
+    divcon worker --queue /shared/divcon.db       # 任意のホストで任意の数だけ起動する
+
+役割:
+    - コーディネーター: データを読み込み、呼び出し数の少ない Stage 1・3a（と軸の統合）を自分で実行する。
+      Stage 2・3b・4・5 はキューに投入して完了を待ち、次の Stage へ進める。
+      全 Stage の完了後、divcon run と同じ結果ファイルを保存する（pipeline.write_results）
+    - ワーカー: キューからタスクをリースし、同時に max_workers 個まで処理して結果をコミットする。
+      各ワーカーは自分の環境の API キー・同時API呼び出し数・毎分リクエスト数・キャッシュの設定で動く
+
+タスク:
+    - stage2:<連番>: 意見のバッチを分類する（トピック一覧はキューの meta から読む）
+    - stage3b:<軸ID>: 軸のアンカーを生成する（サンプルした意見をペイロードに載せる）
+    - stage4:<軸ID>:<連番>: 軸の意見のバッチをスコアリングする（アンカーは Stage 3b の結果から読む）
+    - stage5:<軸ID>: 軸の合意可能性を分析する（スコアは Stage 4 の結果から読む）
+
+再開:
+    トピック・対立軸はキューの meta に保存する。コーディネーターを同じキューで再実行すると、
+    完了済みの Stage とタスクを飛ばして続きから実行する（タスクIDが同じため二重に投入されない）。
+    処理中に落ちたワーカーのタスクは、リースの期限切れ後に別のワーカーが処理する。
+
+モデル・推論の強度はコーディネーターの設定をキューに保存し、ワーカーはそれに合わせる
+（ワーカーごとにスコアの基準がずれないように）。意見テキストの前処理はコーディネーターが行う。
+予算（--token-budget・--cost-budget）はワーカーごとに適用される。distill・rescore は分散実行では使わない。
+"""
+
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+from datetime import datetime
+
+import pandas as pd
+
+from . import llm, normalize
+from .axis_merge import merge_duplicate_axes
+from .config import configure, get_settings
+from .pipeline import write_results
+from .sink import CLASSIFICATIONS_FILENAME, SCORES_FILENAME, JsonlSink, score_records
+from .progress import tracker
+from .stages import (
+    print_lock,
+    stage1_topic_discovery,
+    stage2_classification,
+    stage3a_axis_discovery,
+    stage3b_anchor_generation,
+    stage4_scoring,
+    stage5_consensus_analysis,
+)
+from .store import OpinionStore, ScoreStore
+from .workqueue import TaskQueue
+
+# 1タスクあたりの件数（stages の既定値と同じ。1タスク = 1リクエスト）
+STAGE2_BATCH_SIZE = 10
+STAGE4_BATCH_SIZE = 20
+STAGE3B_SAMPLE_SIZE = 500
+
+POLL_INTERVAL = 2.0  # キューを確認する間隔（秒）
+HEARTBEAT_INTERVAL = 30.0  # 処理中のタスクのリースを延ばす間隔（秒。workqueue.LEASE_SECONDS より十分短く）
+MAX_REPORTED_FAILURES = 5
+
+# ワーカーに引き継ぐ設定
+SHARED_SETTINGS = ('model', 'reasoning_effort', 'slim_scoring')
+
+
+def _opinion_payload(op):
+    return {'id': str(op['id']), 'comment': op['comment'], 'text': normalize.prompt_text(op)}
+
+
+# ============================================================================
+# コーディネーター
+# ============================================================================
+
+def wait_for_stage(queue, kind, label, poll_interval=POLL_INTERVAL):
+    """Stage のタスクがすべて完了（または失敗）するまで待ち、失敗したタスクを警告する
+
+    Returns:
+        list: 失敗したタスクの (task_id, error) のリスト
+    """
+    last = None
+    while True:
+        counts = queue.counts(kind)
+        total = sum(counts.values())
+        finished = counts['done'] + counts['failed']
+        if (finished, counts['leased']) != last:
+            print(f"  [{label}] 完了 {counts['done']}/{total} (処理中 {counts['leased']}, 失敗 {counts['failed']})",
+                  flush=True)
+            last = (finished, counts['leased'])
+        if finished >= total:
+            break
+        time.sleep(poll_interval)
+
+    failures = queue.failures(kind)
+    if failures:
+        print(f"[WARNING] {label}: {len(failures)} 件のタスクが失敗しました（結果から除外します）")
+        for task_id, error in failures[:MAX_REPORTED_FAILURES]:
+            print(f"  - {task_id}: {error}")
+    tracker.log(f"{label} 完了 ({total - len(failures)}/{total} タスク)")
+    return failures
+
+
+def coordinate(data_path='data/opinions.csv', queue_path='divcon_queue.db', results_dir='results',
+               docs_dir='../docs', views=True, poll_interval=POLL_INTERVAL):
+    """Stage を順に進め、Stage 2・3b・4・5 をキュー経由でワーカーに処理させる
+
+    Args:
+        data_path: 入力CSV（id, comment 列）
+        queue_path: キューの SQLite ファイル（ワーカーと共有する）
+        results_dir: 出力ディレクトリ
+        docs_dir: HTMLビューのコピー先（None の場合はコピーしない）
+        views: True の場合、完了後にHTMLビューを生成する
+        poll_interval: キューを確認する間隔（秒）
+    """
+    settings = get_settings()
+    os.makedirs(results_dir, exist_ok=True)
+    queue = TaskQueue(queue_path)
+
+    print(f"DivCon Analysis（分散実行）")
+    print(f"=" * 60)
+    print(f"Model: {settings.model}")
+    print(f"Reasoning Effort: {settings.reasoning_effort}")
+    print(f"Queue: {queue_path}")
+    print(f"=" * 60)
+    print()
+
+    start_time = datetime.now()
+    shared = {name: getattr(settings, name) for name in SHARED_SETTINGS}
+    stored = queue.get_meta('settings')
+    if stored is not None and stored != shared:
+        print(f"[WARNING] キューの設定 {stored} で再開します（現在の設定 {shared} は使いません）")
+        configure(**stored)
+        shared = stored
+    queue.set_meta('settings', shared)
+    queue.set_meta('state', 'running')
+
+    print("データ読み込み中...")
+    opinions = pd.read_csv(data_path).to_dict('records')
+    print(f"[OK] {len(opinions)} 件の意見を読み込み\n")
+    if settings.normalize_comments or settings.compress_tokens > 0:
+        normalize.preprocess_opinions(opinions, normalize=settings.normalize_comments,
+                                      max_tokens=settings.compress_tokens)
+
+    # Stage 1: トピック検出（コーディネーターで実行）
+    topics = queue.get_meta('topics')
+    if topics is None:
+        topics = stage1_topic_discovery(opinions)
+        queue.set_meta('topics', topics)
+    else:
+        print(f"[OK] キューからトピック {len(topics)} 個を再開\n")
+    with open(f'{results_dir}/topics.json', 'w', encoding='utf-8') as f:
+        json.dump(topics, f, ensure_ascii=False, indent=2)
+    topic_map = {t['id']: t for t in topics}
+    warnings = []
+
+    # Stage 2: トピック分類（ワーカー）
+    print(f"[Stage 2] トピック分類をキューに投入中... (バッチサイズ: {STAGE2_BATCH_SIZE})")
+    added = queue.add(
+        (f"stage2:{n:06d}", 'stage2', {'opinions': [_opinion_payload(op) for op in opinions[i:i + STAGE2_BATCH_SIZE]]},
+         None)
+        for n, i in enumerate(range(0, len(opinions), STAGE2_BATCH_SIZE))
+    )
+    print(f"  {added} タスクを投入")
+    failures = wait_for_stage(queue, 'stage2', 'Stage 2', poll_interval)
+    if failures:
+        warnings.append(f"Stage 2: {len(failures)} バッチの分類に失敗しました（その意見は未分類）")
+
+    opinion_store = OpinionStore(opinions)
+    with JsonlSink(f'{results_dir}/{CLASSIFICATIONS_FILENAME}') as classification_sink:
+        for _, classifications in queue.results('stage2'):
+            classification_sink.append(classifications)
+            opinion_store.assign_topics(classifications, topic_map)
+    topic_opinions = {t['id']: opinion_store.topic_opinions(t['id']) for t in topics}
+    for topic in topics:
+        print(f"  - [{topic['id']}] {topic['name']}: {len(topic_opinions[topic['id']])} 件")
+    print()
+
+    # Stage 3a: 対立軸の発見（コーディネーターで実行）
+    all_axes = queue.get_meta('axes')
+    merge_report = queue.get_meta('axis_merge', [])
+    if all_axes is None:
+        all_axes = _discover_axes(topics, topic_opinions)
+        if settings.merge_axes:
+            all_axes, merge_report = merge_duplicate_axes(all_axes, topic_map, confirm=settings.merge_confirm)
+        queue.set_meta('axes', all_axes)
+        queue.set_meta('axis_merge', merge_report)
+    else:
+        print(f"[OK] キューから対立軸 {sum(len(a) for a in all_axes.values())} 個を再開\n")
+
+    axes = []  # (topic_id, axis, 軸の意見)
+    for topic_id, topic_axes in sorted(all_axes.items()):
+        for axis in topic_axes:
+            axis_topic_ids = axis.get('topic_ids', [topic_id])
+            axes.append((topic_id, axis, [op for t in axis_topic_ids for op in topic_opinions[t]]))
+
+    # Stage 3b: アンカー生成（ワーカー）
+    print(f"[Stage 3b] アンカー生成をキューに投入中... ({len(axes)} 軸)")
+    queue.add(
+        (f"stage3b:{axis['id']}", 'stage3b',
+         {'axis_id': axis['id'],
+          'opinions': [_opinion_payload(op) for op in _sample(axis_opinions, STAGE3B_SAMPLE_SIZE, axis['id'])]},
+         axis['id'])
+        for _, axis, axis_opinions in axes
+    )
+    failures = wait_for_stage(queue, 'stage3b', 'Stage 3b', poll_interval)
+    all_anchors = dict((task_id.split(':', 1)[1], anchors) for task_id, anchors in queue.results('stage3b'))
+    if failures:
+        warnings.append(f"Stage 3b: {len(failures)} 軸のアンカー生成に失敗しました（その軸は除外）")
+        axes = [entry for entry in axes if entry[1]['id'] in all_anchors]
+
+    # Stage 4: スコアリング（ワーカー）
+    print(f"[Stage 4] スコアリングをキューに投入中... (バッチサイズ: {STAGE4_BATCH_SIZE})")
+    added = queue.add(
+        (f"stage4:{axis['id']}:{n:06d}", 'stage4',
+         {'axis_id': axis['id'], 'opinions': [_opinion_payload(op) for op in axis_opinions[i:i + STAGE4_BATCH_SIZE]]},
+         axis['id'])
+        for _, axis, axis_opinions in axes
+        for n, i in enumerate(range(0, len(axis_opinions), STAGE4_BATCH_SIZE))
+    )
+    print(f"  {added} タスクを投入")
+    failures = wait_for_stage(queue, 'stage4', 'Stage 4', poll_interval)
+    if failures:
+        warnings.append(f"Stage 4: {len(failures)} バッチのスコアリングに失敗しました（そのスコアは欠落）")
+
+    score_store = ScoreStore(opinion_store)
+    with JsonlSink(f'{results_dir}/{SCORES_FILENAME}') as score_sink:
+        for topic_id, axis, _ in axes:
+            scores = [s for _, batch in queue.results('stage4', axis['id']) for s in batch]
+            score_store.add_axis_scores(axis, topic_id, scores)
+            score_sink.append(score_records(axis, topic_id, scores, opinion_store))
+
+    # Stage 5: 合意可能性分析（ワーカー）
+    print(f"[Stage 5] 合意可能性分析をキューに投入中... ({len(axes)} 軸)")
+    queue.add((f"stage5:{axis['id']}", 'stage5', {'axis_id': axis['id']}, axis['id']) for _, axis, _ in axes)
+    failures = wait_for_stage(queue, 'stage5', 'Stage 5', poll_interval)
+    if failures:
+        warnings.append(f"Stage 5: {len(failures)} 軸の合意可能性分析に失敗しました")
+    consensus_analyses = [analysis for _, analysis in queue.results('stage5')]
+
+    queue.set_meta('state', 'done')
+    print(f"[OK] 全軸の処理完了（ワーカーは終了してかまいません）\n")
+
+    scored_axes = {axis['id'] for _, axis, _ in axes}
+    write_results(
+        results_dir, opinions, topics,
+        {t: [axis for axis in topic_axes if axis['id'] in scored_axes] for t, topic_axes in all_axes.items()},
+        all_anchors, score_store, consensus_analyses, start_time,
+        merge_report=merge_report, warnings=warnings, docs_dir=docs_dir, views=views,
+    )
+    queue.close()
+
+
+def _sample(opinions, size, seed):
+    """再実行しても同じになるサンプル"""
+    if len(opinions) <= size:
+        return opinions
+    return random.Random(seed).sample(opinions, size)
+
+
+def _discover_axes(topics, topic_opinions):
+    """全トピックの Stage 3a を並列に実行し、軸IDを標準化する"""
+    def discover(topic):
+        axes = stage3a_axis_discovery(topic, topic_opinions[topic['id']])
+        for i, axis in enumerate(axes, 1):
+            axis['id'] = f"{topic['id']}_A{i}"
+        return topic['id'], axes
+
+    targets = [t for t in topics if topic_opinions[t['id']]]
+    for topic in topics:
+        if not topic_opinions[topic['id']]:
+            print(f"[WARNING] トピック [{topic['id']}] に属する意見がありません。スキップします。\n")
+    with llm.ContextThreadPoolExecutor(max_workers=get_settings().max_workers) as executor:
+        return dict(executor.map(discover, targets))
+
+
+# ============================================================================
+# ワーカー
+# ============================================================================
+
+class _WorkerContext:
+    """タスク間で共有する参照データ（トピック・軸・アンカー）をキューから読んでキャッシュする"""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self._lock = threading.Lock()
+        self._topics = None
+        self._axes = None
+        self._anchors = {}
+
+    def topics(self):
+        with self._lock:
+            if self._topics is None:
+                self._topics = self.queue.get_meta('topics')
+            return self._topics
+
+    def axis(self, axis_id):
+        with self._lock:
+            if self._axes is None:
+                self._axes = {axis['id']: axis for axes in self.queue.get_meta('axes').values() for axis in axes}
+            return self._axes[axis_id]
+
+    def anchors(self, axis_id):
+        with self._lock:
+            if axis_id not in self._anchors:
+                self._anchors[axis_id] = self.queue.result(f"stage3b:{axis_id}")
+            return self._anchors[axis_id]
+
+
+def run_task(context, task):
+    """1つのタスクを処理して結果（JSON にできる値）を返す"""
+    kind = task['kind']
+    payload = task['payload']
+
+    if kind == 'stage2':
+        opinions = payload['opinions']
+        classified = stage2_classification(opinions, context.topics(), batch_size=len(opinions))
+        return [{'opinion_id': op['id'], 'topic_id': op['topic_id']} for op in classified]
+
+    axis = context.axis(payload['axis_id'])
+    if kind == 'stage3b':
+        return stage3b_anchor_generation(axis, payload['opinions'], sample_size=STAGE3B_SAMPLE_SIZE)
+    if kind == 'stage4':
+        opinions = payload['opinions']
+        return stage4_scoring(axis, context.anchors(axis['id']), opinions, batch_size=len(opinions))
+    if kind == 'stage5':
+        scores = [s for _, batch in context.queue.results('stage4', axis['id']) for s in batch]
+        # 本文は Stage 4 のタスクの入力から引く（excerpt が空の意見の代表選択に使う）
+        texts = {op['id']: op['comment'] for payload in context.queue.payloads('stage4', axis['id'])
+                 for op in payload['opinions']}
+        return stage5_consensus_analysis(axis, scores, texts=texts)
+    raise ValueError(f"未知のタスクの種類: {kind}")
+
+
+def run_worker(queue_path='divcon_queue.db', kinds=None, worker_id=None, idle_timeout=0,
+               poll_interval=POLL_INTERVAL):
+    """キューのタスクを処理する（コーディネーターが完了するか、idle_timeout 秒タスクがなければ終了する）
+
+    Args:
+        queue_path: キューの SQLite ファイル
+        kinds: 処理するタスクの種類（None の場合はすべて。例: ['stage4']）
+        worker_id: ワーカー名（None の場合は ホスト名:PID）
+        idle_timeout: タスクがないまま待つ秒数の上限（0 = コーディネーターの完了まで待つ）
+        poll_interval: タスクがないときにキューを確認する間隔（秒）
+
+    Returns:
+        dict: {'completed', 'failed', 'duplicates'}
+    """
+    queue = TaskQueue(queue_path)
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+    # コーディネーターの設定（モデル・推論の強度）に合わせる
+    shared = queue.get_meta('settings')
+    while shared is None:
+        print(f"  コーディネーターの開始を待っています... ({queue_path})", flush=True)
+        time.sleep(poll_interval)
+        shared = queue.get_meta('settings')
+    configure(**shared)
+    settings = get_settings()
+    max_workers = settings.max_workers
+
+    print(f"DivCon Worker [{worker_id}]")
+    print(f"=" * 60)
+    print(f"Model: {settings.model} / Reasoning Effort: {settings.reasoning_effort} / 並列数: {max_workers}")
+    print(f"Queue: {queue_path}" + (f" / タスク: {', '.join(kinds)}" if kinds else ''))
+    print(f"=" * 60)
+
+    context = _WorkerContext(queue)
+    in_flight = {}  # future → タスク
+    stats = {'completed': 0, 'failed': 0, 'duplicates': 0}
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            # 一時的なエラー（ロック待ちのタイムアウトなど）でスレッドが止まるとリースが切れるため、記録して続ける
+            try:
+                queue.heartbeat(worker_id, [task['id'] for task in list(in_flight.values())])
+            except sqlite3.Error as e:
+                with print_lock:
+                    print(f"[WARNING] ハートビートの記録に失敗しました（次の間隔で再試行します）: {e}")
+
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
+
+    stopping = False  # 予算切れ・中断: 新しいタスクをリースしない
+    interrupted = False
+    idle_since = time.monotonic()
+    executor = llm.ContextThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while True:
+            if not stopping and len(in_flight) < max_workers:
+                for task in queue.lease(worker_id, kinds, limit=max_workers - len(in_flight)):
+                    in_flight[executor.submit(run_task, context, task)] = task
+
+            if not in_flight:
+                if stopping or queue.get_meta('state') == 'done':
+                    break
+                if idle_timeout and time.monotonic() - idle_since > idle_timeout:
+                    print(f"  {idle_timeout} 秒間タスクがないため終了します")
+                    break
+                time.sleep(poll_interval)
+                continue
+            idle_since = time.monotonic()
+
+            done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = in_flight.pop(future)
+                error = future.exception()
+                if error is None:
+                    if queue.complete(task['id'], worker_id, future.result()):
+                        stats['completed'] += 1
+                    else:
+                        stats['duplicates'] += 1  # リースの期限切れ後に別のワーカーが先にコミットした
+                elif isinstance(error, llm.BudgetExceededError):
+                    # 予算切れ: タスクを返し、処理中のタスクの完了を待って終了する
+                    queue.release(task['id'], worker_id)
+                    if not stopping:
+                        print(f"[WARNING] {error}。新しいタスクのリースを停止します。")
+                    stopping = True
+                else:
+                    queue.fail(task['id'], worker_id, f"{type(error).__name__}: {error}")
+                    stats['failed'] += 1
+                    with print_lock:
+                        print(f"[WARNING] タスク {task['id']} が失敗しました ({task['attempts']} 回目): {error}")
+    except KeyboardInterrupt:
+        # 実行中の呼び出しの完了を待つ前にタスクを返し、すぐに他のワーカーが引き継げるようにする
+        interrupted = True
+        for task in in_flight.values():
+            queue.release(task['id'], worker_id)
+        raise
+    finally:
+        executor.shutdown(wait=not interrupted, cancel_futures=interrupted)
+        stop.set()
+        heartbeat_thread.join()
+
+    print(f"\n[OK] ワーカー [{worker_id}] 終了: 完了 {stats['completed']} 件 / 失敗 {stats['failed']} 件"
+          f" / 重複コミット {stats['duplicates']} 件")
+    queue.close()
+    return stats
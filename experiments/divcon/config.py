@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 設定
+
+.env / 環境変数の読み込みは最初に設定を参照したときに一度だけ行う（import 時には何もしない）。
+"""
+
+import os
+from dataclasses import dataclass, replace
+from threading import Lock
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Settings:
+    """実行設定"""
+    model: str = 'gpt-5-mini'
+    reasoning_effort: str = 'medium'
+    max_workers: int = 10  # 並列実行数
+    max_concurrency: int = 0  # プロセス全体の同時API呼び出し数の上限（0 = 無制限）
+    requests_per_minute: int = 0  # プロセス全体の毎分リクエスト数の上限（0 = 無制限）
+    cache_dir: Optional[str] = None  # レスポンスキャッシュの保存先（None = キャッシュしない）
+    distill: bool = False  # Stage 4 でローカルスコアラーを併用する（divcon.distill）
+    slim_scoring: bool = False  # Stage 4 で excerpt を文番号で返させ、reasoning を一部の意見に絞る（出力トークン削減）
+    rescore_repeats: int = 0  # 不確かなスコアの再スコアリング回数（0 = 行わない。divcon.rescore）
+    profile_clusters: int = 0  # トピックあたりのスタンス・プロファイル数の上限（0 = 行わない。divcon.profiles）
+    merge_axes: bool = False  # トピックをまたいで重複する対立軸を統合する（divcon.axis_merge）
+    merge_confirm: bool = False  # 軸の統合前に候補を LLM で確認する（merge_axes 有効時のみ）
+    normalize_comments: bool = True  # プロンプト用に意見テキストを正規化する（divcon.normalize）
+    compress_tokens: int = 0  # プロンプト用の意見テキストの1件あたりのトークン上限（0 = 圧縮しない）
+    hedge_percentile: float = 0.0  # この percentile を超えた呼び出しを複製する（0 = ヘッジしない。例: 0.95）
+    hedge_budget: float = 0.05  # ヘッジによる追加リクエストの上限（呼び出し数に対する割合）
+    token_budget: int = 0  # 実行あたりの入出力トークン数の上限（0 = 無制限。llm.BudgetExceededError）
+    cost_budget: float = 0.0  # 実行あたりのコスト（USD）の上限（0 = 無制限。料金は planner.MODEL_PRICES）
+
+
+_settings = None
+_settings_lock = Lock()
+
+
+def _load_dotenv():
+    """python-dotenv があれば .env を読み込む"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def get_settings():
+    """現在の設定を返す（初回のみ .env と環境変数から読み込む）"""
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            _load_dotenv()
+            _settings = Settings(
+                model=os.getenv('OPENAI_MODEL', Settings.model),
+                reasoning_effort=os.getenv('REASONING_EFFORT', Settings.reasoning_effort),
+                max_workers=int(os.getenv('DIVCON_MAX_WORKERS', Settings.max_workers)),
+                max_concurrency=int(os.getenv('DIVCON_MAX_CONCURRENCY', Settings.max_concurrency)),
+                requests_per_minute=int(os.getenv('DIVCON_RPM', Settings.requests_per_minute)),
+                cache_dir=os.getenv('DIVCON_CACHE_DIR') or Settings.cache_dir,
+                distill=os.getenv('DIVCON_DISTILL', '').lower() in ('1', 'true', 'yes'),
+                slim_scoring=os.getenv('DIVCON_SLIM_SCORING', '').lower() in ('1', 'true', 'yes'),
+                rescore_repeats=int(os.getenv('DIVCON_RESCORE', Settings.rescore_repeats)),
+                profile_clusters=int(os.getenv('DIVCON_PROFILES', Settings.profile_clusters)),
+                merge_axes=os.getenv('DIVCON_MERGE_AXES', '').lower() in ('1', 'true', 'yes'),
+                merge_confirm=os.getenv('DIVCON_MERGE_CONFIRM', '').lower() in ('1', 'true', 'yes'),
+                normalize_comments=os.getenv('DIVCON_NORMALIZE', '1').lower() not in ('0', 'false', 'no'),
+                compress_tokens=int(os.getenv('DIVCON_COMPRESS_TOKENS', Settings.compress_tokens)),
+                hedge_percentile=float(os.getenv('DIVCON_HEDGE', Settings.hedge_percentile)),
+                hedge_budget=float(os.getenv('DIVCON_HEDGE_BUDGET', Settings.hedge_budget)),
+                token_budget=int(os.getenv('DIVCON_TOKEN_BUDGET', Settings.token_budget)),
+                cost_budget=float(os.getenv('DIVCON_COST_BUDGET', Settings.cost_budget)),
+            )
+        return _settings
+
+
+def configure(**overrides):
+    """設定を上書きする（例: configure(model='gpt-5', max_workers=4)）"""
+    global _settings
+    settings = replace(get_settings(), **overrides)
+    with _settings_lock:
+        _settings = settings
+    return settings
@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon ローカルスタンス推定（LLM ラベルからの蒸留）
+Stage 4 のスコアリングの一部を、LLM のスコアで学習した軽量なローカルモデルで置き換える
+
+軸ごとに:
+    1. ランダムに選んだ初期サンプルを LLM（stage4_scoring）でスコアリングする
+    2. 文字 n-gram（1-3）のハッシュ特徴で2つのモデルを学習する
+         - 該当判定: ロジスティック回帰（score が null かどうか）
+         - 強度: 順序ロジスティック回帰（全閾値型。重み共有の5つの閾値 1|2 ... 5|6）
+    3. 交差検証で「確信度の高い予測」と LLM スコアの一致率を測る
+    4. 一致率が目標に届くまで、最も確信度の低い意見を LLM に回して学習データに加える（能動学習）
+    5. 目標に届いたら、確信度の高い意見はローカルで採点し、残りだけを LLM でスコアリングする
+
+一致率が DISTILL_MAX_ROUNDS 回で目標に届かない軸は、残り全件を LLM でスコアリングする
+（品質を落としてまでローカル推定は使わない）。
+"""
+
+import random
+import re
+import zlib
+
+import numpy as np
+
+from .stages import print_lock, stage4_scoring
+
+# この件数未満の軸は蒸留せず全件を LLM でスコアリングする
+DISTILL_MIN_OPINIONS = 300
+# 初期サンプル数と、能動学習1ラウンドで LLM に回す件数
+DISTILL_INITIAL_SAMPLE = 150
+DISTILL_ROUND_SIZE = 100
+DISTILL_MAX_ROUNDS = 5
+# ローカルで採点する確信度の下限（予測スコア ±1 のうち同じ側のスコアに入る確率）
+DISTILL_CONFIDENCE = 0.8
+# 目標一致率（null の一致と、左右（1-3 / 4-6）が同じでスコア差 ±1 以内を一致とみなす）
+SIDE_BOUNDARY = 3
+DISTILL_TARGET_AGREEMENT = 0.9
+DISTILL_CV_FOLDS = 5
+# 一致率の推定に必要な、交差検証で確信度が下限を超えた予測の件数
+DISTILL_MIN_CONFIDENT = 30
+
+NGRAM_SIZES = (1, 2, 3)
+FEATURE_DIM = 2 ** 16
+TRAIN_ITERATIONS = 200
+LEARNING_RATE = 2.0
+L2_PENALTY = 1e-3
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[。！？!?\n])')
+
+
+# ============================================================================
+# 特徴量
+# ============================================================================
+
+class NgramFeatures:
+    """文字 n-gram をハッシュした疎行列（CSR 形式、行ごとに L2 正規化）
+
+    学習・予測とも疎行列のまま行う（密行列にすると意見数 × FEATURE_DIM になるため）。
+    """
+
+    def __init__(self, indptr, indices, data, dim=FEATURE_DIM):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.dim = dim
+
+    @classmethod
+    def from_texts(cls, texts, dim=FEATURE_DIM):
+        indptr = [0]
+        indices = []
+        for text in texts:
+            text = str(text or '')
+            for n in NGRAM_SIZES:
+                for j in range(len(text) - n + 1):
+                    # hash() はプロセスごとに変わるので crc32 で固定する
+                    indices.append(zlib.crc32(text[j:j + n].encode('utf-8')) % dim)
+            indptr.append(len(indices))
+        indptr = np.array(indptr, dtype=np.int64)
+        indices = np.array(indices, dtype=np.int64)
+
+        # 行ごとの L2 正規化（同じ n-gram の重複は同じ列への加算として扱う）
+        row_ids = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        squared_norms = np.zeros(len(texts), dtype=np.float64)
+        if len(indices):
+            unique_keys, counts = np.unique(row_ids * dim + indices, return_counts=True)
+            np.add.at(squared_norms, unique_keys // dim, counts.astype(np.float64) ** 2)
+        norms = np.sqrt(squared_norms)
+        data = 1.0 / np.where(norms > 0, norms, 1.0)[row_ids]
+        return cls(indptr, indices, data, dim)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, rows):
+        """指定した行だけの疎行列"""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, stops = self.indptr[rows], self.indptr[rows + 1]
+        lengths = stops - starts
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        positions = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return NgramFeatures(indptr, self.indices[positions], self.data[positions], self.dim)
+
+    def matvec(self, weights):
+        """X @ weights"""
+        sums = np.concatenate([[0.0], np.cumsum(self.data * weights[self.indices])])
+        return sums[self.indptr[1:]] - sums[self.indptr[:-1]]
+
+    def rmatvec(self, values):
+        """X.T @ values"""
+        row_values = np.repeat(values, np.diff(self.indptr))
+        return np.bincount(self.indices, weights=self.data * row_values, minlength=self.dim)
+
+
+# ============================================================================
+# モデル
+# ============================================================================
+
+def _sigmoid(x):
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def _fit_thresholds(X, y, n_thresholds):
+    """全閾値型のロジスティック回帰を勾配降下で学習する
+
+    P(y > k) = sigmoid(x·w - θ_k)。n_thresholds=1 なら通常の2値ロジスティック回帰。
+
+    Args:
+        X: NgramFeatures（m 行）
+        y: 0 .. n_thresholds のラベル
+        n_thresholds: 閾値の数
+
+    Returns:
+        (w, theta)
+    """
+    m = len(X)
+    w = np.zeros(X.dim)
+    theta = np.linspace(-1.0, 1.0, n_thresholds) if n_thresholds > 1 else np.zeros(1)
+    # signs[i, k] = +1 if y_i > k else -1
+    signs = np.where(y[:, None] > np.arange(n_thresholds)[None, :], 1.0, -1.0)
+
+    for _ in range(TRAIN_ITERATIONS):
+        margins = signs * (X.matvec(w)[:, None] - theta[None, :])
+        coef = -signs * _sigmoid(-margins)  # d loss / d (x·w - θ)
+        grad_w = X.rmatvec(coef.sum(axis=1)) / m + L2_PENALTY * w
+        grad_theta = -coef.sum(axis=0) / m
+        w -= LEARNING_RATE * grad_w
+        theta -= LEARNING_RATE * grad_theta
+    return w, np.sort(theta)
+
+
+class StanceModel:
+    """該当判定（null かどうか）と 1-6 の順序ロジスティック回帰を組み合わせたモデル"""
+
+    def fit(self, X, labels):
+        """
+        Args:
+            X: NgramFeatures（m 行）
+            labels: 0（null）または 1-6 のスコア
+        """
+        labels = np.asarray(labels)
+        applicable = labels > 0
+        self.applicable_w, self.applicable_theta = _fit_thresholds(X, applicable.astype(int), 1)
+        if applicable.sum() >= 2 and len(np.unique(labels[applicable])) >= 2:
+            self.ordinal_w, self.ordinal_theta = _fit_thresholds(X[np.flatnonzero(applicable)], labels[applicable] - 1, 5)
+        else:
+            # スコア付きの意見が1種類しかない場合は、その値に寄せた閾値を置く
+            value = int(labels[applicable][0]) if applicable.any() else 1
+            self.ordinal_w = np.zeros(X.dim)
+            self.ordinal_theta = np.where(np.arange(1, 6) < value, -4.0, 4.0)
+        return self
+
+    def _probabilities(self, applicable_logit, ordinal_logit):
+        """7クラス（null, 1-6）の確率"""
+        p_applicable = _sigmoid(applicable_logit - self.applicable_theta[0])
+        p_greater = _sigmoid(ordinal_logit[:, None] - self.ordinal_theta[None, :])  # P(y > k), k=1..5
+        cumulative = np.hstack([np.ones((len(p_greater), 1)), p_greater, np.zeros((len(p_greater), 1))])
+        p_levels = np.clip(cumulative[:, :-1] - cumulative[:, 1:], 0.0, None)
+        p_levels /= np.clip(p_levels.sum(axis=1, keepdims=True), 1e-12, None)
+        return np.hstack([(1 - p_applicable)[:, None], p_applicable[:, None] * p_levels])
+
+    def predict_proba(self, X):
+        return self._probabilities(X.matvec(self.applicable_w), X.matvec(self.ordinal_w))
+
+
+def predict(proba):
+    """7クラス確率から予測ラベルと確信度を求める
+
+    一致判定（null の一致、同じ側でスコア差 ±1）に合わせ、スコアの確信度は
+    予測スコアとその両隣のうち同じ側のスコアの確率の合計とする（3 の確信度に 4 は含めない）。
+
+    Returns:
+        (predicted, confidence): 予測ラベル（0 = null, 1-6）と確信度
+    """
+    levels = proba[:, 1:]
+    # 左右それぞれの中で両隣を足す（境界の 3 と 4 は互いに足さない）
+    windows = []
+    for side in (levels[:, :SIDE_BOUNDARY], levels[:, SIDE_BOUNDARY:]):
+        padded = np.pad(side, ((0, 0), (1, 1)))
+        windows.append(padded[:, :-2] + padded[:, 1:-1] + padded[:, 2:])
+    window = np.hstack(windows)
+    best_level = window.argmax(axis=1)
+    best_window = window[np.arange(len(proba)), best_level]
+    is_null = proba[:, 0] >= best_window
+    predicted = np.where(is_null, 0, best_level + 1)
+    confidence = np.where(is_null, proba[:, 0], best_window)
+    return predicted, confidence
+
+
+def agrees(predicted, labels):
+    """null の一致、または左右（1-3 / 4-6）が同じでスコア差 ±1 以内なら一致とみなす"""
+    both_null = (predicted == 0) & (labels == 0)
+    same_side = (predicted <= SIDE_BOUNDARY) == (labels <= SIDE_BOUNDARY)
+    both_scored = (predicted > 0) & (labels > 0) & same_side & (np.abs(predicted - labels) <= 1)
+    return both_null | both_scored
+
+
+def out_of_fold_predictions(X, labels, folds=DISTILL_CV_FOLDS, seed=0):
+    """交差検証で、各行をその行を含まない学習データのモデルで予測する
+
+    Returns:
+        (predicted, confidence): predict() と同じ形式
+    """
+    labels = np.asarray(labels)
+    m = len(labels)
+    folds = max(2, min(folds, m))
+    order = np.random.default_rng(seed).permutation(m)
+    predicted = np.zeros(m, dtype=np.int64)
+    confidence = np.zeros(m)
+    for k in range(folds):
+        test = order[k::folds]
+        train = np.setdiff1d(order, test)
+        proba = StanceModel().fit(X[train], labels[train]).predict_proba(X[test])
+        predicted[test], confidence[test] = predict(proba)
+    return predicted, confidence
+
+
+def cross_validated_agreement(X, labels, folds=DISTILL_CV_FOLDS, confidence=DISTILL_CONFIDENCE, seed=0):
+    """交差検証で、確信度の高い予測と LLM スコアの一致率を求める
+
+    Returns:
+        (agreement, coverage, n_confident): 一致率、確信度の高い予測の割合、その件数
+    """
+    labels = np.asarray(labels)
+    predicted, row_confidence = out_of_fold_predictions(X, labels, folds, seed)
+    is_confident = row_confidence >= confidence
+    confident = int(is_confident.sum())
+    agreed = int((agrees(predicted, labels) & is_confident).sum())
+    agreement = agreed / confident if confident else 0.0
+    return agreement, confident / len(labels) if len(labels) else 0.0, confident
+
+
+def _local_excerpt(comment, features_w, score):
+    """予測した側に最も寄与する文を根拠として切り抜く"""
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(str(comment or '')) if s.strip()]
+    if not sentences:
+        return ''
+    values = NgramFeatures.from_texts(sentences).matvec(features_w)
+    best = int(np.argmax(values) if score >= 4 else np.argmin(values))
+    return f"「{sentences[best][:150]}」"
+
+
+# ============================================================================
+# Stage 4（蒸留版）
+# ============================================================================
+
+def _labels_from_scores(scores):
+    return {str(s['opinion_id']): (0 if s['score'] is None else int(s['score'])) for s in scores}
+
+
+def stage4_scoring_distilled(axis, anchors, topic_opinions, seed=0):
+    """Stage 4: 強度推定（ローカルモデル併用版）
+
+    Args:
+        axis: 対立軸情報
+        anchors: Stage 3b のアンカー
+        topic_opinions: トピックに属する意見のリスト
+        seed: サンプリングの乱数シード
+
+    Returns:
+        (scores, report) のタプル。scores は stage4_scoring と同じ形式、
+        report は軸ごとの一致率とコスト削減量
+    """
+    total = len(topic_opinions)
+    report = {
+        'axis_id': axis['id'],
+        'total': total,
+        'llm_scored': 0,
+        'local_scored': 0,
+        'rounds': 0,
+        'agreement': None,
+        'coverage': None,
+        'fallback': False,
+    }
+
+    if total < DISTILL_MIN_OPINIONS:
+        scores = stage4_scoring(axis, anchors, topic_opinions)
+        report['llm_scored'] = len(scores)
+        report['llm_share'] = 1.0
+        report['savings'] = 0.0
+        return scores, report
+
+    ids = [str(op['id']) for op in topic_opinions]
+    features = NgramFeatures.from_texts([op['comment'] for op in topic_opinions])
+    rng = random.Random(seed)
+
+    llm_scores = {}
+    labeled_rows = []
+
+    def score_with_llm(rows):
+        scores = stage4_scoring(axis, anchors, [topic_opinions[r] for r in rows])
+        for s in scores:
+            llm_scores[str(s['opinion_id'])] = s
+        labels = _labels_from_scores(scores)
+        labeled_rows.extend(r for r in rows if ids[r] in labels)
+        return labels
+
+    labels = {}
+    labels.update(score_with_llm(rng.sample(range(total), DISTILL_INITIAL_SAMPLE)))
+    asked = set(labeled_rows)
+
+    model = None
+    while True:
+        X = features[labeled_rows]
+        y = np.array([labels[ids[r]] for r in labeled_rows])
+        agreement, coverage, n_confident = cross_validated_agreement(X, y)
+        report['agreement'] = round(agreement, 3)
+        report['coverage'] = round(coverage, 3)
+
+        with print_lock:
+            print(f"  [Stage 4 蒸留] 軸 [{axis['id']}] ラウンド {report['rounds']}: "
+                  f"学習 {len(labeled_rows)} 件, 一致率 {agreement:.2f}, カバー率 {coverage:.2f}")
+
+        if agreement >= DISTILL_TARGET_AGREEMENT and n_confident >= DISTILL_MIN_CONFIDENT:
+            model = StanceModel().fit(X, y)
+            break
+
+        unlabeled = np.array([r for r in range(total) if r not in asked], dtype=np.int64)
+        if report['rounds'] >= DISTILL_MAX_ROUNDS or len(unlabeled) == 0:
+            break
+
+        # 最も確信度の低い意見を LLM に回す
+        round_model = StanceModel().fit(X, y)
+        _, confidence = predict(round_model.predict_proba(features[unlabeled]))
+        uncertain = unlabeled[np.argsort(confidence, kind='stable')[:DISTILL_ROUND_SIZE]].tolist()
+        asked.update(uncertain)
+        labels.update(score_with_llm(uncertain))
+        report['rounds'] += 1
+
+    unlabeled = np.array([r for r in range(total) if r not in asked], dtype=np.int64)
+    local_scores = []
+    if model is None:
+        # 目標一致率に届かなかった軸は残りを全件 LLM でスコアリング
+        report['fallback'] = True
+        if len(unlabeled):
+            score_with_llm(unlabeled.tolist())
+    elif len(unlabeled):
+        predicted, confidence = predict(model.predict_proba(features[unlabeled]))
+        confident = confidence >= DISTILL_CONFIDENCE
+        for row, label, p in zip(unlabeled[confident], predicted[confident], confidence[confident]):
+            score = None if label == 0 else int(label)
+            local_scores.append({
+                'opinion_id': ids[row],
+                'score': score,
+                'excerpt': '' if score is None else _local_excerpt(topic_opinions[row]['comment'], model.ordinal_w, score),
+                'reasoning': f"ローカルモデルによる推定（確信度 {p:.2f}）",
+                'confidence': round(float(p), 2),
+            })
+        if (~confident).any():
+            score_with_llm(unlabeled[~confident].tolist())
+
+    scores = list(llm_scores.values()) + local_scores
+    report['llm_scored'] = len(llm_scores)
+    report['local_scored'] = len(local_scores)
+    report['llm_share'] = round(len(llm_scores) / total, 3)
+    report['savings'] = round(len(local_scores) / total, 3)
+
+    with print_lock:
+        status = "目標未達のため全件 LLM" if report['fallback'] else f"ローカル {len(local_scores)} 件"
+        print(f"  [OK] 軸 [{axis['id']}] 蒸留完了: LLM {len(llm_scores)} 件, {status} "
+              f"(削減率 {report['savings']:.0%})\n")
+
+    return scores, report
+
+
+# ============================================================================
+# 結果の保存
+# ============================================================================
+
+def write_summary_distill(f, reports):
+    """summary.txt にローカルスコアラーの一致率とコスト削減量を書き込む"""
+    total = sum(r['total'] for r in reports)
+    local = sum(r['local_scored'] for r in reports)
+    f.write("ローカルスコアラー（LLM ラベルからの蒸留）:\n")
+    f.write(f"  全体: {local}/{total} 件をローカルで採点 (削減率 {local / total if total else 0:.1%})\n")
+    for r in sorted(reports, key=lambda r: r['axis_id']):
+        agreement = '-' if r['agreement'] is None else f"{r['agreement']:.2f}"
+        note = ' 目標未達のため全件LLM' if r['fallback'] else ''
+        f.write(f"    [{r['axis_id']}] 一致率 {agreement}, LLM {r['llm_scored']} 件, "
+                f"ローカル {r['local_scored']} 件 (削減率 {r['savings']:.1%}){note}\n")
+    f.write("\n")
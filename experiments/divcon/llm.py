@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon LLM 呼び出し
+
+OpenAI クライアントは最初の呼び出し時に生成する。
+全Stageの API 呼び出しはここの parse() を通す。
+
+複数データセットを同じプロセスで実行する場合（divcon batch）に備えて、
+次の3つをプロセス全体で共有する（いずれも設定が 0 / None なら無効）:
+    - FairScheduler: 同時API呼び出し数の上限。空いた枠は実行中の少ない実行単位から順に割り当てる
+    - RateLimiter: 毎分リクエスト数の上限
+    - ResponseCache: 同一リクエストのレスポンスをディスクに保存して再利用する
+    - Hedger: 遅い呼び出しの複製（ヘッジ）を送り、先に返った有効な結果を使う
+
+実行単位ごとの入出力トークン数を集計し、予算（token_budget / cost_budget）が設定されていれば、
+BUDGET_DEGRADE_SHARE を超えたところで推論の強度を下げてヘッジを止め、使い切ったら
+BudgetExceededError を送出する（実行中の呼び出しの分だけ予算を少し超えることがある）。
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+from contextlib import contextmanager
+from itertools import count
+from pathlib import Path
+from threading import Condition, Lock
+
+from . import progress
+from .config import get_settings
+
+_client = None
+_client_lock = Lock()
+
+# 実行単位の名前（divcon batch のデータセット名）。スケジューリングと集計に使う
+_run_name = contextvars.ContextVar('divcon_run_name', default=None)
+# True の間はレスポンスキャッシュを読み書きしない（no_cache）
+_cache_disabled = contextvars.ContextVar('divcon_cache_disabled', default=False)
+
+# 実行単位 → {'requests', 'cache_hits', 'input_tokens', 'output_tokens', 'hedged', 'hedge_wins', 'hedge_saved_seconds',
+#             'alias_saved_input_tokens', 'alias_saved_output_tokens'}
+_usage = defaultdict(Counter)
+_usage_lock = Lock()
+
+
+def get_client():
+    """OpenAI クライアントを返す（初回呼び出し時に生成）"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+
+            get_settings()  # .env の読み込み
+            _client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        return _client
+
+
+def set_client(client):
+    """クライアントを差し替える（ノートブックや別バックエンドから利用する場合）"""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+# ============================================================================
+# 実行単位
+# ============================================================================
+
+@contextmanager
+def run_scope(name):
+    """この中で行う API 呼び出しを実行単位 name として扱う"""
+    token = _run_name.set(name)
+    try:
+        yield
+    finally:
+        _run_name.reset(token)
+
+
+@contextmanager
+def no_cache():
+    """この中で行う API 呼び出しはレスポンスキャッシュを読み書きしない（同じプロンプトから独立した回答を得る場合）"""
+    token = _cache_disabled.set(True)
+    try:
+        yield
+    finally:
+        _cache_disabled.reset(token)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """submit 時の実行単位（contextvars）をワーカースレッドに引き継ぐ ThreadPoolExecutor"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
+
+
+def current_run():
+    """現在の実行単位の名前（divcon batch 以外では None）"""
+    return _run_name.get()
+
+
+def get_usage():
+    """実行単位ごとの API リクエスト数・キャッシュヒット数・トークン数・ヘッジの集計を返す"""
+    with _usage_lock:
+        return {name: dict(counter) for name, counter in _usage.items()}
+
+
+def _count(key, amount=1, run=None):
+    with _usage_lock:
+        _usage[run if run is not None else _run_name.get()][key] += amount
+
+
+def add_usage(key, amount):
+    """API 呼び出し以外で求めた値（ID の別名で削減したトークン数など）を現在の実行単位の集計に加える"""
+    _count(key, amount)
+
+
+# ============================================================================
+# 共有リミッタとキャッシュ
+# ============================================================================
+
+class FairScheduler:
+    """同時実行枠を実行単位ごとに公平に割り当てる
+
+    枠が空いたら、待っている実行単位のうち実行中の呼び出しが最も少ないものに渡す
+    （同数なら先に待ち始めたもの）。大きなデータセットが大量に投入していても、
+    小さなデータセットの呼び出しは順番待ちの最後尾に回されない。
+    """
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max_concurrency
+        self._cond = Condition()
+        self._in_flight = Counter()
+        self._waiting = defaultdict(deque)  # 実行単位 → 待ち番号
+        self._total = 0
+        self._tickets = count()
+
+    def _next_run(self):
+        candidates = [(self._in_flight[run], queue[0], run) for run, queue in self._waiting.items()]
+        return min(candidates)[2] if candidates else None
+
+    @contextmanager
+    def slot(self, run):
+        if self.max_concurrency <= 0:
+            yield
+            return
+
+        with self._cond:
+            ticket = next(self._tickets)
+            self._waiting[run].append(ticket)
+            while not (self._total < self.max_concurrency
+                       and self._next_run() == run
+                       and self._waiting[run][0] == ticket):
+                self._cond.wait()
+            self._waiting[run].popleft()
+            if not self._waiting[run]:
+                del self._waiting[run]
+            self._in_flight[run] += 1
+            self._total += 1
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight[run] -= 1
+                self._total -= 1
+                self._cond.notify_all()
+
+
+class RateLimiter:
+    """毎分リクエスト数の上限（一定間隔で送信枠を予約する）"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = Lock()
+        self._next_time = 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class ResponseCache:
+    """パース済みレスポンスのディスクキャッシュ（キーはリクエスト内容の SHA-256）"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+
+    @staticmethod
+    def key(request):
+        payload = json.dumps(request, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f'{key}.json'
+
+    def get(self, key, response_format):
+        path = self._path(key)
+        try:
+            return response_format.model_validate_json(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, parsed):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{id(parsed)}.tmp')
+        tmp_path.write_text(parsed.model_dump_json(), encoding='utf-8')
+        os.replace(tmp_path, path)
+
+
+# ヘッジ: レスポンスの型（≒ Stage）ごとに直近 HEDGE_WINDOW 件のレイテンシを保持する
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20  # この件数がそろうまではヘッジしない
+HEDGE_THREADS = 64  # ヘッジ有効時に API 呼び出しを行うスレッド数の上限
+
+
+class Hedger:
+    """遅い呼び出しの複製（ヘッジ）を送り、先に返った有効な結果を使う
+
+    呼び出しがレスポンスの型ごとのレイテンシの percentile を超えても終わらなければ、
+    同じリクエストをもう1件送る。ヘッジの件数は呼び出し数の budget 倍まで。
+    同期クライアントでは送信済みのリクエストを中断できないため、負けた側は
+    未開始なら取り消し、実行中なら結果を捨てる（完了は待たない）。
+    """
+
+    def __init__(self, percentile, budget):
+        self.percentile = percentile
+        self.budget = budget
+        self._lock = Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=HEDGE_WINDOW))
+        self._calls = 0
+        self._hedged = 0
+        self._executor = ContextThreadPoolExecutor(max_workers=HEDGE_THREADS, thread_name_prefix='divcon-hedge')
+
+    def threshold(self, key):
+        """ヘッジを送るまでの待ち時間（秒）。サンプルが足りなければ None"""
+        with self._lock:
+            samples = sorted(self._latencies[key])
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(self.percentile * len(samples)))]
+
+    def _timed(self, key, fn):
+        start = time.monotonic()
+        result = fn()
+        with self._lock:
+            self._latencies[key].append(time.monotonic() - start)
+        return result
+
+    def _take_budget(self):
+        with self._lock:
+            if self._hedged + 1 > self.budget * self._calls:
+                return False
+            self._hedged += 1
+            return True
+
+    def call(self, key, fn, valid):
+        """fn() を実行し、valid(結果) が真の最初の結果を返す"""
+        with self._lock:
+            self._calls += 1
+        threshold = self.threshold(key)
+        if threshold is None:
+            return self._timed(key, fn)
+
+        start = time.monotonic()
+        primary = self._executor.submit(self._timed, key, fn)
+        try:
+            return primary.result(timeout=threshold)
+        except TimeoutError:
+            pass
+        if not self._take_budget():
+            return primary.result()
+
+        run = _run_name.get()
+        _count('hedged', run=run)
+        hedge = self._executor.submit(self._timed, key, fn)
+        pending = {primary, hedge}
+        winner = None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for attempt in (primary, hedge):
+                if attempt in done and attempt.exception() is None and valid(attempt.result()):
+                    winner = attempt
+                    break
+        if winner is None:
+            return primary.result()
+
+        finished = time.monotonic()
+        if winner is hedge:
+            # 元の呼び出しが終わった時点で、ヘッジで短縮できた時間を記録する
+            _count('hedge_wins', run=run)
+            primary.add_done_callback(
+                lambda _: _count('hedge_saved_seconds', time.monotonic() - finished, run=run)
+            )
+        for attempt in pending:
+            attempt.cancel()
+        return winner.result()
+
+
+_shared = None  # (設定値, FairScheduler, RateLimiter, ResponseCache, Hedger)
+_shared_lock = Lock()
+
+
+def _get_shared():
+    """現在の設定に対応するリミッタとキャッシュを返す（設定が変わったら作り直す）"""
+    global _shared
+    settings = get_settings()
+    config = (settings.max_concurrency, settings.requests_per_minute, settings.cache_dir,
+              settings.hedge_percentile, settings.hedge_budget)
+    with _shared_lock:
+        if _shared is None or _shared[0] != config:
+            _shared = (
+                config,
+                FairScheduler(settings.max_concurrency),
+                RateLimiter(settings.requests_per_minute),
+                ResponseCache(settings.cache_dir) if settings.cache_dir else None,
+                Hedger(settings.hedge_percentile, settings.hedge_budget) if settings.hedge_percentile > 0 else None,
+            )
+        return _shared[1:]
+
+
+# ============================================================================
+# 予算
+# ============================================================================
+
+BUDGET_DEGRADE_SHARE = 0.8  # 予算のこの割合を使ったら推論の強度を下げ、ヘッジを止める
+DEGRADED_REASONING_EFFORT = 'low'
+_DEGRADABLE_EFFORTS = ('medium', 'high')
+
+_budget_notices = set()  # 警告を表示済みの (実行単位, 種類)
+
+
+class BudgetExceededError(RuntimeError):
+    """実行のトークン数・コストの予算を使い切った"""
+
+
+def _notice_once(kind, message):
+    key = (_run_name.get(), kind)
+    with _usage_lock:
+        if key in _budget_notices:
+            return
+        _budget_notices.add(key)
+    print(message)
+
+
+def budget_share():
+    """現在の実行単位が使った予算の割合（予算が設定されていなければ 0）"""
+    settings = get_settings()
+    if settings.token_budget <= 0 and settings.cost_budget <= 0:
+        return 0.0
+    with _usage_lock:
+        usage = _usage.get(_run_name.get(), Counter())
+        input_tokens, output_tokens = usage['input_tokens'], usage['output_tokens']
+
+    shares = [0.0]
+    if settings.token_budget > 0:
+        shares.append((input_tokens + output_tokens) / settings.token_budget)
+    if settings.cost_budget > 0:
+        from .planner import estimate_cost
+
+        cost = estimate_cost(settings.model, input_tokens, output_tokens)
+        if cost is None:
+            _notice_once('price', f"[WARNING] モデル {settings.model} の料金が不明なため、コストの予算は適用しません")
+        else:
+            shares.append(cost / settings.cost_budget)
+    return max(shares)
+
+
+def parse(messages, response_format, reasoning_effort=None):
+    """Structured Outputs で API を呼び出し、パース済みの結果を返す
+
+    Args:
+        messages: チャットメッセージのリスト
+        response_format: Pydantic モデル
+        reasoning_effort: 推論の強度（None の場合は設定値、False の場合は指定しない）
+
+    Returns:
+        response_format のインスタンス
+    """
+    settings = get_settings()
+    kwargs = {}
+    if reasoning_effort is None:
+        kwargs['reasoning_effort'] = settings.reasoning_effort
+    elif reasoning_effort is not False:
+        kwargs['reasoning_effort'] = reasoning_effort
+
+    scheduler, rate_limiter, cache, hedger = _get_shared()
+    if _cache_disabled.get():
+        cache = None
+
+    def cache_key_for(kwargs):
+        return ResponseCache.key({
+            'model': settings.model,
+            'messages': messages,
+            'response_format': response_format.model_json_schema(),
+            **kwargs
+        })
+
+    cache_key = None
+    if cache is not None:
+        cache_key = cache_key_for(kwargs)
+        cached = cache.get(cache_key, response_format)
+        if cached is not None:
+            _count('cache_hits')
+            return cached
+
+    # 予算: 使い切ったら送信しない。残りが少なければ推論の強度を下げ、ヘッジを止める
+    share = budget_share()
+    if share >= 1.0:
+        raise BudgetExceededError(f"予算を使い切りました（使用率 {share:.0%}）")
+    if share >= BUDGET_DEGRADE_SHARE:
+        _notice_once('degrade', f"[WARNING] 予算の {share:.0%} を使用しました。"
+                                f"以降は推論の強度を {DEGRADED_REASONING_EFFORT} に下げ、ヘッジを行いません")
+        hedger = None
+        if kwargs.get('reasoning_effort') in _DEGRADABLE_EFFORTS:
+            kwargs['reasoning_effort'] = DEGRADED_REASONING_EFFORT
+            if cache is not None:
+                cache_key = cache_key_for(kwargs)
+
+    def request():
+        with scheduler.slot(_run_name.get()):
+            rate_limiter.acquire()
+            _count('requests')
+            progress.tracker.request_started()
+            try:
+                completion = get_client().beta.chat.completions.parse(
+                    model=settings.model,
+                    messages=messages,
+                    response_format=response_format,
+                    **kwargs
+                )
+            except Exception as e:
+                progress.tracker.request_failed(e)
+                raise
+            usage = getattr(completion, 'usage', None)
+            _count('input_tokens', getattr(usage, 'prompt_tokens', 0) or 0)
+            _count('output_tokens', getattr(usage, 'completion_tokens', 0) or 0)
+            progress.tracker.request_finished(getattr(usage, 'total_tokens', 0) or 0)
+        return completion
+
+    if hedger is not None:
+        completion = hedger.call(response_format.__name__, request,
+                                 valid=lambda c: c.choices[0].message.parsed is not None)
+    else:
+        completion = request()
+    parsed = completion.choices[0].message.parsed
+
+    if cache is not None and parsed is not None:
+        cache.put(cache_key, parsed)
+    return parsed
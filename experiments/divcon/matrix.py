@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 意見 × 対立軸のスコア行列（memory-mapped .npy）と2次元の立場マップ
+
+scores.csv を毎回ピボットしなくても分析ノートブックから開けるように、スコアを
+意見 × 対立軸の密な float32 行列として保存する。数値は .npy なので np.load(mmap_mode='r') で
+件数によらずすぐに開け、必要な行・列だけがディスクから読まれる。
+
+    - 行は入力データの意見の順（opinion_ids.txt）、列は軸ID順（meta.json の axes）
+    - スコアがない要素（null、または別トピックの軸）は NaN。mask は有効なスコア（1-6）のある要素で True
+    - 立場マップは行列の主成分分析（PCA）の第1・第2主成分。欠けた要素は軸の平均で補う
+      （中心化後は 0 になるため、スコアのない軸は位置に影響しない）。
+      軸数は意見数よりずっと少ないため、CHUNK_ROWS 行ずつ読みながら軸 × 軸の共分散を足し合わせ、
+      その固有値分解で主成分を求める（乱択 SVD を使わずに厳密な PCA が意見数に比例した時間で求まる）
+    - スコアが1つもない意見の立場マップは NaN
+
+使用方法:
+    from divcon.matrix import load_matrix
+
+    m = load_matrix('results')
+    m.scores[:, 0]           # 1列目の軸のスコア（NaN = なし）
+    m.stance_map             # (意見数, 2) の立場マップ
+    m.to_dataframe()         # 意見ID × 軸ID の DataFrame（メモリに読み込む）
+
+出力（results/matrix/）:
+    - scores.npy: 意見 × 軸のスコア（float32、NaN = なし）
+    - mask.npy: 有効なスコアの有無（bool）
+    - stance_map.npy: 立場マップ（float32、意見数 × 2）
+    - opinion_ids.txt: 行 → 意見ID（1行に1件）
+    - meta.json: 列 → 軸、主成分（平均・負荷量・寄与率）
+"""
+
+import json
+import os
+
+import numpy as np
+
+from .store import NULL_SCORE
+
+MATRIX_DIRNAME = 'matrix'
+CHUNK_ROWS = 262_144  # 共分散・射影の計算で一度に読む行数
+N_COMPONENTS = 2
+
+
+# ============================================================================
+# 書き出し
+# ============================================================================
+
+def write_score_matrix(results_dir, score_store, all_axes):
+    """スコア行列・マスク・立場マップを results_dir/matrix/ に書き出す
+
+    Args:
+        results_dir: 結果ディレクトリ
+        score_store: ScoreStore（行は score_store.opinions の順。列はスコアのある軸）
+        all_axes: {topic_id: [axis, ...]}（meta.json の各軸のトピック）
+
+    Returns:
+        dict: meta.json の内容
+    """
+    from numpy.lib.format import open_memmap
+
+    matrix_dir = os.path.join(results_dir, MATRIX_DIRNAME)
+    os.makedirs(matrix_dir, exist_ok=True)
+
+    opinion_store = score_store.opinions
+    topic_of = {axis['id']: topic_id for topic_id, axes in all_axes.items() for axis in axes}
+    axes = sorted(score_store.axes, key=lambda axis: axis['id'])
+    n, d = len(opinion_store), len(axes)
+
+    scores = open_memmap(os.path.join(matrix_dir, 'scores.npy'), mode='w+', dtype=np.float32, shape=(n, d))
+    mask = open_memmap(os.path.join(matrix_dir, 'mask.npy'), mode='w+', dtype=np.bool_, shape=(n, d))
+    scores[:] = np.nan
+    mask[:] = False
+    for column, axis in enumerate(axes):
+        rows, axis_scores = score_store.axis_arrays(axis['id'])
+        known = rows >= 0  # LLM が返した未知の意見IDは除く
+        rows = rows[known]
+        axis_scores = axis_scores[known]
+        valid = axis_scores != NULL_SCORE
+        scores[rows[valid], column] = axis_scores[valid]
+        mask[rows[valid], column] = True
+
+    with open(os.path.join(matrix_dir, 'opinion_ids.txt'), 'w', encoding='utf-8') as f:
+        f.writelines(f"{opinion_id}\n" for opinion_id in opinion_store.ids)
+
+    projection = _write_stance_map(os.path.join(matrix_dir, 'stance_map.npy'), scores, mask)
+
+    meta = {
+        'n_opinions': n,
+        'axes': [
+            {
+                'column': column,
+                'id': axis['id'],
+                'name': axis['name'],
+                'topic_ids': list(axis.get('topic_ids') or [topic_of.get(axis['id'])]),
+                'left_pole': axis.get('left_pole', ''),
+                'right_pole': axis.get('right_pole', ''),
+                'scored': int(mask[:, column].sum()),
+            }
+            for column, axis in enumerate(axes)
+        ],
+        'projection': projection,
+    }
+    with open(os.path.join(matrix_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    scores.flush()
+    mask.flush()
+    return meta
+
+
+def stance_components(scores, mask, n_components=N_COMPONENTS, chunk_rows=CHUNK_ROWS):
+    """スコア行列の主成分（欠けた要素は軸の平均で補う）
+
+    Returns:
+        (mean, components, explained_variance_ratio)。components は (n_components, 軸数)。
+        軸数が n_components より少ない場合、足りない主成分は 0
+    """
+    n, d = scores.shape
+    counts = np.zeros(d, dtype=np.int64)
+    totals = np.zeros(d, dtype=np.float64)
+    for start in range(0, n, chunk_rows):
+        block_mask = mask[start:start + chunk_rows]
+        counts += block_mask.sum(axis=0)
+        totals += np.where(block_mask, scores[start:start + chunk_rows], 0).sum(axis=0, dtype=np.float64)
+    mean = np.divide(totals, counts, out=np.zeros(d), where=counts > 0)
+
+    # 中心化した行列の軸 × 軸の積和（スコアのない要素は 0）
+    scatter = np.zeros((d, d), dtype=np.float64)
+    for start in range(0, n, chunk_rows):
+        centered = _centered(scores[start:start + chunk_rows], mask[start:start + chunk_rows], mean)
+        scatter += centered.T @ centered
+
+    eigenvalues, eigenvectors = np.linalg.eigh(scatter)
+    order = np.argsort(eigenvalues)[::-1][:n_components]
+    components = np.zeros((n_components, d))
+    components[:len(order)] = eigenvectors[:, order].T
+    # 符号を決める（負荷量の絶対値が最大の軸を正にする）
+    for k in range(len(order)):
+        if components[k, np.argmax(np.abs(components[k]))] < 0:
+            components[k] = -components[k]
+
+    total = eigenvalues.clip(min=0).sum()
+    ratio = np.zeros(n_components)
+    if total > 0:
+        ratio[:len(order)] = eigenvalues[order].clip(min=0) / total
+    return mean, components, ratio
+
+
+def _centered(block, block_mask, mean):
+    return np.where(block_mask, block - mean, 0).astype(np.float64)
+
+
+def _write_stance_map(path, scores, mask, chunk_rows=CHUNK_ROWS):
+    """立場マップを memmap に書き出し、主成分の情報を返す"""
+    from numpy.lib.format import open_memmap
+
+    n = scores.shape[0]
+    mean, components, ratio = stance_components(scores, mask, chunk_rows=chunk_rows)
+    stance_map = open_memmap(path, mode='w+', dtype=np.float32, shape=(n, N_COMPONENTS))
+    for start in range(0, n, chunk_rows):
+        block_mask = mask[start:start + chunk_rows]
+        projected = _centered(scores[start:start + chunk_rows], block_mask, mean) @ components.T
+        projected[~block_mask.any(axis=1)] = np.nan
+        stance_map[start:start + chunk_rows] = projected
+    stance_map.flush()
+    return {
+        'mean': mean.round(6).tolist(),
+        'components': components.round(6).tolist(),
+        'explained_variance_ratio': ratio.round(6).tolist(),
+    }
+
+
+# ============================================================================
+# 読み込み
+# ============================================================================
+
+class ScoreMatrix:
+    """保存したスコア行列（数値は memmap。意見IDは初めて使うときに読み込む）"""
+
+    def __init__(self, matrix_dir):
+        self.matrix_dir = matrix_dir
+        self.scores = np.load(os.path.join(matrix_dir, 'scores.npy'), mmap_mode='r')
+        self.mask = np.load(os.path.join(matrix_dir, 'mask.npy'), mmap_mode='r')
+        self.stance_map = np.load(os.path.join(matrix_dir, 'stance_map.npy'), mmap_mode='r')
+        with open(os.path.join(matrix_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.axes = self.meta['axes']
+        self._opinion_ids = None
+
+    @property
+    def opinion_ids(self):
+        if self._opinion_ids is None:
+            with open(os.path.join(self.matrix_dir, 'opinion_ids.txt'), 'r', encoding='utf-8') as f:
+                self._opinion_ids = f.read().splitlines()
+        return self._opinion_ids
+
+    def column(self, axis_id):
+        """軸IDの列番号"""
+        for axis in self.axes:
+            if axis['id'] == axis_id:
+                return axis['column']
+        raise KeyError(axis_id)
+
+    def to_dataframe(self):
+        """意見ID × 軸ID の DataFrame（行列全体をメモリに読み込む）"""
+        import pandas as pd
+
+        return pd.DataFrame(np.asarray(self.scores), index=pd.Index(self.opinion_ids, name='opinion_id'),
+                            columns=[axis['id'] for axis in self.axes])
+
+
+def load_matrix(results_dir):
+    """results_dir/matrix/ のスコア行列を開く"""
+    return ScoreMatrix(os.path.join(results_dir, MATRIX_DIRNAME))
+
+
+def write_summary_matrix(f, meta):
+    """summary.txt に立場マップの寄与率を書き出す"""
+    if not meta['axes']:
+        return
+    ratio = meta['projection']['explained_variance_ratio']
+    f.write(f"スコア行列: {meta['n_opinions']} 件 × {len(meta['axes'])} 軸（matrix/）\n")
+    f.write(f"  立場マップの寄与率: 第1主成分 {ratio[0]:.1%} / 第2主成分 {ratio[1]:.1%}\n\n")
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 分極度メトリクス
+Stage 4 の実スコアから軸ごとの分極度を計算し、axis_metrics.json として保存する
+
+Stage 3a の strength（1-5）はスコアリング前のLLMの推定値なので、
+実際のスコア分布から次の指標を計算して軸のランキングに使う。
+
+    - bimodality: 二峰性係数（Bimodality Coefficient, 5/9 を超えると二峰性の目安）
+    - esteban_ray: Esteban–Ray 分極度（両極に半数ずつで 1 になるよう正規化）
+    - extremity_share: 極端スコア（1 または 6）の割合
+
+全指標はスコアヒストグラム（軸ごとに6ビン）だけから計算するため、
+ブートストラップもヒストグラムの多項分布リサンプリングで行え、
+スコア件数（100万件でも）に依存せず軸数 × リサンプル数の計算量で済む。
+
+使用方法:
+    divcon stats
+
+出力:
+    - results/axis_metrics.json: 軸ごとの分極度メトリクスと95%信頼区間、ランキング
+"""
+
+import json
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from . import stats
+
+# Esteban–Ray の分極感度パラメータ（論文で許容される範囲 [0, 1.6] の上限）
+ER_ALPHA = 1.6
+BOOTSTRAP_SAMPLES = 1000
+CI_LEVEL = 0.95
+
+# ランキングに使う指標
+RANK_METRIC = 'esteban_ray'
+
+_VALUES = np.arange(stats.SCORE_MIN, stats.SCORE_MAX + 1, dtype=np.float64)
+
+
+def _moments(counts):
+    """ヒストグラムから件数・平均・中心モーメント（2-4次）を計算する（最後の次元が6ビン）"""
+    n = counts.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (counts * _VALUES).sum(axis=-1) / n
+        dev = _VALUES - mean[..., None]
+        m2 = (counts * dev ** 2).sum(axis=-1) / n
+        m3 = (counts * dev ** 3).sum(axis=-1) / n
+        m4 = (counts * dev ** 4).sum(axis=-1) / n
+    return n, m2, m3, m4
+
+
+def bimodality_coefficient(counts):
+    """二峰性係数 BC = (g1^2 + 1) / (g2 + 3(n-1)^2 / ((n-2)(n-3)))
+
+    g1, g2 は標本補正済みの歪度・尖度。n < 4 または分散0の場合は NaN。
+    """
+    n, m2, m3, m4 = _moments(counts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        g1 = m3 / m2 ** 1.5
+        g2 = m4 / m2 ** 2 - 3
+        skew = g1 * np.sqrt(n * (n - 1)) / (n - 2)
+        kurt = ((n + 1) * g2 + 6) * (n - 1) / ((n - 2) * (n - 3))
+        bc = (skew ** 2 + 1) / (kurt + 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+    return np.where((n >= 4) & (m2 > 0), bc, np.nan)
+
+
+def esteban_ray(counts, alpha=ER_ALPHA):
+    """Esteban–Ray 分極度 P = K Σ_i Σ_j π_i^(1+α) π_j |y_i - y_j|
+
+    K はスコア1と6に半数ずつ分かれた分布で P = 1 となるように決める。
+    """
+    n = counts.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = counts / n[..., None]
+    distance = np.abs(_VALUES[:, None] - _VALUES[None, :])
+    raw = np.einsum('...i,ij,...j->...', share ** (1 + alpha), distance, share)
+    max_raw = 2 * 0.5 ** (2 + alpha) * (_VALUES[-1] - _VALUES[0])
+    return np.where(n > 0, raw / max_raw, np.nan)
+
+
+def extremity_share(counts):
+    """極端スコア（1 または 6）の割合"""
+    n = counts.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = (counts[..., 0] + counts[..., -1]) / n
+    return np.where(n > 0, share, np.nan)
+
+
+METRICS = {
+    'bimodality': bimodality_coefficient,
+    'esteban_ray': esteban_ray,
+    'extremity_share': extremity_share,
+}
+
+
+def bootstrap_intervals(counts, n_samples=BOOTSTRAP_SAMPLES, ci_level=CI_LEVEL, seed=0):
+    """全軸・全指標のブートストラップ信頼区間を一括で計算する
+
+    元のスコアを再サンプリングする代わりに、各軸のヒストグラムから
+    多項分布で n_samples 個のヒストグラムを生成する（結果は同じ分布になる）。
+
+    Args:
+        counts: shape (n_axes, 6) のスコア件数
+        n_samples: リサンプル数
+        ci_level: 信頼水準
+        seed: 乱数シード
+
+    Returns:
+        dict: {metric: (lower, upper)} 各要素は shape (n_axes,)
+    """
+    if len(counts) == 0:
+        # スコアのある軸がない（予算切れで途中停止した場合など）
+        return {name: (np.empty(0), np.empty(0)) for name in METRICS}
+
+    rng = np.random.default_rng(seed)
+    n = counts.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pvals = counts / n[:, None]
+    # スコアのない軸は一様分布で代用し、結果は NaN に置き換える
+    pvals = np.where(n[:, None] > 0, pvals, 1 / counts.shape[-1])
+    samples = rng.multinomial(n.astype(np.int64), pvals, size=(n_samples, len(n))).astype(np.float64)
+
+    tail = (1 - ci_level) / 2 * 100
+    intervals = {}
+    for name, func in METRICS.items():
+        values = func(samples)
+        # 全リサンプルが NaN の軸（n < 4 の二峰性など）は NaN のまま
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            lower, upper = np.nanpercentile(values, [tail, 100 - tail], axis=0)
+        empty = n == 0
+        intervals[name] = (np.where(empty, np.nan, lower), np.where(empty, np.nan, upper))
+    return intervals
+
+
+def compute_axis_metrics(scores_df, axes_data=None, n_samples=BOOTSTRAP_SAMPLES, seed=0):
+    """軸ごとの分極度メトリクスを計算する
+
+    Args:
+        scores_df: scores.csv の DataFrame（axis_id, score 列が必要）
+        axes_data: axes.json の内容（LLM の strength を併記するために使用）
+        n_samples: ブートストラップのリサンプル数
+        seed: 乱数シード
+
+    Returns:
+        dict: {axis_id: {n, bimodality, esteban_ray, extremity_share, *_ci, llm_strength, rank}}
+              rank は RANK_METRIC の降順（1 が最も分極している軸）
+    """
+    strengths = {}
+    for topic_axes in (axes_data or {}).values():
+        for axis in topic_axes:
+            strengths[axis['id']] = axis.get('strength')
+
+    axis_ids, hist = stats.score_histograms(scores_df)
+    counts = hist[:, stats.SCORE_MIN:].astype(np.float64)
+
+    point = {name: func(counts) for name, func in METRICS.items()}
+    intervals = bootstrap_intervals(counts, n_samples=n_samples, seed=seed)
+
+    def _num(x):
+        x = float(x)
+        return None if np.isnan(x) else round(x, 4)
+
+    # ランキング（NaN の軸は最下位）
+    order = np.argsort(-np.nan_to_num(point[RANK_METRIC], nan=-np.inf), kind='stable')
+    ranks = np.empty(len(axis_ids), dtype=np.int64)
+    ranks[order] = np.arange(1, len(axis_ids) + 1)
+
+    metrics = {}
+    for i, axis_id in enumerate(axis_ids):
+        record = {'n': int(counts[i].sum())}
+        for name in METRICS:
+            record[name] = _num(point[name][i])
+            lower, upper = intervals[name]
+            record[f'{name}_ci'] = [_num(lower[i]), _num(upper[i])]
+        record['llm_strength'] = strengths.get(axis_id)
+        record['rank'] = int(ranks[i])
+        metrics[axis_id] = record
+    return metrics
+
+
+def write_axis_metrics(metrics, path='results/axis_metrics.json'):
+    """メトリクスを JSON として保存する"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, ensure_ascii=False, indent=2)
+
+
+def compute_axis_metrics_from_results(results_dir='results'):
+    """results/ の scores.csv と axes.json からメトリクスを計算する"""
+    scores_df = pd.read_csv(f'{results_dir}/scores.csv')
+    try:
+        with open(f'{results_dir}/axes.json', 'r', encoding='utf-8') as f:
+            axes_data = json.load(f)
+    except FileNotFoundError:
+        axes_data = None
+    return compute_axis_metrics(scores_df, axes_data)
+
+
+def load_axis_metrics(results_dir='results'):
+    """axis_metrics.json を読み込む。なければ scores.csv から計算する"""
+    try:
+        with open(f'{results_dir}/axis_metrics.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return compute_axis_metrics_from_results(results_dir)
+
+
+def write_summary_ranking(f, metrics, axes_data=None):
+    """summary.txt に実測の分極度による軸ランキングを書き出す
+
+    Args:
+        f: 書き込み先のファイルオブジェクト
+        metrics: compute_axis_metrics() の結果
+        axes_data: axes.json の内容（軸名の表示に使用）
+    """
+    axis_names = {}
+    for topic_axes in (axes_data or {}).values():
+        for axis in topic_axes:
+            axis_names[axis['id']] = axis['name']
+
+    def _fmt(value, ci):
+        if value is None:
+            return '-'
+        if ci[0] is None:
+            return f"{value:.2f}"
+        return f"{value:.2f} [{ci[0]:.2f}-{ci[1]:.2f}]"
+
+    f.write("対立軸ランキング（実スコアの分極度順、[ ] は95%信頼区間）:\n")
+    for axis_id, m in sorted(metrics.items(), key=lambda item: item[1]['rank']):
+        strength = f"{m['llm_strength']}/5" if m['llm_strength'] is not None else '-'
+        f.write(f"  {m['rank']:>2}. [{axis_id}] {axis_names.get(axis_id, '')}\n")
+        f.write(f"      分極度(ER): {_fmt(m['esteban_ray'], m['esteban_ray_ci'])}"
+                f" | 二峰性: {_fmt(m['bimodality'], m['bimodality_ci'])}"
+                f" | 極端割合: {_fmt(m['extremity_share'], m['extremity_share_ci'])}"
+                f" | n={m['n']} | LLM強度: {strength}\n")
+    f.write("\n")
+
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 意見テキストの前処理
+プロンプトに載せる意見テキストを正規化・圧縮し、Stage 1〜4 の入力トークンを減らす
+
+意見の dict には次の2つを持たせる:
+    - comment: 元の本文（表示と excerpt の照合に使う。変更しない）
+    - text: プロンプト用のテキスト（preprocess_opinions で追加。なければ comment を使う）
+
+正規化（normalize_comment）:
+    - NFKC 正規化（全角英数・全角空白などを統一）
+    - URL を [URL] に、「>」で始まる引用行を [引用略] に置き換える
+    - 長いカギ括弧の引用（計画本文の引き写しなど）を先頭だけ残して省略する
+    - 挨拶・結びの定型文（「お世話になっております」「よろしくお願いいたします」など）を削除する
+    - 同じ文の繰り返しを1つにし、空白を詰める
+正規化で本文が空になる場合は空白を詰めただけのテキストを使う。
+
+圧縮（compress_text、max_tokens 指定時のみ）:
+    トークン数の上限を超える意見から、立場を表す文末表現（「べき」「反対」など）を含む文と
+    先頭・末尾の文を優先して抽出し、元の順に並べる（省略箇所は「…」）。
+"""
+
+import math
+import re
+import unicodedata
+
+# 長いカギ括弧の引用は先頭 QUOTE_KEEP_CHARS 文字だけ残す（QUOTE_MAX_CHARS 文字を超える場合）
+QUOTE_MAX_CHARS = 80
+QUOTE_KEEP_CHARS = 30
+OMISSION = '…'
+
+# 挨拶・結びの定型文（文全体が一致する場合だけ削除する）
+BOILERPLATE_PATTERNS = (
+    r'(拝啓|謹啓|前略|敬具|謹白|草々)',
+    r'(いつも)?(大変)?お世話になって(おり|い)ます',
+    r'(突然の)?(ご連絡|メール)?失礼(いた|致)?します',
+    r'(以下|下記)の(とおり|通り)?、?意見を(提出|送付|お送り|申し上げ)(いた|致|し)?(します|ます)',
+    r'(パブリックコメント|意見)を(提出|送付|お送り)(いた|致|し)?(します|ます)',
+    r'以上(です|となります|、?よろしくお願い(いた|致)?します)?',
+    r'(何卒|なにとぞ|どうぞ)?(ご検討|ご高配|ご配慮)?(の(ほど|程))?、?(を)?(何卒|なにとぞ|どうぞ)?よろしくお願い(いた|致|申し上げ|し)?(します|ます)',
+)
+
+# 立場を表す表現（圧縮時に優先して残す文）
+STANCE_MARKERS = ('べき', '反対', '賛成', '必要', '求め', 'してほしい', 'ください', '望む', '望みます', 'すべき', '見直',
+                  '撤回', '推進', '廃止', '中止', '懸念', '支持')
+
+_URL = re.compile(r'https?://[\x21-\x7e]+')
+_QUOTED_LINE = re.compile(r'^[ \t]*>.*$', re.M)
+_LONG_QUOTE = re.compile(r'「([^「」]{%d,})」' % (QUOTE_MAX_CHARS + 1))
+_SENTENCE = re.compile(r'[^。！？!?\n]+[。！？!?]*|\n')
+# 元の本文の文（URL の途中の ? などでは区切らない）
+_SOURCE_SENTENCE = re.compile(r'(?:https?://[\x21-\x7e]+|[^。！？!?\n])+[。！？!?]*|\n')
+_BOILERPLATE = re.compile('|'.join(f'(?:{p})' for p in BOILERPLATE_PATTERNS))
+_TRAILING_PUNCT = '。．.！!？?、, '
+_SPACES = re.compile(r'[ \t\r\f\v]+')
+_ASCII_RUN = re.compile(r'[\x21-\x7e]+')
+# 正規化で入れる置き換え・省略の記号（元の本文との照合では無視する）
+PLACEHOLDERS = ('[URL]', '[引用略]', OMISSION)
+_PLACEHOLDER = re.compile('|'.join(re.escape(p) for p in PLACEHOLDERS))
+_WHITESPACE = re.compile(r'\s+')
+# プロンプトの文と元の本文の文の対応付けに必要な文字 bigram の一致率
+SOURCE_MATCH_MIN = 0.5
+
+
+def nfkc(text):
+    return unicodedata.normalize('NFKC', str(text or ''))
+
+
+def split_sentences(text):
+    """文（句点・感嘆符・疑問符・改行で区切る）のリスト"""
+    return [s.strip() for s in _SENTENCE.findall(text) if s.strip()]
+
+
+def normalize_comment(text):
+    """意見の本文をプロンプト用に正規化する"""
+    text = nfkc(text)
+    collapsed = _SPACES.sub(' ', text).strip()
+
+    text = _URL.sub('[URL]', text)
+    text = _QUOTED_LINE.sub('[引用略]', text)
+    text = _LONG_QUOTE.sub(lambda m: f"「{m.group(1)[:QUOTE_KEEP_CHARS]}{OMISSION}」", text)
+
+    sentences = []
+    seen = set()
+    for sentence in split_sentences(_SPACES.sub(' ', text)):
+        if _BOILERPLATE.fullmatch(sentence.rstrip(_TRAILING_PUNCT)):
+            continue
+        if sentence in seen:
+            continue
+        seen.add(sentence)
+        sentences.append(sentence)
+
+    normalized = ' '.join(sentences)
+    return normalized if normalized else collapsed
+
+
+def _match_key(sentence):
+    text = _WHITESPACE.sub('', _PLACEHOLDER.sub('', nfkc(sentence)))
+    return {text[i:i + 2] for i in range(len(text) - 1)} or set(text)
+
+
+def source_sentences(text, comment):
+    """プロンプト用テキストの文と、それぞれに対応する元の本文の文
+
+    正規化・圧縮で文の中身は変わる（[URL] への置き換え、引用の省略など）ため、文字 bigram の
+    一致率が最も高い本文の文を対応させる（SOURCE_MATCH_MIN 未満なら対応なし）。
+
+    Returns:
+        (prompt_sentences, sources)。sources[i] はプロンプトの i 番目の文に対応する本文の文（なければ None）
+    """
+    prompt_sentences = split_sentences(text) or [text]
+    originals = [s.strip() for s in _SOURCE_SENTENCE.findall(str(comment or '')) if s.strip()]
+    original_keys = [_match_key(s) for s in originals]
+
+    sources = []
+    for sentence in prompt_sentences:
+        key = _match_key(sentence)
+        best, best_rate = None, 0
+        for original, original_key in zip(originals, original_keys):
+            rate = len(key & original_key) / len(key) if key else 0
+            if rate >= SOURCE_MATCH_MIN and rate > best_rate:
+                best, best_rate = original, rate
+        sources.append(best)
+    return prompt_sentences, sources
+
+
+# ============================================================================
+# トークン数と圧縮
+# ============================================================================
+
+def _load_encoding():
+    """tiktoken があれば o200k_base のエンコーディングを返す"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding('o200k_base')
+    except Exception:
+        return None
+
+
+_encoding = None
+_encoding_loaded = False
+
+
+def estimate_tokens(text):
+    """トークン数の見積もり（tiktoken がない場合は日本語1文字 = 1、英数字4文字 = 1 で概算する）"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding = _load_encoding()
+        _encoding_loaded = True
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    ascii_chars = sum(len(m) for m in _ASCII_RUN.findall(text))
+    return len(text) - ascii_chars + (ascii_chars + 3) // 4
+
+
+def compress_text(text, max_tokens):
+    """トークン数が max_tokens 以下になるように文を抽出する"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    sentences = split_sentences(text)
+    costs = [estimate_tokens(s) for s in sentences]
+
+    def priority(i):
+        stance = sum(marker in sentences[i] for marker in STANCE_MARKERS)
+        position = 2 if i == 0 else 1 if i == len(sentences) - 1 else 0
+        return (-(2 * stance + position), i)
+
+    selected = []
+    budget = max_tokens
+    for i in sorted(range(len(sentences)), key=priority):
+        if costs[i] + 1 <= budget:  # 1 は省略記号の分
+            selected.append(i)
+            budget -= costs[i] + 1
+    if not selected:
+        # 1文も入らない場合は先頭の文を切り詰める
+        head = sentences[0] if sentences else text
+        while head and estimate_tokens(head) + 1 > max_tokens:
+            head = head[:max(len(head) * 3 // 4, len(head) - 50)]
+        return head + OMISSION
+
+    parts = []
+    previous = -1
+    for i in sorted(selected):
+        if i != previous + 1:
+            parts.append(OMISSION)
+        parts.append(sentences[i])
+        previous = i
+    if previous != len(sentences) - 1:
+        parts.append(OMISSION)
+    return ' '.join(parts)
+
+
+# ============================================================================
+# 意見リストの前処理
+# ============================================================================
+
+def prompt_text(op):
+    """プロンプトに載せる意見テキスト（前処理していなければ元の本文）"""
+    return op.get('text') or op['comment']
+
+
+def preprocess_opinions(opinions, normalize=True, max_tokens=0):
+    """意見ごとにプロンプト用のテキスト（op['text']）を作る（op['comment'] は変更しない）
+
+    Args:
+        opinions: 意見の dict のリスト（その場で text を追加する）
+        normalize: False の場合は正規化せず、空白を詰めるだけにする
+        max_tokens: 1意見あたりのトークン数の上限（0 = 圧縮しない）
+
+    Returns:
+        dict: {'tokens_before', 'tokens_after', 'compressed'}
+    """
+    tokens_before = 0
+    tokens_after = 0
+    compressed = 0
+    for op in opinions:
+        comment = op.get('comment')
+        comment = '' if comment is None or (isinstance(comment, float) and math.isnan(comment)) else str(comment)
+        text = normalize_comment(comment) if normalize else _SPACES.sub(' ', comment).strip()
+        if max_tokens > 0:
+            shortened = compress_text(text, max_tokens)
+            compressed += shortened != text
+            text = shortened
+        op['text'] = text
+        tokens_before += estimate_tokens(comment)
+        tokens_after += estimate_tokens(text)
+    return {'tokens_before': tokens_before, 'tokens_after': tokens_after, 'compressed': compressed}
@@ -0,0 +1,550 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon パイプライン
+Stage 1 〜 5 をストリーミング実行し、結果ファイルを保存する
+
+出力:
+    - results/topics.json: 発見されたトピック
+    - results/axes.json: 対立軸
+    - results/anchors.json: 極端意見アンカー
+    - results/scores.csv: 全意見のスコア（scores.jsonl から外部マージで並べ替えて作る）
+    - results/scores.jsonl・classifications.jsonl: バッチごとに追記したスコアと分類結果（divcon.sink）
+    - results/consensus.json: 合意可能性分析結果
+    - results/stats.json: 軸別・トピック別の統計
+    - results/axis_metrics.json: 実スコアに基づく軸の分極度メトリクス
+    - results/distill.json: ローカルスコアラーの軸別一致率とコスト削減量（distill 有効時のみ）
+    - results/rescore.json: 不確かなスコアの再スコアリング結果（rescore 有効時のみ）
+    - results/axis_merge.json: トピック横断で統合した対立軸（merge_axes 有効時のみ）
+    - results/summary.txt: 統計サマリー
+"""
+
+import json
+import os
+from concurrent.futures import wait, FIRST_COMPLETED
+from datetime import datetime
+
+import pandas as pd
+
+from . import llm, metrics, normalize, stats
+from .axis_merge import merge_duplicate_axes, write_summary_merge
+from .matrix import write_score_matrix, write_summary_matrix
+from .planner import PLAN_AXES_PER_TOPIC
+from .sink import CLASSIFICATIONS_FILENAME, SCORES_FILENAME, JsonlSink, score_records, write_scores_csv
+from .store import OpinionStore, ScoreStore
+from .config import get_settings
+from .progress import tracker
+from .stages import (
+    print_lock,
+    stage1_topic_discovery,
+    stage2_classification,
+    stage3a_axis_discovery,
+    stage3b_anchor_generation,
+    stage4_scoring,
+    stage5_consensus_analysis,
+)
+
+# トピックの分類済み意見がこの件数に達したら、Stage 2 の完了を待たずに Stage 3a を開始する
+# （Stage 3a のサンプル数と同じ。これ以上集めてもプロンプトに載る意見は増えない）
+STAGE3A_EARLY_START = 500
+
+
+def plan(data_path='data/opinions.csv'):
+    """API を呼び出さずに実行計画を見積もって表示する（divcon run --dry-run）
+
+    Returns:
+        planner.plan_run() の結果
+    """
+    from . import planner
+
+    settings = get_settings()
+    opinions = pd.read_csv(data_path).to_dict('records')
+    result = planner.plan_run(opinions, settings)
+    planner.print_plan(result, settings)
+    return result
+
+
+def run(data_path='data/opinions.csv', results_dir='results', docs_dir='../docs', views=True):
+    """全Stageを実行し、結果を results_dir に保存する
+
+    Args:
+        data_path: 入力CSV（id, comment 列）
+        results_dir: 出力ディレクトリ
+        docs_dir: HTMLビューのコピー先（None の場合はコピーしない）
+        views: True の場合、完了後にHTMLビューを生成する
+    """
+    settings = get_settings()
+    max_workers = settings.max_workers
+    os.makedirs(results_dir, exist_ok=True)
+
+    print(f"DivCon Analysis")
+    print(f"=" * 60)
+    print(f"Model: {settings.model}")
+    print(f"Reasoning Effort: {settings.reasoning_effort}")
+    print(f"=" * 60)
+    print()
+
+    start_time = datetime.now()
+
+    # データ読み込み
+    print("データ読み込み中...")
+    df = pd.read_csv(data_path)
+    opinions = df.to_dict('records')
+    print(f"[OK] {len(opinions)} 件の意見を読み込み\n")
+
+    # プロンプト用の意見テキスト（元の comment は表示と excerpt の照合用にそのまま残す）
+    if settings.normalize_comments or settings.compress_tokens > 0:
+        preprocess = normalize.preprocess_opinions(
+            opinions, normalize=settings.normalize_comments, max_tokens=settings.compress_tokens
+        )
+        saved = 1 - preprocess['tokens_after'] / max(preprocess['tokens_before'], 1)
+        print(f"[OK] 意見テキストの前処理: {preprocess['tokens_before']} → {preprocess['tokens_after']} トークン"
+              f" (-{saved:.0%}, 圧縮 {preprocess['compressed']} 件)\n")
+
+    budget_error = None  # 予算を使い切った場合の例外（以降は新しい処理を投入しない）
+
+    # Stage 1: トピック検出
+    try:
+        topics = stage1_topic_discovery(opinions)
+    except llm.BudgetExceededError as e:
+        print(f"[WARNING] {e}。トピック検出の前に停止し、結果を保存します。")
+        tracker.log("予算切れのため新しい処理の投入を停止")
+        budget_error = e
+        topics = []
+
+    # 結果保存
+    with open(f'{results_dir}/topics.json', 'w', encoding='utf-8') as f:
+        json.dump(topics, f, ensure_ascii=False, indent=2)
+
+    # 全トピックの対立軸とアンカーを保存
+    all_axes = {}
+    all_anchors = {}
+    all_consensus_analyses = []
+    distill_reports = []
+    rescore_reports = []
+    merge_report = []
+
+    # ============================================================================
+    # Stage 2 → 3a → 3b & 4 → 5 をストリーミング実行
+    # ============================================================================
+    # ステージ間の全件待ちをなくし、前段の結果がそろった単位から次のStageを開始する
+    #   - Stage 3a: トピックの分類済み意見が STAGE3A_EARLY_START 件に達したら分類完了を待たずに開始
+    #   - Stage 3b & 4: トピックの対立軸が確定し、かつ全意見の分類が終わったら軸ごとに開始
+    #     （merge_axes 有効時は全トピックの Stage 3a を待ち、重複する軸を統合してから開始）
+    #   - Stage 5: 軸のスコアリングが終わったらその軸だけで開始
+    print(f"\n[ストリーミング実行] Stage 2 → 3a → 3b & 4 → 5 を並列実行中... (並列数: {max_workers})\n")
+
+    topic_map = {t['id']: t for t in topics}
+    opinion_store = OpinionStore(opinions)  # トピック → 意見の索引
+    # 分類結果とスコアはバッチごとに追記する（実行中でも途中までの結果を確認できる）
+    classification_sink = JsonlSink(f'{results_dir}/{CLASSIFICATIONS_FILENAME}')
+    score_sink = JsonlSink(f'{results_dir}/{SCORES_FILENAME}')
+    score_store = ScoreStore(opinion_store)  # 軸 → スコアの索引（comment・軸名は複製しない）
+    topic_opinions_cache = {}  # Stage 2 完了後のトピック別意見（軸タスク間で共有）
+    futures = {}  # future → (種類, タスク情報)
+    axis_discovery_started = set()
+
+    def expect_stage4_work():
+        """完了予定時刻の推定用に Stage 4 の作業量（軸 × 意見数）の見込みを登録する
+
+        対立軸が決まったトピックは実際の軸数、まだのトピックは planner.PLAN_AXES_PER_TOPIC 個を仮定する。
+        """
+        total = 0
+        for topic in topics:
+            if topic['id'] not in all_axes:
+                total += opinion_store.topic_count(topic['id']) * PLAN_AXES_PER_TOPIC
+        for topic_id, axes in all_axes.items():
+            for axis in axes:
+                total += sum(opinion_store.topic_count(t) for t in axis.get('topic_ids', [topic_id]))
+        tracker.expect_work('Stage 4', total)
+
+    # 分類前はトピックごとの件数が分からないため、全意見 × 仮定の軸数を見込む
+    tracker.expect_work('Stage 2', len(opinions))
+    tracker.expect_work('Stage 4', len(opinions) * PLAN_AXES_PER_TOPIC)
+
+    def discover_axes_for_topic(topic, topic_opinions):
+        """トピックの対立軸を発見（並列実行用）"""
+        axes = stage3a_axis_discovery(topic, topic_opinions)
+
+        # 軸IDを標準化（トピックID + 軸番号の形式に統一）
+        with print_lock:
+            for i, axis in enumerate(axes, 1):
+                old_id = axis['id']
+                axis['id'] = f"{topic['id']}_A{i}"
+                print(f"  [{topic['id']}] {old_id} → {axis['id']}")
+        return axes
+
+    def process_axis(task):
+        """軸のアンカー生成とスコアリング（並列実行用）"""
+        axis = task['axis']
+        topic_opinions = task['topic_opinions']
+
+        # distill・rescore はスコアを後から補正するため、補正後に軸全体を追記する
+        streaming = not settings.distill and settings.rescore_repeats == 0
+
+        def append_scores(batch_scores):
+            score_sink.append(score_records(axis, task['topic_id'], batch_scores, opinion_store))
+
+        # Stage 3b: アンカー生成
+        tracker.add_work('Stage 3b')
+        anchors = stage3b_anchor_generation(axis, topic_opinions)
+        tracker.complete_work('Stage 3b')
+
+        # Stage 4: スコアリング（distill 有効時はローカルスコアラーを併用）
+        if settings.distill:
+            from .distill import stage4_scoring_distilled
+            scores, report = stage4_scoring_distilled(axis, anchors, topic_opinions)
+        else:
+            scores, report = stage4_scoring(axis, anchors, topic_opinions,
+                                            on_batch=append_scores if streaming else None), None
+
+        # 不確かなスコアだけを再スコアリング（confidence・votes を付与）
+        rescore_report = None
+        if settings.rescore_repeats > 0:
+            from .rescore import stage4_rescore_uncertain
+            scores, rescore_report = stage4_rescore_uncertain(
+                axis, anchors, topic_opinions, scores, repeats=settings.rescore_repeats
+            )
+
+        if not streaming:
+            append_scores(scores)
+        return anchors, scores, (report, rescore_report)
+
+    def analyze_consensus_for_axis(axis, axis_scores):
+        """軸の合意可能性分析（並列実行用）"""
+        axis_id = axis['id']
+
+        with print_lock:
+            print(f"  [Stage 5] 軸 [{axis_id}] を分析中... ({len(axis_scores)} 件の意見)")
+
+        # Stage 5: 合意可能性分析
+        tracker.add_work('Stage 5')
+        texts = {str(s['opinion_id']): opinion_store.comment(opinion_store.row(s['opinion_id'])) for s in axis_scores}
+        analysis = stage5_consensus_analysis(axis, axis_scores, texts=texts)
+        tracker.complete_work('Stage 5')
+
+        with print_lock:
+            consensus_count = len(analysis.get('consensus_points', []))
+            conflict_count = len(analysis.get('conflict_points', []))
+            print(f"  [OK] 軸 [{axis_id}] 完了 (合意点: {consensus_count}, 対立点: {conflict_count})\n")
+
+        return analysis
+
+    with llm.ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+
+        def submit_axis_discovery(topic_id):
+            axis_discovery_started.add(topic_id)
+            tracker.add_work('Stage 3a')
+            topic_opinions = opinion_store.topic_opinions(topic_id)
+            future = executor.submit(discover_axes_for_topic, topic_map[topic_id], topic_opinions)
+            futures[future] = ('axes', topic_id)
+
+        def on_classified(classifications):
+            """Stage 2 のバッチ完了ごとに呼ばれ、意見が十分集まったトピックの Stage 3a を開始する"""
+            classification_sink.append(classifications)
+            changed = opinion_store.assign_topics(classifications, topic_map)
+            for topic_id in sorted(changed):
+                count = opinion_store.topic_count(topic_id)
+                if topic_id not in axis_discovery_started and count >= STAGE3A_EARLY_START:
+                    with print_lock:
+                        print(f"  [Stage 3a 先行開始] トピック [{topic_id}] ({count} 件分類済み)")
+                    submit_axis_discovery(topic_id)
+
+        # Stage 2: トピック分類（予算切れの場合は完了したバッチの分類だけを使い、以降の Stage を投入しない）
+        if budget_error is None:
+            try:
+                opinions = stage2_classification(opinions, topics, on_batch=on_classified)
+            except llm.BudgetExceededError as e:
+                print(f"[WARNING] {e}。新しい処理の投入を停止し、完了済みの結果を保存します。")
+                tracker.log("予算切れのため新しい処理の投入を停止")
+                budget_error = e
+
+        # 分類完了後の正式な割り当てを反映し、トピック別の意見リストを確定する
+        opinion_store.assign_topics(
+            ({'opinion_id': op['id'], 'topic_id': op.get('topic_id')} for op in opinions), topic_map
+        )
+        topic_opinions_cache = {t['id']: opinion_store.topic_opinions(t['id']) for t in topics}
+
+        # 先行開始しなかったトピックの Stage 3a を開始
+        for topic in topics:
+            if budget_error is not None:
+                break
+            if topic['id'] in axis_discovery_started:
+                continue
+            if len(topic_opinions_cache[topic['id']]) == 0:
+                print(f"[WARNING] トピック [{topic['id']}] に属する意見がありません。スキップします。\n")
+                continue
+            submit_axis_discovery(topic['id'])
+
+        # 完了したものから次のStageを投入する
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, info = futures.pop(future)
+
+                if isinstance(future.exception(), llm.BudgetExceededError):
+                    # 予算切れ: 実行中の処理の完了だけを待ち、そこまでの結果を保存する
+                    if budget_error is None:
+                        print(f"[WARNING] {future.exception()}。新しい処理の投入を停止し、完了済みの結果を保存します。")
+                        tracker.log("予算切れのため新しい処理の投入を停止")
+                    budget_error = future.exception()
+                    continue
+
+                if kind == 'axes':
+                    # Stage 3a 完了 → 軸ごとに Stage 3b & 4 を開始
+                    topic_id = info
+                    all_axes[topic_id] = future.result()
+                    tracker.complete_work('Stage 3a')
+                    tracker.log(f"トピック [{topic_id}] の対立軸 {len(all_axes[topic_id])} 個を発見")
+                    expect_stage4_work()
+                    if budget_error is not None:
+                        continue
+                    if not settings.merge_axes:
+                        axes_to_score = [(topic_id, axis) for axis in all_axes[topic_id]]
+                    elif any(k == 'axes' for k, _ in futures.values()):
+                        continue
+                    else:
+                        # 全トピックの軸がそろったら、重複する軸を統合してから投入する
+                        try:
+                            all_axes, merge_report = merge_duplicate_axes(
+                                all_axes, topic_map, confirm=settings.merge_confirm
+                            )
+                        except llm.BudgetExceededError as e:
+                            print(f"[WARNING] {e}。対立軸の統合を行わずに停止します。")
+                            budget_error = e
+                            continue
+                        for r in merge_report:
+                            tracker.log(f"軸 [{r['axis_id']}] に {', '.join(m['axis_id'] for m in r['merged'])} を統合")
+                        expect_stage4_work()
+                        axes_to_score = [(t, axis) for t, axes in sorted(all_axes.items()) for axis in axes]
+
+                    for axis_topic_id, axis in axes_to_score:
+                        # 共有軸はまとめたトピックの意見の和集合でスコアリングする
+                        axis_topic_ids = axis.get('topic_ids', [axis_topic_id])
+                        if len(axis_topic_ids) == 1:
+                            axis_opinions = topic_opinions_cache[axis_topic_ids[0]]
+                        else:
+                            axis_opinions = [op for t in axis_topic_ids for op in topic_opinions_cache[t]]
+                        task = {
+                            'topic_id': axis_topic_ids[0],
+                            'topic_name': topic_map[axis_topic_ids[0]]['name'],
+                            'axis': axis,
+                            'topic_opinions': axis_opinions
+                        }
+                        new_future = executor.submit(process_axis, task)
+                        futures[new_future] = ('scores', task)
+                        pending.add(new_future)
+
+                elif kind == 'scores':
+                    # Stage 4 完了 → その軸の Stage 5 を開始
+                    axis = info['axis']
+                    anchors, scores, (report, rescore_report) = future.result()
+                    all_anchors[axis['id']] = anchors
+                    if report is not None:
+                        distill_reports.append(report)
+                    if rescore_report is not None:
+                        rescore_reports.append(rescore_report)
+                    score_store.add_axis_scores(axis, info['topic_id'], scores)
+                    tracker.log(f"軸 [{axis['id']}] のスコアリング完了 ({len(scores)} 件)")
+                    if budget_error is not None:
+                        continue
+                    new_future = executor.submit(analyze_consensus_for_axis, axis, scores)
+                    futures[new_future] = ('consensus', axis)
+                    pending.add(new_future)
+
+                else:
+                    all_consensus_analyses.append(future.result())
+                    tracker.log(f"軸 [{info['id']}] の合意可能性分析完了")
+
+    print(f"[OK] 全軸の処理完了\n")
+    tracker.log("全軸の処理完了")
+    classification_sink.close()
+    score_sink.close()
+
+    write_results(
+        results_dir, opinions, topics, all_axes, all_anchors, score_store, all_consensus_analyses, start_time,
+        distill_reports=distill_reports, rescore_reports=rescore_reports, merge_report=merge_report,
+        budget_error=budget_error, docs_dir=docs_dir, views=views,
+    )
+
+
+def write_results(results_dir, opinions, topics, all_axes, all_anchors, score_store, consensus_analyses, start_time,
+                  distill_reports=(), rescore_reports=(), merge_report=(), budget_error=None, warnings=(),
+                  docs_dir=None, views=True):
+    """結果ファイル（axes.json 〜 summary.txt）を保存し、HTMLビューを生成する（分散実行と共用。divcon.cluster）
+
+    Args:
+        all_axes: {topic_id: [axis, ...]}
+        all_anchors: {axis_id: anchors}
+        score_store: ScoreStore（スコアは results_dir/scores.jsonl にも追記済みであること）
+        consensus_analyses: Stage 5 の結果のリスト
+        start_time: 処理時間の計算に使う開始時刻
+        budget_error: 予算切れで停止した場合の例外
+        warnings: summary.txt に書き出す警告（失敗したタスクなど）
+    """
+    # 結果保存
+    print("結果を保存中...")
+
+    # 対立軸（トピックID順）
+    all_axes = dict(sorted(all_axes.items()))
+    with open(f'{results_dir}/axes.json', 'w', encoding='utf-8') as f:
+        json.dump(all_axes, f, ensure_ascii=False, indent=2)
+
+    # アンカー
+    with open(f'{results_dir}/anchors.json', 'w', encoding='utf-8') as f:
+        json.dump(all_anchors, f, ensure_ascii=False, indent=2)
+
+    # スコア（scores.jsonl を外部マージで軸ID・スコア順に並べ替えて CSV にする）
+    write_scores_csv(f'{results_dir}/{SCORES_FILENAME}', f'{results_dir}/scores.csv',
+                     score_store.opinions, score_store.axes)
+    scores_df = score_store.to_dataframe(columns=('topic_id', 'axis_id', 'score'))
+
+    # 意見 × 対立軸のスコア行列（memory-mapped .npy）と立場マップ
+    matrix_meta = write_score_matrix(results_dir, score_store, all_axes)
+
+    # 対立軸をまたいだスタンス・プロファイル（予算切れの場合は LLM で名前を付けない）
+    profile_report = []
+    if get_settings().profile_clusters > 0:
+        from .profiles import stance_profiles
+        profile_report = stance_profiles(results_dir, score_store.opinions, all_axes, topics,
+                                         get_settings().profile_clusters, name=budget_error is None)
+    else:
+        from .profiles import remove_profiles
+        remove_profiles(results_dir)
+
+    # 軸別・トピック別の統計（summary.txt とビューで共用）
+    score_stats = stats.compute_stats(scores_df, all_axes)
+    stats.write_stats(score_stats, f'{results_dir}/stats.json')
+
+    # 実スコアに基づく分極度メトリクス（axes.json の LLM strength とは別に保存）
+    axis_metrics = metrics.compute_axis_metrics(scores_df, all_axes)
+    metrics.write_axis_metrics(axis_metrics, f'{results_dir}/axis_metrics.json')
+
+    # ローカルスコアラーの一致率とコスト削減量
+    if distill_reports:
+        distill_reports = sorted(distill_reports, key=lambda r: r['axis_id'])
+        with open(f'{results_dir}/distill.json', 'w', encoding='utf-8') as f:
+            json.dump(distill_reports, f, ensure_ascii=False, indent=2)
+
+    # 不確かなスコアの再スコアリング結果
+    if rescore_reports:
+        rescore_reports = sorted(rescore_reports, key=lambda r: r['axis_id'])
+        with open(f'{results_dir}/rescore.json', 'w', encoding='utf-8') as f:
+            json.dump(rescore_reports, f, ensure_ascii=False, indent=2)
+
+    # トピック横断で統合した対立軸
+    if merge_report:
+        with open(f'{results_dir}/axis_merge.json', 'w', encoding='utf-8') as f:
+            json.dump(merge_report, f, ensure_ascii=False, indent=2)
+
+    # 合意可能性分析結果を保存
+    print("合意可能性分析結果を保存中...")
+    # 軸ID順にソート
+    consensus_analyses = sorted(consensus_analyses, key=lambda x: x['axis_id'])
+
+    with open(f'{results_dir}/consensus.json', 'w', encoding='utf-8') as f:
+        json.dump(consensus_analyses, f, ensure_ascii=False, indent=2)
+
+    # サマリー統計
+    with open(f'{results_dir}/summary.txt', 'w', encoding='utf-8') as f:
+        f.write("DivCon Analysis Summary\n")
+        f.write("=" * 60 + "\n\n")
+
+        f.write(f"総意見数: {len(opinions)} 件\n")
+        f.write(f"トピック数: {len(topics)} 個\n")
+        f.write(f"対立軸数: {sum(len(axes) for axes in all_axes.values())} 個\n")
+        f.write(f"スコア数: {len(score_store)} 件\n\n")
+        if budget_error is not None:
+            f.write(f"[WARNING] {budget_error}。途中で停止したため、結果は完了した対立軸のみです。\n\n")
+        for warning in warnings:
+            f.write(f"[WARNING] {warning}\n")
+        if warnings:
+            f.write("\n")
+
+        f.write("トピック一覧:\n")
+        for topic in topics:
+            f.write(f"  - [{topic['id']}] {topic['name']}\n")
+        f.write("\n")
+
+        f.write("対立軸一覧:\n")
+        for topic_id, axes in sorted(all_axes.items()):
+            topic_name = next(t['name'] for t in topics if t['id'] == topic_id)
+            f.write(f"  トピック: {topic_name}\n")
+            for axis in axes:
+                f.write(f"    - [{axis['id']}] {axis['name']} (強度: {axis['strength']}/5)\n")
+        f.write("\n")
+
+        if axis_metrics:
+            metrics.write_summary_ranking(f, axis_metrics, all_axes)
+
+        if distill_reports:
+            from .distill import write_summary_distill
+            write_summary_distill(f, distill_reports)
+
+        if rescore_reports:
+            from .rescore import write_summary_rescore
+            write_summary_rescore(f, rescore_reports)
+
+        if merge_report:
+            write_summary_merge(f, merge_report)
+
+        write_summary_matrix(f, matrix_meta)
+
+        if profile_report:
+            from .profiles import write_summary_profiles
+            write_summary_profiles(f, profile_report)
+
+        # トークン数（予算の確認用）、ヘッジリクエスト（--hedge 指定時）、意見IDの別名による削減量
+        run_usage = llm.get_usage().get(llm.current_run(), {})
+        if run_usage.get('input_tokens') or run_usage.get('output_tokens'):
+            f.write(f"トークン数: 入力 {run_usage.get('input_tokens', 0)} / 出力 {run_usage.get('output_tokens', 0)}\n\n")
+        if run_usage.get('hedged'):
+            f.write(f"ヘッジリクエスト: {run_usage['hedged']} 件"
+                    f"（うち先着 {run_usage.get('hedge_wins', 0)} 件、"
+                    f"短縮した待ち時間 {run_usage.get('hedge_saved_seconds', 0):.1f} 秒）\n\n")
+        if run_usage.get('alias_saved_input_tokens'):
+            f.write(f"意見IDの別名で削減したトークン数（推定）: 入力 {run_usage['alias_saved_input_tokens']}"
+                    f" / 出力 {run_usage.get('alias_saved_output_tokens', 0)}\n\n")
+
+        # スコア分布（stats.json と同じ集計値を使用）
+        if len(score_store) > 0:
+            stats.write_summary_stats(f, score_stats, topics, all_axes)
+
+    end_time = datetime.now()
+    elapsed = (end_time - start_time).total_seconds()
+
+    print(f"\n{'=' * 60}")
+    if budget_error is not None:
+        print(f"[WARNING] 予算を使い切ったため途中で停止しました（完了した対立軸のみ保存）")
+    print(f"[OK] 全処理完了！")
+    print(f"  処理時間: {elapsed:.1f} 秒")
+    print(f"  結果保存先: {results_dir}/")
+    print(f"    - topics.json: トピック一覧")
+    print(f"    - axes.json: 対立軸一覧")
+    print(f"    - anchors.json: アンカー一覧")
+    print(f"    - scores.csv: 全意見のスコア")
+    print(f"    - scores.jsonl・classifications.jsonl: バッチごとに追記したスコアと分類結果")
+    print(f"    - consensus.json: 合意可能性分析")
+    print(f"    - stats.json: 軸別・トピック別の統計")
+    print(f"    - axis_metrics.json: 軸の分極度メトリクス")
+    print(f"    - matrix/: 意見 × 対立軸のスコア行列（.npy）と立場マップ")
+    if profile_report:
+        print(f"    - profiles.json: 対立軸をまたいだスタンス・プロファイル")
+    if distill_reports:
+        print(f"    - distill.json: ローカルスコアラーの一致率とコスト削減量")
+    if rescore_reports:
+        print(f"    - rescore.json: 不確かなスコアの再スコアリング結果")
+    if merge_report:
+        print(f"    - axis_merge.json: トピック横断で統合した対立軸")
+    print(f"    - summary.txt: 統計サマリー")
+    print(f"{'=' * 60}")
+
+    # HTMLビューの自動生成
+    if views:
+        print(f"\n[HTML生成] ビューファイルを生成中...")
+        try:
+            from . import views as views_module
+            views_module.generate_all(results_dir, docs_dir)
+        except Exception as e:
+            print(f"[WARNING] HTML生成中にエラー: {e}")
+            print(f"  手動で divcon views を実行してください。")
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 実行計画の見積もり（divcon run --dry-run）
+API を呼び出さずに、入力データと設定から Stage ごとの呼び出し数・入出力トークン数・
+コスト・所要時間を見積もる
+
+見積もりの前提:
+    - 意見のトークン数は実際の入力データから数える（前処理の設定も反映する。divcon.normalize）
+    - トピック数・軸数・スコア付き（null 以外）の割合は実行するまで分からないため PLAN_* の値を仮定する
+    - バッチサイズとサンプル数は stages の関数の既定値を使う
+    - 推論トークンは reasoning_effort ごとの REASONING_TOKENS を出力トークンに加える
+      （Stage 3b は high、Stage 5 はモデルの既定値 = medium として扱う）
+    - distill（divcon.distill）有効時、DISTILL_MIN_OPINIONS 件以上の軸の Stage 4 は、初期サンプルと
+      PLAN_DISTILL_ROUNDS 回の能動学習の分を LLM でスコアリングし、残りの意見は PLAN_DISTILL_LOCAL_SHARE を
+      ローカルで採点するものとする（目標一致率に届かない軸は全件 LLM になるため、その場合の上限も表示する）
+    - 所要時間は Stage を順に実行した場合の値（実際はストリーミング実行で Stage が重なるため短くなる）
+
+料金は MODEL_PRICES（USD / 100万トークン）で計算する。一覧にないモデルはコストを出さない。
+"""
+
+import inspect
+import math
+
+from . import distill, normalize, stages
+
+# 実行するまで分からない値の仮定
+PLAN_TOPICS = 5  # Stage 1 のプロンプトは 3-7 個を推奨
+PLAN_AXES_PER_TOPIC = 3  # Stage 3a のプロンプトは 2-4 個
+PLAN_SCORED_SHARE = 0.6  # Stage 4 で null 以外のスコアが付く割合
+PLAN_RESCORE_SHARE = 0.3  # 再スコアリングの対象になる割合（divcon.rescore）
+PLAN_DISTILL_ROUNDS = 2  # 目標一致率に届くまでの能動学習のラウンド数（divcon.distill）
+PLAN_DISTILL_LOCAL_SHARE = 0.7  # 学習データ以外の意見のうちローカルで採点できる割合
+
+# プロンプトの固定部分（指示文・トピック一覧など）のトークン数
+PROMPT_TOKENS = {
+    'Stage 1': 400,
+    'Stage 2': 250,
+    'Stage 3a': 600,
+    'Stage 3b': 1000,
+    'Stage 4': 1100,
+    'Stage 5': 900,
+}
+TOPIC_LIST_TOKENS = 60  # Stage 2 のプロンプトに載るトピック1件あたり
+
+# 出力トークン数（推論トークンを除く）
+OUTPUT_TOKENS_PER_CALL = {'Stage 1': 700, 'Stage 3a': 1000, 'Stage 3b': 700, 'Stage 5': 1500}
+OUTPUT_TOKENS_PER_OPINION = {'Stage 2': 15, 'Stage 4': 130}
+OUTPUT_TOKENS_PER_OPINION_SLIM = 25  # Stage 4 のスリム出力（settings.slim_scoring）
+
+# 推論トークン数（1呼び出しあたり）
+REASONING_TOKENS = {'minimal': 0, 'low': 400, 'medium': 1500, 'high': 4000}
+
+# 所要時間の見積もり
+BASE_LATENCY = 2.0  # 1呼び出しあたりの固定の待ち時間（秒）
+OUTPUT_TOKENS_PER_SECOND = 80.0
+
+# USD / 100万トークン（入力, 出力）。見積もり用（実際の料金は公開価格を確認すること）
+MODEL_PRICES = {
+    'gpt-5': (1.25, 10.00),
+    'gpt-5-mini': (0.25, 2.00),
+    'gpt-5-nano': (0.05, 0.40),
+    'gpt-4.1': (2.00, 8.00),
+    'gpt-4.1-mini': (0.40, 1.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+}
+
+STAGES = ('Stage 1', 'Stage 2', 'Stage 3a', 'Stage 3b', 'Stage 4', 'Stage 5')
+
+
+def _default(func, name):
+    return inspect.signature(func).parameters[name].default
+
+
+def estimate_cost(model, input_tokens, output_tokens):
+    """トークン数からコスト（USD）を計算する（MODEL_PRICES にないモデルは None）"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    return (input_tokens * prices[0] + output_tokens * prices[1]) / 1_000_000
+
+
+def plan_run(opinions, settings):
+    """Stage ごとの呼び出し数・トークン数・コスト・所要時間を見積もる
+
+    Args:
+        opinions: 意見の dict のリスト（id, comment）
+        settings: config.Settings
+
+    Returns:
+        dict: {'stages': {stage: {...}}, 'total': {...}, 'assumptions': {...}}
+    """
+    if settings.normalize_comments or settings.compress_tokens > 0:
+        normalize.preprocess_opinions(opinions, normalize=settings.normalize_comments,
+                                      max_tokens=settings.compress_tokens)
+    opinion_tokens = [normalize.estimate_tokens(normalize.prompt_text(op)) + 4 for op in opinions]  # 4 は ID の分
+    n = len(opinions)
+    mean_tokens = sum(opinion_tokens) / max(n, 1)
+
+    sample_1 = min(n, _default(stages.stage1_topic_discovery, 'sample_size'))
+    batch_2 = _default(stages.stage2_classification, 'batch_size')
+    batch_4 = _default(stages.stage4_scoring, 'batch_size')
+    per_topic = n / PLAN_TOPICS
+    sample_3a = min(per_topic, _default(stages.stage3a_axis_discovery, 'sample_size'))
+    sample_3b = min(per_topic, _default(stages.stage3b_anchor_generation, 'sample_size'))
+    n_axes = PLAN_TOPICS * PLAN_AXES_PER_TOPIC
+
+    # Stage 5: 左右の多い側の件数からチャンク数を決める（stage5_consensus_analysis と同じ式）
+    per_side = per_topic * PLAN_SCORED_SHARE / 2
+    chunks = max(1, min(stages.STAGE5_MAX_CHUNKS, math.ceil(per_side / stages.STAGE5_OPINIONS_PER_SIDE)))
+    calls_5 = chunks + (1 if chunks > 1 else 0)
+    reps_5 = 2 * min(per_side, stages.STAGE5_OPINIONS_PER_SIDE * chunks)
+
+    # Stage 4: 1軸あたりに LLM でスコアリングする件数と呼び出し数（distill 有効時は蒸留の分を除く）
+    scored_4 = per_topic
+    calls_4 = math.ceil(per_topic / batch_4)
+    distilled = settings.distill and per_topic >= distill.DISTILL_MIN_OPINIONS
+    if distilled:
+        labeled = min(per_topic, distill.DISTILL_INITIAL_SAMPLE + PLAN_DISTILL_ROUNDS * distill.DISTILL_ROUND_SIZE)
+        remaining = (per_topic - labeled) * (1 - PLAN_DISTILL_LOCAL_SHARE)
+        scored_4 = labeled + remaining
+        # 初期サンプル・各ラウンド・残りはそれぞれ別の stage4_scoring の呼び出しでバッチに分ける
+        calls_4 = (math.ceil(distill.DISTILL_INITIAL_SAMPLE / batch_4)
+                   + PLAN_DISTILL_ROUNDS * math.ceil(distill.DISTILL_ROUND_SIZE / batch_4)
+                   + math.ceil(remaining / batch_4))
+
+    effort = settings.reasoning_effort
+    stage_calls = {
+        'Stage 1': 1,
+        'Stage 2': math.ceil(n / batch_2),
+        'Stage 3a': PLAN_TOPICS,
+        'Stage 3b': n_axes,
+        'Stage 4': n_axes * calls_4,
+        'Stage 5': n_axes * calls_5,
+    }
+    stage_input = {
+        'Stage 1': sample_1 * mean_tokens,
+        'Stage 2': n * mean_tokens + stage_calls['Stage 2'] * PLAN_TOPICS * TOPIC_LIST_TOKENS,
+        'Stage 3a': PLAN_TOPICS * sample_3a * mean_tokens,
+        'Stage 3b': n_axes * sample_3b * mean_tokens,
+        'Stage 4': n_axes * scored_4 * mean_tokens,
+        'Stage 5': n_axes * reps_5 * (mean_tokens + 100),  # 代表意見は excerpt と理由も載る
+    }
+    stage_output = {
+        'Stage 2': n * OUTPUT_TOKENS_PER_OPINION['Stage 2'],
+        'Stage 4': n_axes * scored_4 * (OUTPUT_TOKENS_PER_OPINION_SLIM if settings.slim_scoring
+                                         else OUTPUT_TOKENS_PER_OPINION['Stage 4']),
+    }
+    stage_effort = {stage: effort for stage in STAGES}
+    stage_effort['Stage 3b'] = 'high'
+    stage_effort['Stage 5'] = 'medium'
+
+    # 再スコアリング（divcon.rescore）は Stage 4 の一部を repeats 回やり直す
+    rescore_factor = 1 + PLAN_RESCORE_SHARE * settings.rescore_repeats
+    # ヘッジ（llm.Hedger）は呼び出し数の hedge_budget 倍まで増える
+    hedge_factor = 1 + (settings.hedge_budget if settings.hedge_percentile > 0 else 0)
+
+    parallel = settings.max_concurrency if settings.max_concurrency > 0 else settings.max_workers
+    result = {'stages': {}}
+    for stage in STAGES:
+        factor = hedge_factor * (rescore_factor if stage == 'Stage 4' else 1)
+        calls = stage_calls[stage] * factor
+        output_tokens = stage_output.get(stage, stage_calls[stage] * OUTPUT_TOKENS_PER_CALL.get(stage, 0))
+        reasoning_tokens = stage_calls[stage] * REASONING_TOKENS.get(stage_effort[stage], REASONING_TOKENS['medium'])
+        input_tokens = (stage_input[stage] + stage_calls[stage] * PROMPT_TOKENS[stage]) * factor
+        output_tokens = (output_tokens + reasoning_tokens) * factor
+
+        latency = BASE_LATENCY + output_tokens / max(calls, 1) / OUTPUT_TOKENS_PER_SECOND
+        seconds = math.ceil(calls / parallel) * latency
+        if settings.requests_per_minute > 0:
+            seconds = max(seconds, calls / settings.requests_per_minute * 60)
+        result['stages'][stage] = {
+            'calls': int(math.ceil(calls)),
+            'input_tokens': int(input_tokens),
+            'output_tokens': int(output_tokens),
+            'cost_usd': estimate_cost(settings.model, input_tokens, output_tokens),
+            'seconds': round(seconds, 1),
+        }
+
+    records = result['stages'].values()
+    costs = [r['cost_usd'] for r in records]
+    result['total'] = {
+        'calls': sum(r['calls'] for r in records),
+        'input_tokens': sum(r['input_tokens'] for r in records),
+        'output_tokens': sum(r['output_tokens'] for r in records),
+        'cost_usd': None if None in costs else sum(costs),
+        'seconds': round(sum(r['seconds'] for r in records), 1),
+    }
+    result['assumptions'] = {
+        'opinions': n,
+        'mean_opinion_tokens': round(mean_tokens, 1),
+        'topics': PLAN_TOPICS,
+        'axes': n_axes,
+        'parallel': parallel,
+        'distill': settings.distill,
+        'distill_axes': n_axes if distilled else 0,
+        # 目標一致率に届かず全件 LLM になった場合の Stage 4 の呼び出し数
+        'stage4_max_calls': int(math.ceil(n_axes * math.ceil(per_topic / batch_4) * hedge_factor * rescore_factor)),
+    }
+    return result
+
+
+def print_plan(plan, settings):
+    """見積もりを表形式で表示する"""
+    a = plan['assumptions']
+    print(f"DivCon 実行計画（ドライラン、API は呼び出しません）")
+    print(f"=" * 60)
+    print(f"Model: {settings.model} / Reasoning Effort: {settings.reasoning_effort} / 並列数: {a['parallel']}")
+    print(f"意見数: {a['opinions']} 件（平均 {a['mean_opinion_tokens']} トークン）")
+    print(f"仮定: トピック {a['topics']} 個 / 対立軸 {a['axes']} 個")
+    print(f"=" * 60)
+
+    def _cost(value):
+        return '-' if value is None else f"${value:,.2f}"
+
+    print(f"{'Stage':<9} {'呼び出し':>8} {'入力トークン':>13} {'出力トークン':>13} {'コスト':>10} {'時間(秒)':>9}")
+    for stage, r in list(plan['stages'].items()) + [('合計', plan['total'])]:
+        print(f"{stage:<9} {r['calls']:>8,} {r['input_tokens']:>13,} {r['output_tokens']:>13,} "
+              f"{_cost(r['cost_usd']):>10} {r['seconds']:>9,.0f}")
+    if plan['total']['cost_usd'] is None:
+        print(f"[WARNING] モデル {settings.model} の料金が MODEL_PRICES にないため、コストは表示しません")
+    if a['distill']:
+        if a['distill_axes']:
+            print(f"distill: ローカルで採点する割合を {PLAN_DISTILL_LOCAL_SHARE:.0%}（能動学習 {PLAN_DISTILL_ROUNDS} ラウンド）と"
+                  f"仮定しています。目標一致率に届かない軸は全件 LLM になり、Stage 4 は最大 {a['stage4_max_calls']:,} 呼び出しです")
+        else:
+            print(f"distill: 1軸あたりの意見が {distill.DISTILL_MIN_OPINIONS} 件未満の見込みのため、"
+                  f"蒸留は行わず全件 LLM でスコアリングするものとして見積もっています")
+    print(f"出力トークンは推論トークンを含みます。時間は Stage を順に実行した場合の目安です。")
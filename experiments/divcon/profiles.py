@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 対立軸をまたいだ立場のパターン（スタンス・プロファイル）のクラスタリング
+
+Stage 5 までは軸ごとに独立して分析するため、「原発推進・賦課金反対・LNG推進」のように
+複数の軸で同じ立場の組み合わせを取る意見のまとまりは見えない。トピックごとに、各意見の
+軸のスコアのベクトル（スコア行列 divcon.matrix の行）をクラスタリングし、クラスタごとに
+1回だけ LLM で名前を付ける。
+
+    - 欠けたスコア（null）は距離にも重心にも使わない k-means（距離はスコアのある軸の平均二乗差）
+    - スコアが MIN_PROFILE_AXES 軸未満の意見はプロファイルなし（-1）
+    - 重心は FIT_SAMPLE 件の標本で求め（k-means++ の初期化を N_INIT 回試して慣性が最小のものを使う）、
+      全件の割り当ては CHUNK_ROWS 行ずつの行列演算で行う。100万件でも数秒で終わる
+    - 乱数の種はトピックIDから決めるため、同じスコアからは同じプロファイルになる
+
+使用方法:
+    divcon run --profiles 5
+
+出力:
+    - results/profiles.json: トピックごとのプロファイル（名前・説明・件数・各軸の平均スコア・代表意見）
+    - results/matrix/profiles.npy: 意見（スコア行列の行）→ プロファイル番号（profiles.json の通し番号、-1 = なし）
+"""
+
+import json
+import os
+import zlib
+
+import numpy as np
+from pydantic import BaseModel
+
+from . import llm
+from .config import get_settings
+from .matrix import CHUNK_ROWS, MATRIX_DIRNAME, load_matrix
+from .normalize import prompt_text
+from .stages import print_lock
+
+PROFILES_FILENAME = 'profiles.json'
+LABELS_FILENAME = 'profiles.npy'
+
+MIN_PROFILE_AXES = 2  # プロファイルを付ける意見のスコアのある軸数の下限（トピックの軸数もこれ以上が必要）
+MIN_PROFILE_SIZE = 10  # クラスタ数はプロファイルを付ける意見数 / MIN_PROFILE_SIZE を超えない
+FIT_SAMPLE = 50_000  # 重心の計算に使う標本の件数
+N_INIT = 3
+MAX_ITERATIONS = 100
+REPRESENTATIVES = 5  # 名前付けのプロンプトに載せる代表意見（重心に近い順）
+REPRESENTATIVE_CHARS = 300
+
+
+# ============================================================================
+# k-means（欠けたスコアを除く）
+# ============================================================================
+
+def masked_distances(X, W, centers):
+    """各行と各重心の、スコアのある軸での平均二乗差（スコアのない行は inf）
+
+    Args:
+        X: スコア（欠けた要素は 0）
+        W: スコアの有無（float の 0/1）
+        centers: (k, 軸数)
+    """
+    counts = W.sum(axis=1, keepdims=True)
+    squared = (W * X * X).sum(axis=1, keepdims=True) - 2 * (W * X) @ centers.T + W @ (centers * centers).T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, np.maximum(squared, 0) / counts, np.inf)
+
+
+def _update_centers(X, W, labels, k, fallback):
+    """クラスタごとの軸の平均（クラスタ内でスコアのない軸は fallback）"""
+    sums = np.zeros((k, X.shape[1]))
+    counts = np.zeros((k, X.shape[1]))
+    np.add.at(sums, labels, W * X)
+    np.add.at(counts, labels, W)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), fallback)
+
+
+def _init_centers(X, W, k, rng):
+    """k-means++ の初期化（欠けたスコアを除いた距離で選ぶ）"""
+    centers = np.empty((k, X.shape[1]))
+    fallback = (W * X).sum(axis=0) / np.maximum(W.sum(axis=0), 1)
+    first = rng.integers(len(X))
+    centers[0] = np.where(W[first] > 0, X[first], fallback)
+    nearest = masked_distances(X, W, centers[:1])[:, 0]
+    for c in range(1, k):
+        total = nearest.sum()
+        pick = rng.choice(len(X), p=nearest / total) if total > 0 else rng.integers(len(X))
+        centers[c] = np.where(W[pick] > 0, X[pick], fallback)
+        nearest = np.minimum(nearest, masked_distances(X, W, centers[c:c + 1])[:, 0])
+    return centers
+
+
+def fit_centers(X, W, k, rng, n_init=N_INIT, max_iterations=MAX_ITERATIONS):
+    """欠けたスコアを除く k-means の重心（慣性が最小の試行）"""
+    fallback = (W * X).sum(axis=0) / np.maximum(W.sum(axis=0), 1)
+    best, best_inertia = None, np.inf
+    for _ in range(n_init):
+        centers = _init_centers(X, W, k, rng)
+        labels = None
+        for _ in range(max_iterations):
+            distances = masked_distances(X, W, centers)
+            new_labels = distances.argmin(axis=1)
+            if labels is not None and np.array_equal(labels, new_labels):
+                break
+            labels = new_labels
+            centers = _update_centers(X, W, labels, k, fallback)
+            # 空のクラスタは最も遠い点で作り直す
+            for c in np.setdiff1d(np.arange(k), labels):
+                far = distances.min(axis=1).argmax()
+                centers[c] = np.where(W[far] > 0, X[far], fallback)
+        inertia = masked_distances(X, W, centers).min(axis=1).sum()
+        if inertia < best_inertia:
+            best, best_inertia = centers, inertia
+    return best
+
+
+def assign(X, W, centers, chunk_rows=CHUNK_ROWS):
+    """全行を最も近い重心に割り当てる（ラベルと距離）"""
+    labels = np.empty(len(X), dtype=np.int64)
+    distances = np.empty(len(X))
+    for start in range(0, len(X), chunk_rows):
+        d = masked_distances(X[start:start + chunk_rows], W[start:start + chunk_rows], centers)
+        labels[start:start + chunk_rows] = d.argmin(axis=1)
+        distances[start:start + chunk_rows] = d.min(axis=1)
+    return labels, distances
+
+
+def cluster_rows(scores, mask, k, seed=0, fit_sample=FIT_SAMPLE):
+    """スコア行列の行をクラスタリングする
+
+    Args:
+        scores: (意見数, 軸数) のスコア（欠けた要素は NaN）
+        mask: スコアの有無
+        k: クラスタ数の上限
+
+    Returns:
+        (labels, centers, distances)。labels は大きいクラスタから 0, 1, ...（プロファイルなしは -1）
+    """
+    W = np.asarray(mask, dtype=np.float64)
+    X = np.where(mask, scores, 0).astype(np.float64)
+    eligible = np.flatnonzero(W.sum(axis=1) >= MIN_PROFILE_AXES)
+    labels = np.full(len(X), -1, dtype=np.int64)
+    distances = np.full(len(X), np.inf)
+    k = min(k, len(eligible) // MIN_PROFILE_SIZE)
+    if k < 2:
+        return labels, np.empty((0, X.shape[1])), distances
+
+    rng = np.random.default_rng(seed)
+    sample = eligible if len(eligible) <= fit_sample else np.sort(rng.choice(eligible, fit_sample, replace=False))
+    centers = fit_centers(X[sample], W[sample], k, rng)
+    labels[eligible], distances[eligible] = assign(X[eligible], W[eligible], centers)
+
+    # 件数の多い順に番号を付け直す（空のクラスタは除く）
+    sizes = np.bincount(labels[eligible], minlength=k)
+    order = [c for c in np.argsort(-sizes, kind='stable') if sizes[c] > 0]
+    relabel = np.full(k, -1, dtype=np.int64)
+    relabel[order] = np.arange(len(order))
+    labels[eligible] = relabel[labels[eligible]]
+    return labels, centers[order], distances
+
+
+# ============================================================================
+# 名前付け
+# ============================================================================
+
+class ProfileNaming(BaseModel):
+    name: str
+    description: str
+
+
+def _describe_center(axes, profile):
+    lines = []
+    for axis, mean, coverage in zip(axes, profile['centroid'], profile['coverage']):
+        side = '-' if mean is None else ('左寄り' if mean < 3.5 else '右寄り')
+        mean_text = '-' if mean is None else f"{mean:.1f}"
+        lines.append(f"- {axis['name']}（左極: {axis['left_pole']} / 右極: {axis['right_pole']}）: "
+                     f"平均 {mean_text}（{side}、スコアあり {coverage:.0%}）")
+    return "\n".join(lines)
+
+
+def _fallback_name(axes, profile):
+    """LLM で名前を付けられない場合の名前（平均が中間から離れた軸の向き）"""
+    parts = [f"{axis['name']}: {'左' if mean < 3.5 else '右'}"
+             for axis, mean in zip(axes, profile['centroid']) if mean is not None and abs(mean - 3.5) >= 1]
+    return ' / '.join(parts) or '中間的な立場'
+
+
+def name_profile(topic, axes, profile, representatives):
+    """プロファイルの名前と説明を LLM で付ける（クラスタ1つにつき1回）"""
+    examples = "\n".join(f"- {prompt_text(op)[:REPRESENTATIVE_CHARS]}" for op in representatives)
+
+    prompt = f"""トピック「{topic['name']}」の意見を、複数の対立軸のスコア（1-6。1-3 は左寄り、4-6 は右寄り）の
+組み合わせでグループ分けしました。次はそのうちの1つのグループです（全体の {profile['share']:.0%}、{profile['size']} 件）。
+
+【このグループの各軸の平均スコア】
+{_describe_center(axes, profile)}
+
+【このグループの代表的な意見】
+{examples}
+
+【タスク】
+このグループに共通する立場の組み合わせを表す名前と説明を付けてください。
+- name: 20文字程度の短い名前（例: 「原発推進・賦課金反対・LNG推進」）。平均が中間（3-4）に近い軸は名前に含めなくて構いません
+- description: どのような立場の組み合わせかを1-2文で説明してください
+"""
+
+    result = llm.parse(
+        messages=[
+            {"role": "system", "content": "あなたは対立構造を分析する専門家です。"},
+            {"role": "user", "content": prompt}
+        ],
+        response_format=ProfileNaming
+    )
+    return result.name, result.description
+
+
+# ============================================================================
+# 実行
+# ============================================================================
+
+def topic_axes(all_axes, topic_id):
+    """トピックの意見がスコアリングされた軸（トピック横断の共有軸を含む）"""
+    axes = [axis for axes in all_axes.values() for axis in axes if topic_id in axis.get('topic_ids', ())]
+    axes += [axis for axis in all_axes.get(topic_id, []) if 'topic_ids' not in axis]
+    return sorted(axes, key=lambda axis: axis['id'])
+
+
+def stance_profiles(results_dir, opinion_store, all_axes, topics, k, name=True):
+    """トピックごとのスタンス・プロファイルを求めて profiles.json と matrix/profiles.npy に書き出す
+
+    Args:
+        results_dir: 結果ディレクトリ（matrix/ を書き出し済みであること）
+        opinion_store: OpinionStore（トピックへの分類とプロンプト用の本文）
+        all_axes: {topic_id: [axis, ...]}
+        topics: トピックのリスト
+        k: トピックあたりのプロファイル数の上限
+        name: False の場合 LLM で名前を付けない（軸の向きから作った名前にする）
+
+    Returns:
+        list: profiles.json の内容（トピックごと）
+    """
+    matrix = load_matrix(results_dir)
+    column_of = {axis['id']: axis['column'] for axis in matrix.axes}
+    topic_map = {t['id']: t for t in topics}
+    labels = np.full(matrix.meta['n_opinions'], -1, dtype=np.int32)
+
+    report = []
+    jobs = []  # (トピック, 軸, プロファイル, 代表意見)
+    for topic_id in sorted(topic_map):
+        axes = [axis for axis in topic_axes(all_axes, topic_id) if axis['id'] in column_of]
+        rows = opinion_store.topic_rows(topic_id)
+        if len(axes) < MIN_PROFILE_AXES or len(rows) == 0:
+            continue
+        columns = [column_of[axis['id']] for axis in axes]
+        scores = np.asarray(matrix.scores[rows][:, columns])
+        mask = np.asarray(matrix.mask[rows][:, columns])
+
+        topic_labels, centers, distances = cluster_rows(scores, mask, k, seed=zlib.crc32(topic_id.encode('utf-8')))
+        if len(centers) == 0:
+            continue
+        profiled = int((topic_labels >= 0).sum())
+
+        profiles = []
+        for c in range(len(centers)):
+            members = np.flatnonzero(topic_labels == c)
+            member_mask = mask[members]
+            with np.errstate(invalid='ignore'):
+                means = np.where(member_mask, scores[members], 0).sum(axis=0) / member_mask.sum(axis=0)
+            nearest = members[np.argsort(distances[members], kind='stable')[:REPRESENTATIVES]]
+            profile = {
+                'id': f"{topic_id}_P{c + 1}",
+                'name': '',
+                'description': '',
+                'size': len(members),
+                'share': round(len(members) / profiled, 4),
+                'centroid': [None if np.isnan(m) else round(float(m), 2) for m in means],
+                'coverage': [round(float(v), 4) for v in member_mask.mean(axis=0)],
+                'representative_ids': [opinion_store.ids[rows[i]] for i in nearest],
+                'code': len(jobs),  # matrix/profiles.npy の値
+            }
+            labels[rows[members]] = profile['code']
+            profiles.append(profile)
+            jobs.append((topic_map[topic_id], axes, profile, [opinion_store.records[rows[i]] for i in nearest]))
+
+        report.append({
+            'topic_id': topic_id,
+            'axes': [axis['id'] for axis in axes],
+            'profiled': profiled,
+            'unprofiled': len(rows) - profiled,
+            'profiles': profiles,
+        })
+
+    if jobs:
+        with print_lock:
+            print(f"  [スタンス・プロファイル] {len(report)} トピック・{len(jobs)} 個のプロファイルに名前を付けています...")
+        names = _name_all(jobs) if name else [None] * len(jobs)
+        for (_, axes, profile, _), result in zip(jobs, names):
+            if result is None:
+                profile['name'] = _fallback_name(axes, profile)
+            else:
+                profile['name'], profile['description'] = result
+
+    np.save(os.path.join(results_dir, MATRIX_DIRNAME, LABELS_FILENAME), labels)
+    with open(os.path.join(results_dir, PROFILES_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def _name_all(jobs):
+    """全プロファイルの名前を並列に付ける（失敗・予算切れのプロファイルは None）"""
+    def run(job):
+        topic, axes, profile, representatives = job
+        try:
+            return name_profile(topic, axes, profile, representatives)
+        except Exception as e:
+            with print_lock:
+                print(f"  [WARNING] プロファイル [{profile['id']}] の名前付けに失敗: {e}")
+            return None
+
+    with llm.ContextThreadPoolExecutor(max_workers=get_settings().max_workers) as executor:
+        return list(executor.map(run, jobs))
+
+
+def remove_profiles(results_dir):
+    """前回の実行の profiles.json・matrix/profiles.npy を消す（行列と行が合わなくなるため）"""
+    for path in (os.path.join(results_dir, PROFILES_FILENAME),
+                 os.path.join(results_dir, MATRIX_DIRNAME, LABELS_FILENAME)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def write_summary_profiles(f, report):
+    """summary.txt にトピックごとのプロファイルを書き出す"""
+    if not report:
+        return
+    f.write("スタンス・プロファイル（対立軸をまたいだ立場の組み合わせ）:\n")
+    for entry in report:
+        f.write(f"  トピック [{entry['topic_id']}]（{len(entry['axes'])} 軸、プロファイルなし {entry['unprofiled']} 件）\n")
+        for profile in entry['profiles']:
+            f.write(f"    - [{profile['id']}] {profile['name']}: {profile['size']} 件 ({profile['share']:.0%})\n")
+    f.write("\n")
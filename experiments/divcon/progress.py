@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 進捗トラッカーとライブダッシュボード
+
+各Stageと LLM 呼び出しが進捗を記録し、--dashboard 指定時はローカルの HTTP サーバーが
+Server-Sent Events（SSE）で配信する。ブラウザで http://127.0.0.1:<port>/ を開くと、
+実行中のジョブの状況をリアルタイムで確認できる。
+
+    - Stage 別・軸別の完了数（Stage 2 / 4 は意見数、それ以外は呼び出し数）
+    - 実行中の API リクエスト数、毎分リクエスト数、tokens/sec（直近 RATE_WINDOW 秒）
+    - エラー数と 429（レート制限）の回数
+    - 完了予定時刻（Stage 2 と Stage 4 の進捗率からの推定。まだ始まっていない Stage の作業量は
+      expect_work で登録した見込み（Stage 4 は軸数 × 意見数）を使う）
+
+エンドポイント:
+    /              ダッシュボード（HTML）
+    /events        SSE（event: snapshot を毎秒、event: log を随時）
+    /snapshot.json 現在の状態（JSON）
+
+記録は常に行う（ロック1つとカウンタの更新のみ）。サーバーは明示的に起動したときだけ動く。
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+SNAPSHOT_INTERVAL = 1.0  # SSE で状態を送る間隔（秒）
+RATE_WINDOW = 30.0  # 毎分リクエスト数・tokens/sec の集計期間（秒）
+MAX_LOG_EVENTS = 500
+
+# 完了予定時刻の推定に使う Stage（意見数単位で進捗が分かるもの）
+ETA_STAGES = ('Stage 2', 'Stage 4')
+
+
+class ProgressTracker:
+    """Stage 別・軸別の進捗と LLM 呼び出しの統計（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.start_time = time.time()
+            self.stages = {}  # Stage 名 → {'done', 'total'}
+            self.expected = {}  # Stage 名 → 見込みの作業量（完了予定時刻の推定用）
+            self.axes = {}  # 軸ID → {'done', 'total'}（Stage 4 の意見数）
+            self.in_flight = 0
+            self.requests = 0
+            self.errors = 0
+            self.rate_limited = 0
+            self.tokens = 0
+            self._recent = deque()  # (完了時刻, トークン数)
+            self._log = deque(maxlen=MAX_LOG_EVENTS)
+            self._log_seq = 0
+
+    # ------------------------------------------------------------------
+    # Stage の進捗
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _label(name):
+        """divcon batch の実行中はデータセット名を前に付ける"""
+        from .llm import current_run
+
+        run = current_run()
+        return f"{run}/{name}" if run else name
+
+    def add_work(self, stage, total=1, axis_id=None):
+        """Stage（と軸）の作業量を追加する"""
+        stage = self._label(stage)
+        axis_id = self._label(axis_id) if axis_id is not None else None
+        with self._lock:
+            entry = self.stages.setdefault(stage, {'done': 0, 'total': 0})
+            entry['total'] += total
+            if axis_id is not None:
+                axis = self.axes.setdefault(axis_id, {'done': 0, 'total': 0})
+                axis['total'] += total
+
+    def expect_work(self, stage, total):
+        """Stage の作業量の見込みを登録する（add_work で登録された量がこれより少ない間は見込みを使う）"""
+        stage = self._label(stage)
+        with self._lock:
+            self.expected[stage] = total
+
+    def complete_work(self, stage, done=1, axis_id=None):
+        """Stage（と軸）の完了数を進める"""
+        stage = self._label(stage)
+        axis_id = self._label(axis_id) if axis_id is not None else None
+        with self._lock:
+            entry = self.stages.setdefault(stage, {'done': 0, 'total': 0})
+            entry['done'] += done
+            if axis_id is not None:
+                axis = self.axes.setdefault(axis_id, {'done': 0, 'total': 0})
+                axis['done'] += done
+
+    def log(self, message):
+        """ダッシュボードのログに出来事を記録する"""
+        message = self._label(message)
+        with self._lock:
+            self._log_seq += 1
+            self._log.append({'seq': self._log_seq, 'time': time.time(), 'message': message})
+
+    def logs_since(self, seq):
+        with self._lock:
+            return [event for event in self._log if event['seq'] > seq]
+
+    # ------------------------------------------------------------------
+    # LLM 呼び出し
+    # ------------------------------------------------------------------
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, tokens=0):
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.tokens += tokens
+            self._recent.append((time.time(), tokens))
+
+    def request_failed(self, error):
+        rate_limited = getattr(error, 'status_code', None) == 429
+        with self._lock:
+            self.in_flight -= 1
+            self.errors += 1
+            if rate_limited:
+                self.rate_limited += 1
+        if rate_limited:
+            self.log("429 レート制限")
+        else:
+            self.log(f"APIエラー: {type(error).__name__}")
+
+    # ------------------------------------------------------------------
+    # 状態
+    # ------------------------------------------------------------------
+
+    def snapshot(self):
+        """現在の状態を dict で返す"""
+        now = time.time()
+        with self._lock:
+            while self._recent and self._recent[0][0] < now - RATE_WINDOW:
+                self._recent.popleft()
+            elapsed = now - self.start_time
+            window = min(RATE_WINDOW, elapsed) or 1.0
+            recent_tokens = sum(tokens for _, tokens in self._recent)
+
+            # 見込みだけが登録された（まだ始まっていない）Stage も分母に含める
+            eta_names = [name for name in set(self.stages) | set(self.expected)
+                         if name.rsplit('/', 1)[-1] in ETA_STAGES]
+            done = sum(self.stages[name]['done'] for name in eta_names if name in self.stages)
+            total = sum(max(self.stages.get(name, {}).get('total', 0), self.expected.get(name, 0))
+                        for name in eta_names)
+            fraction = done / total if total else 0.0
+            eta = self.start_time + elapsed / fraction if 0 < fraction < 1 else None
+
+            return {
+                'time': now,
+                'elapsed': round(elapsed, 1),
+                'stages': {name: dict(entry) for name, entry in self.stages.items()},
+                'axes': {axis_id: dict(entry) for axis_id, entry in sorted(self.axes.items())},
+                'in_flight': self.in_flight,
+                'requests': self.requests,
+                'errors': self.errors,
+                'rate_limited': self.rate_limited,
+                'tokens': self.tokens,
+                'requests_per_minute': round(len(self._recent) * 60.0 / window, 1),
+                'tokens_per_second': round(recent_tokens / window, 1),
+                'progress': round(fraction, 4),
+                'eta': eta,
+            }
+
+
+tracker = ProgressTracker()
+
+
+# ============================================================================
+# ダッシュボード
+# ============================================================================
+
+DASHBOARD_HTML = """<!DOCTYPE html>
+<html lang="ja">
+<head>
+    <meta charset="UTF-8">
+    <title>DivCon - 実行状況</title>
+    <style>
+        body { font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", "Hiragino Sans", "Yu Gothic", sans-serif;
+               background: #f5f7fa; color: #2c3e50; margin: 0; padding: 20px; }
+        h1 { font-size: 20px; margin: 0 0 16px; }
+        .cards { display: flex; gap: 12px; flex-wrap: wrap; margin-bottom: 20px; }
+        .card { background: white; border-radius: 8px; padding: 12px 16px; min-width: 140px;
+                box-shadow: 0 1px 3px rgba(0,0,0,0.1); }
+        .card .label { font-size: 11px; color: #7f8c8d; }
+        .card .value { font-size: 22px; font-weight: 600; }
+        .card.warn .value { color: #e74c3c; }
+        section { background: white; border-radius: 8px; padding: 12px 16px; margin-bottom: 16px;
+                  box-shadow: 0 1px 3px rgba(0,0,0,0.1); }
+        h2 { font-size: 14px; margin: 0 0 8px; color: #34495e; }
+        .row { display: flex; align-items: center; gap: 8px; font-size: 12px; margin: 4px 0; }
+        .row .name { width: 120px; font-weight: 600; }
+        .bar { flex: 1; height: 10px; background: #ecf0f1; border-radius: 5px; overflow: hidden; }
+        .bar div { height: 100%; background: #3498db; }
+        .bar div.done { background: #2ecc71; }
+        .row .count { width: 120px; text-align: right; color: #7f8c8d; }
+        #log { font-family: monospace; font-size: 11px; max-height: 240px; overflow-y: auto; color: #555; }
+        #status { font-size: 12px; color: #95a5a6; margin-bottom: 12px; }
+    </style>
+</head>
+<body>
+    <h1>DivCon 実行状況</h1>
+    <div id="status">接続中...</div>
+    <div class="cards">
+        <div class="card"><div class="label">経過時間</div><div class="value" id="elapsed">-</div></div>
+        <div class="card"><div class="label">完了予定</div><div class="value" id="eta">-</div></div>
+        <div class="card"><div class="label">実行中リクエスト</div><div class="value" id="inFlight">-</div></div>
+        <div class="card"><div class="label">リクエスト/分</div><div class="value" id="rpm">-</div></div>
+        <div class="card"><div class="label">tokens/sec</div><div class="value" id="tps">-</div></div>
+        <div class="card"><div class="label">完了リクエスト</div><div class="value" id="requests">-</div></div>
+        <div class="card" id="errorsCard"><div class="label">エラー / 429</div><div class="value" id="errors">-</div></div>
+    </div>
+    <section><h2>Stage 別</h2><div id="stages"></div></section>
+    <section><h2>対立軸別（Stage 4）</h2><div id="axes"></div></section>
+    <section><h2>ログ</h2><div id="log"></div></section>
+    <script>
+        function formatDuration(seconds) {
+            const s = Math.max(0, Math.round(seconds));
+            return `${Math.floor(s / 60)}:${String(s % 60).padStart(2, '0')}`;
+        }
+
+        function element(tag, className, text) {
+            const node = document.createElement(tag);
+            if (className) node.className = className;
+            if (text !== undefined) node.textContent = text;
+            return node;
+        }
+
+        // 名前（Stage 名・データセット名・軸ID）は textContent で入れる（HTML として解釈しない）
+        function renderProgressRows(container, entries) {
+            container.replaceChildren(...Object.entries(entries).map(([name, e]) => {
+                const ratio = e.total ? Math.min(1, e.done / e.total) : 0;
+                const fill = element('div', e.total && e.done >= e.total ? 'done' : '');
+                fill.style.width = `${(ratio * 100).toFixed(1)}%`;
+                const bar = element('span', 'bar');
+                bar.appendChild(fill);
+                const row = element('div', 'row');
+                row.append(element('span', 'name', name), bar, element('span', 'count', `${e.done} / ${e.total}`));
+                return row;
+            }));
+        }
+
+        const source = new EventSource('/events');
+        source.addEventListener('snapshot', event => {
+            const s = JSON.parse(event.data);
+            document.getElementById('status').textContent = '更新: ' + new Date(s.time * 1000).toLocaleTimeString();
+            document.getElementById('elapsed').textContent = formatDuration(s.elapsed);
+            document.getElementById('eta').textContent = s.eta
+                ? new Date(s.eta * 1000).toLocaleTimeString() + ` (${(s.progress * 100).toFixed(0)}%)` : '-';
+            document.getElementById('inFlight').textContent = s.in_flight;
+            document.getElementById('rpm').textContent = s.requests_per_minute;
+            document.getElementById('tps').textContent = s.tokens_per_second;
+            document.getElementById('requests').textContent = s.requests;
+            document.getElementById('errors').textContent = `${s.errors} / ${s.rate_limited}`;
+            document.getElementById('errorsCard').className = s.errors ? 'card warn' : 'card';
+            renderProgressRows(document.getElementById('stages'), s.stages);
+            renderProgressRows(document.getElementById('axes'), s.axes);
+        });
+        source.addEventListener('log', event => {
+            const e = JSON.parse(event.data);
+            const log = document.getElementById('log');
+            const line = document.createElement('div');
+            line.textContent = new Date(e.time * 1000).toLocaleTimeString() + '  ' + e.message;
+            log.prepend(line);
+        });
+        source.onerror = () => {
+            document.getElementById('status').textContent = '切断されました（ジョブが終了した可能性があります）';
+        };
+    </script>
+</body>
+</html>
+"""
+
+
+class _DashboardHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/':
+            self._send(200, 'text/html; charset=utf-8', DASHBOARD_HTML.encode('utf-8'))
+        elif self.path == '/snapshot.json':
+            body = json.dumps(tracker.snapshot(), ensure_ascii=False).encode('utf-8')
+            self._send(200, 'application/json; charset=utf-8', body)
+        elif self.path == '/events':
+            self._stream_events()
+        else:
+            self._send(404, 'text/plain; charset=utf-8', b'not found')
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_events(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        last_seq = 0
+        try:
+            while not self.server.stopping.is_set():
+                for event in tracker.logs_since(last_seq):
+                    last_seq = event['seq']
+                    self._write_event('log', event)
+                self._write_event('snapshot', tracker.snapshot())
+                self.server.stopping.wait(SNAPSHOT_INTERVAL)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _write_event(self, name, data):
+        payload = json.dumps(data, ensure_ascii=False)
+        self.wfile.write(f"event: {name}\ndata: {payload}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass  # アクセスログは出さない（進捗の print と混ざるため）
+
+
+class DashboardServer:
+    """ダッシュボードの HTTP サーバー（デーモンスレッドで動く）"""
+
+    def __init__(self, port=DEFAULT_PORT, host='127.0.0.1'):
+        self.httpd = ThreadingHTTPServer((host, port), _DashboardHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.stopping.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def start_dashboard(port=DEFAULT_PORT):
+    """ダッシュボードを起動する（port=0 なら空いているポートを使う）"""
+    server = DashboardServer(port).start()
+    print(f"[OK] ダッシュボード: {server.url}\n")
+    return server
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 代表意見の選択
+スコア帯ごとの層化と、文字バイグラムによる簡易テキストクラスタリングで
+プロンプトに載せる代表意見を選ぶ
+
+エンベディングは使わず、文字バイグラムをハッシュしたベクトルの
+k-means でクラスタを作り、各クラスタの中心に最も近い意見を代表とする。
+"""
+
+import zlib
+
+import numpy as np
+
+# 文字バイグラムのハッシュ次元
+HASH_DIM = 1024
+KMEANS_ITERATIONS = 10
+
+
+def text_vectors(texts, dim=HASH_DIM):
+    """文字バイグラムをハッシュした L2 正規化済みベクトルを作る
+
+    Args:
+        texts: 文字列のリスト
+        dim: ハッシュ次元
+
+    Returns:
+        np.ndarray: shape (len(texts), dim) の float32 行列
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    rows, cols = [], []
+    for i, text in enumerate(texts):
+        text = str(text or '')
+        for j in range(len(text) - 1):
+            rows.append(i)
+            # hash() はプロセスごとに変わるので crc32 で固定する
+            cols.append(zlib.crc32(text[j:j + 2].encode('utf-8')) % dim)
+    if rows:
+        np.add.at(vectors, (np.array(rows), np.array(cols)), 1.0)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def _kmeans_medoids(vectors, k, seed=0):
+    """k-means（k-means++ 初期化）で k クラスタを作り、各クラスタの中心に最も近い行番号を返す"""
+    n = len(vectors)
+    if k >= n:
+        return list(range(n))
+
+    rng = np.random.default_rng(seed)
+    centers = [int(rng.integers(n))]
+    dist = 1 - vectors @ vectors[centers[0]]
+    for _ in range(1, k):
+        weights = np.clip(dist, 0, None) ** 2
+        total = weights.sum()
+        nxt = int(rng.choice(n, p=weights / total)) if total > 0 else int(rng.integers(n))
+        centers.append(nxt)
+        dist = np.minimum(dist, 1 - vectors @ vectors[nxt])
+    centroids = vectors[centers].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        labels = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(k):
+            members = vectors[labels == c]
+            if len(members):
+                centroid = members.mean(axis=0)
+                norm = np.linalg.norm(centroid)
+                centroids[c] = centroid / norm if norm > 0 else centroid
+
+    # 各クラスタの中心に最も近い意見（重複しないように選ぶ）
+    similarity = vectors @ centroids.T
+    chosen = []
+    for c in range(k):
+        for idx in np.argsort(-similarity[:, c]):
+            if int(idx) not in chosen:
+                chosen.append(int(idx))
+                break
+    return chosen
+
+
+def _allocate(sizes, k):
+    """k 件をグループサイズに比例して割り振る（空でないグループには最低1件）"""
+    sizes = np.asarray(sizes, dtype=np.float64)
+    quota = np.zeros(len(sizes), dtype=np.int64)
+    nonempty = np.flatnonzero(sizes > 0)
+    if len(nonempty) == 0 or k <= 0:
+        return quota
+    if k <= len(nonempty):
+        # 件数の多い層から1件ずつ
+        for idx in nonempty[np.argsort(-sizes[nonempty], kind='stable')][:k]:
+            quota[idx] = 1
+        return quota
+
+    quota[nonempty] = 1
+    remaining = k - len(nonempty)
+    extra = sizes / sizes.sum() * remaining
+    quota += np.floor(extra).astype(np.int64)
+    # 端数は小数部の大きい順に配る
+    for idx in np.argsort(-(extra - np.floor(extra)), kind='stable')[:k - quota.sum()]:
+        quota[idx] += 1
+
+    # グループサイズを超えた分は余裕のあるグループへ回す
+    capacity = sizes.astype(np.int64)
+    overflow = int(np.clip(quota - capacity, 0, None).sum())
+    quota = np.minimum(quota, capacity)
+    for idx in np.argsort(-(capacity - quota), kind='stable'):
+        if overflow <= 0:
+            break
+        add = min(overflow, capacity[idx] - quota[idx])
+        quota[idx] += add
+        overflow -= add
+    return quota
+
+
+def select_representatives(scores, k, text_key='excerpt', texts=None, seed=0):
+    """スコア帯ごとに層化し、層内のテキストクラスタから代表意見を k 件選ぶ
+
+    Args:
+        scores: スコア辞書のリスト（score と text_key を持つ）
+        k: 選ぶ件数
+        text_key: クラスタリングに使うテキストのキー
+        texts: 意見ID → 本文（text_key が空のスコアに使う。スコア辞書は本文を持たないため、
+               渡さない場合は空の excerpt のスコアがすべて同じテキストとして扱われる）
+        seed: 乱数シード
+
+    Returns:
+        list: 選ばれたスコア辞書（スコア順）
+    """
+    if len(scores) <= k:
+        return sorted(scores, key=lambda s: s['score'])
+
+    strata = {}
+    for s in scores:
+        strata.setdefault(s['score'], []).append(s)
+    keys = sorted(strata)
+    quota = _allocate([len(strata[key]) for key in keys], k)
+
+    selected = []
+    for key, q in zip(keys, quota):
+        members = strata[key]
+        if q <= 0:
+            continue
+        member_texts = [m.get(text_key) or (texts or {}).get(str(m['opinion_id']), '') for m in members]
+        chosen = _kmeans_medoids(text_vectors(member_texts), int(q), seed=seed)
+        selected.extend(members[i] for i in chosen)
+    return selected
+
+
+def deal_into_chunks(items, n_chunks):
+    """スコア順に並んだ代表意見を、各チャンクにスコア帯が偏らないよう順番に配る"""
+    chunks = [[] for _ in range(n_chunks)]
+    for i, item in enumerate(items):
+        chunks[i % n_chunks].append(item)
+    return chunks
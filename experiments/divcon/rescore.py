@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 不確かなスコアの再スコアリング
+Stage 4 のスコアのうち不安定そうなものだけを N 回スコアリングし直し、多数決と確信度を付ける
+
+全件を再スコアリングすると Stage 4 のコストが倍になるため、次のいずれかに該当するものだけを対象にする:
+    - boundary: 左右の境界（スコア 3 / 4）
+    - ungrounded: excerpt が本文に見当たらない（根拠の切り抜きが本文に基づいていない）
+    - local_disagreement: 軸のスコアで学習したローカルモデル（divcon.distill）の交差検証予測と食い違う
+
+各スコアに次の2列を付ける（scores.csv とビューに出力）:
+    - confidence: 最終スコアと同じ票の割合（再スコアリングしなかったものは 1.0、
+      ローカル推定のスコアはモデルの確信度）
+    - votes: 票数（元のスコア + 再スコアリング回数）
+"""
+
+import random
+import re
+from collections import Counter
+
+import numpy as np
+
+from . import llm
+from .normalize import PLACEHOLDERS, nfkc
+from .stages import print_lock, stage4_scoring
+
+# 再スコアリングの回数（元のスコアと合わせて 1 + RESCORE_REPEATS 票）
+RESCORE_REPEATS = 2
+BOUNDARY_SCORES = (3, 4)
+# excerpt の断片がこの文字数以上なら本文に含まれているかを確認する
+EXCERPT_MIN_FRAGMENT = 6
+# ローカルモデルの学習に必要なスコア数（これ未満の軸では local_disagreement を判定しない）
+LOCAL_MIN_SCORES = 50
+
+REASONS = ('boundary', 'ungrounded', 'local_disagreement')
+
+# 省略記号と正規化の置き換え（[URL] など）で断片に分ける（置き換えは任意の文字列に一致するものとして扱う）
+_EXCERPT_SPLIT = re.compile(r'\.{2,}|…+|・{3,}|' + '|'.join(re.escape(p) for p in PLACEHOLDERS))
+_STRIP_CHARS = '「」『』"“”\'' + ' 　'
+_WHITESPACE = re.compile(r'\s+')
+
+
+def excerpt_grounded(excerpt, comment):
+    """excerpt の各断片が本文に含まれているか（空白と全角・半角の違いは無視する）
+
+    プロンプトには NFKC 正規化したテキスト（divcon.normalize）を渡すため、元の本文も正規化して照合する。
+    excerpt に残った [URL]・[引用略] などの置き換えは本文の URL・引用行に当たるため、その前後の断片だけを照合する。
+    """
+    comment = _WHITESPACE.sub('', nfkc(comment))
+    fragments = [_WHITESPACE.sub('', f.strip(_STRIP_CHARS)) for f in _EXCERPT_SPLIT.split(nfkc(excerpt))]
+    fragments = [f for f in fragments if len(f) >= EXCERPT_MIN_FRAGMENT]
+    return all(f in comment for f in fragments)
+
+
+def local_disagreements(scores, topic_opinions):
+    """ローカルモデルの交差検証予測が確信をもって食い違うスコアの意見IDを返す"""
+    from .distill import DISTILL_CONFIDENCE, NgramFeatures, agrees, out_of_fold_predictions
+
+    comments = {str(op['id']): op['comment'] for op in topic_opinions}
+    scored = [s for s in scores if str(s['opinion_id']) in comments]
+    if len(scored) < LOCAL_MIN_SCORES:
+        return set()
+
+    features = NgramFeatures.from_texts([comments[str(s['opinion_id'])] for s in scored])
+    labels = np.array([0 if s['score'] is None else int(s['score']) for s in scored])
+    predicted, confidence = out_of_fold_predictions(features, labels)
+    disagree = (confidence >= DISTILL_CONFIDENCE) & ~agrees(predicted, labels)
+    return {str(s['opinion_id']) for s, flag in zip(scored, disagree) if flag}
+
+
+def find_uncertain(scores, topic_opinions):
+    """再スコアリングの対象を探す
+
+    Returns:
+        dict: 意見ID → 該当した理由のリスト
+    """
+    comments = {str(op['id']): op['comment'] for op in topic_opinions}
+    disagreements = local_disagreements(scores, topic_opinions)
+
+    uncertain = {}
+    for s in scores:
+        opinion_id = str(s['opinion_id'])
+        reasons = []
+        if s['score'] in BOUNDARY_SCORES:
+            reasons.append('boundary')
+        if s['score'] is not None and not excerpt_grounded(s['excerpt'], comments.get(opinion_id, '')):
+            reasons.append('ungrounded')
+        if opinion_id in disagreements:
+            reasons.append('local_disagreement')
+        if reasons:
+            uncertain[opinion_id] = reasons
+    return uncertain
+
+
+def aggregate_votes(votes):
+    """票（スコアまたは None のリスト、先頭が元のスコア）から最終スコアと確信度を決める
+
+    最多票のスコアを採用する。同数の場合は、元のスコアが含まれていればそれを、
+    なければ票の中央値に近いものを選ぶ。
+
+    Returns:
+        (score, confidence)
+    """
+    counts = Counter(votes)
+    top = max(counts.values())
+    tied = [v for v, c in counts.items() if c == top]
+    if len(tied) == 1:
+        final = tied[0]
+    elif votes[0] in tied:
+        final = votes[0]
+    else:
+        numeric = [v for v in votes if v is not None]
+        center = float(np.median(numeric)) if numeric else 0.0
+        final = min(tied, key=lambda v: (v is None, abs(v - center) if v is not None else 0, v or 0))
+    return final, round(counts[final] / len(votes), 2)
+
+
+def stage4_rescore_uncertain(axis, anchors, topic_opinions, scores, repeats=RESCORE_REPEATS, seed=0):
+    """Stage 4 の不確かなスコアだけを repeats 回スコアリングし直す
+
+    再スコアリングでは対象の意見の並びをシャッフルしてバッチを組み直し、レスポンスキャッシュを使わない
+    （対象が1件の場合などはシャッフルしても同じプロンプトになり、キャッシュされた1つの回答が
+    複数の票として数えられて確信度が高く出てしまうため）。
+
+    Args:
+        axis: 対立軸情報
+        anchors: Stage 3b のアンカー
+        topic_opinions: トピックに属する意見のリスト
+        scores: stage4_scoring の結果（confidence・votes を付けて返す）
+        repeats: 再スコアリングの回数
+        seed: シャッフルの乱数シード
+
+    Returns:
+        (scores, report) のタプル
+    """
+    uncertain = find_uncertain(scores, topic_opinions)
+    opinion_by_id = {str(op['id']): op for op in topic_opinions}
+    targets = [opinion_by_id[i] for i in uncertain if i in opinion_by_id]
+
+    with print_lock:
+        print(f"  [Stage 4 再スコアリング] 軸 [{axis['id']}] {len(targets)}/{len(scores)} 件を {repeats} 回")
+
+    repeat_scores = {str(op['id']): [] for op in targets}
+    for r in range(repeats if targets else 0):
+        shuffled = list(targets)
+        random.Random(seed + r).shuffle(shuffled)
+        with llm.no_cache():
+            repeat = stage4_scoring(axis, anchors, shuffled)
+        for s in repeat:
+            if str(s['opinion_id']) in repeat_scores:
+                repeat_scores[str(s['opinion_id'])].append(s)
+
+    changed = 0
+    for s in scores:
+        extra = repeat_scores.get(str(s['opinion_id']))
+        if not extra:
+            s.setdefault('confidence', 1.0)
+            s.setdefault('votes', 1)
+            continue
+        votes = [s['score']] + [e['score'] for e in extra]
+        final, confidence = aggregate_votes(votes)
+        if final != s['score']:
+            # 最終スコアと同じ票の excerpt・reasoning を採用する
+            source = next(e for e in extra if e['score'] == final)
+            s['score'] = final
+            s['excerpt'] = source['excerpt']
+            s['reasoning'] = source['reasoning']
+            changed += 1
+        s['confidence'] = confidence
+        s['votes'] = len(votes)
+
+    reason_counts = Counter(reason for reasons in uncertain.values() for reason in reasons)
+    confidences = [s['confidence'] for s in scores]
+    report = {
+        'axis_id': axis['id'],
+        'total': len(scores),
+        'rescored': len(targets),
+        'repeats': repeats,
+        'reasons': {reason: reason_counts.get(reason, 0) for reason in REASONS},
+        'changed': changed,
+        'extra_share': round(len(targets) * repeats / len(scores), 3) if scores else 0.0,
+        'mean_confidence': round(float(np.mean(confidences)), 3) if confidences else None,
+    }
+
+    with print_lock:
+        print(f"  [OK] 軸 [{axis['id']}] 再スコアリング完了 (スコア変更: {changed} 件, "
+              f"追加コスト: {report['extra_share']:.0%})\n")
+
+    return scores, report
+
+
+def write_summary_rescore(f, reports):
+    """summary.txt に再スコアリングの対象件数と確信度を書き込む"""
+    total = sum(r['total'] for r in reports)
+    rescored = sum(r['rescored'] for r in reports)
+    changed = sum(r['changed'] for r in reports)
+    f.write("不確かなスコアの再スコアリング:\n")
+    f.write(f"  全体: {rescored}/{total} 件を再スコアリング, スコア変更 {changed} 件\n")
+    for r in sorted(reports, key=lambda r: r['axis_id']):
+        reasons = ', '.join(f"{reason} {count}" for reason, count in r['reasons'].items())
+        f.write(f"    [{r['axis_id']}] {r['rescored']} 件 ({reasons}) 変更 {r['changed']} 件, "
+                f"平均確信度 {r['mean_confidence']}\n")
+    f.write("\n")
@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 結果サーバー（divcon serve）
+結果ディレクトリを SQLite に読み込み、ページング付きの JSON API とビューを配信する
+
+静的なビューは全スコアを HTML に埋め込むため、意見数が増えるとファイルサイズと
+ブラウザ側の検索・フィルタリングの時間が比例して増える。サーバーでは:
+    - scores を topic_id・axis_id・score の索引付きテーブルに入れる
+    - 本文・excerpt・reasoning に FTS5（trigram）の全文検索索引を張る
+    - 一覧はキーセットページング（cursor）で返すので、何ページ目でも一定時間で返る
+    - ビュー（/ と /two_pane）はスコアを埋め込まず、表示する分だけ API から取得する
+
+データベース:
+    results/results.db（scores.csv などより古い場合は自動で作り直す）
+
+エンドポイント:
+    /                    リストビュー（API 版）
+    /two_pane            2ペインビュー（API 版）
+    /api/meta            トピック・対立軸・統計・分極度メトリクス
+    /api/scores          スコア一覧（topic_id, axis_id, score, side, q, sort, limit, cursor）
+    /api/consensus/<id>  軸の合意可能性分析
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+from .views.model import SOURCE_FILES
+
+DB_FILENAME = 'results.db'
+DEFAULT_PORT = 8000
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# 件数はこの上限まで数える（検索結果が大量でも応答時間を一定に保つ）
+COUNT_LIMIT = 10000
+# trigram 索引が使える最短の検索語（これより短い語は LIKE で検索する）
+FTS_MIN_QUERY = 3
+
+NULL_SORT = 7  # score が null の行の並び順（1-6 の後。降順でも null は最後に返す）
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE topics (id TEXT PRIMARY KEY, name TEXT, description TEXT);
+CREATE TABLE axes (
+    id TEXT PRIMARY KEY, topic_id TEXT, name TEXT, left_pole TEXT, right_pole TEXT,
+    strength INTEGER, rank INTEGER, esteban_ray REAL
+);
+CREATE TABLE consensus (axis_id TEXT PRIMARY KEY, analysis TEXT NOT NULL);
+CREATE TABLE opinions (opinion_id TEXT PRIMARY KEY, comment TEXT);
+CREATE TABLE scores (
+    id INTEGER PRIMARY KEY,
+    opinion_id TEXT NOT NULL,
+    topic_id TEXT,
+    axis_id TEXT,
+    score INTEGER,
+    score_sort INTEGER NOT NULL,
+    excerpt TEXT,
+    reasoning TEXT,
+    confidence REAL,
+    votes INTEGER
+);
+CREATE INDEX scores_axis ON scores (axis_id, score_sort);
+CREATE INDEX scores_topic ON scores (topic_id, score_sort);
+CREATE INDEX scores_score ON scores (score_sort);
+CREATE VIEW score_text AS
+    SELECT s.id AS id, o.comment AS comment, s.excerpt AS excerpt, s.reasoning AS reasoning
+    FROM scores s LEFT JOIN opinions o ON o.opinion_id = s.opinion_id;
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE scores_fts USING fts5(
+    comment, excerpt, reasoning, content='score_text', content_rowid='id', tokenize='trigram'
+);
+INSERT INTO scores_fts (scores_fts) VALUES ('rebuild');
+"""
+
+
+# ============================================================================
+# データベースの構築
+# ============================================================================
+
+def _load_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def database_is_stale(results_dir, db_path):
+    """データベースが存在しないか、結果ファイルより古い場合 True"""
+    if not os.path.exists(db_path):
+        return True
+    db_mtime = os.path.getmtime(db_path)
+    return any(
+        os.path.getmtime(path) > db_mtime
+        for path in (Path(results_dir) / name for name in SOURCE_FILES)
+        if path.exists()
+    )
+
+
+def build_database(results_dir='results', db_path=None):
+    """結果ディレクトリから SQLite データベースを作る
+
+    Returns:
+        データベースのパス
+    """
+    import pandas as pd
+
+    from . import metrics, stats
+
+    results_dir = Path(results_dir)
+    db_path = Path(db_path or results_dir / DB_FILENAME)
+    tmp_path = db_path.with_suffix('.db.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    scores_df = pd.read_csv(results_dir / 'scores.csv', dtype={'opinion_id': str})
+    topics = _load_json(results_dir / 'topics.json', [])
+    axes_data = _load_json(results_dir / 'axes.json', {})
+    consensus = _load_json(results_dir / 'consensus.json', [])
+    score_stats = stats.load_stats(str(results_dir))
+    axis_metrics = metrics.load_axis_metrics(str(results_dir))
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('stats', json.dumps(score_stats, ensure_ascii=False)),
+            ('axis_metrics', json.dumps(axis_metrics, ensure_ascii=False)),
+        ])
+        conn.executemany(
+            "INSERT INTO topics VALUES (?, ?, ?)",
+            [(t['id'], t['name'], t.get('description', '')) for t in topics]
+        )
+        conn.executemany("INSERT INTO axes VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+            (a['id'], topic_id, a['name'], a['left_pole'], a['right_pole'], a.get('strength'),
+             axis_metrics.get(a['id'], {}).get('rank'), axis_metrics.get(a['id'], {}).get('esteban_ray'))
+            for topic_id, topic_axes in axes_data.items() for a in topic_axes
+        ])
+        conn.executemany(
+            "INSERT INTO consensus VALUES (?, ?)",
+            [(c['axis_id'], json.dumps(c, ensure_ascii=False)) for c in consensus]
+        )
+
+        opinions = scores_df.drop_duplicates('opinion_id')[['opinion_id', 'comment']]
+        conn.executemany(
+            "INSERT INTO opinions VALUES (?, ?)",
+            opinions.astype(object).where(opinions.notna(), None).itertuples(index=False, name=None)
+        )
+
+        score = scores_df['score']
+        columns = pd.DataFrame({
+            'opinion_id': scores_df['opinion_id'],
+            'topic_id': scores_df['topic_id'],
+            'axis_id': scores_df['axis_id'],
+            'score': score.astype('Int64'),
+            'score_sort': score.fillna(NULL_SORT).astype(int),
+            'excerpt': scores_df['excerpt'],
+            'reasoning': scores_df['reasoning'],
+            'confidence': scores_df['confidence'] if 'confidence' in scores_df else None,
+            'votes': scores_df['votes'].astype('Int64') if 'votes' in scores_df else 1,
+        }).astype(object)
+        columns = columns.where(columns.notna(), None)
+        conn.executemany(
+            "INSERT INTO scores (opinion_id, topic_id, axis_id, score, score_sort, excerpt, reasoning, confidence, votes) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            columns.itertuples(index=False, name=None)
+        )
+
+        try:
+            conn.executescript(FTS_SCHEMA)
+            fts = True
+        except sqlite3.OperationalError as e:
+            # trigram トークナイザは SQLite 3.34 以降
+            print(f"[WARNING] FTS5 trigram 索引を作成できません（{e}）。検索は LIKE で行います。")
+            fts = False
+        conn.execute("INSERT INTO meta VALUES ('fts', ?)", ('1' if fts else '0',))
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    print(f"[OK] データベース作成完了: {db_path} ({len(scores_df)} 件のスコア)")
+    return db_path
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+class ResultsAPI:
+    """結果データベースへの読み取り専用クエリ（スレッドごとに接続を持つ）"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        meta = dict(self._conn().execute("SELECT key, value FROM meta").fetchall())
+        self.fts = meta.get('fts') == '1'
+        self.stats = json.loads(meta['stats'])
+        self.axis_metrics = json.loads(meta['axis_metrics'])
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.db_path.resolve()}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def meta(self):
+        conn = self._conn()
+        return {
+            'topics': [dict(row) for row in conn.execute("SELECT * FROM topics ORDER BY id")],
+            'axes': [dict(row) for row in conn.execute(
+                "SELECT * FROM axes ORDER BY rank IS NULL, rank, id")],
+            'stats': self.stats,
+            'axis_metrics': self.axis_metrics,
+        }
+
+    def consensus(self, axis_id):
+        row = self._conn().execute("SELECT analysis FROM consensus WHERE axis_id = ?", (axis_id,)).fetchone()
+        return json.loads(row['analysis']) if row else None
+
+    def scores(self, params):
+        """スコア一覧（キーセットページング）
+
+        Args:
+            params: クエリパラメータ
+                topic_id, axis_id: 絞り込み
+                score: 1-6 または null
+                side: left（1-3）または right（4-6）
+                q: キーワード（本文・excerpt・reasoning）
+                sort: id（既定、scores.csv の順）/ score / -score（null はどちらの向きでも最後）
+                limit: 件数（最大 MAX_PAGE_SIZE）
+                cursor: 前のページの next_cursor
+
+        Returns:
+            {'items', 'total', 'total_capped', 'next_cursor'}
+        """
+        where, args = [], []
+        if params.get('topic_id'):
+            where.append("s.topic_id = ?")
+            args.append(params['topic_id'])
+        if params.get('axis_id'):
+            where.append("s.axis_id = ?")
+            args.append(params['axis_id'])
+        if params.get('score'):
+            if params['score'] in ('null', '該当なし'):
+                where.append("s.score IS NULL")
+            else:
+                where.append("s.score_sort = ?")
+                args.append(int(params['score']))
+        if params.get('side') == 'left':
+            where.append("s.score_sort BETWEEN 1 AND 3")
+        elif params.get('side') == 'right':
+            where.append("s.score_sort BETWEEN 4 AND 6")
+
+        q = (params.get('q') or '').strip()
+        if q:
+            if self.fts and len(q) >= FTS_MIN_QUERY:
+                where.append("s.id IN (SELECT rowid FROM scores_fts WHERE scores_fts MATCH ?)")
+                args.append('"' + q.replace('"', '""') + '"')
+            else:
+                pattern = '%' + q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                where.append("(o.comment LIKE ? ESCAPE '\\' OR s.excerpt LIKE ? ESCAPE '\\' "
+                             "OR s.reasoning LIKE ? ESCAPE '\\')")
+                args.extend([pattern] * 3)
+
+        filter_sql = " AND ".join(where) or "1"
+        conn = self._conn()
+        total = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM scores s LEFT JOIN opinions o ON o.opinion_id = s.opinion_id "
+            f"WHERE {filter_sql} LIMIT {COUNT_LIMIT + 1})", args
+        ).fetchone()[0]
+
+        # キーセットページング
+        sort = params.get('sort') or 'id'
+        descending = sort.startswith('-')
+        by_score = sort.lstrip('-') == 'score'
+        op = '<' if descending else '>'
+        direction = 'DESC' if descending else 'ASC'
+        order_sql = f"s.score_sort {direction}, s.id {direction}" if by_score else f"s.id {direction}"
+        cursor = params.get('cursor')
+        cursor_sort, cursor_id = None, None
+        if cursor:
+            if by_score:
+                cursor_sort, cursor_id = (int(v) for v in cursor.split(','))
+            else:
+                cursor_id = int(cursor)
+
+        # 昇順は null（NULL_SORT）が最後に来る。降順は 1-6 を読み終えてから null を読む
+        # （どちらの区間も (軸, score_sort) の索引の順に読めるため、並べ替えは発生しない）
+        segments = [None]
+        if by_score and descending:
+            segments = [f"s.score_sort < {NULL_SORT}", f"s.score_sort = {NULL_SORT}"]
+
+        limit = max(1, min(int(params.get('limit') or PAGE_SIZE), MAX_PAGE_SIZE))
+        # カーソルのある区間（それより前の区間は読み終えている）
+        cursor_segment = 1 if len(segments) > 1 and cursor_sort == NULL_SORT else 0
+        rows = []
+        for index, segment in enumerate(segments):
+            if index < cursor_segment:
+                continue
+            page_where, page_args = [filter_sql], list(args)
+            if segment is not None:
+                page_where.append(segment)
+            if cursor_sort is not None:
+                if index == cursor_segment:
+                    page_where.append(f"(s.score_sort, s.id) {op} (?, ?)")
+                    page_args.extend([cursor_sort, cursor_id])
+            elif cursor_id is not None:
+                page_where.append(f"s.id {op} ?")
+                page_args.append(cursor_id)
+            rows += conn.execute(
+                f"SELECT s.id, s.opinion_id, o.comment, s.topic_id, t.name AS topic_name, s.axis_id, "
+                f"a.name AS axis_name, s.score, s.score_sort, s.excerpt, s.reasoning, s.confidence, s.votes "
+                f"FROM scores s "
+                f"LEFT JOIN opinions o ON o.opinion_id = s.opinion_id "
+                f"LEFT JOIN topics t ON t.id = s.topic_id "
+                f"LEFT JOIN axes a ON a.id = s.axis_id "
+                f"WHERE {' AND '.join(page_where)} ORDER BY {order_sql} LIMIT ?",
+                page_args + [limit + 1 - len(rows)]
+            ).fetchall()
+            if len(rows) > limit:
+                break
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = f"{last['score_sort']},{last['id']}" if by_score else str(last['id'])
+
+        items = []
+        for row in rows:
+            item = dict(row)
+            del item['id'], item['score_sort']
+            items.append(item)
+        return {
+            'items': items,
+            'total': min(total, COUNT_LIMIT),
+            'total_capped': total > COUNT_LIMIT,
+            'next_cursor': next_cursor,
+        }
+
+
+# ============================================================================
+# HTTP サーバー
+# ============================================================================
+
+class _ResultsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.rstrip('/') or '/'
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        api = self.server.api
+
+        try:
+            if path == '/':
+                self._send_html(self.server.pages['list'])
+            elif path == '/two_pane':
+                self._send_html(self.server.pages['two_pane'])
+            elif path == '/api/meta':
+                self._send_json(api.meta())
+            elif path == '/api/scores':
+                self._send_json(api.scores(params))
+            elif path.startswith('/api/consensus/'):
+                analysis = api.consensus(unquote(path[len('/api/consensus/'):]))
+                if analysis is None:
+                    self._send_json({'error': 'not found'}, status=404)
+                else:
+                    self._send_json(analysis)
+            else:
+                self._send_json({'error': 'not found'}, status=404)
+        except ValueError as e:
+            self._send_json({'error': str(e)}, status=400)
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_html(self, html):
+        self._send(200, 'text/html; charset=utf-8', html.encode('utf-8'))
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self._send(status, 'application/json; charset=utf-8', body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(results_dir='results', host='127.0.0.1', port=DEFAULT_PORT, rebuild=False):
+    """結果サーバーを起動する（Ctrl+C で終了）"""
+    from .views import list_view, two_pane
+    from .views.model import ViewModel
+
+    db_path = Path(results_dir) / DB_FILENAME
+    if rebuild or database_is_stale(results_dir, db_path):
+        build_database(results_dir, db_path)
+
+    httpd = ThreadingHTTPServer((host, port), _ResultsHandler)
+    httpd.daemon_threads = True
+    httpd.api = ResultsAPI(db_path)
+    # ビューはスコアを埋め込まない版を起動時に一度だけ生成する
+    model = ViewModel(results_dir, with_scores=False)
+    httpd.pages = {
+        'list': list_view.render(model, api_base='/api'),
+        'two_pane': two_pane.render(model, api_base='/api'),
+    }
+
+    print(f"[OK] 結果サーバー起動: http://{host}:{httpd.server_address[1]}/")
+    print(f"   リストビュー: http://{host}:{httpd.server_address[1]}/")
+    print(f"   2ペインビュー: http://{host}:{httpd.server_address[1]}/two_pane")
+    print(f"   全文検索: {'FTS5 trigram' if httpd.api.fts else 'LIKE'}")
+    print(f"   終了するには Ctrl+C を押してください")
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 追記専用の結果ファイル（JSONL）と外部マージによる scores.csv の出力
+
+分類結果とスコアを、バッチが終わるたびに JSONL に追記して fsync する。
+    - 実行中でも results/scores.jsonl・classifications.jsonl を読めば途中までの結果を確認できる
+    - 途中で止まっても、fsync 済みのバッチは失われない（書きかけの最終行は読み込み時に無視する）
+scores.csv は実行の最後に scores.jsonl から作る。SORT_RUN_ROWS 件ずつ並べ替えた一時ファイル（ラン）を
+k-way マージするため、スコア全件の DataFrame を作って並べ替えるより最大メモリが小さい。
+
+出力:
+    - results/classifications.jsonl: Stage 2 の分類結果（opinion_id, topic_id）
+    - results/scores.jsonl: Stage 4 のスコア（scores.csv から comment・axis_name を除いた列）
+"""
+
+import csv
+import heapq
+import json
+import math
+import os
+import tempfile
+import threading
+from itertools import islice
+
+SORT_RUN_ROWS = 200_000  # 外部マージの1ランの件数（メモリに載せる最大件数）
+
+SCORE_COLUMNS = ('opinion_id', 'comment', 'topic_id', 'axis_id', 'axis_name', 'score', 'excerpt', 'reasoning',
+                 'confidence', 'votes')
+
+CLASSIFICATIONS_FILENAME = 'classifications.jsonl'
+SCORES_FILENAME = 'scores.jsonl'
+
+
+class JsonlSink:
+    """バッチ単位で追記・fsync する JSONL ファイル（スレッド間で共有できる）"""
+
+    def __init__(self, path, fsync=True):
+        """
+        Args:
+            path: 出力ファイル（既存の内容は消して書き始める）
+            fsync: True の場合、バッチごとに fsync する
+        """
+        self.path = path
+        self.fsync = fsync
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def append(self, records):
+        """レコードのリストを1バッチとして追記する"""
+        lines = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.count += len(records)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_jsonl(path):
+    """JSONL のレコードを順に返す（途中で止まった実行の書きかけの行は飛ばす）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                if line.endswith('\n'):
+                    raise
+
+
+def _nan_to_none(value):
+    return None if value is None or (isinstance(value, float) and math.isnan(value)) else value
+
+
+def score_records(axis, topic_id, scores, opinion_store):
+    """stage4_scoring のスコアを scores.jsonl のレコードにする
+
+    topic_ids を持つ共有軸（divcon.axis_merge）の topic_id は各意見が分類されたトピックにする
+    （ScoreStore.to_dataframe と同じ）。excerpt・reasoning を持つのはこのレコードだけ（ScoreStore には残さない）。
+    """
+    topics = [topic_id] * len(scores)
+    if len(axis.get('topic_ids', ())) > 1:
+        rows = [opinion_store.row(s['opinion_id']) for s in scores]
+        topics = [t or topic_id for t in opinion_store.topic_ids_of(rows)] if rows else []
+    records = []
+    for s, record_topic in zip(scores, topics):
+        records.append({
+            'opinion_id': str(s['opinion_id']),
+            'topic_id': record_topic,
+            'axis_id': axis['id'],
+            'score': s['score'],
+            'excerpt': s['excerpt'],
+            'reasoning': s['reasoning'],
+            'confidence': _nan_to_none(s.get('confidence')),
+            'votes': s.get('votes', 1),
+        })
+    return records
+
+
+# ============================================================================
+# 外部マージ
+# ============================================================================
+
+def external_sort(records, key, run_rows=SORT_RUN_ROWS, tmp_dir=None):
+    """レコードを key の順に返す（run_rows 件ずつ並べ替えて一時ファイルに書き、k-way マージする）
+
+    同じ key のレコードは入力の順を保つ。
+    """
+    records = iter(records)
+    first = list(islice(records, run_rows))
+    first.sort(key=key)
+    rest = list(islice(records, run_rows))
+    if not rest:
+        # 1ランに収まる場合は一時ファイルを使わない
+        yield from first
+        return
+
+    with tempfile.TemporaryDirectory(prefix='divcon-sort-', dir=tmp_dir) as tmp:
+        paths = []
+        chunk = first
+        while chunk:
+            chunk.sort(key=key)
+            path = os.path.join(tmp, f'run{len(paths):05d}.jsonl')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(r, ensure_ascii=False) + '\n' for r in chunk)
+            paths.append(path)
+            chunk = rest
+            rest = list(islice(records, run_rows)) if rest else []
+
+        files = [open(path, 'r', encoding='utf-8') for path in paths]
+        try:
+            yield from heapq.merge(*(map(json.loads, f) for f in files), key=key)
+        finally:
+            for f in files:
+                f.close()
+
+
+def _score_sort_key(record):
+    # pandas の sort_values(by=['axis_id', 'score'], na_position='last') と同じ順
+    score = record['score']
+    return record['axis_id'], score is None, score or 0
+
+
+def _format_float(value, digits=None):
+    if value is None:
+        return ''
+    return repr(float(round(value, digits) if digits is not None else value))
+
+
+def write_scores_csv(jsonl_path, csv_path, opinion_store, axes, run_rows=SORT_RUN_ROWS):
+    """scores.jsonl を軸ID・スコアの順に並べ替えて scores.csv に書き出す
+
+    Args:
+        jsonl_path: scores.jsonl
+        csv_path: 出力する scores.csv
+        opinion_store: comment を引く OpinionStore
+        axes: 出力する軸のリスト（ここにない軸のレコードは出力しない。予算切れで止まった軸など）
+        run_rows: 外部マージの1ランの件数
+
+    Returns:
+        int: 出力した件数
+    """
+    axis_names = {axis['id']: axis['name'] for axis in axes}
+    records = (r for r in read_jsonl(jsonl_path) if r['axis_id'] in axis_names)
+
+    count = 0
+    tmp_dir = os.path.dirname(os.path.abspath(csv_path))
+    with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(SCORE_COLUMNS)
+        for r in external_sort(records, _score_sort_key, run_rows=run_rows, tmp_dir=tmp_dir):
+            writer.writerow((
+                r['opinion_id'],
+                opinion_store.comment(opinion_store.row(r['opinion_id'])),
+                r['topic_id'],
+                r['axis_id'],
+                axis_names[r['axis_id']],
+                _format_float(r['score']),
+                r['excerpt'],
+                r['reasoning'],
+                _format_float(r['confidence'], 2),
+                r['votes'],
+            ))
+            count += 1
+    return count
@@ -0,0 +1,831 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 各Stageの実装
+Stage 1（トピック検出）から Stage 5（合意可能性分析）までの処理
+
+各関数は単体で呼び出せる（ノートブックからの利用を想定）。
+全体の実行順序と並列化は pipeline.run() が担当する。
+"""
+
+import random
+import zlib
+from concurrent.futures import CancelledError, as_completed
+from threading import Lock
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from . import llm, representatives
+from .aliases import IdAliases
+from .normalize import prompt_text, source_sentences
+from .progress import tracker
+from .store import SCORE_MAX, SCORE_MIN
+from .config import get_settings
+
+print_lock = Lock()  # スレッドセーフな出力用
+
+
+# ============================================================================
+# Stage 1: トピック検出
+# ============================================================================
+
+class Topic(BaseModel):
+    id: str
+    name: str
+    description: str
+
+class TopicDiscoveryResponse(BaseModel):
+    topics: List[Topic]
+    reasoning: str
+
+
+def stage1_topic_discovery(opinions, sample_size=500):
+    """Stage 1: トピック検出（ランダムサンプリング版）"""
+    # ランダムサンプリング
+    if len(opinions) > sample_size:
+        sampled_opinions = random.sample(opinions, sample_size)
+        print(f"[Stage 1] トピック検出中... ({len(opinions)} 件から {sample_size} 件をサンプリング)")
+    else:
+        sampled_opinions = opinions
+        print(f"[Stage 1] トピック検出中... ({len(opinions)} 件の意見)")
+
+    tracker.add_work('Stage 1')
+
+    # 意見テキストを結合（IDはプロンプト内の短い別名にする）
+    aliases = IdAliases([op['id'] for op in sampled_opinions])
+    opinions_text = "\n\n".join([f"[{aliases.alias(op['id'])}] {prompt_text(op)}" for op in sampled_opinions])
+
+    prompt = f"""以下は、エネルギー基本計画に対する市民意見です。
+
+これらの意見を分析し、主要なトピック（議論の主題）を抽出してください。
+
+【意見一覧】
+{opinions_text}
+
+【指示】
+1. この中で議論されている主要なトピックは何ですか？
+2. 最適なトピック数を自動で判断してください（3-7個程度を推奨）
+3. 各トピックに明確な名前と説明を付けてください
+"""
+
+    result = llm.parse(
+        messages=[
+            {"role": "system", "content": "あなたは市民意見を分析する専門家です。意見を読み、主要なトピックを抽出してください。"},
+            {"role": "user", "content": prompt}
+        ],
+        response_format=TopicDiscoveryResponse
+    )
+    topics = [t.model_dump() for t in result.topics]
+    tracker.complete_work('Stage 1')
+    tracker.log(f"Stage 1: {len(topics)} 個のトピックを検出")
+
+    print(f"[OK] {len(topics)} 個のトピックを検出")
+    print(f"  理由: {aliases.restore_text(result.reasoning)}")
+    for topic in topics:
+        print(f"  - [{topic['id']}] {topic['name']}")
+    print()
+
+    return topics
+
+
+# ============================================================================
+# Stage 2: トピック分類
+# ============================================================================
+
+class Classification(BaseModel):
+    opinion_id: str
+    topic_id: str
+
+class ClassificationResponse(BaseModel):
+    classifications: List[Classification]
+
+
+def stage2_classification(opinions, topics, batch_size=10, on_batch=None):
+    """Stage 2: トピック分類（並列処理版）
+
+    Args:
+        opinions: 意見のリスト
+        topics: トピックのリスト
+        batch_size: 1リクエストあたりの意見数
+        on_batch: バッチ完了ごとに分類結果のリストを受け取るコールバック（後続Stageの先行開始用）
+    """
+    max_workers = get_settings().max_workers
+    print(f"[Stage 2] トピック分類中... (バッチサイズ: {batch_size}, 並列数: {max_workers})")
+
+    topics_text = "\n".join([f"[{t['id']}] {t['name']}: {t['description']}" for t in topics])
+    tracker.add_work('Stage 2', len(opinions))
+
+    def classify_batch(batch_info):
+        """バッチを分類する関数（並列実行用）"""
+        i, batch = batch_info
+        aliases = IdAliases([op['id'] for op in batch], echoed=True)
+        batch_text = "\n".join([f"[{aliases.alias(op['id'])}] {prompt_text(op)}" for op in batch])
+
+        prompt = f"""以下のトピック定義があります:
+
+{topics_text}
+
+次の意見を、最も適切なトピックに分類してください:
+
+{batch_text}
+
+【重要】opinion_idとtopic_idは必ず上記のリストに存在するIDを使用してください。
+"""
+
+        result = llm.parse(
+            messages=[
+                {"role": "system", "content": "意見を適切なトピックに分類してください。指定されたIDのみを使用してください。"},
+                {"role": "user", "content": prompt}
+            ],
+            response_format=ClassificationResponse
+        )
+        # 別名を元の意見IDに戻す（未知の別名は捨てる）
+        classifications = []
+        for c in result.classifications:
+            opinion_id = aliases.resolve(c.opinion_id)
+            if opinion_id is not None:
+                classifications.append({'opinion_id': opinion_id, 'topic_id': c.topic_id})
+        tracker.complete_work('Stage 2', len(batch))
+
+        with print_lock:
+            print(f"  [OK] {i+1}-{i+len(batch)} 件を分類")
+
+        return classifications
+
+    # バッチを作成
+    batches = [(i, opinions[i:i+batch_size]) for i in range(0, len(opinions), batch_size)]
+
+    # 並列実行
+    classified_opinions = []
+    budget_error = None
+    with llm.ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(classify_batch, batch_info) for batch_info in batches]
+        for future in as_completed(futures):
+            try:
+                classifications = future.result()
+            except llm.BudgetExceededError as e:
+                # 予算切れ: まだ始まっていないバッチを取り消し、完了済みの分類だけを反映する
+                if budget_error is None:
+                    budget_error = e
+                    for pending in futures:
+                        pending.cancel()
+                continue
+            except CancelledError:
+                continue
+            classified_opinions.extend(classifications)
+            if on_batch is not None:
+                on_batch(classifications)
+
+    # 分類結果を元のデータに追加
+    classification_map = {c['opinion_id']: c['topic_id'] for c in classified_opinions}
+    for op in opinions:
+        op['topic_id'] = classification_map.get(str(op['id']), None)
+    if budget_error is not None:
+        raise budget_error
+
+    # 統計
+    valid_topic_ids = {t['id'] for t in topics}
+    topic_counts = {}
+    unclassified = 0
+
+    for op in opinions:
+        if op['topic_id'] is None:
+            unclassified += 1
+        elif op['topic_id'] in valid_topic_ids:
+            topic_counts[op['topic_id']] = topic_counts.get(op['topic_id'], 0) + 1
+
+    print(f"\n  分類結果:")
+    for topic_id, count in topic_counts.items():
+        topic_name = next(t['name'] for t in topics if t['id'] == topic_id)
+        print(f"  - [{topic_id}] {topic_name}: {count} 件")
+
+    if unclassified > 0:
+        print(f"  - 未分類: {unclassified} 件 [WARNING]")
+    print()
+
+    return opinions
+
+
+# ============================================================================
+# Stage 3a: 対立軸の発見
+# ============================================================================
+
+class Axis(BaseModel):
+    id: str
+    name: str
+    left_pole: str
+    right_pole: str
+    strength: int
+    reasoning: str
+
+class AxisDiscoveryResponse(BaseModel):
+    axes: List[Axis]
+
+
+def stage3a_axis_discovery(topic, topic_opinions, sample_size=500):
+    """Stage 3a: 対立軸の発見（ランダムサンプリング版）"""
+    # ランダムサンプリング
+    if len(topic_opinions) > sample_size:
+        sampled_opinions = random.sample(topic_opinions, sample_size)
+        print(f"[Stage 3a] トピック [{topic['id']}] {topic['name']} の対立軸発見中... ({len(topic_opinions)} 件から {sample_size} 件をサンプリング)")
+    else:
+        sampled_opinions = topic_opinions
+        print(f"[Stage 3a] トピック [{topic['id']}] {topic['name']} の対立軸発見中... ({len(topic_opinions)} 件)")
+
+    aliases = IdAliases([op['id'] for op in sampled_opinions])
+    topic_opinions_text = "\n\n".join([f"[{aliases.alias(op['id'])}] {prompt_text(op)}" for op in sampled_opinions])
+
+    prompt = f"""以下は、「{topic['name']}」というトピックに関する市民意見です。
+
+{topic_opinions_text}
+
+【タスク】
+この意見群の中で、人々が**対立している軸**を発見してください。
+
+対立軸とは:
+- 意見が二極化している次元
+- 「AかBか」という選択を迫られる論点
+- 例: "環境保護 vs 経済成長", "短期的利益 vs 長期的持続性"
+
+【指示】
+1. 主要な対立軸を2-4個抽出してください
+2. 各軸に明確な名前を付けてください（"A vs B"の形式）
+3. 対立の強度を5段階で評価してください：
+   - 5: 非常に強い対立（意見が完全に二極化）
+   - 4: 強い対立
+   - 3: 中程度の対立
+   - 2: やや対立
+   - 1: 弱い対立
+4. **重要**: reasoning（理由説明）で具体的な意見を参照する際は、必ず `[ID:XXX]` の形式を使用してください
+   - 正しい例: "[ID:123]では再エネ推進を主張している"
+   - 正しい例: "左極の代表例として[ID:456]、右極として[ID:789]が見られる"
+   - 誤った例: "意見123では..." "ID123によると..." "コメント[123]"
+"""
+
+    result = llm.parse(
+        messages=[
+            {"role": "system", "content": "あなたは対立構造を分析する専門家です。"},
+            {"role": "user", "content": prompt}
+        ],
+        response_format=AxisDiscoveryResponse
+    )
+    axes = [a.model_dump() for a in result.axes]
+    for axis in axes:
+        axis['reasoning'] = aliases.restore_text(axis['reasoning'])
+
+    print(f"  [OK] {len(axes)} 個の対立軸を発見")
+    strength_labels = ["", "弱い", "やや", "中程度", "強い", "非常に強い"]
+    for axis in axes:
+        print(f"  - [{axis['id']}] {axis['name']} (強度: {axis['strength']}/5 - {strength_labels[axis['strength']]}対立)")
+    print()
+
+    return axes
+
+
+# ============================================================================
+# Stage 3b: 極端意見アンカーの生成
+# ============================================================================
+
+class AnchorGenerationResponse(BaseModel):
+    left_anchors: List[str]
+    right_anchors: List[str]
+
+
+def stage3b_anchor_generation(axis, topic_opinions, sample_size=500):
+    """Stage 3b: 極端意見アンカーの生成（ランダムサンプリング版）"""
+    print(f"[Stage 3b] 対立軸 [{axis['id']}] {axis['name']} のアンカー生成中...")
+
+    # ランダムサンプリング
+    if len(topic_opinions) > sample_size:
+        sampled_opinions = random.sample(topic_opinions, sample_size)
+    else:
+        sampled_opinions = topic_opinions
+
+    aliases = IdAliases([op['id'] for op in sampled_opinions])
+    topic_opinions_text = "\n\n".join([f"[{aliases.alias(op['id'])}] {prompt_text(op)}" for op in sampled_opinions])
+
+    prompt = f"""以下の市民意見を参考にして、対立軸「{axis['name']}」について、
+極端に強い主張の文章例を生成してください。
+
+【既存の意見（参考）】
+{topic_opinions_text}
+
+【タスク】
+- **左極**（{axis['left_pole']}）の極端な主張を10パターン生成
+- **右極**（{axis['right_pole']}）の極端な主張を10パターン生成
+
+【極端な文章の例】
+例えば、対立軸が「環境保護 vs 経済成長」の場合：
+
+左極（環境保護）の例:
+- 「経済成長を完全に停止してでも、環境保護を最優先すべきである」
+- 「全ての企業活動を即座に規制し、自然環境を元の状態に戻すべきだ」
+- 「人間の経済活動は地球環境に対する犯罪であり、全面的に見直すべきである」
+
+右極（経済成長）の例:
+- 「環境規制を全て撤廃し、経済成長を最大化すべきである」
+- 「環境保護は経済発展の後で考えればよく、今は成長が最優先だ」
+- 「環境コストを無視してでも、産業競争力を強化すべきである」
+
+【重要なポイント】
+1. 既存の意見の文脈を保ちつつ、より極端な表現にすること
+2. 「完全に」「全て」「絶対に」「即座に」などの強い表現を使用
+3. 妥協や条件を一切含まない断定的な主張にすること
+4. 各パターンは異なる角度から極端さを表現すること
+5. 同じような主張の繰り返しは避けること
+"""
+
+    result = llm.parse(
+        messages=[
+            {"role": "system", "content": "多様で極端な主張を生成してください。妥協のない、断定的な表現を使用してください。"},
+            {"role": "user", "content": prompt}
+        ],
+        response_format=AnchorGenerationResponse,
+        reasoning_effort="high"
+    )
+    anchors = {
+        'left_anchors': result.left_anchors,
+        'right_anchors': result.right_anchors
+    }
+
+    print(f"  [OK] アンカー生成完了 (左極: {len(anchors['left_anchors'])} 個, 右極: {len(anchors['right_anchors'])} 個)")
+    print()
+
+    return anchors
+
+
+# ============================================================================
+# Stage 4: 強度推定
+# ============================================================================
+
+class Score(BaseModel):
+    opinion_id: str
+    score: Optional[int] = None  # 1-6、または該当しない場合はnull
+    excerpt: str  # 判断根拠となった本文の重要部分（切り抜きまたは要約）
+    reasoning: str
+
+class ScoringResponse(BaseModel):
+    scores: List[Score]
+
+class SlimScore(BaseModel):
+    """スリム出力（excerpt を書き写さず文番号で返す。reasoning は一部の意見のみ）"""
+    opinion_id: str
+    score: Optional[int] = None
+    sentences: List[int]  # 判断根拠の文番号（本文の {n}）
+    reasoning: Optional[str] = None
+
+class SlimScoringResponse(BaseModel):
+    scores: List[SlimScore]
+
+
+# スリム出力で reasoning を必ず書かせる意見の割合（意見IDのハッシュで選ぶので実行ごとに同じ意見になる）
+SLIM_REASONING_SHARE = 0.1
+# スリム出力の excerpt にする文の数の上限
+SLIM_MAX_SENTENCES = 2
+
+# スコアの意味（通常の出力とスリム出力で共通）
+_SCORE_CRITERIA = """**まず、この対立軸に該当するかを判定:**
+- 意見がこの対立軸について明確な立場を示している場合 → 1-6でスコアリング
+- 意見がこの対立軸に全く言及していない、または判断できない場合 → scoreをnullにする
+
+**スコアの意味（該当する場合）:**
+6段階評価により、より明確な立場判定を行います。中立的なバランス点はありません。
+- **1**: 左極（最も強い）- 左極アンカーに非常に近い立場
+- **2**: 左寄り（強）- 左極に近いが、若干の留保がある
+- **3**: 左寄り（弱）- 左寄りだが、やや穏健な立場
+- **4**: 右寄り（弱）- 右寄りだが、やや穏健な立場
+- **5**: 右寄り（強）- 右極に近いが、若干の留保がある
+- **6**: 右極（最も強い）- 右極アンカーに非常に近い立場"""
+
+
+def _reasoning_sampled(opinion_id):
+    return zlib.crc32(str(opinion_id).encode('utf-8')) % 1000 < SLIM_REASONING_SHARE * 1000
+
+
+def _slim_scoring_prompt(axis, left_anchors_text, right_anchors_text, batch, aliases, sentences):
+    """スリム出力のプロンプト（本文の各文に {n} の文番号を付ける）"""
+    opinions_to_score = "\n\n".join([
+        f"[{aliases.alias(op['id'])}] " + "".join(f"{{{n}}}{sentence}" for n, sentence in
+                                               enumerate(sentences[str(op['id'])], 1))
+        for op in batch
+    ])
+    sampled = [aliases.alias(op['id']) for op in batch if _reasoning_sampled(op['id'])]
+
+    return f"""以下の基準アンカーに基づいて、意見をスコアリングしてください。
+
+【対立軸】{axis['name']}
+- 左極（スコア1）: {axis['left_pole']}
+- 右極（スコア5）: {axis['right_pole']}
+
+【左極アンカー例】（スコア1に相当）
+{left_anchors_text}
+
+【右極アンカー例】（スコア5に相当）
+{right_anchors_text}
+
+【スコアリング対象の意見】（本文中の {{1}} {{2}} ... はその後に続く文の番号です）
+{opinions_to_score}
+
+【タスク】
+各意見を以下の基準でスコアリングしてください:
+
+{_SCORE_CRITERIA}
+
+**sentences（判断根拠の文番号）:**
+- スコアを付けた場合: 判断の根拠となった文の番号を1-{SLIM_MAX_SENTENCES}個、本文の順に記載してください
+  - 本文を書き写さないでください（番号だけを記載します）
+- スコアがnullの場合: 空のリスト（[]）にしてください
+
+**reasoning（理由）:**
+- 次の意見には、理由を1文で記載してください: {', '.join(sampled) if sampled else '（なし）'}
+- それ以外の意見は、スコアの判断に迷った場合（3と4の境界など）だけ1文で記載し、迷わなかった場合は null にしてください
+
+**重要**: 意見が対立軸に該当しない場合、無理にスコアを付けず、scoreフィールドをnullにしてください。
+"""
+
+
+def _checked_score(score, axis_id, opinion_id):
+    """範囲外（1-6 以外）のスコアを警告して null にする（ScoreStore の格納値 0 や int8 の範囲外を防ぐ）"""
+    if score is None or SCORE_MIN <= score <= SCORE_MAX:
+        return score
+    with print_lock:
+        print(f"[WARNING] 軸 [{axis_id}] の意見 [{opinion_id}] のスコア {score} は範囲外のため null にします")
+    return None
+
+
+def _slim_excerpt(sources, numbers):
+    """文番号から excerpt を作る（元の本文の文を使う。範囲外の番号・本文に対応しない文は無視する）
+
+    Args:
+        sources: プロンプトの文番号 - 1 → 元の本文の文（normalize.source_sentences）
+    """
+    valid = sorted({n for n in numbers if 1 <= n <= len(sources) and sources[n - 1] is not None})
+    excerpt = []
+    for n in valid:
+        if sources[n - 1] not in excerpt:
+            excerpt.append(sources[n - 1])
+    if not excerpt:
+        return ''
+    return "「" + "...".join(excerpt[:SLIM_MAX_SENTENCES]) + "」"
+
+
+def stage4_scoring(axis, anchors, topic_opinions, batch_size=20, on_batch=None, slim=None):
+    """Stage 4: 強度推定（並列処理版）
+
+    Args:
+        on_batch: バッチ完了ごとにスコアのリストを受け取るコールバック（結果ファイルへの逐次追記用）
+        slim: True の場合、excerpt を書き写させずに文番号で返させ、本文の文から excerpt を作る。
+              reasoning は SLIM_REASONING_SHARE の割合の意見と、判断に迷った意見だけに書かせる
+              （出力トークンを減らす。None の場合は設定の slim_scoring）
+    """
+    max_workers = get_settings().max_workers
+    if slim is None:
+        slim = get_settings().slim_scoring
+    print(f"[Stage 4] 対立軸 [{axis['id']}] のスコアリング中... ({len(topic_opinions)} 件, 並列数: {max_workers})")
+
+    tracker.add_work('Stage 4', len(topic_opinions), axis_id=axis['id'])
+
+    left_anchors_text = "\n".join([f"L{i+1}. {a}" for i, a in enumerate(anchors['left_anchors'])])
+    right_anchors_text = "\n".join([f"R{i+1}. {a}" for i, a in enumerate(anchors['right_anchors'])])
+
+    def score_batch(batch_info):
+        """バッチをスコアリングする関数（並列実行用）"""
+        i, batch = batch_info
+        aliases = IdAliases([op['id'] for op in batch], echoed=True)
+        if slim:
+            return score_batch_slim(i, batch, aliases)
+        opinions_to_score = "\n\n".join([f"[{aliases.alias(op['id'])}] {prompt_text(op)}" for op in batch])
+
+        prompt = f"""以下の基準アンカーに基づいて、意見をスコアリングしてください。
+
+【対立軸】{axis['name']}
+- 左極（スコア1）: {axis['left_pole']}
+- 右極（スコア5）: {axis['right_pole']}
+
+【左極アンカー例】（スコア1に相当）
+{left_anchors_text}
+
+【右極アンカー例】（スコア5に相当）
+{right_anchors_text}
+
+【スコアリング対象の意見】
+{opinions_to_score}
+
+【タスク】
+各意見を以下の基準でスコアリングしてください:
+
+{_SCORE_CRITERIA}
+
+**excerpt（重要部分の切り抜き）:**
+- スコアを付けた場合: 判断の根拠となった本文の重要な部分を切り抜いて記載してください
+  - **必ず「...」（日本語のカギ括弧）で囲んでください**。"..."（ダブルクオーテーション）は使用しないでください
+  - 原文から直接引用する形式で記載してください
+  - [URL]・[引用略]・… は前処理で入れた記号です。excerpt には含めず、その前後の本文だけを引用してください
+  - 長い場合は複数の重要箇所を抽出するか、要約してください
+  - 目安: 50-150文字程度
+  - フォーマット例: 「原発を最大限活用すべきである...再生可能エネルギーとの併用が重要だ」
+- スコアがnullの場合: excerptは空文字列（""）にしてください
+
+**重要**: 意見が対立軸に該当しない場合、無理にスコアを付けず、scoreフィールドをnullにしてください。
+"""
+
+        result = llm.parse(
+            messages=[
+                {"role": "system", "content": "アンカーを基準に意見をスコアリングしてください。"},
+                {"role": "user", "content": prompt}
+            ],
+            response_format=ScoringResponse
+        )
+        # 別名を元の意見IDに戻す（未知の別名は捨てる）
+        scores = []
+        for s in result.scores:
+            opinion_id = aliases.resolve(s.opinion_id)
+            if opinion_id is None:
+                continue
+            score = _checked_score(s.score, axis['id'], opinion_id)
+            scores.append(dict(s.model_dump(), opinion_id=opinion_id, score=score,
+                               excerpt=s.excerpt if score is not None else ''))
+        tracker.complete_work('Stage 4', len(batch), axis_id=axis['id'])
+
+        with print_lock:
+            print(f"  [OK] {i+1}-{i+len(batch)} 件をスコアリング")
+
+        return scores
+
+    def score_batch_slim(i, batch, aliases):
+        """スリム出力でバッチをスコアリングする"""
+        # プロンプトにはプロンプト用テキストの文を載せ、excerpt は対応する元の本文の文から作る
+        sentences = {}
+        sources = {}
+        for op in batch:
+            sentences[str(op['id'])], sources[str(op['id'])] = source_sentences(prompt_text(op), op['comment'])
+        result = llm.parse(
+            messages=[
+                {"role": "system", "content": "アンカーを基準に意見をスコアリングしてください。"},
+                {"role": "user", "content": _slim_scoring_prompt(
+                    axis, left_anchors_text, right_anchors_text, batch, aliases, sentences
+                )}
+            ],
+            response_format=SlimScoringResponse
+        )
+        # 別名を元の意見IDに戻し、文番号を本文と照合して excerpt にする
+        scores = []
+        for s in result.scores:
+            opinion_id = aliases.resolve(s.opinion_id)
+            if opinion_id is None:
+                continue
+            score = _checked_score(s.score, axis['id'], opinion_id)
+            scores.append({
+                'opinion_id': opinion_id,
+                'score': score,
+                'excerpt': _slim_excerpt(sources[opinion_id], s.sentences) if score is not None else '',
+                'reasoning': s.reasoning or '',
+            })
+        tracker.complete_work('Stage 4', len(batch), axis_id=axis['id'])
+
+        with print_lock:
+            print(f"  [OK] {i+1}-{i+len(batch)} 件をスコアリング（スリム出力）")
+
+        return scores
+
+    # バッチを作成
+    batches = [(i, topic_opinions[i:i+batch_size]) for i in range(0, len(topic_opinions), batch_size)]
+
+    # 並列実行
+    all_scores = []
+    with llm.ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(score_batch, batch_info) for batch_info in batches]
+        for future in as_completed(futures):
+            scores = future.result()
+            all_scores.extend(scores)
+            if on_batch is not None:
+                on_batch(scores)
+
+    print(f"  [OK] スコアリング完了\n")
+
+    return all_scores
+
+
+# ============================================================================
+# Stage 5: 合意可能性分析
+# ============================================================================
+
+class ConsensusPoint(BaseModel):
+    """合意可能なポイント"""
+    point: str
+    explanation: str
+    supporting_opinions: List[str]  # 意見IDのリスト
+
+class ConflictPoint(BaseModel):
+    """合意不可能なポイント"""
+    point: str
+    explanation: str
+    left_opinions: List[str]  # 左側意見IDのリスト
+    right_opinions: List[str]  # 右側意見IDのリスト
+
+class ConsensusAnalysisResponse(BaseModel):
+    """合意可能性分析の結果"""
+    consensus_points: List[ConsensusPoint]
+    conflict_points: List[ConflictPoint]
+    reasoning: str
+
+
+# Stage 5 のプロンプトに載せる意見数（1チャンクあたり、左右それぞれ）
+STAGE5_OPINIONS_PER_SIDE = 20
+# 意見の多い軸をチャンクに分けて並列分析する際のチャンク数の上限
+STAGE5_MAX_CHUNKS = 8
+
+
+def _consensus_prompt(axis, left_opinions, right_opinions, aliases):
+    """合意可能性分析のプロンプトを作成（意見IDは aliases の別名にする）"""
+    left_text = "\n".join([
+        f"[ID: {aliases.alias(s['opinion_id'])}, スコア: {s['score']}] {s['excerpt']}"
+        for s in left_opinions
+    ])
+
+    right_text = "\n".join([
+        f"[ID: {aliases.alias(s['opinion_id'])}, スコア: {s['score']}] {s['excerpt']}"
+        for s in right_opinions
+    ])
+
+    return f"""以下の対立軸において、合意可能なポイントと合意不可能なポイントを分析してください。
+
+【対立軸】
+{axis['name']}
+
+- 左極（スコア1-3）: {axis['left_pole']}
+- 右極（スコア4-6）: {axis['right_pole']}
+
+【スコアリング基準】
+- スコア1: 左極の立場を最も強く支持（最左端）
+- スコア2-3: 左寄りの立場
+- スコア4-5: 右寄りの立場
+- スコア6: 右極の立場を最も強く支持（最右端）
+
+【左側の意見（スコア1-3）】
+{left_text if left_text else '（該当意見なし）'}
+
+【右側の意見（スコア4-6）】
+{right_text if right_text else '（該当意見なし）'}
+
+【分析指示】
+1. **合意可能なポイント**: 左右両側が妥協・合意できそうな共通点や中間案を特定してください
+   - 両側が共有している価値観や懸念
+   - 実現可能な妥協案や段階的アプローチ
+   - 両側が受け入れられそうな条件付き合意
+   - 特にスコア2-3と4-5の意見間で見られる共通点に注目
+
+2. **合意不可能なポイント**: 根本的に対立しており、妥協が困難なポイントを特定してください
+   - 価値観の根本的な相違
+   - 互いに譲れない原則や立場
+   - 論理的に両立不可能な主張
+   - 特にスコア1と6の意見間で見られる根本的対立に注目
+
+各ポイントには、それを裏付ける意見のIDを含めてください。
+"""
+
+
+def _request_consensus(prompt):
+    """合意可能性分析のAPI呼び出し"""
+    return llm.parse(
+        messages=[
+            {"role": "system", "content": "あなたは対立する意見を分析し、合意可能性を評価する専門家です。"},
+            {"role": "user", "content": prompt}
+        ],
+        response_format=ConsensusAnalysisResponse,
+        reasoning_effort=False
+    )
+
+
+def _merge_consensus_results(axis, partials):
+    """チャンクごとの分析結果を1つに統合する（reduce）"""
+    sections = []
+    for i, partial in enumerate(partials, 1):
+        consensus_text = "\n".join([
+            f"- {cp.point}: {cp.explanation}（根拠: {', '.join(cp.supporting_opinions)}）"
+            for cp in partial.consensus_points
+        ])
+        conflict_text = "\n".join([
+            f"- {cp.point}: {cp.explanation}（左: {', '.join(cp.left_opinions)} / 右: {', '.join(cp.right_opinions)}）"
+            for cp in partial.conflict_points
+        ])
+        sections.append(f"""【部分分析 {i}】
+合意可能なポイント:
+{consensus_text if consensus_text else '（なし）'}
+合意不可能なポイント:
+{conflict_text if conflict_text else '（なし）'}""")
+
+    prompt = f"""対立軸「{axis['name']}」について、意見を複数のグループに分けて合意可能性を分析しました。
+以下の部分分析の結果を統合してください。
+
+- 左極（スコア1-3）: {axis['left_pole']}
+- 右極（スコア4-6）: {axis['right_pole']}
+
+{chr(10).join(sections)}
+
+【統合指示】
+1. 同じ趣旨のポイントは1つにまとめ、裏付けとなる意見のIDはすべて引き継いでください
+2. 複数の部分分析に現れるポイントを優先し、1つにしか現れないポイントも重要なものは残してください
+3. 意見のIDは部分分析に記載されたものだけを使用してください
+"""
+    return _request_consensus(prompt)
+
+
+def stage5_consensus_analysis(axis, scores, texts=None):
+    """Stage 5: 合意可能性分析
+
+    スコア帯ごとの層化とテキストクラスタリングで代表意見を選んでプロンプトに載せる。
+    意見が1チャンク（左右各 STAGE5_OPINIONS_PER_SIDE 件）に収まらない軸は、
+    代表意見をチャンクに分けて並列に分析し（map）、結果を統合する（reduce）。
+
+    Args:
+        axis: 対立軸情報
+        scores: スコアリング結果のリスト
+        texts: 意見ID → 本文（excerpt が空の意見の代表選択に使う）
+
+    Returns:
+        dict: 合意可能・不可能なポイントの分析結果
+    """
+    # スコア付きの意見のみを抽出
+    valid_scores = [s for s in scores if s['score'] is not None]
+
+    if len(valid_scores) == 0:
+        return {
+            'axis_id': axis['id'],
+            'axis_name': axis['name'],
+            'consensus_points': [],
+            'conflict_points': [],
+            'reasoning': '分析対象となる意見がありません。'
+        }
+
+    # 左側（スコア1-3）と右側（スコア4-6）に分類
+    left_opinions = [s for s in valid_scores if s['score'] <= 3]
+    right_opinions = [s for s in valid_scores if s['score'] >= 4]
+
+    # 代表意見の選択（チャンク数に応じて件数を増やす）
+    per_side = STAGE5_OPINIONS_PER_SIDE
+    n_chunks = max(1, min(STAGE5_MAX_CHUNKS, -(-max(len(left_opinions), len(right_opinions)) // per_side)))
+    left_reps = representatives.select_representatives(left_opinions, per_side * n_chunks, texts=texts)
+    right_reps = representatives.select_representatives(right_opinions, per_side * n_chunks, texts=texts)
+    # 別名は軸全体で1つ（チャンクの部分分析を統合するプロンプトでも同じ別名を使う）
+    aliases = IdAliases([s['opinion_id'] for s in left_reps + right_reps])
+
+    try:
+        if n_chunks == 1:
+            result = _request_consensus(_consensus_prompt(axis, left_reps, right_reps, aliases))
+        else:
+            chunks = list(zip(
+                representatives.deal_into_chunks(left_reps, n_chunks),
+                representatives.deal_into_chunks(right_reps, n_chunks)
+            ))
+            with llm.ContextThreadPoolExecutor(max_workers=min(get_settings().max_workers, n_chunks)) as executor:
+                partials = list(executor.map(
+                    lambda chunk: _request_consensus(_consensus_prompt(axis, *chunk, aliases)), chunks
+                ))
+            with print_lock:
+                print(f"  [Stage 5] 軸 [{axis['id']}] {n_chunks} チャンクの分析結果を統合中...")
+            result = _merge_consensus_results(axis, partials)
+
+        return {
+            'axis_id': axis['id'],
+            'axis_name': axis['name'],
+            'left_pole': axis['left_pole'],
+            'right_pole': axis['right_pole'],
+            'consensus_points': [
+                {
+                    'point': aliases.restore_text(cp.point),
+                    'explanation': aliases.restore_text(cp.explanation),
+                    'supporting_opinions': [aliases.restore_reference(v) for v in cp.supporting_opinions]
+                }
+                for cp in result.consensus_points
+            ],
+            'conflict_points': [
+                {
+                    'point': aliases.restore_text(cp.point),
+                    'explanation': aliases.restore_text(cp.explanation),
+                    'left_opinions': [aliases.restore_reference(v) for v in cp.left_opinions],
+                    'right_opinions': [aliases.restore_reference(v) for v in cp.right_opinions]
+                }
+                for cp in result.conflict_points
+            ],
+            'reasoning': aliases.restore_text(result.reasoning),
+            'opinion_counts': {
+                'left': len(left_opinions),
+                'right': len(right_opinions),
+                'total': len(valid_scores),
+                'representatives': len(left_reps) + len(right_reps),
+                'chunks': n_chunks
+            }
+        }
+
+    except llm.BudgetExceededError:
+        raise  # 予算切れは呼び出し側で新しい処理の投入を止めるため、エラー結果にせずそのまま伝える
+    except Exception as e:
+        print(f"  [ERROR] 軸 {axis['id']} の合意可能性分析でエラー: {e}")
+        return {
+            'axis_id': axis['id'],
+            'axis_name': axis['name'],
+            'consensus_points': [],
+            'conflict_points': [],
+            'reasoning': f'エラーが発生しました: {str(e)}'
+        }
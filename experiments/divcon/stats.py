@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 統計モジュール
+scores.csv から軸別・トピック別の集計値を一括計算し、stats.json として保存する
+
+使用方法:
+    divcon stats
+
+出力:
+    - results/stats.json: 全体・トピック別・軸別のヒストグラム、平均、中央値、null率、左右件数
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from .store import SCORE_MAX, SCORE_MIN
+
+# スコアの範囲（SCORE_MIN-SCORE_MAX。0 は null 用のビン）
+N_BINS = SCORE_MAX + 1
+LEFT_SCORES = (1, 2, 3)
+RIGHT_SCORES = (4, 5, 6)
+
+
+def _summarize_histograms(hist):
+    """ヒストグラム行列から各種統計量を計算する
+
+    Args:
+        hist: shape (n_groups, 7) の件数行列。列0は null、列1-6はスコア1-6
+
+    Returns:
+        dict: 列ごとの配列（total, null, mean, median, std, left, right）
+    """
+    values = np.arange(SCORE_MIN, SCORE_MAX + 1, dtype=np.float64)
+    counts = hist[:, SCORE_MIN:].astype(np.float64)
+    n_scored = counts.sum(axis=1)
+    null = hist[:, 0]
+    total = n_scored + null
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (counts * values).sum(axis=1) / n_scored
+        var = (counts * values ** 2).sum(axis=1) / n_scored - mean ** 2
+        std = np.sqrt(np.clip(var, 0, None))
+        null_rate = null / total
+
+    # 中央値はヒストグラムの累積件数から求める（np.median と同じく偶数件は中間2値の平均）
+    cum = np.cumsum(counts, axis=1)
+    lo_pos = np.floor((n_scored - 1) / 2)
+    hi_pos = np.floor(n_scored / 2)
+    lo_idx = (cum <= lo_pos[:, None]).sum(axis=1)
+    hi_idx = (cum <= hi_pos[:, None]).sum(axis=1)
+    lo_idx = np.minimum(lo_idx, len(values) - 1)
+    hi_idx = np.minimum(hi_idx, len(values) - 1)
+    median = np.where(n_scored > 0, (values[lo_idx] + values[hi_idx]) / 2, np.nan)
+
+    return {
+        'total': total,
+        'scored': n_scored,
+        'null': null,
+        'null_rate': null_rate,
+        'mean': mean,
+        'median': median,
+        'std': std,
+        'left': hist[:, list(LEFT_SCORES)].sum(axis=1),
+        'right': hist[:, list(RIGHT_SCORES)].sum(axis=1),
+    }
+
+
+def _to_records(keys, hist, summary):
+    """集計結果を {key: {...}} の辞書に変換する（JSON化できるPython型に揃える）"""
+    def _num(x):
+        x = float(x)
+        return None if np.isnan(x) else round(x, 4)
+
+    records = {}
+    for i, key in enumerate(keys):
+        records[key] = {
+            'total': int(summary['total'][i]),
+            'scored': int(summary['scored'][i]),
+            'null': int(summary['null'][i]),
+            'null_rate': _num(summary['null_rate'][i]),
+            'mean': _num(summary['mean'][i]),
+            'median': _num(summary['median'][i]),
+            'std': _num(summary['std'][i]),
+            'left': int(summary['left'][i]),
+            'right': int(summary['right'][i]),
+            'histogram': {str(s): int(hist[i, s]) for s in range(SCORE_MIN, SCORE_MAX + 1)},
+        }
+    return records
+
+
+def score_histograms(scores_df, key='axis_id'):
+    """軸ごとのスコアヒストグラムを np.bincount で一度に作る
+
+    Args:
+        scores_df: axis_id（key）, score 列を持つ DataFrame
+        key: グループ化する列（'topic_id' ならトピックごと）
+
+    Returns:
+        tuple: (axis_ids, hist) hist は shape (n_axes, 7)。列0は null、列1-6はスコア1-6
+    """
+    axis_codes, axis_ids = pd.factorize(scores_df[key], sort=True)
+    axis_ids = [str(a) for a in axis_ids]
+    n_axes = len(axis_ids)
+
+    # null は 0 のビンに入れる
+    scores = pd.to_numeric(scores_df['score'], errors='coerce').to_numpy()
+    valid = ~np.isnan(scores) & (scores >= SCORE_MIN) & (scores <= SCORE_MAX)
+    bins = np.where(valid, np.nan_to_num(scores), 0).astype(np.int64)
+
+    hist = np.bincount(axis_codes * N_BINS + bins, minlength=n_axes * N_BINS)
+    return axis_ids, hist.reshape(n_axes, N_BINS)
+
+
+def compute_stats(scores_df, axes_data=None):
+    """スコアの集計を一括で計算する
+
+    軸ごとのヒストグラムを np.bincount で一度だけ作り、
+    トピック別・全体の値はその行列を足し合わせて求める。
+
+    Args:
+        scores_df: scores.csv の DataFrame（axis_id, topic_id, score 列が必要）
+        axes_data: axes.json の内容 {topic_id: [axis, ...]}（省略時はスコアから軸→トピックを推定）
+
+    Returns:
+        dict: {'overall': {...}, 'topics': {topic_id: {...}}, 'axes': {axis_id: {...}}}
+    """
+    axis_to_topic = {}
+    if axes_data:
+        for topic_id, topic_axes in axes_data.items():
+            for axis in topic_axes:
+                axis_to_topic[axis['id']] = topic_id
+
+    axis_ids, hist = score_histograms(scores_df)
+
+    # 軸 → トピックの対応（axes.json にない軸はスコアの topic_id を使う）
+    first_topic = scores_df.groupby('axis_id', sort=True)['topic_id'].first()
+    for axis_id, topic_id in first_topic.items():
+        axis_to_topic.setdefault(str(axis_id), str(topic_id))
+
+    if all(len(axis.get('topic_ids', ())) <= 1 for topic_axes in (axes_data or {}).values() for axis in topic_axes):
+        topic_ids = sorted({axis_to_topic[a] for a in axis_ids})
+        topic_index = {t: i for i, t in enumerate(topic_ids)}
+        topic_codes = np.array([topic_index[axis_to_topic[a]] for a in axis_ids], dtype=np.int64)
+
+        topic_hist = np.zeros((len(topic_ids), N_BINS), dtype=np.int64)
+        np.add.at(topic_hist, topic_codes, hist)
+    else:
+        # トピック横断の共有軸（divcon.axis_merge）がある場合は、スコア行の topic_id で集計する
+        topic_ids, topic_hist = score_histograms(scores_df, key='topic_id')
+    overall_hist = hist.sum(axis=0, keepdims=True)
+
+    axes_records = _to_records(axis_ids, hist, _summarize_histograms(hist))
+    for axis_id in axis_ids:
+        axes_records[axis_id]['topic_id'] = axis_to_topic[axis_id]
+
+    return {
+        'overall': _to_records(['all'], overall_hist, _summarize_histograms(overall_hist))['all'],
+        'topics': _to_records(topic_ids, topic_hist, _summarize_histograms(topic_hist)),
+        'axes': axes_records,
+    }
+
+
+def write_stats(stats, path='results/stats.json'):
+    """統計を JSON として保存する"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2)
+
+
+def compute_stats_from_results(results_dir='results'):
+    """results/ の scores.csv と axes.json から統計を計算する"""
+    scores_df = pd.read_csv(f'{results_dir}/scores.csv')
+    try:
+        with open(f'{results_dir}/axes.json', 'r', encoding='utf-8') as f:
+            axes_data = json.load(f)
+    except FileNotFoundError:
+        axes_data = None
+    return compute_stats(scores_df, axes_data)
+
+
+def load_stats(results_dir='results'):
+    """stats.json を読み込む。なければ scores.csv から計算する"""
+    try:
+        with open(f'{results_dir}/stats.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return compute_stats_from_results(results_dir)
+
+
+def write_summary_stats(f, stats, topics=None, axes_data=None):
+    """summary.txt にスコア分布統計を書き出す
+
+    Args:
+        f: 書き込み先のファイルオブジェクト
+        stats: compute_stats() の結果
+        topics: topics.json の内容（トピック名の表示に使用）
+        axes_data: axes.json の内容（軸名の表示に使用）
+    """
+    topic_names = {t['id']: t['name'] for t in (topics or [])}
+    axis_names = {}
+    for topic_axes in (axes_data or {}).values():
+        for axis in topic_axes:
+            axis_names[axis['id']] = axis['name']
+
+    overall = stats['overall']
+    hist = overall['histogram']
+    f.write("スコア分布統計:\n")
+    if overall['scored'] > 0:
+        f.write(f"  平均: {overall['mean']:.2f}\n")
+        f.write(f"  中央値: {overall['median']:.1f}\n")
+        f.write(f"  標準偏差: {overall['std']:.2f}\n")
+        f.write(f"  左寄り(1-3): {overall['left']} 件\n")
+        f.write(f"    - 左極(1): {hist['1']} 件\n")
+        f.write(f"    - 左寄り強(2): {hist['2']} 件\n")
+        f.write(f"    - 左寄り弱(3): {hist['3']} 件\n")
+        f.write(f"  右寄り(4-6): {overall['right']} 件\n")
+        f.write(f"    - 右寄り弱(4): {hist['4']} 件\n")
+        f.write(f"    - 右寄り強(5): {hist['5']} 件\n")
+        f.write(f"    - 右極(6): {hist['6']} 件\n")
+    if overall['null'] > 0:
+        f.write(f"  該当なし: {overall['null']} 件\n")
+    f.write("\n")
+
+    f.write("トピック別スコア分布:\n")
+    for topic_id, s in stats['topics'].items():
+        name = topic_names.get(topic_id, '')
+        f.write(_format_group_line(f"[{topic_id}] {name}".rstrip(), s))
+    f.write("\n")
+
+    f.write("対立軸別スコア分布:\n")
+    for axis_id, s in stats['axes'].items():
+        name = axis_names.get(axis_id, '')
+        f.write(_format_group_line(f"[{axis_id}] {name}".rstrip(), s))
+
+
+def _format_group_line(label, s):
+    """トピック・軸ごとの1行サマリー"""
+    hist = '/'.join(str(s['histogram'][str(k)]) for k in range(SCORE_MIN, SCORE_MAX + 1))
+    mean = f"{s['mean']:.2f}" if s['mean'] is not None else '-'
+    median = f"{s['median']:.1f}" if s['median'] is not None else '-'
+    null_rate = f"{s['null_rate'] * 100:.0f}%" if s['null_rate'] is not None else '-'
+    return (f"  - {label}\n"
+            f"      左 {s['left']} / 右 {s['right']} / 該当なし {s['null']} ({null_rate})"
+            f" | 平均 {mean} 中央値 {median} | 分布(1-6) {hist}\n")
+
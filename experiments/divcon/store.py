@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 意見・スコアのインメモリストア
+
+パイプライン実行中の意見とスコアを列（array）単位で保持する。
+    - 意見ID・トピックID・軸IDは sys.intern した文字列（またはその整数コード）として1つだけ持つ
+    - コメント本文や軸名はスコアごとに複製せず、出力時に行番号・軸コードから引く
+    - トピック → 意見、軸 → スコアの索引を持ち、トピックや軸ごとの全件走査をしない
+
+スコアは統計・スコア行列・立場プロファイルに必要な数値列（スコア・確信度・票数）だけを持つ。
+excerpt・reasoning は scores.jsonl（divcon.sink）にだけ書き、scores.csv の外部マージ時にそこから読み戻す
+（Stage 5 と再スコアリングには stage4_scoring の戻り値をそのまま渡す）。
+スコア数が数百万件になっても、1件あたりの追加メモリは十数バイトの数値列のみ。
+"""
+
+import sys
+from array import array
+
+import numpy as np
+
+# 有効なスコアの範囲（stats・stages もここから読む。このモジュールは pandas を読み込まない）
+SCORE_MIN = 1
+SCORE_MAX = 6
+NULL_SCORE = 0  # スコアなし（null）の格納値（有効なスコアは SCORE_MIN-SCORE_MAX）
+
+
+class OpinionStore:
+    """意見の列ストア（トピック → 意見の索引付き）"""
+
+    def __init__(self, opinions):
+        """
+        Args:
+            opinions: 意見のリスト（id, comment を持つ dict。stage 関数にはこの dict をそのまま渡す）
+        """
+        self.records = opinions
+        self.ids = [sys.intern(str(op['id'])) for op in opinions]
+        self._row_by_id = {opinion_id: row for row, opinion_id in enumerate(self.ids)}
+
+        self.topic_ids = []  # トピックコード → トピックID
+        self._topic_code = {}
+        self._topic_codes = array('i', [-1]) * len(opinions)  # 行 → トピックコード（-1 = 未分類）
+        self._topic_counts = array('i')  # トピックコード → 件数
+        self._topic_index = None  # トピックコード → 行番号の配列（分類が変わったら作り直す）
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, opinion_id):
+        """意見IDの行番号を返す（存在しない場合は -1）"""
+        return self._row_by_id.get(str(opinion_id), -1)
+
+    def comment(self, row):
+        return self.records[row]['comment'] if row >= 0 else ''
+
+    def _code_for_topic(self, topic_id):
+        code = self._topic_code.get(topic_id)
+        if code is None:
+            code = len(self.topic_ids)
+            self.topic_ids.append(sys.intern(topic_id))
+            self._topic_code[topic_id] = code
+            self._topic_counts.append(0)
+        return code
+
+    def assign_topics(self, classifications, valid_topic_ids=None):
+        """分類結果（opinion_id, topic_id の dict のリスト）を反映する
+
+        Returns:
+            分類が変わったトピックIDの集合
+        """
+        changed = set()
+        for c in classifications:
+            row = self.row(c['opinion_id'])
+            topic_id = c['topic_id']
+            if row < 0 or topic_id is None or (valid_topic_ids is not None and topic_id not in valid_topic_ids):
+                continue
+            code = self._code_for_topic(topic_id)
+            old_code = self._topic_codes[row]
+            if old_code == code:
+                continue
+            if old_code >= 0:
+                self._topic_counts[old_code] -= 1
+                changed.add(self.topic_ids[old_code])
+            self._topic_codes[row] = code
+            self._topic_counts[code] += 1
+            changed.add(topic_id)
+        if changed:
+            self._topic_index = None
+        return changed
+
+    def topic_count(self, topic_id):
+        code = self._topic_code.get(topic_id)
+        return self._topic_counts[code] if code is not None else 0
+
+    def topic_rows(self, topic_id):
+        """トピックに属する意見の行番号（元データの順）"""
+        code = self._topic_code.get(topic_id)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        if self._topic_index is None:
+            codes = np.frombuffer(self._topic_codes, dtype=np.int32)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(self.topic_ids) + 1))
+            self._topic_index = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.topic_ids))]
+        return self._topic_index[code]
+
+    def topic_ids_of(self, rows):
+        """行番号の配列に対応するトピックID（未分類・未知の行は None）"""
+        codes = np.frombuffer(self._topic_codes, dtype=np.int32)
+        rows = np.asarray(rows)
+        row_codes = np.where(rows >= 0, codes[np.maximum(rows, 0)], -1)
+        return np.array(self.topic_ids + [None], dtype=object)[row_codes]  # -1 は末尾の None を指す
+
+    def topic_opinions(self, topic_id):
+        """トピックに属する意見（元の dict への参照のリスト）"""
+        return [self.records[row] for row in self.topic_rows(topic_id)]
+
+
+class ScoreStore:
+    """スコアの列ストア（軸 → スコアの索引付き）
+
+    スコアは軸単位で追加されるため、各軸のスコアは連続した区間 [start, stop) に並ぶ。
+    """
+
+    def __init__(self, opinion_store):
+        self.opinions = opinion_store
+        self._opinion_ids = []  # intern 済みの意見ID（LLM が返した未知のIDも保持する）
+        self._opinion_rows = array('i')  # 意見の行番号（-1 = 未知のID）
+        self._axis_codes = array('i')
+        self._scores = array('b')  # 1-6、NULL_SCORE = null
+        self._confidences = array('f')  # NaN = 未評価
+        self._votes = array('b')
+
+        self.axes = []  # 軸コード → 軸情報
+        self._axis_topics = []  # 軸コード → トピックID
+        self._axis_ranges = {}  # 軸ID → (start, stop)
+
+    def __len__(self):
+        return len(self._scores)
+
+    def add_axis_scores(self, axis, topic_id, scores):
+        """1軸分のスコア（stage4_scoring の戻り値）の数値列を追加する（excerpt・reasoning は保持しない）
+
+        topic_ids を持つ共有軸（divcon.axis_merge）の場合、topic_id は代表のトピックで、
+        scores.csv の topic_id は各意見のトピックになる。
+        """
+        if axis['id'] in self._axis_ranges:
+            raise ValueError(f"軸 [{axis['id']}] のスコアは追加済みです")
+        code = len(self.axes)
+        self.axes.append(axis)
+        self._axis_topics.append(sys.intern(topic_id))
+        start = len(self._scores)
+
+        for s in scores:
+            row = self.opinions.row(s['opinion_id'])
+            self._opinion_ids.append(self.opinions.ids[row] if row >= 0 else sys.intern(str(s['opinion_id'])))
+            self._opinion_rows.append(row)
+            self._axis_codes.append(code)
+            self._scores.append(NULL_SCORE if s['score'] is None else s['score'])
+            self._confidences.append(s.get('confidence', float('nan')))
+            self._votes.append(s.get('votes', 1))
+
+        self._axis_ranges[axis['id']] = (start, len(self._scores))
+
+    def axis_scores(self, axis_id):
+        """軸のスコアを dict のリストで返す（excerpt・reasoning は含まない。必要な場合は scores.jsonl を読む）"""
+        start, stop = self._axis_ranges.get(axis_id, (0, 0))
+        return [
+            {
+                'opinion_id': self._opinion_ids[i],
+                'score': None if self._scores[i] == NULL_SCORE else self._scores[i],
+                'confidence': self._confidences[i],
+                'votes': self._votes[i],
+            }
+            for i in range(start, stop)
+        ]
+
+    def axis_arrays(self, axis_id):
+        """軸のスコアを (意見の行番号, スコア) の配列で返す（コピーなし。スコアは 1-6、NULL_SCORE = null）"""
+        start, stop = self._axis_ranges.get(axis_id, (0, 0))
+        rows = np.frombuffer(self._opinion_rows, dtype=np.int32)[start:stop]
+        scores = np.frombuffer(self._scores, dtype=np.int8)[start:stop]
+        return rows, scores
+
+    def to_dataframe(self, columns=None):
+        """scores.csv の excerpt・reasoning 以外の列の DataFrame を返す（comment・axis_name はここで初めて展開する）
+
+        Args:
+            columns: 返す列（None の場合はすべて。統計の計算には topic_id・axis_id・score だけで足りる）
+        """
+        import pandas as pd
+
+        rows = np.frombuffer(self._opinion_rows, dtype=np.int32)
+        axis_codes = np.frombuffer(self._axis_codes, dtype=np.int32)
+
+        def comment_column():
+            comments = np.array([op['comment'] for op in self.opinions.records] + [''], dtype=object)
+            return comments[rows]  # 行番号 -1 は末尾の '' を指す
+
+        def topic_column():
+            topic_col = np.array(self._axis_topics, dtype=object)[axis_codes]
+            # トピック横断の共有軸（divcon.axis_merge）は、各意見が分類されたトピックを使う
+            shared = np.array([len(axis.get('topic_ids', ())) > 1 for axis in self.axes], dtype=bool)[axis_codes]
+            if shared.any():
+                opinion_topics = self.opinions.topic_ids_of(rows[shared])
+                topic_col[shared] = np.where(opinion_topics == None, topic_col[shared], opinion_topics)  # noqa: E711
+            return topic_col
+
+        def score_column():
+            scores = np.frombuffer(self._scores, dtype=np.int8).astype(np.float64)
+            scores[scores == NULL_SCORE] = np.nan
+            return scores
+
+        builders = {
+            'opinion_id': lambda: self._opinion_ids,
+            'comment': comment_column,
+            'topic_id': topic_column,
+            'axis_id': lambda: np.array([axis['id'] for axis in self.axes], dtype=object)[axis_codes],
+            'axis_name': lambda: np.array([axis['name'] for axis in self.axes], dtype=object)[axis_codes],
+            'score': score_column,
+            'confidence': lambda: np.frombuffer(self._confidences, dtype=np.float32).round(2),
+            'votes': lambda: np.frombuffer(self._votes, dtype=np.int8),
+        }
+        return pd.DataFrame({name: builders[name]() for name in (columns or builders)})
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 品質とスループットのスイープ
+正解ラベル付きの小さなデータセットで、Stage 2（分類）と Stage 4（スコアリング）を
+バッチサイズ・モデル・推論の強度の組み合わせごとに実行し、品質と速度・コストを比べる
+
+使用方法:
+    divcon sweep gold.json --batch-sizes 10,20,50 --efforts low,medium --min-quality 0.8
+
+正解ラベルのファイル（JSON）:
+    {
+        "opinions": [{"id": "1", "comment": "..."}, ...],
+        "topics": [...],                               # topics.json と同じ形式（Stage 2 用）
+        "topic_labels": {"1": "T1", ...},              # 意見ID → 正解のトピックID
+        "axes": [                                      # Stage 4 用（複数可）
+            {"axis": {...}, "anchors": {...},          # axes.json / anchors.json の1軸分
+             "labels": {"1": 3, "2": null, ...}}       # 意見ID → 正解のスコア（null = 該当なし）
+        ]
+    }
+
+指標:
+    - Stage 2: accuracy（正解のトピックに分類された割合。分類されなかった意見は不正解）
+    - Stage 4: quadratic-weighted kappa（正解・予測とも 1-6 の意見）、null の一致率、±1 以内の一致率
+    - 共通: 所要時間、スループット（意見数 / 秒）、リクエスト数、入出力トークン数、コスト（planner.MODEL_PRICES）
+品質は Stage 2 が accuracy、Stage 4 が kappa。速度と品質のパレート最適な組み合わせに * を付け、
+--min-quality を満たす中で最も速い組み合わせを推奨として表示する。
+
+キャッシュは無効にして実行する（同じリクエストがキャッシュから返ると速度を比較できないため）。
+"""
+
+import contextlib
+import io
+import itertools
+import json
+import math
+import time
+
+import numpy as np
+
+from . import llm
+from .config import configure, get_settings
+from .planner import estimate_cost
+
+SWEEP_STAGES = ('2', '4')
+DEFAULT_BATCH_SIZES = (10, 20, 50)
+SCORE_LEVELS = 6
+
+
+# ============================================================================
+# 指標
+# ============================================================================
+
+def quadratic_weighted_kappa(gold, predicted, levels=SCORE_LEVELS):
+    """1..levels のスコアの quadratic-weighted kappa（件数が足りない場合は NaN）"""
+    gold = np.asarray(gold, dtype=np.int64) - 1
+    predicted = np.asarray(predicted, dtype=np.int64) - 1
+    if len(gold) < 2:
+        return float('nan')
+    observed = np.zeros((levels, levels))
+    np.add.at(observed, (gold, predicted), 1)
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / len(gold)
+    i, j = np.indices((levels, levels))
+    weights = (i - j) ** 2 / (levels - 1) ** 2
+    denominator = (weights * expected).sum()
+    if denominator == 0:
+        return 1.0 if (weights * observed).sum() == 0 else float('nan')
+    return float(1 - (weights * observed).sum() / denominator)
+
+
+def classification_metrics(opinions, topic_labels):
+    """Stage 2 の結果（topic_id 付きの意見）を正解と比べる"""
+    labelled = [op for op in opinions if str(op['id']) in topic_labels]
+    correct = sum(op.get('topic_id') == topic_labels[str(op['id'])] for op in labelled)
+    accuracy = correct / max(len(labelled), 1)
+    return {'quality': accuracy, 'accuracy': accuracy}
+
+
+def scoring_metrics(scores, labels):
+    """Stage 4 の結果を正解のスコアと比べる"""
+    predicted = {str(s['opinion_id']): s['score'] for s in scores}
+    ids = list(labels)
+    null_agree = sum((labels[i] is None) == (predicted.get(i) is None) for i in ids)
+    both = [(labels[i], predicted[i]) for i in ids if labels[i] is not None and predicted.get(i) is not None]
+    gold, pred = (list(t) for t in zip(*both)) if both else ([], [])
+    kappa = quadratic_weighted_kappa(gold, pred)
+    return {
+        'quality': kappa,
+        'kappa': kappa,
+        'null_agreement': null_agree / max(len(ids), 1),
+        'within_one': sum(abs(g - p) <= 1 for g, p in both) / max(len(both), 1),
+        'n_scored': len(both),
+    }
+
+
+# ============================================================================
+# 実行
+# ============================================================================
+
+def load_gold(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        gold = json.load(f)
+    gold['opinions'] = [dict(op, id=str(op['id'])) for op in gold['opinions']]
+    gold['topic_labels'] = {str(k): v for k, v in gold.get('topic_labels', {}).items()}
+    for entry in gold.get('axes', []):
+        entry['labels'] = {str(k): v for k, v in entry['labels'].items()}
+    return gold
+
+
+def _run_stage(stage, gold, batch_size):
+    """1つの組み合わせで Stage を実行し、品質の指標を返す"""
+    from .stages import stage2_classification, stage4_scoring
+
+    if stage == '2':
+        opinions = [dict(op) for op in gold['opinions']]
+        classified = stage2_classification(opinions, gold['topics'], batch_size=batch_size)
+        return len(opinions), classification_metrics(classified, gold['topic_labels'])
+
+    # Stage 4: 軸ごとのスコアをまとめて評価する
+    by_id = {op['id']: op for op in gold['opinions']}
+    all_scores = []
+    all_labels = {}
+    n = 0
+    for k, entry in enumerate(gold['axes']):
+        opinions = [by_id[i] for i in entry['labels'] if i in by_id]
+        scores = stage4_scoring(entry['axis'], entry['anchors'], opinions, batch_size=batch_size)
+        # 軸をまたいで同じ意見IDがあっても区別できるように、軸番号を付けて集計する
+        all_scores.extend(dict(s, opinion_id=f"{k}:{s['opinion_id']}") for s in scores)
+        all_labels.update({f"{k}:{i}": entry['labels'][i] for i in entry['labels'] if i in by_id})
+        n += len(opinions)
+    return n, scoring_metrics(all_scores, all_labels)
+
+
+def run_sweep(gold_path, stages=SWEEP_STAGES, batch_sizes=DEFAULT_BATCH_SIZES, models=None, efforts=None,
+              verbose=False):
+    """全組み合わせを実行して結果のリストを返す
+
+    Args:
+        gold_path: 正解ラベルのファイル
+        stages: 実行する Stage（'2', '4'）
+        batch_sizes: バッチサイズの候補
+        models: モデルの候補（None の場合は現在の設定）
+        efforts: 推論の強度の候補（None の場合は現在の設定）
+        verbose: True の場合、各 Stage の出力を表示する
+    """
+    gold = load_gold(gold_path)
+    original = get_settings()
+    models = models or [original.model]
+    efforts = efforts or [original.reasoning_effort]
+
+    records = []
+    try:
+        for stage, model, effort, batch_size in itertools.product(stages, models, efforts, batch_sizes):
+            if stage == '2' and not gold.get('topic_labels'):
+                continue
+            if stage == '4' and not gold.get('axes'):
+                continue
+            configure(model=model, reasoning_effort=effort, cache_dir=None)
+            name = f"sweep/stage{stage}/{model}/{effort}/b{batch_size}"
+            print(f"  [Stage {stage}] model={model} effort={effort} batch_size={batch_size} ...", flush=True)
+
+            start = time.monotonic()
+            output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+            with llm.run_scope(name), output:
+                n, quality = _run_stage(stage, gold, batch_size)
+            seconds = time.monotonic() - start
+
+            usage = llm.get_usage().get(name, {})
+            input_tokens = usage.get('input_tokens', 0)
+            output_tokens = usage.get('output_tokens', 0)
+            records.append({
+                'stage': stage,
+                'model': model,
+                'reasoning_effort': effort,
+                'batch_size': batch_size,
+                **quality,
+                'seconds': round(seconds, 2),
+                'throughput': round(n / seconds, 2) if seconds > 0 else None,
+                'requests': usage.get('requests', 0),
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'cost_usd': estimate_cost(model, input_tokens, output_tokens),
+            })
+    finally:
+        configure(model=original.model, reasoning_effort=original.reasoning_effort, cache_dir=original.cache_dir)
+
+    mark_pareto(records)
+    return records
+
+
+def mark_pareto(records):
+    """Stage ごとに、所要時間と品質のパレート最適な組み合わせに pareto=True を付ける"""
+    valid = [r for r in records if not math.isnan(r['quality'])]
+    for record in records:
+        record['pareto'] = not math.isnan(record['quality']) and not any(
+            other is not record and other['stage'] == record['stage']
+            and other['seconds'] <= record['seconds'] and other['quality'] >= record['quality']
+            and (other['seconds'] < record['seconds'] or other['quality'] > record['quality'])
+            for other in valid
+        )
+
+
+def recommend(records, stage, min_quality):
+    """品質が min_quality 以上の中で最も速い組み合わせ（なければ None）"""
+    candidates = [r for r in records if r['stage'] == stage and r['quality'] >= min_quality]
+    return min(candidates, key=lambda r: r['seconds']) if candidates else None
+
+
+def print_table(records, min_quality=None):
+    """Stage ごとの結果を所要時間の順に表示する（* はパレート最適）"""
+    quality_names = {'2': 'accuracy', '4': 'kappa'}
+    for stage in SWEEP_STAGES:
+        rows = sorted((r for r in records if r['stage'] == stage), key=lambda r: r['seconds'])
+        if not rows:
+            continue
+        print(f"\nStage {stage}（品質 = {quality_names[stage]}、* はパレート最適）")
+        print(f"  {'':1} {'model':<14} {'effort':<8} {'batch':>5} {'品質':>7} {'秒':>8} {'件/秒':>7} "
+              f"{'req':>5} {'入力tok':>9} {'出力tok':>9} {'コスト':>9}")
+        for r in rows:
+            cost = '-' if r['cost_usd'] is None else f"${r['cost_usd']:.4f}"
+            print(f"  {'*' if r['pareto'] else ' '} {r['model']:<14} {r['reasoning_effort']:<8} {r['batch_size']:>5} "
+                  f"{r['quality']:>7.3f} {r['seconds']:>8.1f} {r['throughput'] or 0:>7.1f} {r['requests']:>5} "
+                  f"{r['input_tokens']:>9,} {r['output_tokens']:>9,} {cost:>9}")
+        if min_quality is not None:
+            best = recommend(records, stage, min_quality)
+            if best is None:
+                print(f"  [WARNING] 品質 {min_quality} を満たす組み合わせがありません")
+            else:
+                print(f"  推奨: model={best['model']} effort={best['reasoning_effort']} batch_size={best['batch_size']}"
+                      f"（品質 {best['quality']:.3f}、{best['seconds']:.1f} 秒）")
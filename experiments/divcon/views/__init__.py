@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon HTMLビュー生成
+
+    - two_pane: 2ペイン対立ビュー（左寄り 1-3 / 右寄り 4-6）
+    - list_view: フィルタリング・検索可能なリストビュー
+
+generate_all は結果ディレクトリを一度だけ読み込み（ViewModel）、全ビューを同じ
+シリアライズ済みデータから描画する。出力は次のように書き込む:
+    - 内容が変わったファイルだけを書き換える（docs/ のコピーも同様）
+    - 各ファイルの隣に gzip（.gz）と brotli（.br、brotli がインストールされている場合）の圧縮版を置く
+    - 入力（結果ファイルとビューのコード）が前回から変わっていなければ描画そのものを省略する
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+
+# 入力のフィンガープリントを保存するファイル（結果ディレクトリ内）
+STAMP_FILENAME = '.views_stamp.json'
+
+# ビュー → (結果ディレクトリの出力名, docs の出力名)
+OUTPUTS = {
+    'two_pane': ('two_pane_view.html', 'index.html'),
+    'list_view': ('list_view.html', 'list.html'),
+}
+
+
+def _compressors():
+    """(拡張子, 圧縮関数) のリスト。brotli は入っている場合のみ"""
+    compressors = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    try:
+        import brotli
+    except ImportError:
+        return compressors
+    compressors.append(('.br', lambda data: brotli.compress(data, mode=brotli.MODE_TEXT)))
+    return compressors
+
+
+def _write_if_changed(path, data):
+    """内容が変わった場合だけ書き込む。書き込んだら True"""
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def write_output(path, data):
+    """ファイルと圧縮版を書き込む（内容が同じファイルは書き換えない）
+
+    Returns:
+        書き込んだファイル数
+    """
+    path = Path(path)
+    written = int(_write_if_changed(path, data))
+    for suffix, compress in _compressors():
+        sibling = path.with_name(path.name + suffix)
+        # 元ファイルが変わっていなければ、圧縮版は存在するかだけを確認する
+        if written or not sibling.exists():
+            written += _write_if_changed(sibling, compress(data))
+    return written
+
+
+def input_fingerprint(results_dir, output_paths):
+    """結果ファイル・ビューのコード・出力先からフィンガープリントを作る"""
+    from .model import SOURCE_FILES
+
+    digest = hashlib.sha256()
+    for name in SOURCE_FILES:
+        path = Path(results_dir) / name
+        digest.update(name.encode('utf-8'))
+        if path.exists():
+            digest.update(hashlib.sha256(path.read_bytes()).digest())
+    for module_path in sorted(Path(__file__).parent.glob('*.py')):
+        digest.update(module_path.read_bytes())
+    for path in output_paths:
+        digest.update(str(path).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def generate_all(results_dir='results', docs_dir=None, force=False):
+    """全ビューを生成し、docs_dir が指定されていれば GitHub Pages 用にも書き出す
+
+    Args:
+        results_dir: 結果ディレクトリ
+        docs_dir: docs ディレクトリ（None の場合は書き出さない）
+        force: True の場合、入力が変わっていなくても描画し直す
+    """
+    from . import list_view, two_pane
+    from .model import ViewModel
+
+    results_dir = Path(results_dir)
+    targets = {name: [results_dir / results_name] for name, (results_name, _) in OUTPUTS.items()}
+    if docs_dir is not None:
+        docs_dir = Path(docs_dir)
+        docs_dir.mkdir(exist_ok=True)
+        for name, (_, docs_name) in OUTPUTS.items():
+            targets[name].append(docs_dir / docs_name)
+    outputs = [path for paths in targets.values() for path in paths]
+
+    stamp_path = results_dir / STAMP_FILENAME
+    fingerprint = input_fingerprint(results_dir, outputs)
+    if not force and all(path.exists() for path in outputs):
+        try:
+            with open(stamp_path, 'r', encoding='utf-8') as f:
+                up_to_date = json.load(f).get('fingerprint') == fingerprint
+        except (OSError, ValueError):
+            up_to_date = False
+        if up_to_date:
+            print(f"[OK] HTMLビューは最新です（入力に変更なし）")
+            return
+
+    model = ViewModel(results_dir)
+    renderers = {'two_pane': two_pane.render, 'list_view': list_view.render}
+
+    written = 0
+    for name, render in renderers.items():
+        print(f"  - {name} 生成中...")
+        data = render(model).encode('utf-8')
+        for path in targets[name]:
+            written += write_output(path, data)
+
+    with open(stamp_path, 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': fingerprint}, f)
+
+    print(f"[OK] HTMLビュー生成完了（書き込み {written} ファイル）")
+    print(f"   総意見数: {model.n_scores} 件 / トピック数: {len(model.topics)} 個 / 対立軸数: {len(model.axes)} 個")
+    for path in outputs:
+        print(f"  - {path}")
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon ビューのフィルター・ソート（Web Worker）
+
+静的なビューでは、フィルターとソートを Web Worker で行い、メインスレッドは
+表示する分の行番号（ウィンドウ）だけを受け取って描画する。データが大きくても
+入力や軸の切り替えで画面が固まらない。
+
+    - FILTER_WORKER_JS: Worker の本体。<script id="filterWorkerSource"> として埋め込み、
+      同じテキストから Blob URL で Worker を起動する（メインスレッドでも関数が定義されるので、
+      Worker が使えない環境ではそのまま同期実行にフォールバックする）
+    - FILTER_CLIENT_JS: メインスレッド側。COLUMNS_JS の列から型付き配列を作って Worker に渡す
+
+Worker が持つ索引:
+    - 軸・トピックごとの行番号（計数ソートで作る Int32Array。フィルター時はその範囲だけを走査する）
+    - キーワード検索用の小文字化したテキスト（初回検索時に作る）
+2ペインの左右の並べ替えはスコア（1-6）の計数ソートで行う（同じスコア内は元の順）。
+"""
+
+FILTER_WORKER_JS = """
+        // ---- フィルター・ソート（Worker とメインスレッドで共通） ----
+        function groupRows(codes, length) {
+            // codes の値ごとに行番号をまとめる（計数ソート。各グループ内は元の順）
+            let n = 0;
+            for (let i = 0; i < length; i++) if (codes[i] + 1 > n) n = codes[i] + 1;
+            const start = new Int32Array(n + 1);
+            for (let i = 0; i < length; i++) start[codes[i] + 1]++;
+            for (let c = 0; c < n; c++) start[c + 1] += start[c];
+            const rows = new Int32Array(length);
+            const next = start.slice(0, n);
+            for (let i = 0; i < length; i++) rows[next[codes[i]]++] = i;
+            return { start, rows };
+        }
+
+        function groupOf(group, code) {
+            if (code < 0 || code + 1 >= group.start.length) return new Int32Array(0);
+            return group.rows.subarray(group.start[code], group.start[code + 1]);
+        }
+
+        function buildIndex(data) {
+            return Object.assign({}, data, {
+                byAxis: groupRows(data.axis, data.length),
+                byTopic: groupRows(data.topic, data.length),
+                searchTexts: null,
+            });
+        }
+
+        function indexSearchText(index, i) {
+            if (!index.searchTexts) index.searchTexts = new Array(index.length);
+            let text = index.searchTexts[i];
+            if (text === undefined) {
+                text = index.searchTexts[i] =
+                    (index.comment[index.opinion[i]] + ' ' + index.excerpt[i] + ' ' + index.reasoning[i]).toLowerCase();
+            }
+            return text;
+        }
+
+        function sortByScore(index, rows, order) {
+            // order のスコア順に並べる（計数ソート）
+            const counts = new Int32Array(7);
+            for (let k = 0; k < rows.length; k++) counts[index.score[rows[k]]]++;
+            const offsets = new Int32Array(7);
+            let total = 0;
+            for (const s of order) {
+                offsets[s] = total;
+                total += counts[s];
+            }
+            const sorted = new Int32Array(total);
+            for (let k = 0; k < rows.length; k++) {
+                const s = index.score[rows[k]];
+                if (order.includes(s)) sorted[offsets[s]++] = rows[k];
+            }
+            return sorted;
+        }
+
+        function runQuery(index, q) {
+            // q: {topic, axis, score, profile: 辞書の番号・スコア・プロファイル番号（null = 指定なし）, text, split, reversed}
+            let base = null;
+            if (q.axis !== null) base = groupOf(index.byAxis, q.axis);
+            else if (q.topic !== null) base = groupOf(index.byTopic, q.topic);
+            const n = base ? base.length : index.length;
+
+            const matched = new Int32Array(n);
+            let m = 0;
+            for (let k = 0; k < n; k++) {
+                const i = base ? base[k] : k;
+                if (q.topic !== null && index.topic[i] !== q.topic) continue;
+                if (q.axis !== null && index.axis[i] !== q.axis) continue;
+                if (q.score !== null && index.score[i] !== q.score) continue;
+                if (q.profile !== null && index.opinionProfile[index.opinion[i]] !== q.profile) continue;
+                if (q.text && !indexSearchText(index, i).includes(q.text)) continue;
+                matched[m++] = i;
+            }
+            const rows = matched.subarray(0, m);
+            if (!q.split) return { all: rows };
+
+            // 2ペイン: デフォルトは左 1,2,3 / 右 6,5,4、中間意見を中央にする場合は左 3,2,1 / 右 4,5,6
+            return {
+                left: sortByScore(index, rows, q.reversed ? [3, 2, 1] : [1, 2, 3]),
+                right: sortByScore(index, rows, q.reversed ? [4, 5, 6] : [6, 5, 4]),
+            };
+        }
+
+        function resultWindow(results, starts, size) {
+            // 結果ごとに [start, start + size) の行番号と総数を返す
+            const out = {};
+            for (const name in results) {
+                const start = starts[name] || 0;
+                out[name] = { total: results[name].length, rows: results[name].slice(start, start + size) };
+            }
+            return out;
+        }
+
+        if (typeof WorkerGlobalScope !== 'undefined' && self instanceof WorkerGlobalScope) {
+            let index = null;
+            let results = {};
+            self.onmessage = event => {
+                const m = event.data;
+                if (m.type === 'init') {
+                    index = buildIndex(m.data);
+                    return;
+                }
+                if (m.type === 'query') {
+                    results = runQuery(index, m.query);
+                }
+                self.postMessage({ seq: m.seq, generation: m.generation, window: resultWindow(results, m.starts || {}, m.size) });
+            };
+        }
+"""
+
+FILTER_CLIENT_JS = """
+        // ---- フィルター・ソートの呼び出し（Worker があれば Worker、なければ同期実行） ----
+        const FILTER_WINDOW = 200;  // 1回に描画する行数（結果ごと）
+
+        function createFilterEngine(withText) {
+            // 列から型付き配列を作る（Worker には所有権ごと渡す）
+            const data = {
+                length: scoreData.length,
+                score: Int8Array.from(cols.score),
+                topic: Int32Array.from(cols.topic),
+                axis: Int32Array.from(cols.axis),
+                opinion: Int32Array.from(cols.opinion),
+                // 意見 → スタンス・プロファイルの番号（-1 = なし）
+                opinionProfile: Int32Array.from(dicts.opinion_id,
+                    (_, code) => code < dicts.opinion_profile.length ? dicts.opinion_profile[code] : -1),
+                comment: withText ? dicts.comment : [],
+                excerpt: withText ? cols.excerpt : [],
+                reasoning: withText ? cols.reasoning : [],
+            };
+            const transfer = [data.score.buffer, data.topic.buffer, data.axis.buffer, data.opinion.buffer,
+                              data.opinionProfile.buffer];
+
+            let seq = 0;
+            let generation = 0;  // query のたびに増やす（古い結果の判定用）
+            let worker = null;
+            const pending = new Map();
+            try {
+                const source = document.getElementById('filterWorkerSource').textContent;
+                worker = new Worker(URL.createObjectURL(new Blob([source], { type: 'text/javascript' })));
+                worker.onmessage = event => {
+                    const resolve = pending.get(event.data.seq);
+                    pending.delete(event.data.seq);
+                    // フィルターが変わった後に届いた古い結果は null にする
+                    if (resolve) resolve(event.data.generation === generation ? event.data.window : null);
+                };
+                worker.postMessage({ type: 'init', data }, transfer);
+            } catch (e) {
+                worker = null;
+            }
+
+            // Worker が使えない場合（古いブラウザなど）はメインスレッドで実行する
+            const index = worker ? null : buildIndex(data);
+            let results = {};
+
+            function send(message) {
+                message.seq = ++seq;
+                message.generation = message.type === 'query' ? ++generation : generation;
+                if (!worker) {
+                    if (message.type === 'query') results = runQuery(index, message.query);
+                    return Promise.resolve(resultWindow(results, message.starts || {}, message.size));
+                }
+                return new Promise(resolve => {
+                    pending.set(message.seq, resolve);
+                    worker.postMessage(message);
+                });
+            }
+
+            return {
+                query: query => send({ type: 'query', query, size: FILTER_WINDOW }),
+                more: starts => send({ type: 'window', starts, size: FILTER_WINDOW }),
+            };
+        }
+"""
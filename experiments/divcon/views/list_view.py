@@ -0,0 +1,736 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon リストビュー HTML 生成スクリプト
+意見をフィルタリング・検索可能なリストビューとして表示
+"""
+
+import json
+
+from .filter_worker import FILTER_CLIENT_JS, FILTER_WORKER_JS
+from .model import COLUMNS_JS
+
+
+def render(model, api_base=None):
+    """リストビューの HTML を文字列で返す
+
+    Args:
+        model: ViewModel
+        api_base: 結果サーバーの API パス（指定するとスコアを埋め込まず API から取得する）
+    """
+    topic_map = model.topic_map
+    topics = model.topics
+    axes = model.axes
+    axis_label = model.axis_label
+
+    # 列形式のスコア（JavaScriptで使用。全ビューで共有）
+    data_json = model.empty_data_json if api_base else model.data_json
+    stats_json = model.stats_json
+    profiles_json = model.profiles_json
+    axis_map_json = model.axis_map_json
+    api_base_json = json.dumps(api_base)
+
+    html_content = f"""<!DOCTYPE html>
+<html lang="ja">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>DivCon 意見リストビュー</title>
+    <style>
+        * {{
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }}
+
+        body {{
+            font-family: 'Segoe UI', 'Yu Gothic', 'Meiryo', sans-serif;
+            background: #f5f5f5;
+            color: #333;
+            line-height: 1.6;
+        }}
+
+        .container {{
+            max-width: 1400px;
+            margin: 0 auto;
+            padding: 20px;
+        }}
+
+        header {{
+            background: white;
+            padding: 30px;
+            margin-bottom: 30px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }}
+
+        h1 {{
+            color: #2c3e50;
+            margin-bottom: 10px;
+            font-size: 28px;
+        }}
+
+        .subtitle {{
+            color: #7f8c8d;
+            font-size: 14px;
+        }}
+
+        .filters {{
+            background: white;
+            padding: 20px;
+            margin-bottom: 20px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+            display: flex;
+            flex-wrap: wrap;
+            gap: 15px;
+            align-items: center;
+        }}
+
+        .filter-group {{
+            display: flex;
+            flex-direction: column;
+            gap: 5px;
+        }}
+
+        .filter-group label {{
+            font-size: 12px;
+            color: #7f8c8d;
+            font-weight: 600;
+        }}
+
+        select, input[type="text"] {{
+            padding: 8px 12px;
+            border: 1px solid #ddd;
+            border-radius: 4px;
+            font-size: 14px;
+            min-width: 200px;
+        }}
+
+        input[type="text"] {{
+            min-width: 300px;
+        }}
+
+        .stats {{
+            background: white;
+            padding: 15px 20px;
+            margin-bottom: 20px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+        }}
+
+        .stats-text {{
+            color: #7f8c8d;
+            font-size: 14px;
+        }}
+
+        .stats-number {{
+            color: #2c3e50;
+            font-weight: 600;
+            font-size: 18px;
+        }}
+
+        .opinion-card {{
+            background: white;
+            padding: 20px;
+            margin-bottom: 15px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+            border-left: 4px solid #3498db;
+            transition: box-shadow 0.2s;
+        }}
+
+        .opinion-card:hover {{
+            box-shadow: 0 4px 8px rgba(0,0,0,0.15);
+        }}
+
+        .opinion-card.score-1 {{ border-left-color: #c0392b; }}
+        .opinion-card.score-2 {{ border-left-color: #e74c3c; }}
+        .opinion-card.score-3 {{ border-left-color: #e67e22; }}
+        .opinion-card.score-4 {{ border-left-color: #3498db; }}
+        .opinion-card.score-5 {{ border-left-color: #8e44ad; }}
+        .opinion-card.score-6 {{ border-left-color: #6c3483; }}
+        .opinion-card.score-null {{ border-left-color: #95a5a6; }}
+
+        .opinion-header {{
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            margin-bottom: 12px;
+            flex-wrap: wrap;
+            gap: 10px;
+        }}
+
+        .opinion-id {{
+            font-size: 12px;
+            color: #95a5a6;
+            font-weight: 600;
+        }}
+
+        .badges {{
+            display: flex;
+            gap: 8px;
+            flex-wrap: wrap;
+        }}
+
+        .badge {{
+            padding: 4px 10px;
+            border-radius: 12px;
+            font-size: 11px;
+            font-weight: 600;
+            color: white;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+            max-width: 300px;
+        }}
+
+        .badge-topic {{
+            background: #3498db;
+        }}
+
+        .badge-confidence {{
+            background: #f39c12;
+        }}
+
+        .badge-profile {{
+            background: #16a085;
+        }}
+
+        .badge-score {{
+            background: #2ecc71;
+        }}
+
+        .badge-score.score-1 {{ background: #c0392b; }}
+        .badge-score.score-2 {{ background: #e74c3c; }}
+        .badge-score.score-3 {{ background: #e67e22; }}
+        .badge-score.score-4 {{ background: #3498db; }}
+        .badge-score.score-5 {{ background: #8e44ad; }}
+        .badge-score.score-6 {{ background: #6c3483; }}
+        .badge-score.score-null {{ background: #95a5a6; }}
+
+        .axis-name {{
+            font-size: 14px;
+            color: #7f8c8d;
+            margin-bottom: 10px;
+            font-weight: 500;
+        }}
+
+        .excerpt {{
+            background: #f8f9fa;
+            padding: 12px 15px;
+            border-radius: 4px;
+            margin-bottom: 10px;
+            font-size: 14px;
+            color: #2c3e50;
+            border-left: 3px solid #3498db;
+            font-weight: 500;
+        }}
+
+        .comment {{
+            font-size: 13px;
+            color: #555;
+            line-height: 1.8;
+            margin-bottom: 10px;
+        }}
+
+        .reasoning {{
+            font-size: 12px;
+            color: #7f8c8d;
+            padding: 10px;
+            background: #f8f9fa;
+            border-radius: 4px;
+            margin-top: 10px;
+        }}
+
+        .reasoning-label {{
+            font-weight: 600;
+            color: #95a5a6;
+            margin-bottom: 5px;
+        }}
+
+        .no-results {{
+            text-align: center;
+            padding: 60px 20px;
+            color: #95a5a6;
+            font-size: 16px;
+        }}
+
+        .legend {{
+            background: white;
+            padding: 15px 20px;
+            margin-bottom: 20px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }}
+
+        .legend-title {{
+            font-size: 12px;
+            color: #7f8c8d;
+            font-weight: 600;
+            margin-bottom: 10px;
+        }}
+
+        .legend-items {{
+            display: flex;
+            gap: 15px;
+            flex-wrap: wrap;
+        }}
+
+        .legend-item {{
+            display: flex;
+            align-items: center;
+            gap: 8px;
+            font-size: 12px;
+            color: #555;
+        }}
+
+        .legend-color {{
+            width: 20px;
+            height: 12px;
+            border-radius: 2px;
+        }}
+
+        button {{
+            padding: 8px 16px;
+            background: #3498db;
+            color: white;
+            border: none;
+            border-radius: 4px;
+            cursor: pointer;
+            font-size: 14px;
+            font-weight: 600;
+        }}
+
+        button:hover {{
+            background: #2980b9;
+        }}
+
+        .load-more {{
+            text-align: center;
+            margin: 20px 0;
+        }}
+
+        .profile-panel {{
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(260px, 1fr));
+            gap: 12px;
+            margin-bottom: 20px;
+        }}
+
+        .profile-card {{
+            background: white;
+            padding: 15px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+            border-top: 3px solid #16a085;
+            cursor: pointer;
+        }}
+
+        .profile-card.selected {{
+            background: #e8f8f5;
+        }}
+
+        .profile-name {{
+            font-weight: 600;
+            color: #2c3e50;
+            margin-bottom: 4px;
+        }}
+
+        .profile-size {{
+            font-size: 12px;
+            color: #7f8c8d;
+            margin-bottom: 8px;
+        }}
+
+        .profile-description {{
+            font-size: 13px;
+            color: #555;
+            margin-bottom: 8px;
+        }}
+
+        .profile-axes {{
+            font-size: 12px;
+            color: #7f8c8d;
+            list-style: none;
+        }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <header>
+            <h1>DivCon 意見リストビュー</h1>
+            <div class="subtitle">エネルギー政策に関する市民意見の対立軸分析</div>
+        </header>
+
+        <div class="legend">
+            <div class="legend-title">スコア凡例（6段階評価）</div>
+            <div class="legend-items">
+                <div class="legend-item">
+                    <div class="legend-color" style="background: #c0392b;"></div>
+                    <span>1: 左極（最も強い）</span>
+                </div>
+                <div class="legend-item">
+                    <div class="legend-color" style="background: #e74c3c;"></div>
+                    <span>2: 左寄り（強）</span>
+                </div>
+                <div class="legend-item">
+                    <div class="legend-color" style="background: #e67e22;"></div>
+                    <span>3: 左寄り（弱）</span>
+                </div>
+                <div class="legend-item">
+                    <div class="legend-color" style="background: #3498db;"></div>
+                    <span>4: 右寄り（弱）</span>
+                </div>
+                <div class="legend-item">
+                    <div class="legend-color" style="background: #8e44ad;"></div>
+                    <span>5: 右寄り（強）</span>
+                </div>
+                <div class="legend-item">
+                    <div class="legend-color" style="background: #6c3483;"></div>
+                    <span>6: 右極（最も強い）</span>
+                </div>
+                <div class="legend-item">
+                    <div class="legend-color" style="background: #95a5a6;"></div>
+                    <span>該当なし</span>
+                </div>
+            </div>
+        </div>
+
+        <div class="filters">
+            <div class="filter-group">
+                <label>トピック</label>
+                <select id="topicFilter">
+                    <option value="">すべて</option>
+                    {' '.join(f'<option value="{t}">[{t}] {topic_map[t]}</option>' for t in topics)}
+                </select>
+            </div>
+
+            <div class="filter-group">
+                <label>対立軸</label>
+                <select id="axisFilter">
+                    <option value="">すべて</option>
+                    {' '.join(f'<option value="{a}">{axis_label(a)}</option>' for a in axes)}
+                </select>
+            </div>
+
+            <div class="filter-group">
+                <label>スコア</label>
+                <select id="scoreFilter">
+                    <option value="">すべて</option>
+                    <option value="1">1: 左極（最も強い）</option>
+                    <option value="2">2: 左寄り（強）</option>
+                    <option value="3">3: 左寄り（弱）</option>
+                    <option value="4">4: 右寄り（弱）</option>
+                    <option value="5">5: 右寄り（強）</option>
+                    <option value="6">6: 右極（最も強い）</option>
+                    <option value="該当なし">該当なし</option>
+                </select>
+            </div>
+
+            <div class="filter-group" id="profileFilterGroup" style="display: none;">
+                <label>スタンス・プロファイル</label>
+                <select id="profileFilter">
+                    <option value="">すべて</option>
+                </select>
+            </div>
+
+            <div class="filter-group">
+                <label>キーワード検索</label>
+                <input type="text" id="searchBox" placeholder="本文・excerpt・reasoning を検索...">
+            </div>
+
+            <button onclick="resetFilters()">リセット</button>
+        </div>
+
+        <div class="stats">
+            <span class="stats-text">表示中: <span class="stats-number" id="visibleCount">0</span> / <span id="totalCount">0</span> 件</span>
+            <span class="stats-text" id="groupStats"></span>
+        </div>
+
+        <div id="profilePanel" class="profile-panel" style="display: none;"></div>
+
+        <div id="opinionsList"></div>
+
+        <div id="loadMore" class="load-more" style="display: none;">
+            <button onclick="loadMore()">さらに読み込む</button>
+        </div>
+
+        <div id="noResults" class="no-results" style="display: none;">
+            該当する意見が見つかりませんでした
+        </div>
+    </div>
+
+    <script id="filterWorkerSource">
+{FILTER_WORKER_JS}
+    </script>
+
+    <script>
+        const scoreData = {data_json};
+        const statsData = {stats_json};
+        // スタンス・プロファイル（profiles.json。code 順なので code が配列の添字になる）
+        const profilesData = {profiles_json};
+        const axisMap = {axis_map_json};
+        // divcon serve から配信された場合は API のパス（静的 HTML では null）
+        const API_BASE = {api_base_json};
+{COLUMNS_JS}
+{FILTER_CLIENT_JS}
+        // 静的 HTML ではフィルター・ソートを Worker で行う（API 版はサーバーで行う）
+        const engine = API_BASE ? null : createFilterEngine(true);
+        let filteredData = [];  // 表示中の行番号
+        let hasMore = false;
+        let nextCursor = null;
+        let matchedCount = null;
+        let requestSeq = 0;
+        let searchTimer = null;
+
+        // トピック・軸フィルターに対応する分布（stats.json）を表示
+        function renderGroupStats() {{
+            const topicFilter = document.getElementById('topicFilter').value;
+            const axisFilter = document.getElementById('axisFilter').value;
+            let groupStats = statsData.overall;
+
+            if (axisFilter) {{
+                groupStats = statsData.axes[axisFilter];
+                if (groupStats && topicFilter && groupStats.topic_id !== topicFilter) groupStats = null;
+            }} else if (topicFilter) {{
+                groupStats = statsData.topics[topicFilter];
+            }}
+
+            const el = document.getElementById('groupStats');
+            if (!groupStats) {{
+                el.textContent = '';
+                return;
+            }}
+            const mean = groupStats.mean === null ? '-' : groupStats.mean.toFixed(2);
+            const nullRate = groupStats.null_rate === null ? '-' : `${{Math.round(groupStats.null_rate * 100)}}%`;
+            el.textContent = `左寄り ${{groupStats.left}} 件 / 右寄り ${{groupStats.right}} 件 / 該当なし ${{groupStats.null}} 件 (${{nullRate}}) | 平均 ${{mean}}`;
+        }}
+
+        function confidenceBadge(i) {{
+            // 再スコアリングで票が割れたスコア（確信度 < 1）だけ表示する
+            const confidence = cols.confidence[i];
+            if (confidence === null || confidence === undefined || confidence >= 1) return '';
+            const title = cols.votes[i] > 1 ? `${{cols.votes[i]}} 回のスコアリングのうち同じスコアの割合` : 'ローカルモデルの確信度';
+            return `<span class="badge badge-confidence" title="${{title}}">確信度 ${{confidence.toFixed(2)}}</span>`;
+        }}
+
+        function profileBadge(i) {{
+            const code = profileOf(i);
+            if (code < 0) return '';
+            const profile = profilesData[code];
+            return `<span class="badge badge-profile" title="${{profile.description}}">${{profile.name}}</span>`;
+        }}
+
+        // 選択中のトピックのプロファイル（トピック未選択の場合は全トピック）
+        function visibleProfiles() {{
+            const topicFilter = document.getElementById('topicFilter').value;
+            return profilesData.filter(p => !topicFilter || p.topic_id === topicFilter);
+        }}
+
+        function renderProfileOptions() {{
+            // API 版はプロファイルでの絞り込みに対応しない
+            const group = document.getElementById('profileFilterGroup');
+            group.style.display = profilesData.length && !API_BASE ? '' : 'none';
+            const select = document.getElementById('profileFilter');
+            const current = select.value;
+            const topicFilter = document.getElementById('topicFilter').value;
+            const profiles = visibleProfiles();
+            select.innerHTML = '<option value="">すべて</option>' + profiles.map(p =>
+                `<option value="${{p.code}}">${{topicFilter ? '' : `[${{p.topic_id}}] `}}${{p.name}} (${{p.size}} 件)</option>`
+            ).join('');
+            select.value = profiles.some(p => String(p.code) === current) ? current : '';
+        }}
+
+        function renderProfilePanel() {{
+            // トピックを選択したときだけ、そのトピックのプロファイルを一覧表示する
+            const panel = document.getElementById('profilePanel');
+            const profiles = document.getElementById('topicFilter').value && !API_BASE ? visibleProfiles() : [];
+            panel.style.display = profiles.length ? '' : 'none';
+            const selected = document.getElementById('profileFilter').value;
+            panel.innerHTML = profiles.map(p => `
+                <div class="profile-card ${{String(p.code) === selected ? 'selected' : ''}}" onclick="selectProfile(${{p.code}})">
+                    <div class="profile-name">${{p.name}}</div>
+                    <div class="profile-size">${{p.size}} 件（${{Math.round(p.share * 100)}}%）</div>
+                    ${{p.description ? `<div class="profile-description">${{p.description}}</div>` : ''}}
+                    <ul class="profile-axes">
+                        ${{p.axes.map(a => `<li>${{axisMap[a.axis_id] || a.axis_id}}: ${{a.mean === null ? '-' : a.mean.toFixed(1)}}</li>`).join('')}}
+                    </ul>
+                </div>
+            `).join('');
+        }}
+
+        function selectProfile(code) {{
+            const select = document.getElementById('profileFilter');
+            select.value = select.value === String(code) ? '' : String(code);
+            applyFilters();
+        }}
+
+        function renderOpinions(rows) {{
+            const container = document.getElementById('opinionsList');
+            const noResults = document.getElementById('noResults');
+
+            if (rows.length === 0) {{
+                container.innerHTML = '';
+                noResults.style.display = 'block';
+            }} else {{
+                noResults.style.display = 'none';
+                container.innerHTML = rows.map(i => {{
+                    const score = scoreOf(i);
+                    const scoreClass = score === null ? 'score-null' : `score-${{score}}`;
+                    const scoreDisplay = score === null ? '該当なし' : `スコア: ${{score}}`;
+                    const excerpt = cols.excerpt[i];
+
+                    return `
+                        <div class="opinion-card ${{scoreClass}}">
+                            <div class="opinion-header">
+                                <span class="opinion-id">ID: ${{opinionIdOf(i)}}</span>
+                                <div class="badges">
+                                    <span class="badge badge-topic">${{topicNameOf(i)}}</span>
+                                    <span class="badge badge-score ${{scoreClass}}">${{scoreDisplay}}</span>
+                                    ${{confidenceBadge(i)}}
+                                    ${{profileBadge(i)}}
+                                </div>
+                            </div>
+
+                            <div class="axis-name">${{axisNameOf(i)}}</div>
+
+                            ${{excerpt ? `<div class="excerpt">${{excerpt}}</div>` : ''}}
+
+                            <div class="comment">${{commentOf(i)}}</div>
+
+                            <div class="reasoning">
+                                <div class="reasoning-label">💭 判断理由</div>
+                                ${{cols.reasoning[i]}}
+                            </div>
+                        </div>
+                    `;
+                }}).join('');
+            }}
+
+            document.getElementById('visibleCount').textContent =
+                matchedCount === null ? rows.length : `${{rows.length}} (該当 ${{matchedCount}})`;
+            document.getElementById('totalCount').textContent = statsData.overall.total;
+            document.getElementById('loadMore').style.display = hasMore ? 'block' : 'none';
+            renderGroupStats();
+        }}
+
+        async function fetchPage(append) {{
+            const seq = ++requestSeq;
+            const scoreFilter = document.getElementById('scoreFilter').value;
+            const params = new URLSearchParams();
+            const filters = {{
+                topic_id: document.getElementById('topicFilter').value,
+                axis_id: document.getElementById('axisFilter').value,
+                score: scoreFilter === '該当なし' ? 'null' : scoreFilter,
+                q: document.getElementById('searchBox').value.trim(),
+                cursor: append ? nextCursor : '',
+            }};
+            for (const [key, value] of Object.entries(filters)) {{
+                if (value) params.set(key, value);
+            }}
+
+            const response = await fetch(`${{API_BASE}}/scores?${{params}}`);
+            const page = await response.json();
+            if (seq !== requestSeq) return;  // フィルターが変わった後に届いた古い応答は捨てる
+
+            if (!append) clearRecords();
+            const rows = appendRecords(page.items);
+            filteredData = append ? filteredData.concat(rows) : rows;
+            nextCursor = page.next_cursor;
+            hasMore = Boolean(nextCursor);
+            matchedCount = page.total_capped ? `${{page.total}}+` : page.total;
+            renderOpinions(filteredData);
+        }}
+
+        function showResult(result, append) {{
+            if (!result) return;  // 古いフィルターの結果
+            const rows = Array.from(result.all.rows);
+            filteredData = append ? filteredData.concat(rows) : rows;
+            matchedCount = result.all.total;
+            hasMore = filteredData.length < matchedCount;
+            renderOpinions(filteredData);
+        }}
+
+        function loadMore() {{
+            if (API_BASE) {{
+                if (nextCursor) fetchPage(true);
+                return;
+            }}
+            engine.more({{ all: filteredData.length }}).then(result => showResult(result, true));
+        }}
+
+        function applyFilters() {{
+            if (API_BASE) {{
+                fetchPage(false);
+                return;
+            }}
+
+            const topicFilter = document.getElementById('topicFilter').value;
+            const axisFilter = document.getElementById('axisFilter').value;
+            const scoreFilter = document.getElementById('scoreFilter').value;
+            const profileFilter = document.getElementById('profileFilter').value;
+            const searchText = document.getElementById('searchBox').value.toLowerCase();
+            renderProfilePanel();
+
+            // フィルター値を辞書の番号に変換して Worker に渡す（結果は先頭 FILTER_WINDOW 件の行番号）
+            engine.query({{
+                topic: topicFilter ? dictCode('topic_id', topicFilter) : null,
+                axis: axisFilter ? dictCode('axis_id', axisFilter) : null,
+                score: scoreFilter ? (scoreFilter === '該当なし' ? 0 : Number(scoreFilter)) : null,
+                profile: profileFilter ? Number(profileFilter) : null,
+                text: searchText,
+                split: false,
+            }}).then(result => showResult(result, false));
+        }}
+
+        function resetFilters() {{
+            document.getElementById('topicFilter').value = '';
+            document.getElementById('axisFilter').value = '';
+            document.getElementById('scoreFilter').value = '';
+            document.getElementById('searchBox').value = '';
+            renderProfileOptions();
+            applyFilters();
+        }}
+
+        // イベントリスナー
+        document.getElementById('topicFilter').addEventListener('change', () => {{
+            renderProfileOptions();
+            applyFilters();
+        }});
+        document.getElementById('axisFilter').addEventListener('change', applyFilters);
+        document.getElementById('scoreFilter').addEventListener('change', applyFilters);
+        document.getElementById('profileFilter').addEventListener('change', applyFilters);
+        document.getElementById('searchBox').addEventListener('input', () => {{
+            if (!API_BASE) return applyFilters();
+            // API 版は入力が止まってから検索する
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(applyFilters, 300);
+        }});
+
+        // 初期表示
+        renderProfileOptions();
+        applyFilters();
+    </script>
+</body>
+</html>"""
+
+    return html_content
+
+
+def generate_html(results_dir='results'):
+    from .model import ViewModel
+
+    model = ViewModel(results_dir)
+    html_content = render(model)
+
+    # HTMLファイルを保存
+    with open(f'{results_dir}/list_view.html', 'w', encoding='utf-8') as f:
+        f.write(html_content)
+
+    print(f"[OK] HTML生成完了: {results_dir}/list_view.html")
+    print(f"   総意見数: {model.n_scores} 件")
+    print(f"   トピック数: {len(model.topics)} 個")
+    print(f"   対立軸数: {len(model.axes)} 個")
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon ビューの共通データモデル
+
+各ビューが scores.csv・topics.json・axes.json などを個別に読み込み、同じマップと
+同じ JSON を作り直さないように、結果ディレクトリを一度だけ読み込んで共有する。
+埋め込み用の JSON は最初に使われたときに一度だけシリアライズする。
+
+スコアは列形式で埋め込む（行ごとの dict の配列にすると、トピック名・軸名・本文などの
+同じ文字列が軸の数だけ繰り返される）:
+    {
+        "length": 行数,
+        "columns": {
+            "opinion", "topic", "axis": dicts への番号,
+            "score": 0（該当なし）または 1-6,
+            "excerpt", "reasoning", "confidence", "votes": 行ごとの値
+        },
+        "dicts": {
+            "opinion_id", "comment": 意見（同じ番号で対応）,
+            "topic_id", "topic_name": トピック,
+            "axis_id", "axis_name": 対立軸,
+            "opinion_profile": 意見 → スタンス・プロファイルの番号（profiles.json の code、-1 = なし。
+                               --profiles を指定しなかった場合は空）
+        }
+    }
+ページ側は COLUMNS_JS の関数で行番号から各列を直接参照する。
+"""
+
+import json
+from functools import cached_property
+from pathlib import Path
+
+# ビューの入力になる結果ファイル（変更検知に使う）
+SOURCE_FILES = ('scores.csv', 'topics.json', 'axes.json', 'consensus.json', 'stats.json', 'axis_metrics.json',
+                'profiles.json', 'matrix/profiles.npy')
+
+NULL_SCORE = 0  # 列形式での「該当なし」
+
+COLUMNS = ('opinion', 'topic', 'axis', 'score', 'excerpt', 'reasoning', 'confidence', 'votes')
+DICTS = ('opinion_id', 'comment', 'topic_id', 'topic_name', 'axis_id', 'axis_name')
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _dumps_compact(data):
+    # <script> 内に埋め込むため '</' をエスケープする
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+def columnar_payload(scores_df, topic_map, axis_map, opinion_profiles=None):
+    """scores.csv の DataFrame を列形式・辞書エンコードのペイロードにする
+
+    Args:
+        opinion_profiles: 意見ID → スタンス・プロファイルの番号（None の場合は opinion_profile を空にする）
+    """
+    import numpy as np
+    import pandas as pd
+
+    if scores_df is None:
+        return {
+            'length': 0,
+            'columns': {name: [] for name in COLUMNS},
+            'dicts': dict({name: [] for name in DICTS}, opinion_profile=[]),
+        }
+
+    opinion_codes, opinion_ids = pd.factorize(scores_df['opinion_id'].astype(str))
+    comments = scores_df['comment'].fillna('').groupby(opinion_codes, sort=True).first()
+    topic_codes, topic_ids = pd.factorize(scores_df['topic_id'])
+    axis_codes, axis_ids = pd.factorize(scores_df['axis_id'])
+
+    def nullable(values):
+        return [None if pd.isna(v) else v for v in values]
+
+    return {
+        'length': len(scores_df),
+        'columns': {
+            'opinion': opinion_codes.tolist(),
+            'topic': topic_codes.tolist(),
+            'axis': axis_codes.tolist(),
+            'score': pd.to_numeric(scores_df['score'], errors='coerce').fillna(NULL_SCORE).astype(int).tolist(),
+            'excerpt': scores_df['excerpt'].fillna('').tolist(),
+            'reasoning': scores_df['reasoning'].fillna('').tolist(),
+            'confidence': nullable(np.round(scores_df['confidence'].astype(float), 2)),
+            'votes': scores_df['votes'].fillna(1).astype(int).tolist(),
+        },
+        'dicts': {
+            'opinion_id': list(opinion_ids),
+            'comment': comments.tolist(),
+            'topic_id': list(topic_ids),
+            'topic_name': [topic_map.get(t) for t in topic_ids],
+            'axis_id': list(axis_ids),
+            'axis_name': [axis_map.get(a) for a in axis_ids],
+            'opinion_profile': [] if opinion_profiles is None else [opinion_profiles.get(o, -1) for o in opinion_ids],
+        },
+    }
+
+
+# 列形式のスコアを参照するページ側の関数（scoreData に columnar_payload を埋め込んだ後に置く）
+COLUMNS_JS = """
+        // 列形式のスコア（行オブジェクトは作らず、行番号 i で各列を参照する）
+        const cols = scoreData.columns;
+        const dicts = scoreData.dicts;
+        const dictIndex = {};
+
+        function opinionIdOf(i) { return dicts.opinion_id[cols.opinion[i]]; }
+        function commentOf(i) { return dicts.comment[cols.opinion[i]]; }
+        function topicNameOf(i) { return dicts.topic_name[cols.topic[i]]; }
+        function axisNameOf(i) { return dicts.axis_name[cols.axis[i]]; }
+        function scoreOf(i) { return cols.score[i] || null; }  // 0 は該当なし
+        function profileOf(i) {
+            // スタンス・プロファイルの番号（-1 = なし。API 版で追加した意見は -1）
+            const code = dicts.opinion_profile[cols.opinion[i]];
+            return code === undefined ? -1 : code;
+        }
+
+        // 辞書の値 → 番号（フィルター用。辞書にない値は -1）
+        function dictCode(name, value) {
+            if (!dictIndex[name]) {
+                dictIndex[name] = new Map(dicts[name].map((v, code) => [v, code]));
+            }
+            const code = dictIndex[name].get(value);
+            return code === undefined ? -1 : code;
+        }
+
+        function internValue(name, value, partner, partnerValue) {
+            let code = dictCode(name, value);
+            if (code < 0) {
+                code = dicts[name].length;
+                dicts[name].push(value);
+                dicts[partner].push(partnerValue);
+                dictIndex[name].set(value, code);
+            }
+            return code;
+        }
+
+        // API（divcon serve）のレコードを列に追加し、追加した行番号を返す
+        function appendRecords(items) {
+            return items.map(item => {
+                cols.opinion.push(internValue('opinion_id', String(item.opinion_id), 'comment', item.comment || ''));
+                cols.topic.push(internValue('topic_id', item.topic_id, 'topic_name', item.topic_name));
+                cols.axis.push(internValue('axis_id', item.axis_id, 'axis_name', item.axis_name));
+                cols.score.push(item.score === null ? 0 : item.score);
+                cols.excerpt.push(item.excerpt || '');
+                cols.reasoning.push(item.reasoning || '');
+                cols.confidence.push(item.confidence);
+                cols.votes.push(item.votes);
+                return scoreData.length++;
+            });
+        }
+
+        function clearRecords() {
+            for (const name in cols) cols[name].length = 0;
+            scoreData.length = 0;
+        }
+"""
+
+
+class ViewModel:
+    """ビューの描画に使う結果データ"""
+
+    def __init__(self, results_dir='results', with_scores=True):
+        """
+        Args:
+            results_dir: 結果ディレクトリ
+            with_scores: False の場合 scores.csv を読み込まない（divcon serve の API 版ビュー用）
+        """
+        from .. import metrics, stats
+
+        self.results_dir = Path(results_dir)
+
+        # トピック情報
+        with open(self.results_dir / 'topics.json', 'r', encoding='utf-8') as f:
+            topics_data = json.load(f)
+        self.topic_map = {t['id']: t['name'] for t in topics_data}
+
+        # 軸情報（axes.json は {topic_id: [axes...]} の形式なので平坦化する）
+        with open(self.results_dir / 'axes.json', 'r', encoding='utf-8') as f:
+            axes_data = json.load(f)
+        self.axis_map = {}
+        self.axis_to_topic = {}  # 軸IDからトピックIDへのマッピング
+        self.axis_full_info = {}  # 軸の完全情報（名前と両極情報）
+        for topic_id, topic_axes in axes_data.items():
+            for axis in topic_axes:
+                self.axis_map[axis['id']] = axis['name']
+                self.axis_to_topic[axis['id']] = topic_id
+                self.axis_full_info[axis['id']] = {
+                    'name': axis['name'],
+                    'left_pole': axis['left_pole'],
+                    'right_pole': axis['right_pole']
+                }
+                # トピック横断の共有軸（divcon.axis_merge）は共有する全トピック
+                if 'topic_ids' in axis:
+                    self.axis_full_info[axis['id']]['topic_ids'] = axis['topic_ids']
+
+        # 合意可能性分析（軸IDでインデックス化）
+        try:
+            with open(self.results_dir / 'consensus.json', 'r', encoding='utf-8') as f:
+                self.consensus_map = {item['axis_id']: item for item in json.load(f)}
+        except FileNotFoundError:
+            self.consensus_map = {}
+
+        # 軸別・トピック別の統計（stats.json がなければスコアから計算）
+        self.score_stats = stats.load_stats(str(self.results_dir))
+
+        # 実スコアに基づく分極度メトリクス（軸の並び順に使用）
+        self.axis_metrics = metrics.load_axis_metrics(str(self.results_dir))
+
+        # 対立軸をまたいだスタンス・プロファイル（divcon.profiles。--profiles を指定した実行のみ）
+        self.profiles, self.opinion_profiles = self._load_profiles()
+
+        if with_scores:
+            self.scores_df = self._load_scores()
+            self.n_scores = len(self.scores_df)
+            self.topics = sorted(self.scores_df['topic_id'].unique())
+            axis_ids = self.scores_df['axis_id'].unique()
+        else:
+            self.scores_df = None
+            self.n_scores = self.score_stats['overall']['total']
+            self.topics = sorted(self.score_stats['topics'])
+            axis_ids = list(self.score_stats['axes'])
+
+        # 軸の一覧（分極度の順）
+        self.axes = sorted(
+            axis_ids, key=lambda a: (self.axis_metrics.get(a, {}).get('rank', len(self.axis_metrics) + 1), a)
+        )
+
+    def _load_scores(self):
+        import pandas as pd
+
+        scores_df = pd.read_csv(self.results_dir / 'scores.csv', dtype={'opinion_id': str})
+
+        # 確信度（再スコアリング・ローカル推定時のみ。古い scores.csv には列がない）
+        if 'confidence' not in scores_df.columns:
+            scores_df['confidence'] = None
+        if 'votes' not in scores_df.columns:
+            scores_df['votes'] = 1
+        return scores_df
+
+    def _load_profiles(self):
+        """(プロファイルのリスト（code 順）, 意見ID → code)。profiles.json がなければ ([], None)"""
+        import numpy as np
+
+        try:
+            with open(self.results_dir / 'profiles.json', 'r', encoding='utf-8') as f:
+                report = json.load(f)
+            labels = np.load(self.results_dir / 'matrix' / 'profiles.npy')
+            with open(self.results_dir / 'matrix' / 'opinion_ids.txt', 'r', encoding='utf-8') as f:
+                opinion_ids = f.read().splitlines()
+        except FileNotFoundError:
+            return [], None
+
+        profiles = []
+        for entry in report:
+            for profile in entry['profiles']:
+                profiles.append({
+                    'code': profile['code'],
+                    'id': profile['id'],
+                    'topic_id': entry['topic_id'],
+                    'name': profile['name'],
+                    'description': profile['description'],
+                    'size': profile['size'],
+                    'share': profile['share'],
+                    'axes': [{'axis_id': a, 'mean': m} for a, m in zip(entry['axes'], profile['centroid'])],
+                })
+        profiles.sort(key=lambda p: p['code'])
+        profiled = np.flatnonzero(labels >= 0)
+        return profiles, {opinion_ids[row]: int(labels[row]) for row in profiled}
+
+    def axis_label(self, a):
+        er = self.axis_metrics.get(a, {}).get('esteban_ray')
+        return f"[{a}] {self.axis_map[a]}" + (f" (分極度 {er:.2f})" if er is not None else '')
+
+    # ------------------------------------------------------------------------
+    # 埋め込み用 JSON（全ビューで共有）
+    # ------------------------------------------------------------------------
+
+    @cached_property
+    def data_json(self):
+        """列形式のスコア（with_scores=False の場合は空）"""
+        return _dumps_compact(columnar_payload(self.scores_df, self.topic_map, self.axis_map, self.opinion_profiles))
+
+    @cached_property
+    def empty_data_json(self):
+        """空の列形式ペイロード（API 版ビューでレコードを追加していく）"""
+        return _dumps_compact(columnar_payload(None, self.topic_map, self.axis_map))
+
+    @cached_property
+    def profiles_json(self):
+        return _dumps(self.profiles)
+
+    @cached_property
+    def stats_json(self):
+        return _dumps(self.score_stats)
+
+    @cached_property
+    def axis_metrics_json(self):
+        return _dumps(self.axis_metrics)
+
+    @cached_property
+    def axis_to_topic_json(self):
+        return _dumps(self.axis_to_topic)
+
+    @cached_property
+    def axis_map_json(self):
+        return _dumps(self.axis_map)
+
+    @cached_property
+    def axis_full_info_json(self):
+        return _dumps(self.axis_full_info)
+
+    @cached_property
+    def consensus_map_json(self):
+        return _dumps(self.consensus_map)
@@ -1,65 +1,36 @@
-#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
 DivCon 2ペイン対立ビュー HTML 生成スクリプト
 左ペイン（スコア1,2,3）と右ペイン（スコア6,5,4）に分けて表示
 """
 
-import pandas as pd
 import json
 
-def generate_html():
-    # データ読み込み
-    scores_df = pd.read_csv('results/scores.csv')
-
-    # トピック情報を読み込み
-    with open('results/topics.json', 'r', encoding='utf-8') as f:
-        topics_data = json.load(f)
-    topic_map = {t['id']: t['name'] for t in topics_data}
-
-    # 軸情報を読み込み
-    with open('results/axes.json', 'r', encoding='utf-8') as f:
-        axes_data = json.load(f)
-    axis_map = {}
-    axis_to_topic = {}  # 軸IDからトピックIDへのマッピング
-    axis_full_info = {}  # 軸の完全情報（名前と両極情報）
-    for topic_id, topic_axes in axes_data.items():
-        for axis in topic_axes:
-            axis_map[axis['id']] = axis['name']
-            axis_to_topic[axis['id']] = topic_id
-            axis_full_info[axis['id']] = {
-                'name': axis['name'],
-                'left_pole': axis['left_pole'],
-                'right_pole': axis['right_pole']
-            }
-
-    # 合意可能性分析を読み込み
-    try:
-        with open('results/consensus.json', 'r', encoding='utf-8') as f:
-            consensus_data = json.load(f)
-        # 軸IDでインデックス化
-        consensus_map = {item['axis_id']: item for item in consensus_data}
-    except FileNotFoundError:
-        consensus_map = {}
-
-    # nullスコアを文字列に変換
-    scores_df['score'] = scores_df['score'].fillna('該当なし')
-    scores_df['excerpt'] = scores_df['excerpt'].fillna('')
-
-    # トピック名と軸名を追加
-    scores_df['topic_name'] = scores_df['topic_id'].map(topic_map)
-    scores_df['axis_display_name'] = scores_df['axis_id'].map(axis_map)
-
-    # トピックと軸の一覧を取得
-    topics = sorted(scores_df['topic_id'].unique())
-    axes = sorted(scores_df['axis_id'].unique())
-
-    # データをJSON形式に変換（JavaScriptで使用）
-    data_json = scores_df.to_json(orient='records', force_ascii=False)
-    axis_to_topic_json = json.dumps(axis_to_topic, ensure_ascii=False)
-    axis_map_json = json.dumps(axis_map, ensure_ascii=False)
-    axis_full_info_json = json.dumps(axis_full_info, ensure_ascii=False)
-    consensus_map_json = json.dumps(consensus_map, ensure_ascii=False)
+from .filter_worker import FILTER_CLIENT_JS, FILTER_WORKER_JS
+from .model import COLUMNS_JS
+
+
+def render(model, api_base=None):
+    """2ペインビューの HTML を文字列で返す
+
+    Args:
+        model: ViewModel
+        api_base: 結果サーバーの API パス（指定するとスコアを埋め込まず API から取得する）
+    """
+    topic_map = model.topic_map
+    topics = model.topics
+    axes = model.axes
+    axis_label = model.axis_label
+
+    # 列形式のスコアと軸情報（JavaScriptで使用。全ビューで共有）
+    data_json = model.empty_data_json if api_base else model.data_json
+    axis_to_topic_json = model.axis_to_topic_json
+    axis_map_json = model.axis_map_json
+    axis_full_info_json = model.axis_full_info_json
+    consensus_map_json = model.consensus_map_json
+    stats_json = model.stats_json
+    axis_metrics_json = model.axis_metrics_json
+    api_base_json = json.dumps(api_base)
 
     html_content = f"""<!DOCTYPE html>
 <html lang="ja">
@@ -288,6 +259,10 @@ def generate_html():
         .badge-score.score-5 {{ background: #8e44ad; }}
         .badge-score.score-6 {{ background: #6c3483; }}
 
+        .badge-confidence {{
+            background: #f39c12;
+        }}
+
         .axis-name {{
             font-size: 13px;
             color: #7f8c8d;
@@ -535,6 +510,11 @@ def generate_html():
         .jump-link-icon {{
             margin-left: 8px;
         }}
+
+        .load-more {{
+            text-align: center;
+            margin: 20px 0;
+        }}
     </style>
 </head>
 <body>
@@ -557,7 +537,7 @@ def generate_html():
                 <label>対立軸</label>
                 <select id="axisFilter">
                     <option value="">すべて</option>
-                    {' '.join(f'<option value="{a}">[{a}] {axis_map[a]}</option>' for a in axes)}
+                    {' '.join(f'<option value="{a}">{axis_label(a)}</option>' for a in axes)}
                 </select>
             </div>
 
@@ -601,6 +581,10 @@ def generate_html():
             </div>
         </div>
 
+        <div id="loadMore" class="load-more" style="display: none;">
+            <button onclick="loadMore()">さらに読み込む</button>
+        </div>
+
         <!-- 合意可能性分析セクション -->
         <div id="consensusSection" class="consensus-section" style="display: none;">
             <h3>合意可能性分析</h3>
@@ -628,14 +612,42 @@ def generate_html():
         </div>
     </div>
 
+    <script id="filterWorkerSource">
+{FILTER_WORKER_JS}
+    </script>
+
     <script>
-        const allData = {data_json};
+        const scoreData = {data_json};
         const axisToTopic = {axis_to_topic_json};
         const axisMap = {axis_map_json};
         const axisFullInfo = {axis_full_info_json};
         const consensusMap = {consensus_map_json};
-        let filteredData = allData;
+        const statsData = {stats_json};
+        const axisMetrics = {axis_metrics_json};
+        // divcon serve から配信された場合は API のパス（静的 HTML では null）
+        const API_BASE = {api_base_json};
+{COLUMNS_JS}
+{FILTER_CLIENT_JS}
+        // 静的 HTML ではフィルター・ソートを Worker で行う（API 版はサーバーで行う）
+        const engine = API_BASE ? null : createFilterEngine(false);
+        let leftRows = [];  // 表示中の行番号（表示順）
+        let rightRows = [];
+        let hasMore = false;
         let isReversed = false;
+        let cursors = {{}};  // ペイン（left / right）→ 次のページのカーソル
+        let requestSeq = 0;
+
+        // 分極度ランキング順（axis_metrics.json の rank、なければ末尾）
+        function axisRank(axisId) {{
+            return axisMetrics[axisId] ? axisMetrics[axisId].rank : Infinity;
+        }}
+
+        function axisLabel(axisId) {{
+            const metrics = axisMetrics[axisId];
+            const label = `[${{axisId}}] ${{axisMap[axisId]}}`;
+            if (!metrics || metrics.esteban_ray === null) return label;
+            return `${{label}} (分極度 ${{metrics.esteban_ray.toFixed(2)}})`;
+        }}
 
         function updateAxisHeaders() {{
             const axisFilter = document.getElementById('axisFilter').value;
@@ -644,13 +656,19 @@ def generate_html():
 
             if (axisFilter && axisFullInfo[axisFilter]) {{
                 const axisInfo = axisFullInfo[axisFilter];
+                const metrics = axisMetrics[axisFilter];
+                const metricsText = metrics && metrics.esteban_ray !== null
+                    ? `<div class="pane-header-pole">分極度 ${{metrics.esteban_ray.toFixed(2)}} / 極端割合 ${{Math.round(metrics.extremity_share * 100)}}% （${{metrics.rank}}位）</div>`
+                    : '';
                 leftAxisInfo.innerHTML = `
                     <div style="margin-bottom: 5px;"><strong>${{axisInfo.name}}</strong></div>
                     <div class="pane-header-pole">${{axisInfo.left_pole}}</div>
+                    ${{metricsText}}
                 `;
                 rightAxisInfo.innerHTML = `
                     <div style="margin-bottom: 5px;"><strong>${{axisInfo.name}}</strong></div>
                     <div class="pane-header-pole">${{axisInfo.right_pole}}</div>
+                    ${{metricsText}}
                 `;
                 leftAxisInfo.style.display = 'block';
                 rightAxisInfo.style.display = 'block';
@@ -660,28 +678,34 @@ def generate_html():
             }}
         }}
 
-        function renderOpinions(data) {{
-            const leftPane = document.getElementById('leftPane');
-            const rightPane = document.getElementById('rightPane');
-            const noResults = document.getElementById('noResults');
+        // 現在のフィルターに対応する集計値（stats.json）を返す
+        function getGroupStats() {{
+            const topicFilter = document.getElementById('topicFilter').value;
+            const axisFilter = document.getElementById('axisFilter').value;
 
-            // スコアが数値のデータのみフィルター
-            const validData = data.filter(op => typeof op.score === 'number' && op.score >= 1 && op.score <= 6);
+            if (axisFilter) {{
+                const axisStats = statsData.axes[axisFilter];
+                if (!axisStats || (topicFilter && axisStats.topic_id !== topicFilter)) return null;
+                return axisStats;
+            }}
+            if (topicFilter) return statsData.topics[topicFilter] || null;
+            return statsData.overall;
+        }}
 
-            // 左寄り（1-3）と右寄り（4-6）に分類
-            let leftData = validData.filter(op => op.score <= 3);
-            let rightData = validData.filter(op => op.score >= 4);
+        function confidenceBadge(i) {{
+            // 再スコアリングで票が割れたスコア（確信度 < 1）だけ表示する
+            const confidence = cols.confidence[i];
+            if (confidence === null || confidence === undefined || confidence >= 1) return '';
+            const title = cols.votes[i] > 1 ? `${{cols.votes[i]}} 回のスコアリングのうち同じスコアの割合` : 'ローカルモデルの確信度';
+            return `<span class="badge badge-confidence" title="${{title}}">確信度 ${{confidence.toFixed(2)}}</span>`;
+        }}
 
-            // ソート順を制御
-            if (isReversed) {{
-                // 中間意見を中央に: 左は3,2,1 / 右は4,5,6
-                leftData = leftData.sort((a, b) => b.score - a.score);
-                rightData = rightData.sort((a, b) => a.score - b.score);
-            }} else {{
-                // デフォルト: 左は1,2,3 / 右は6,5,4
-                leftData = leftData.sort((a, b) => a.score - b.score);
-                rightData = rightData.sort((a, b) => b.score - a.score);
-            }}
+        // leftData・rightData は表示順に並んだ行番号（左は 1-3、右は 4-6）
+        function renderOpinions(leftData, rightData) {{
+            const leftPane = document.getElementById('leftPane');
+            const rightPane = document.getElementById('rightPane');
+            const noResults = document.getElementById('noResults');
+            const score = cols.score;
 
             if (leftData.length === 0 && rightData.length === 0) {{
                 leftPane.innerHTML = '';
@@ -691,61 +715,128 @@ def generate_html():
                 noResults.style.display = 'none';
 
                 // 左ペイン
-                leftPane.innerHTML = leftData.map(opinion => {{
-                    const scoreClass = `score-${{opinion.score}}`;
+                leftPane.innerHTML = leftData.map(i => {{
+                    const scoreClass = `score-${{score[i]}}`;
                     const scoreLabel = [
                         '', '1:左極', '2:左寄り強', '3:左寄り弱'
-                    ][opinion.score];
+                    ][score[i]];
 
                     return `
                         <div class="opinion-card ${{scoreClass}}">
                             <div class="opinion-header">
-                                <span class="opinion-id">ID: ${{opinion.opinion_id}}</span>
+                                <span class="opinion-id">ID: ${{opinionIdOf(i)}}</span>
                                 <span class="badge badge-score ${{scoreClass}}">${{scoreLabel}}</span>
+                                ${{confidenceBadge(i)}}
                             </div>
-                            ${{opinion.excerpt ? `<div class="excerpt">${{opinion.excerpt}}</div>` : ''}}
-                            <div class="tooltip">${{opinion.comment}}</div>
+                            ${{cols.excerpt[i] ? `<div class="excerpt">${{cols.excerpt[i]}}</div>` : ''}}
+                            <div class="tooltip">${{commentOf(i)}}</div>
                         </div>
                     `;
                 }}).join('');
 
                 // 右ペイン
-                rightPane.innerHTML = rightData.map(opinion => {{
-                    const scoreClass = `score-${{opinion.score}}`;
+                rightPane.innerHTML = rightData.map(i => {{
+                    const scoreClass = `score-${{score[i]}}`;
                     const scoreLabel = [
                         '', '', '', '', '4:右寄り弱', '5:右寄り強', '6:右極'
-                    ][opinion.score];
+                    ][score[i]];
 
                     return `
                         <div class="opinion-card ${{scoreClass}}">
                             <div class="opinion-header">
-                                <span class="opinion-id">ID: ${{opinion.opinion_id}}</span>
+                                <span class="opinion-id">ID: ${{opinionIdOf(i)}}</span>
                                 <span class="badge badge-score ${{scoreClass}}">${{scoreLabel}}</span>
+                                ${{confidenceBadge(i)}}
                             </div>
-                            ${{opinion.excerpt ? `<div class="excerpt">${{opinion.excerpt}}</div>` : ''}}
-                            <div class="tooltip">${{opinion.comment}}</div>
+                            ${{cols.excerpt[i] ? `<div class="excerpt">${{cols.excerpt[i]}}</div>` : ''}}
+                            <div class="tooltip">${{commentOf(i)}}</div>
                         </div>
                     `;
                 }}).join('');
             }}
 
-            document.getElementById('leftCount').textContent = leftData.length;
-            document.getElementById('rightCount').textContent = rightData.length;
+            const groupStats = getGroupStats();
+            document.getElementById('leftCount').textContent = groupStats ? groupStats.left : 0;
+            document.getElementById('rightCount').textContent = groupStats ? groupStats.right : 0;
+            document.getElementById('loadMore').style.display = hasMore ? 'block' : 'none';
+        }}
+
+        // 左右のペインをそれぞれ表示順（サーバー側でソート）に1ページずつ取得する
+        async function fetchPanes(append) {{
+            const seq = ++requestSeq;
+            const sides = {{
+                left: isReversed ? '-score' : 'score',
+                right: isReversed ? 'score' : '-score',
+            }};
+            const pages = await Promise.all(Object.entries(sides).map(async ([side, sort]) => {{
+                if (append && !cursors[side]) return {{ side, items: [], next_cursor: null }};
+                const params = new URLSearchParams({{ side, sort }});
+                const topicFilter = document.getElementById('topicFilter').value;
+                const axisFilter = document.getElementById('axisFilter').value;
+                if (topicFilter) params.set('topic_id', topicFilter);
+                if (axisFilter) params.set('axis_id', axisFilter);
+                if (append) params.set('cursor', cursors[side]);
+                const response = await fetch(`${{API_BASE}}/scores?${{params}}`);
+                return {{ side, ...(await response.json()) }};
+            }}));
+            if (seq !== requestSeq) return;  // フィルターが変わった後に届いた古い応答は捨てる
+
+            if (!append) {{
+                clearRecords();
+                leftRows = [];
+                rightRows = [];
+            }}
+            for (const page of pages) {{
+                const rows = appendRecords(page.items);
+                if (page.side === 'left') leftRows = leftRows.concat(rows);
+                else rightRows = rightRows.concat(rows);
+                cursors[page.side] = page.next_cursor;
+            }}
+            hasMore = Object.values(cursors).some(c => c);
+            renderOpinions(leftRows, rightRows);
         }}
 
-        function applyFilters() {{
+        // 左右のペインの行番号を Worker で絞り込み・並べ替える（結果は各ペインの先頭 FILTER_WINDOW 件）
+        function queryPanes() {{
             const topicFilter = document.getElementById('topicFilter').value;
             const axisFilter = document.getElementById('axisFilter').value;
+            engine.query({{
+                topic: topicFilter ? dictCode('topic_id', topicFilter) : null,
+                axis: axisFilter ? dictCode('axis_id', axisFilter) : null,
+                score: null,
+                profile: null,
+                text: '',
+                split: true,
+                reversed: isReversed,
+            }}).then(result => showResult(result, false));
+        }}
+
+        function showResult(result, append) {{
+            if (!result) return;  // 古いフィルターの結果
+            const left = Array.from(result.left.rows);
+            const right = Array.from(result.right.rows);
+            leftRows = append ? leftRows.concat(left) : left;
+            rightRows = append ? rightRows.concat(right) : right;
+            hasMore = leftRows.length < result.left.total || rightRows.length < result.right.total;
+            renderOpinions(leftRows, rightRows);
+        }}
+
+        function loadMore() {{
+            if (API_BASE) {{
+                fetchPanes(true);
+                return;
+            }}
+            engine.more({{ left: leftRows.length, right: rightRows.length }}).then(result => showResult(result, true));
+        }}
 
-            filteredData = allData.filter(opinion => {{
-                if (topicFilter && opinion.topic_id !== topicFilter) return false;
-                if (axisFilter && opinion.axis_id !== axisFilter) return false;
-                return true;
-            }});
-
+        function applyFilters() {{
             updateAxisHeaders();
-            renderOpinions(filteredData);
             renderConsensus();
+            if (API_BASE) {{
+                fetchPanes(false);
+            }} else {{
+                queryPanes();
+            }}
         }}
 
         function updateAxisDropdown() {{
@@ -759,14 +850,14 @@ def generate_html():
             // トピックが選択されている場合は、そのトピックの軸のみを表示
             const filteredAxes = Object.keys(axisMap).filter(axisId => {{
                 if (!topicFilter) return true; // トピック未選択なら全軸表示
-                return axisToTopic[axisId] === topicFilter;
-            }}).sort();
+                return (axisFullInfo[axisId].topic_ids || [axisToTopic[axisId]]).includes(topicFilter);
+            }}).sort((a, b) => (axisRank(a) - axisRank(b)) || a.localeCompare(b));
 
             // オプションを追加
             filteredAxes.forEach(axisId => {{
                 const option = document.createElement('option');
                 option.value = axisId;
-                option.textContent = `[${{axisId}}] ${{axisMap[axisId]}}`;
+                option.textContent = axisLabel(axisId);
                 axisFilter.appendChild(option);
             }});
 
@@ -778,7 +869,12 @@ def generate_html():
 
         function toggleReverse() {{
             isReversed = document.getElementById('reverseToggle').checked;
-            renderOpinions(filteredData);
+            // 読み込み済みの分を並べ替えるだけでは各ペインの先頭が変わらないので取得し直す
+            if (API_BASE) {{
+                fetchPanes(false);
+            }} else {{
+                queryPanes();
+            }}
         }}
 
         function resetFilters() {{
@@ -886,20 +982,30 @@ def generate_html():
         // 初期表示
         updateAxisDropdown();
         updateAxisHeaders();
-        renderOpinions(allData);
+        if (API_BASE) {{
+            fetchPanes(false);
+        }} else {{
+            queryPanes();
+        }}
         renderConsensus();
     </script>
 </body>
 </html>"""
 
+    return html_content
+
+
+def generate_html(results_dir='results'):
+    from .model import ViewModel
+
+    model = ViewModel(results_dir)
+    html_content = render(model)
+
     # HTMLファイルを保存
-    with open('results/two_pane_view.html', 'w', encoding='utf-8') as f:
+    with open(f'{results_dir}/two_pane_view.html', 'w', encoding='utf-8') as f:
         f.write(html_content)
 
-    print("[OK] 2ペインHTML生成完了: results/two_pane_view.html")
-    print(f"   総意見数: {len(scores_df)} 件")
-    print(f"   トピック数: {len(topics)} 個")
-    print(f"   対立軸数: {len(axes)} 個")
-
-if __name__ == '__main__':
-    generate_html()
+    print(f"[OK] 2ペインHTML生成完了: {results_dir}/two_pane_view.html")
+    print(f"   総意見数: {model.n_scores} 件")
+    print(f"   トピック数: {len(model.topics)} 個")
+    print(f"   対立軸数: {len(model.axes)} 個")
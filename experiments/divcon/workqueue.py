@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+DivCon 永続タスクキュー（SQLite）
+分散実行（divcon.cluster）で、コーディネーターが投入したタスクを複数のワーカープロセス・ホストが
+リース → ハートビート → 結果のコミットの順に処理する
+
+共有ファイルシステム上の1つの SQLite ファイルをキューとして使う:
+    - タスクIDは内容から決まる（例: stage4:T1_A1:000012）。同じIDの投入は無視されるため、
+      コーディネーターを再実行しても同じタスクは二重に登録されない
+    - リースは BEGIN IMMEDIATE のトランザクションで取る。lease_until を過ぎたタスクは
+      ワーカーが落ちたものとみなし、別のワーカーが取り直す（ハートビートで期限を延ばす）
+    - 結果のコミットは冪等（最初にコミットされた結果だけを残す）。リースの期限切れ後に
+      元のワーカーが遅れてコミットしても、タスクの結果は1つになる
+    - MAX_ATTEMPTS 回失敗したタスクは failed になる（コーディネーターが警告して除外する）
+
+ジャーナルは WAL ではなく既定の DELETE モードを使う（WAL は共有メモリを使うため、
+ネットワークファイルシステム上では使えない）。ファイルシステムがファイルロックに対応している必要がある。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+LEASE_SECONDS = 300  # ハートビートがないままこの秒数が過ぎたリースは取り直せる
+MAX_ATTEMPTS = 3
+BUSY_TIMEOUT = 60  # 他のプロセスがロックを持っている場合に待つ秒数
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    group_key TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, kind);
+CREATE INDEX IF NOT EXISTS tasks_group ON tasks (kind, group_key, status);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+STATUSES = ('pending', 'leased', 'done', 'failed')
+
+
+class TaskQueue:
+    """SQLite ファイルの永続タスクキュー（1つのインスタンスをスレッド間で共有できる）"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                                     check_same_thread=False)
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """書き込みロックを先に取るトランザクション（リースの取り合いで同じタスクを2つのワーカーに渡さない）"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # ========================================================================
+    # コーディネーター
+    # ========================================================================
+
+    def add(self, tasks):
+        """タスクを投入する（同じIDのタスクがあれば無視する）
+
+        Args:
+            tasks: (task_id, kind, payload, group_key) のイテラブル。payload は JSON にできる値
+
+        Returns:
+            int: 新しく投入したタスク数
+        """
+        now = time.time()
+        rows = [(task_id, kind, group_key, json.dumps(payload, ensure_ascii=False), now)
+                for task_id, kind, payload, group_key in tasks]
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT OR IGNORE INTO tasks (id, kind, group_key, payload, updated_at) VALUES (?, ?, ?, ?, ?)', rows
+            )
+            return conn.total_changes - before
+
+    def counts(self, kind=None):
+        """状態ごとのタスク数（{'pending': n, 'leased': n, 'done': n, 'failed': n}）"""
+        if kind is None:
+            rows = self._query('SELECT status, COUNT(*) FROM tasks GROUP BY status')
+        else:
+            rows = self._query('SELECT status, COUNT(*) FROM tasks WHERE kind = ? GROUP BY status', (kind,))
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+    def results(self, kind, group_key=None):
+        """完了したタスクの (task_id, result) のリスト（タスクID順）"""
+        if group_key is None:
+            rows = self._query("SELECT id, result FROM tasks WHERE kind = ? AND status = 'done' ORDER BY id", (kind,))
+        else:
+            rows = self._query(
+                "SELECT id, result FROM tasks WHERE kind = ? AND group_key = ? AND status = 'done' ORDER BY id",
+                (kind, group_key)
+            )
+        return [(task_id, json.loads(result)) for task_id, result in rows]
+
+    def payloads(self, kind, group_key):
+        """タスクの入力（payload）のリスト（状態によらない。タスクID順）"""
+        rows = self._query("SELECT payload FROM tasks WHERE kind = ? AND group_key = ? ORDER BY id", (kind, group_key))
+        return [json.loads(payload) for payload, in rows]
+
+    def result(self, task_id):
+        """完了したタスクの結果（未完了の場合は None）"""
+        rows = self._query("SELECT result FROM tasks WHERE id = ? AND status = 'done'", (task_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def failures(self, kind):
+        """失敗したタスクの (task_id, error) のリスト"""
+        return self._query("SELECT id, error FROM tasks WHERE kind = ? AND status = 'failed' ORDER BY id", (kind,))
+
+    def get_meta(self, key, default=None):
+        rows = self._query('SELECT value FROM meta WHERE key = ?', (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def set_meta(self, key, value):
+        with self._transaction() as conn:
+            conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                         (key, json.dumps(value, ensure_ascii=False)))
+
+    # ========================================================================
+    # ワーカー
+    # ========================================================================
+
+    def lease(self, worker, kinds=None, limit=1, lease_seconds=LEASE_SECONDS):
+        """未処理（またはリースの期限切れ）のタスクを最大 limit 件リースする
+
+        Returns:
+            list: {'id', 'kind', 'group_key', 'payload', 'attempts'} のリスト
+        """
+        now = time.time()
+        kind_filter = ''
+        params = [now]
+        if kinds:
+            kind_filter = f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+
+        with self._transaction() as conn:
+            # 期限切れのまま試行回数を使い切ったタスクは失敗にする
+            conn.execute(
+                "UPDATE tasks SET status = 'failed', error = COALESCE(error, 'リースの期限切れ'), worker = NULL, "
+                "lease_until = NULL, updated_at = ? WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, now, MAX_ATTEMPTS)
+            )
+            rows = conn.execute(
+                "SELECT id, kind, group_key, payload, attempts FROM tasks "
+                f"WHERE (status = 'pending' OR (status = 'leased' AND lease_until < ?)){kind_filter} "
+                "ORDER BY rowid LIMIT ?",
+                params + [limit]
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                [(worker, now + lease_seconds, now, row[0]) for row in rows]
+            )
+        return [
+            {'id': task_id, 'kind': kind, 'group_key': group_key, 'payload': json.loads(payload),
+             'attempts': attempts + 1}
+            for task_id, kind, group_key, payload, attempts in rows
+        ]
+
+    def heartbeat(self, worker, task_ids, lease_seconds=LEASE_SECONDS):
+        """処理中のタスクのリースを延ばす（他のワーカーに取り直されたタスクは延ばさない）
+
+        Returns:
+            int: 延ばしたタスク数
+        """
+        if not task_ids:
+            return 0
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE tasks SET lease_until = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                [(now + lease_seconds, now, task_id, worker) for task_id in task_ids]
+            )
+            return conn.total_changes - before
+
+    def complete(self, task_id, worker, result):
+        """結果をコミットする（冪等。すでに完了したタスクは変更せず False を返す）"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, worker = ?, lease_until = NULL, error = NULL, "
+                "updated_at = ? WHERE id = ? AND status != 'done'",
+                (json.dumps(result, ensure_ascii=False), worker, time.time(), task_id)
+            )
+            return cursor.rowcount > 0
+
+    def fail(self, task_id, worker, error):
+        """失敗を記録する（試行回数が MAX_ATTEMPTS 未満なら未処理に戻す）"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?, "
+                "worker = NULL, lease_until = NULL, updated_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (MAX_ATTEMPTS, str(error), time.time(), task_id, worker)
+            )
+
+    def release(self, task_id, worker):
+        """処理せずにリースを返す（ワーカーの停止時など。試行回数に数えない）"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = 'pending', attempts = MAX(attempts - 1, 0), worker = NULL, "
+                "lease_until = NULL, updated_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time(), task_id, worker)
+            )
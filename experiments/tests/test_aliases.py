@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""divcon.aliases の意見ID ↔ 別名の変換のテスト"""
+
+from divcon import llm
+from divcon.aliases import IdAliases
+
+IDS = ['c0a8f1d2-uuid-0001', 'c0a8f1d2-uuid-0002', 'c0a8f1d2-uuid-0003']
+
+
+def test_alias_and_resolve_round_trip():
+    aliases = IdAliases(IDS)
+    for opinion_id in IDS:
+        assert aliases.resolve(aliases.alias(opinion_id)) == opinion_id
+    assert [aliases.alias(i) for i in IDS] == ['1', '2', '3']
+
+
+def test_resolve_accepts_decorated_aliases_and_rejects_unknown():
+    aliases = IdAliases(IDS)
+    assert aliases.resolve('[2]') == IDS[1]
+    assert aliases.resolve('ID:3') == IDS[2]
+    assert aliases.resolve(1) == IDS[0]
+    assert aliases.resolve('4') is None
+    assert aliases.resolve('0') is None
+    assert aliases.resolve('意見2') is None
+
+
+def test_restore_text_replaces_known_references_only():
+    aliases = IdAliases(IDS)
+    text = 'ID:1 と ID： 3 は賛成、ID:9 は範囲外'
+    assert aliases.restore_text(text) == f'ID:{IDS[0]} と ID： {IDS[2]} は賛成、ID:9 は範囲外'
+
+
+def test_restore_reference_keeps_prefix():
+    aliases = IdAliases(IDS)
+    assert aliases.restore_reference('ID:2') == f'ID:{IDS[1]}'
+    assert aliases.restore_reference('2') == IDS[1]
+    assert aliases.restore_reference('ID:7') == 'ID:7'
+
+
+def test_saved_tokens_are_counted():
+    with llm.run_scope('test_aliases'):
+        IdAliases(IDS, echoed=True)
+    usage = llm.get_usage()['test_aliases']
+    assert usage['alias_saved_input_tokens'] > 0
+    assert usage['alias_saved_output_tokens'] == usage['alias_saved_input_tokens']
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""divcon.axis_merge のトピック横断の軸統合のテスト"""
+
+import numpy as np
+import pytest
+
+from divcon import axis_merge
+from divcon.axis_merge import merge_duplicate_axes, similarity_matrix
+
+
+def _axis(axis_id, name='財政支出の拡大', left='増税してでも支出を増やす', right='支出を抑えて減税する', strength=3):
+    return {'id': axis_id, 'name': name, 'left_pole': left, 'right_pole': right, 'strength': strength}
+
+
+def test_similarity_ignores_width_and_spaces():
+    sim = similarity_matrix([_axis('A1'), _axis('B1', name='財政支出の 拡大'), _axis('C1', name='教育', left='公立', right='私立')])
+    assert sim[0, 1] == pytest.approx(1.0)
+    assert sim[0, 2] < axis_merge.MERGE_SIMILARITY
+
+
+def test_identical_axes_merge_into_strongest():
+    all_axes = {'T1': [_axis('T1-A1', strength=2)], 'T2': [_axis('T2-A1', strength=4)]}
+    merged, report = merge_duplicate_axes(all_axes, topic_map={})
+    assert merged['T1'] == []
+    [shared] = merged['T2']
+    assert shared['id'] == 'T2-A1'
+    assert shared['topic_ids'] == ['T2', 'T1']
+    assert shared['merged_from'] == ['T1-A1']
+    assert report[0]['axis_id'] == 'T2-A1'
+
+
+def test_axes_within_one_topic_are_not_merged():
+    all_axes = {'T1': [_axis('T1-A1'), _axis('T1-A2')]}
+    merged, report = merge_duplicate_axes(all_axes, topic_map={})
+    assert merged == all_axes
+    assert report == []
+
+
+def test_at_most_one_axis_per_topic(monkeypatch):
+    # T1 の2軸がどちらも T2 の軸と同じ → 共有軸に入る T1 の軸は類似度の高い1つだけ
+    sim = np.array([
+        [1.0, 1.0, 0.9],
+        [1.0, 1.0, 0.8],
+        [0.9, 0.8, 1.0],
+    ])
+    monkeypatch.setattr(axis_merge, 'similarity_matrix', lambda axes: sim)
+    all_axes = {'T1': [_axis('T1-A1'), _axis('T1-A2')], 'T2': [_axis('T2-A1')]}
+    merged, report = merge_duplicate_axes(all_axes, topic_map={})
+
+    assert len(report) == 1
+    assert report[0]['topic_ids'] == ['T1', 'T2']
+    assert [m['axis_id'] for m in report[0]['merged']] == ['T2-A1']
+    assert [axis['id'] for axis in merged['T1']] == ['T1-A1', 'T1-A2']
+    assert merged['T2'] == []
+
+
+def test_groups_do_not_chain(monkeypatch):
+    # A~B、B~C は閾値以上だが A~C は閾値未満 → A-B だけ統合し、C は独立のまま
+    sim = np.array([
+        [1.0, 0.9, 0.3],
+        [0.9, 1.0, 0.8],
+        [0.3, 0.8, 1.0],
+    ])
+    monkeypatch.setattr(axis_merge, 'similarity_matrix', lambda axes: sim)
+    all_axes = {'T1': [_axis('T1-A1')], 'T2': [_axis('T2-A1')], 'T3': [_axis('T3-A1')]}
+    merged, report = merge_duplicate_axes(all_axes, topic_map={})
+
+    assert len(report) == 1
+    assert report[0]['topic_ids'] == ['T1', 'T2']
+    assert [axis['id'] for axis in merged['T3']] == ['T3-A1']
+    assert 'topic_ids' not in merged['T3'][0]
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""divcon.distill のローカルスタンス推定のテスト"""
+
+import numpy as np
+
+from divcon.distill import NgramFeatures, StanceModel, agrees, cross_validated_agreement, predict
+
+
+def _dense(X):
+    dense = np.zeros((len(X), X.dim))
+    for i in range(len(X)):
+        np.add.at(dense[i], X.indices[X.indptr[i]:X.indptr[i + 1]], X.data[X.indptr[i]:X.indptr[i + 1]])
+    return dense
+
+
+def test_agreement_is_same_side_within_one():
+    predicted = np.array([0, 3, 3, 2, 5, 1, 0])
+    labels = np.array([0, 4, 2, 3, 6, 3, 1])
+    assert agrees(predicted, labels).tolist() == [True, False, True, True, True, False, False]
+
+
+def test_confidence_does_not_cross_the_side_boundary():
+    # スコア 3 と 4 に半分ずつ → どの予測でも確信度は片側の 0.5 だけ
+    proba = np.array([[0.0, 0.0, 0.0, 0.5, 0.5, 0.0, 0.0]])
+    _, confidence = predict(proba)
+    assert confidence[0] == 0.5
+
+    proba = np.array([[0.1, 0.3, 0.3, 0.3, 0.0, 0.0, 0.0]])
+    predicted, confidence = predict(proba)
+    assert (predicted[0], round(float(confidence[0]), 6)) == (2, 0.9)
+
+
+def test_features_match_dense_products():
+    X = NgramFeatures.from_texts(['増税に反対', '増税に賛成です', '', 'ああああ'], dim=64)
+    dense = _dense(X)
+    rng = np.random.default_rng(0)
+    w = rng.normal(size=64)
+    v = rng.normal(size=4)
+    np.testing.assert_allclose(X.matvec(w), dense @ w)
+    np.testing.assert_allclose(X.rmatvec(v), dense.T @ v)
+    np.testing.assert_allclose(np.linalg.norm(dense[[0, 1, 3]], axis=1), 1.0)
+    np.testing.assert_allclose(_dense(X[[3, 1]]), dense[[3, 1]])
+
+
+def test_model_learns_separable_stances():
+    texts = ['この計画に強く賛成します'] * 20 + ['この計画に強く反対します'] * 20 + ['天気の話です'] * 20
+    labels = np.array([6] * 20 + [1] * 20 + [0] * 20)
+    X = NgramFeatures.from_texts(texts)
+    predicted, confidence = predict(StanceModel().fit(X, labels).predict_proba(X))
+    assert agrees(predicted, labels).all()
+
+    agreement, coverage, n_confident = cross_validated_agreement(X, labels)
+    assert agreement == 1.0
+    assert n_confident == round(coverage * len(labels))
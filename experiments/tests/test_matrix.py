@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""divcon.matrix の立場マップ（主成分）のテスト"""
+
+import numpy as np
+import pytest
+
+from divcon.matrix import stance_components
+
+
+def _random_scores(n=500, d=4, missing=0.2, seed=0):
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(n, 1))
+    scores = np.clip(np.rint(3.5 + latent * rng.uniform(0.5, 1.5, size=d) + rng.normal(scale=0.5, size=(n, d))), 1, 6)
+    mask = rng.random((n, d)) >= missing
+    return np.where(mask, scores, np.nan).astype(np.float32), mask
+
+
+def _reference_pca(scores, mask, n_components):
+    """平均で補った行列を numpy の SVD で PCA する（比較用）"""
+    mean = np.array([scores[mask[:, j], j].mean() for j in range(scores.shape[1])])
+    filled = np.where(mask, scores, mean) - mean
+    _, s, vt = np.linalg.svd(filled, full_matrices=False)
+    return mean, vt[:n_components], (s ** 2 / (s ** 2).sum())[:n_components]
+
+
+def test_matches_svd_of_mean_imputed_matrix():
+    scores, mask = _random_scores()
+    mean, components, ratio = stance_components(scores, mask)
+    ref_mean, ref_components, ref_ratio = _reference_pca(scores, mask, 2)
+
+    np.testing.assert_allclose(mean, ref_mean, atol=1e-5)
+    np.testing.assert_allclose(ratio, ref_ratio, atol=1e-6)
+    # 主成分は符号を除いて一致する
+    for k in range(2):
+        assert abs(float(components[k] @ ref_components[k])) == pytest.approx(1.0, abs=1e-6)
+
+
+def test_sign_convention():
+    scores, mask = _random_scores(seed=1)
+    _, components, _ = stance_components(scores, mask)
+    for component in components:
+        assert component[np.argmax(np.abs(component))] > 0
+
+
+def test_chunking_does_not_change_result():
+    scores, mask = _random_scores(n=1000, seed=2)
+    whole = stance_components(scores, mask)
+    chunked = stance_components(scores, mask, chunk_rows=7)
+    for a, b in zip(whole, chunked):
+        np.testing.assert_allclose(a, b, atol=1e-9)
+
+
+def test_fewer_axes_than_components():
+    scores, mask = _random_scores(d=1, seed=3)
+    mean, components, ratio = stance_components(scores, mask)
+    assert components.shape == (2, 1)
+    assert components[0, 0] == pytest.approx(1.0)
+    assert components[1, 0] == 0
+    assert ratio.tolist() == pytest.approx([1.0, 0.0])
+
+
+def test_axis_without_scores_has_zero_loading():
+    scores, mask = _random_scores(d=3, seed=4)
+    scores[:, 2] = np.nan
+    mask[:, 2] = False
+    mean, components, _ = stance_components(scores, mask)
+    assert mean[2] == 0
+    np.testing.assert_allclose(components[:, 2], 0, atol=1e-12)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""divcon.metrics の分極度指標のテスト"""
+
+import math
+
+import numpy as np
+import pytest
+
+from divcon.metrics import bimodality_coefficient, bootstrap_intervals, esteban_ray, extremity_share
+
+
+def test_esteban_ray_is_one_for_even_split_at_the_poles():
+    assert float(esteban_ray(np.array([5, 0, 0, 0, 0, 5]))) == pytest.approx(1.0)
+
+
+def test_esteban_ray_is_zero_for_consensus():
+    assert float(esteban_ray(np.array([0, 0, 7, 0, 0, 0]))) == pytest.approx(0.0)
+
+
+def test_esteban_ray_depends_only_on_shares():
+    counts = np.array([3, 1, 0, 2, 0, 4])
+    assert float(esteban_ray(counts * 10)) == pytest.approx(float(esteban_ray(counts)))
+
+
+def test_esteban_ray_ranks_polarized_above_spread():
+    polarized = np.array([4, 1, 0, 0, 1, 4])
+    uniform = np.array([2, 2, 2, 2, 2, 2])
+    assert esteban_ray(polarized) > esteban_ray(uniform)
+
+
+def test_empty_histogram_is_nan():
+    empty = np.zeros(6)
+    assert math.isnan(float(esteban_ray(empty)))
+    assert math.isnan(float(extremity_share(empty)))
+    assert math.isnan(float(bimodality_coefficient(empty)))
+
+
+def test_extremity_share():
+    assert float(extremity_share(np.array([2, 1, 1, 1, 1, 4]))) == pytest.approx(0.6)
+
+
+def test_bimodality_needs_variance():
+    assert math.isnan(float(bimodality_coefficient(np.array([0, 0, 0, 9, 0, 0]))))
+    assert float(bimodality_coefficient(np.array([50, 0, 0, 0, 0, 50]))) > 5 / 9
+
+
+def test_bootstrap_intervals_cover_the_point_estimate():
+    counts = np.array([[40, 5, 5, 5, 5, 40], [0, 0, 0, 0, 0, 0]], dtype=np.float64)
+    lower, upper = bootstrap_intervals(counts, n_samples=200)['esteban_ray']
+    point = float(esteban_ray(counts[0]))
+    assert lower[0] <= point <= upper[0]
+    assert math.isnan(lower[1]) and math.isnan(upper[1])
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""divcon.normalize の意見テキストの前処理のテスト"""
+
+from divcon.normalize import (OMISSION, QUOTE_KEEP_CHARS, compress_text, estimate_tokens, normalize_comment,
+                              preprocess_opinions, source_sentences)
+
+
+def test_normalize_removes_boilerplate_and_duplicates():
+    text = 'お世話になっております。\n財源を示すべきです。財源を示すべきです。\nよろしくお願いいたします。'
+    assert normalize_comment(text) == '財源を示すべきです。'
+
+
+def test_normalize_replaces_urls_quotes_and_width():
+    quote = 'あ' * 100
+    text = f'ＡＢＣ案に反対です。詳細は https://example.com/a?b=1 を参照。\n> 引用された文\n「{quote}」は長すぎる。'
+    normalized = normalize_comment(text)
+    assert normalized.startswith('ABC案に反対です。')
+    assert '[URL]' in normalized and 'example.com' not in normalized
+    assert '[引用略]' in normalized and '引用された文' not in normalized
+    assert f"「{'あ' * QUOTE_KEEP_CHARS}{OMISSION}」" in normalized
+
+
+def test_normalize_keeps_text_that_is_only_boilerplate():
+    assert normalize_comment('よろしくお願いします。') == 'よろしくお願いします。'
+
+
+def test_source_sentences_map_back_to_the_original():
+    comment = 'お世話になっております。詳細は https://example.com/?q=1 にあります。増税には反対です。'
+    text = normalize_comment(comment)
+    prompt_sentences, sources = source_sentences(text, comment)
+    assert prompt_sentences == ['詳細は [URL] にあります。', '増税には反対です。']
+    assert sources == ['詳細は https://example.com/?q=1 にあります。', '増税には反対です。']
+
+
+def test_compress_keeps_stance_sentences_within_budget():
+    filler = '背景の説明が続きます。' * 3
+    text = f'はじめに。{filler}この計画には反対です。おわりに。'
+    compressed = compress_text(text, 20)
+    assert estimate_tokens(compressed) < estimate_tokens(text)
+    assert '背景の説明' not in compressed
+    assert 'この計画には反対です。' in compressed
+    assert OMISSION in compressed
+
+
+def test_preprocess_keeps_comment_and_counts_tokens():
+    opinions = [{'comment': 'お世話になっております。賛成です。'}, {'comment': float('nan')}]
+    report = preprocess_opinions(opinions)
+    assert opinions[0]['comment'] == 'お世話になっております。賛成です。'
+    assert opinions[0]['text'] == '賛成です。'
+    assert opinions[1]['text'] == ''
+    assert report['tokens_after'] < report['tokens_before']
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""divcon.planner の実行計画の見積もりのテスト"""
+
+from divcon import distill, planner
+from divcon.config import Settings
+
+
+def _opinions(n):
+    return [{'id': i, 'comment': 'この計画には反対です。財源の説明が足りません。'} for i in range(n)]
+
+
+def test_distill_reduces_stage4_for_large_axes():
+    n = planner.PLAN_TOPICS * distill.DISTILL_MIN_OPINIONS * 3
+    full = planner.plan_run(_opinions(n), Settings())
+    distilled = planner.plan_run(_opinions(n), Settings(distill=True))
+
+    assert distilled['stages']['Stage 4']['calls'] < full['stages']['Stage 4']['calls']
+    assert distilled['stages']['Stage 4']['input_tokens'] < full['stages']['Stage 4']['input_tokens']
+    assert distilled['stages']['Stage 2'] == full['stages']['Stage 2']
+    assert distilled['assumptions']['distill_axes'] == distilled['assumptions']['axes']
+    assert distilled['assumptions']['stage4_max_calls'] == full['stages']['Stage 4']['calls']
+
+
+def test_distill_is_skipped_for_small_axes(capsys):
+    n = planner.PLAN_TOPICS * (distill.DISTILL_MIN_OPINIONS - 1)
+    settings = Settings(distill=True)
+    plan = planner.plan_run(_opinions(n), settings)
+    assert plan['stages'] == planner.plan_run(_opinions(n), Settings())['stages']
+    assert plan['assumptions']['distill_axes'] == 0
+
+    planner.print_plan(plan, settings)
+    assert '蒸留は行わず' in capsys.readouterr().out
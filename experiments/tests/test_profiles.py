@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""divcon.profiles の欠損を除く k-means のテスト"""
+
+import numpy as np
+
+from divcon.profiles import MIN_PROFILE_SIZE, cluster_rows, masked_distances
+
+
+def _two_groups(n=60, seed=0):
+    # 40 件は全軸で左、20 件は全軸で右。一部の要素は欠ける
+    rng = np.random.default_rng(seed)
+    left = np.clip(rng.normal(1.5, 0.4, size=(40, 3)), 1, 6)
+    right = np.clip(rng.normal(5.5, 0.4, size=(n - 40, 3)), 1, 6)
+    scores = np.vstack([left, right])
+    mask = rng.random(scores.shape) >= 0.15
+    mask[:, :2] = True
+    return np.where(mask, scores, np.nan), mask
+
+
+def test_masked_distances_ignore_missing_axes():
+    X = np.array([[2.0, 0.0], [0.0, 0.0]])
+    W = np.array([[1.0, 0.0], [0.0, 0.0]])
+    centers = np.array([[4.0, 100.0]])
+    d = masked_distances(X, W, centers)
+    assert d[0, 0] == 4.0
+    assert np.isinf(d[1, 0])
+
+
+def test_separable_groups_become_profiles_by_size():
+    scores, mask = _two_groups()
+    labels, centers, distances = cluster_rows(scores, mask, k=2, seed=1)
+    assert labels[:40].tolist() == [0] * 40
+    assert labels[40:].tolist() == [1] * 20
+    assert (centers[0] < 3).all() and (centers[1] > 4).all()
+    assert np.isfinite(distances).all()
+
+
+def test_rows_with_too_few_axes_get_no_profile():
+    scores, mask = _two_groups()
+    mask[0] = [True, False, False]
+    scores[0, 1:] = np.nan
+    labels, _, distances = cluster_rows(scores, mask, k=2)
+    assert labels[0] == -1 and np.isinf(distances[0])
+
+
+def test_k_is_capped_by_profile_size():
+    scores, mask = _two_groups(n=49)
+    labels, centers, _ = cluster_rows(scores, mask, k=50)
+    assert len(centers) <= 49 // MIN_PROFILE_SIZE
+    assert labels.max() < len(centers)
+
+    labels, centers, _ = cluster_rows(scores[:MIN_PROFILE_SIZE], mask[:MIN_PROFILE_SIZE], k=5)
+    assert len(centers) == 0 and (labels == -1).all()
+
+
+def test_same_seed_gives_same_profiles():
+    scores, mask = _two_groups()
+    a = cluster_rows(scores, mask, k=3, seed=7)
+    b = cluster_rows(scores, mask, k=3, seed=7)
+    np.testing.assert_array_equal(a[0], b[0])
+    np.testing.assert_allclose(a[1], b[1])
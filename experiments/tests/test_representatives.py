@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""divcon.representatives.select_representatives のテスト"""
+
+from divcon.representatives import select_representatives
+
+
+def test_keeps_all_when_fewer_than_k():
+    scores = [{'opinion_id': '1', 'score': 5, 'excerpt': 'b'}, {'opinion_id': '2', 'score': 2, 'excerpt': 'a'}]
+    assert [s['opinion_id'] for s in select_representatives(scores, 5)] == ['2', '1']
+
+
+def test_allocates_across_score_strata():
+    scores = [{'opinion_id': str(i), 'score': 1 + i % 3, 'excerpt': f'意見{i}'} for i in range(30)]
+    chosen = select_representatives(scores, 6)
+    assert len(chosen) == 6
+    assert sorted(s['score'] for s in chosen) == [1, 1, 2, 2, 3, 3]
+
+
+def test_empty_excerpts_use_texts():
+    # excerpt が空でも本文で2つのクラスタに分かれ、それぞれから1件ずつ選ばれる
+    scores = [{'opinion_id': str(i), 'score': 2, 'excerpt': ''} for i in range(20)]
+    texts = {str(i): ('原発の再稼働に賛成する' if i < 10 else '再生可能エネルギーの拡大を求める') for i in range(20)}
+    chosen = select_representatives(scores, 2, texts=texts)
+    assert sorted(int(s['opinion_id']) < 10 for s in chosen) == [False, True]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""divcon.rescore の再スコアリングがレスポンスキャッシュを使わないことのテスト"""
+
+import re
+import types
+from dataclasses import replace
+
+from divcon import config, llm
+from divcon.rescore import stage4_rescore_uncertain
+
+
+class _CountingClient:
+    """Stage 4 のスコアリングに答え、API 呼び出しの回数を数える"""
+
+    def __init__(self):
+        self.calls = 0
+        self.beta = types.SimpleNamespace(chat=types.SimpleNamespace(completions=self))
+
+    def parse(self, model=None, messages=None, response_format=None, **kwargs):
+        self.calls += 1
+        aliases = re.findall(r'^\[(\w+)\] ', messages[-1]['content'], re.M)
+        parsed = response_format(scores=[
+            {'opinion_id': alias, 'score': 3 + self.calls % 2, 'excerpt': '「賛成です」', 'reasoning': 'r'}
+            for alias in aliases
+        ])
+        usage = types.SimpleNamespace(prompt_tokens=10, completion_tokens=10, total_tokens=20)
+        return types.SimpleNamespace(usage=usage, choices=[types.SimpleNamespace(message=types.SimpleNamespace(parsed=parsed))])
+
+
+def test_single_target_repeats_bypass_cache(monkeypatch, tmp_path):
+    client = _CountingClient()
+    monkeypatch.setattr(llm, '_client', client)
+    monkeypatch.setattr(config, '_settings', replace(config.get_settings(), cache_dir=str(tmp_path),
+                                                     max_workers=1, slim_scoring=False))
+
+    axis = {'id': 'T1_A1', 'name': '軸', 'left_pole': '左', 'right_pole': '右'}
+    anchors = {'left_anchors': ['左'], 'right_anchors': ['右']}
+    opinions = [{'id': 1, 'comment': '賛成です。'}]
+    scores = [{'opinion_id': '1', 'score': 3, 'excerpt': '「賛成です」', 'reasoning': 'r'}]
+
+    scores, report = stage4_rescore_uncertain(axis, anchors, opinions, scores, repeats=3)
+
+    # 対象が1件なのでどの回も同じプロンプトになるが、キャッシュを使わずに毎回 API を呼ぶ
+    assert client.calls == 3
+    assert report['rescored'] == 1
+    assert scores[0]['votes'] == 4
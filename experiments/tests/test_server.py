@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""divcon.server.ResultsAPI.scores のキーセットページング（並び順）のテスト"""
+
+import pandas as pd
+import pytest
+
+from divcon.server import ResultsAPI, build_database
+
+SCORES = [None, 3, 6, None, 1, 4, 6, 2, None, 5]
+
+
+@pytest.fixture(scope='module')
+def api(tmp_path_factory):
+    results_dir = tmp_path_factory.mktemp('results')
+    pd.DataFrame({
+        'opinion_id': [str(i) for i in range(len(SCORES))],
+        'comment': [f'意見{i}' for i in range(len(SCORES))],
+        'topic_id': 'T1',
+        'axis_id': 'T1_A1',
+        'axis_name': '軸',
+        'score': pd.array(SCORES, dtype='Int64'),
+        'excerpt': '',
+        'reasoning': '',
+    }).to_csv(results_dir / 'scores.csv', index=False)
+    return ResultsAPI(build_database(results_dir))
+
+
+def _all_pages(api, **params):
+    items, cursor = [], None
+    while True:
+        page = api.scores(dict(params, cursor=cursor) if cursor else params)
+        items += page['items']
+        cursor = page['next_cursor']
+        if cursor is None:
+            return items
+
+
+@pytest.mark.parametrize('limit', ['1', '2', '3', '100'])
+def test_score_ascending_puts_nulls_last(api, limit):
+    items = _all_pages(api, sort='score', limit=limit)
+    assert [item['score'] for item in items] == [1, 2, 3, 4, 5, 6, 6, None, None, None]
+
+
+@pytest.mark.parametrize('limit', ['1', '2', '3', '100'])
+def test_score_descending_puts_nulls_last(api, limit):
+    items = _all_pages(api, sort='-score', limit=limit)
+    assert [item['score'] for item in items] == [6, 6, 5, 4, 3, 2, 1, None, None, None]
+    # 同じスコアの中は id の降順
+    assert [item['opinion_id'] for item in items[:2]] == ['6', '2']
+    assert [item['opinion_id'] for item in items[-3:]] == ['8', '3', '0']
+
+
+def test_id_order_pages(api):
+    assert [item['opinion_id'] for item in _all_pages(api, sort='-id', limit='4')] == \
+        [str(i) for i in reversed(range(len(SCORES)))]
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""divcon.sink.external_sort のテスト"""
+
+import random
+
+from divcon.sink import _score_sort_key, external_sort
+
+
+def _records(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {'seq': i, 'axis_id': f"T{rng.randint(1, 3)}_A{rng.randint(1, 2)}", 'score': rng.choice([None, 1, 2, 3, 4, 5, 6])}
+        for i in range(n)
+    ]
+
+
+def test_single_run_matches_sorted():
+    records = _records(50)
+    assert list(external_sort(records, _score_sort_key, run_rows=100)) == sorted(records, key=_score_sort_key)
+
+
+def test_merge_of_runs_matches_stable_sort(tmp_path):
+    records = _records(1000)
+    result = list(external_sort(iter(records), _score_sort_key, run_rows=64, tmp_dir=tmp_path))
+    # 同じ key のレコードは入力の順を保つ（sorted と同じ安定ソート）
+    assert result == sorted(records, key=_score_sort_key)
+    assert list(tmp_path.iterdir()) == []  # 一時ファイルは消える
+
+
+def test_exact_multiple_of_run_rows(tmp_path):
+    records = _records(128)
+    assert list(external_sort(records, _score_sort_key, run_rows=64, tmp_dir=tmp_path)) == \
+        sorted(records, key=_score_sort_key)
+
+
+def test_empty_input():
+    assert list(external_sort([], _score_sort_key, run_rows=10)) == []
+
+
+def test_nulls_sort_last_within_axis():
+    records = [{'axis_id': 'A', 'score': None}, {'axis_id': 'A', 'score': 6}, {'axis_id': 'A', 'score': 1}]
+    assert [r['score'] for r in external_sort(records, _score_sort_key, run_rows=1)] == [1, 6, None]
+
+
+def test_write_scores_csv_reads_text_back_from_jsonl(tmp_path):
+    from divcon.sink import JsonlSink, write_scores_csv
+    from divcon.store import OpinionStore
+
+    opinions = OpinionStore([{'id': 1, 'comment': '本文1'}, {'id': 2, 'comment': '本文2'}])
+    axes = [{'id': 'T1_A1', 'name': '軸1'}, {'id': 'T1_A2', 'name': '軸2'}]
+    records = [
+        {'opinion_id': '2', 'topic_id': 'T1', 'axis_id': 'T1_A2', 'score': None, 'excerpt': '', 'reasoning': 'r4',
+         'confidence': None, 'votes': 1},
+        {'opinion_id': '1', 'topic_id': 'T1', 'axis_id': 'T1_A1', 'score': 5, 'excerpt': '「e1」', 'reasoning': 'r1',
+         'confidence': 0.667, 'votes': 3},
+        {'opinion_id': '2', 'topic_id': 'T1', 'axis_id': 'T1_A1', 'score': 2, 'excerpt': '「e2」', 'reasoning': 'r2',
+         'confidence': 1.0, 'votes': 1},
+        {'opinion_id': '1', 'topic_id': 'T1', 'axis_id': 'T9_A1', 'score': 1, 'excerpt': '', 'reasoning': '',
+         'confidence': 1.0, 'votes': 1},  # axes にない軸は出力しない
+    ]
+    with JsonlSink(tmp_path / 'scores.jsonl') as sink:
+        sink.append(records)
+
+    count = write_scores_csv(tmp_path / 'scores.jsonl', tmp_path / 'scores.csv', opinions, axes, run_rows=1)
+
+    lines = (tmp_path / 'scores.csv').read_text(encoding='utf-8-sig').splitlines()
+    assert count == 3
+    assert lines[0] == 'opinion_id,comment,topic_id,axis_id,axis_name,score,excerpt,reasoning,confidence,votes'
+    assert lines[1:] == [
+        '2,本文2,T1,T1_A1,軸1,2.0,「e2」,r2,1.0,1',
+        '1,本文1,T1,T1_A1,軸1,5.0,「e1」,r1,0.67,3',
+        '2,本文2,T1,T1_A2,軸2,,,r4,,1',
+    ]
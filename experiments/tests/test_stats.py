@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""divcon.stats のヒストグラム集計のテスト"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from divcon.stats import compute_stats, score_histograms
+
+
+def _scores():
+    return pd.DataFrame({
+        'axis_id': ['A1', 'A1', 'A1', 'A1', 'A2', 'A2', 'B1'],
+        'topic_id': ['T1', 'T1', 'T1', 'T1', 'T1', 'T1', 'T2'],
+        'score': [1, 2, 6, None, 3, 3, 5],
+    })
+
+
+def test_score_histograms_puts_null_in_bin_zero():
+    axis_ids, hist = score_histograms(_scores())
+    assert axis_ids == ['A1', 'A2', 'B1']
+    np.testing.assert_array_equal(hist, [
+        [1, 1, 1, 0, 0, 0, 1],
+        [0, 0, 0, 2, 0, 0, 0],
+        [0, 0, 0, 0, 0, 1, 0],
+    ])
+
+
+def test_compute_stats_matches_pandas():
+    df = _scores()
+    result = compute_stats(df)
+    scored = df.dropna(subset=['score'])
+
+    a1 = result['axes']['A1']
+    assert (a1['total'], a1['scored'], a1['null']) == (4, 3, 1)
+    assert a1['null_rate'] == pytest.approx(0.25)
+    assert a1['mean'] == pytest.approx(scored[scored.axis_id == 'A1'].score.mean(), abs=1e-4)
+    assert a1['median'] == 2.0
+    assert a1['std'] == pytest.approx(scored[scored.axis_id == 'A1'].score.std(ddof=0), abs=1e-4)
+    assert (a1['left'], a1['right']) == (2, 1)
+    assert a1['topic_id'] == 'T1'
+
+    t1 = result['topics']['T1']
+    assert t1['median'] == pytest.approx(scored[scored.topic_id == 'T1'].score.median())
+    assert t1['histogram'] == {'1': 1, '2': 1, '3': 2, '4': 0, '5': 0, '6': 1}
+
+    overall = result['overall']
+    assert overall['scored'] == 6
+    assert overall['mean'] == pytest.approx(scored.score.mean(), abs=1e-4)
+    assert overall['median'] == pytest.approx(scored.score.median())
+
+
+def test_axis_without_scores_has_no_mean():
+    df = pd.DataFrame({'axis_id': ['A1'], 'topic_id': ['T1'], 'score': [None]})
+    a1 = compute_stats(df)['axes']['A1']
+    assert a1['mean'] is None and a1['median'] is None
+    assert a1['null_rate'] == 1.0
+
+
+def test_shared_axis_counts_by_score_topic():
+    df = pd.DataFrame({'axis_id': ['S1', 'S1', 'S1'], 'topic_id': ['T1', 'T2', 'T2'], 'score': [1, 6, 5]})
+    axes_data = {'T1': [{'id': 'S1', 'topic_ids': ['T1', 'T2']}], 'T2': []}
+    result = compute_stats(df, axes_data)
+    assert result['axes']['S1']['topic_id'] == 'T1'
+    assert result['topics']['T1']['scored'] == 1
+    assert result['topics']['T2']['scored'] == 2
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""divcon.sweep の品質指標とパレート判定のテスト"""
+
+import math
+
+import pytest
+
+from divcon.sweep import mark_pareto, quadratic_weighted_kappa, recommend, scoring_metrics
+
+
+def test_perfect_agreement():
+    assert quadratic_weighted_kappa([1, 2, 3, 4, 5, 6], [1, 2, 3, 4, 5, 6]) == pytest.approx(1.0)
+
+
+def test_complete_disagreement():
+    assert quadratic_weighted_kappa([1, 6], [6, 1]) == pytest.approx(-1.0)
+
+
+def test_known_value():
+    # 手計算: observed の重み付き和 2/25、expected の重み付き和 210/25/6 → 1 - 0.08 / 1.4
+    gold = [1, 2, 3, 4, 5, 6]
+    predicted = [1, 2, 3, 4, 6, 5]
+    assert quadratic_weighted_kappa(gold, predicted) == pytest.approx(0.9428571, abs=1e-6)
+
+
+def test_near_misses_score_higher_than_far_misses():
+    gold = [1, 2, 3, 4, 5, 6] * 3
+    near = [min(6, g + 1) for g in gold]
+    far = [7 - g for g in gold]
+    assert quadratic_weighted_kappa(gold, near) > quadratic_weighted_kappa(gold, far)
+
+
+def test_constant_predictions():
+    assert quadratic_weighted_kappa([3, 3, 3], [3, 3, 3]) == 1.0
+    # 予測が一定なら observed と expected が一致し、偶然と同じ（0）
+    assert quadratic_weighted_kappa([1, 2, 3], [3, 3, 3]) == pytest.approx(0.0)
+
+
+def test_too_few_items():
+    assert math.isnan(quadratic_weighted_kappa([3], [3]))
+
+
+def test_scoring_metrics():
+    labels = {'1': 1, '2': 6, '3': None, '4': 3}
+    scores = [{'opinion_id': 1, 'score': 2}, {'opinion_id': 2, 'score': 6}, {'opinion_id': 3, 'score': None},
+              {'opinion_id': 4, 'score': None}]
+    metrics = scoring_metrics(scores, labels)
+    assert metrics['n_scored'] == 2
+    assert metrics['null_agreement'] == 0.75
+    assert metrics['within_one'] == 1.0
+    assert metrics['quality'] == metrics['kappa']
+
+
+def test_pareto_and_recommend():
+    records = [
+        {'stage': '4', 'seconds': 10, 'quality': 0.9},
+        {'stage': '4', 'seconds': 5, 'quality': 0.8},
+        {'stage': '4', 'seconds': 12, 'quality': 0.85},  # 遅くて品質も低い
+        {'stage': '4', 'seconds': 1, 'quality': float('nan')},
+    ]
+    mark_pareto(records)
+    assert [r['pareto'] for r in records] == [True, True, False, False]
+    assert recommend(records, '4', 0.85)['seconds'] == 10
+    assert recommend(records, '4', 0.95) is None
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""divcon.workqueue.TaskQueue のリース・期限切れ・冪等なコミットのテスト"""
+
+import pytest
+
+from divcon.workqueue import MAX_ATTEMPTS, TaskQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = TaskQueue(tmp_path / 'queue.db')
+    q.add([('stage4:A:000000', 'stage4', {'n': 0}, 'A'), ('stage4:A:000001', 'stage4', {'n': 1}, 'A')])
+    yield q
+    q.close()
+
+
+def test_add_ignores_duplicate_ids(queue):
+    assert queue.add([('stage4:A:000000', 'stage4', {'n': 99}, 'A')]) == 0
+    assert queue.counts()['pending'] == 2
+
+
+def test_lease_is_exclusive(queue):
+    first = queue.lease('w1', limit=1)
+    second = queue.lease('w2', limit=5)
+    assert [t['id'] for t in first] == ['stage4:A:000000']
+    assert [t['id'] for t in second] == ['stage4:A:000001']
+    assert first[0]['payload'] == {'n': 0}
+    assert first[0]['attempts'] == 1
+    assert queue.lease('w3', limit=5) == []
+
+
+def test_lease_filters_kinds(queue):
+    queue.add([('stage5:A', 'stage5', {}, 'A')])
+    assert [t['id'] for t in queue.lease('w1', kinds=['stage5'], limit=5)] == ['stage5:A']
+
+
+def test_expired_lease_is_taken_over(queue):
+    task = queue.lease('w1', limit=1, lease_seconds=-1)[0]
+    retaken = queue.lease('w2', limit=1)
+    assert retaken[0]['id'] == task['id']
+    assert retaken[0]['attempts'] == 2
+    # 期限切れ後は元のワーカーのハートビートでは延ばせない
+    assert queue.heartbeat('w1', [task['id']]) == 0
+    assert queue.heartbeat('w2', [task['id']]) == 1
+
+
+def test_heartbeat_keeps_lease(queue):
+    task = queue.lease('w1', limit=1, lease_seconds=-1)[0]
+    assert queue.heartbeat('w1', [task['id']]) == 1
+    assert [t['id'] for t in queue.lease('w2', limit=5)] == ['stage4:A:000001']
+
+
+def test_expired_lease_fails_after_max_attempts(queue):
+    for attempt in range(MAX_ATTEMPTS):
+        tasks = queue.lease(f'w{attempt}', limit=1, lease_seconds=-1)
+        assert tasks[0]['id'] == 'stage4:A:000000'
+    queue.lease('w-last', kinds=['none'])  # 期限切れの判定だけを走らせる
+    assert queue.failures('stage4') == [('stage4:A:000000', 'リースの期限切れ')]
+
+
+def test_complete_is_idempotent(queue):
+    task = queue.lease('w1', limit=1, lease_seconds=-1)[0]
+    queue.lease('w2', limit=1)  # 期限切れ後に別のワーカーが取り直す
+    assert queue.complete(task['id'], 'w2', {'by': 'w2'}) is True
+    assert queue.complete(task['id'], 'w1', {'by': 'w1'}) is False  # 遅れたコミットは捨てる
+    assert queue.result(task['id']) == {'by': 'w2'}
+    assert queue.results('stage4', 'A') == [(task['id'], {'by': 'w2'})]
+
+
+def test_fail_retries_until_max_attempts(queue):
+    for attempt in range(MAX_ATTEMPTS):
+        task = queue.lease('w1', limit=1)[0]
+        assert task['attempts'] == attempt + 1
+        queue.fail(task['id'], 'w1', 'error')
+    assert queue.counts('stage4')['failed'] == 1
+    assert queue.failures('stage4') == [('stage4:A:000000', 'error')]
+
+
+def test_release_does_not_count_attempt(queue):
+    task = queue.lease('w1', limit=1)[0]
+    queue.release(task['id'], 'w1')
+    assert queue.lease('w2', limit=1)[0]['attempts'] == 1
+
+
+def test_meta_roundtrip(queue):
+    assert queue.get_meta('state') is None
+    queue.set_meta('state', {'stage': 'done'})
+    assert queue.get_meta('state') == {'stage': 'done'}